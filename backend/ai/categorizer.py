@@ -0,0 +1,170 @@
+"""
+QUERY CATEGORIZER
+Topic of a farmer's question, in any of the supported languages
+
+Keywords of every category and language are compiled into one regular
+expression (a trie of alternatives, so matching does not try them one by
+one) that is run once over the NFKC-normalized, case-folded text.
+Keywords match at the start of a word, so "pest" also matches
+"pesticides" and "कीट" matches "कीटनाशक"; a keyword ending in "$" must be
+the whole word ("dap$"). When several categories match, the first in
+CATEGORIES wins, as in the original if/elif chain.
+
+Words are runs of letters, digits and Indic vowel signs (\\w alone splits
+"कीटों" at its vowel signs); tokenize() is shared with the response cache.
+
+Backfill stored queries with `python analytics.py --categorize`.
+"""
+
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional
+
+GENERAL = "general"
+
+# Priority order; language codes as in GET /api/advisory/languages
+CATEGORIES: Dict[str, Dict[str, List[str]]] = {
+    "pest_control": {
+        "en": ["pest", "insect", "disease", "bug", "aphid", "worm", "caterpillar", "larva", "fung", "blight",
+               "mildew", "wilt", "rot$", "rotting", "weevil", "locust", "whitefl", "borer", "mite", "termite",
+               "thrips", "virus", "mealybug", "jassid"],
+        "hi": ["कीट", "कीड़", "रोग", "बीमारी", "इल्ली", "माहू", "सुंडी", "फफूंद", "दीमक", "टिड्डी", "झुलसा"],
+        "mr": ["कीड", "अळी", "मावा", "बुरशी", "वाळवी", "करपा"],
+        "bn": ["পোকা", "কীট", "রোগ", "ছত্রাক", "উইপোকা", "মাকড়"],
+        "gu": ["જીવાત", "કીટ", "રોગ", "ઈયળ", "ફૂગ", "ઉધઈ", "મોલો"],
+        "pa": ["ਕੀੜ", "ਕੀਟ", "ਰੋਗ", "ਬਿਮਾਰੀ", "ਸੁੰਡੀ", "ਉੱਲੀ", "ਸਿਉਂਕ", "ਤੇਲਾ"],
+        "ta": ["பூச்சி", "நோய்", "புழு", "பூஞ்சை", "கரையான்", "அசுவினி"],
+        "te": ["పురుగు", "తెగులు", "కీటక", "చీడ", "శిలీంధ్ర", "చెదలు"],
+        "kn": ["ಕೀಟ", "ರೋಗ", "ಹುಳು", "ಶಿಲೀಂಧ್ರ", "ಗೆದ್ದಲು"],
+    },
+    "fertilizer": {
+        "en": ["fertili", "nutrient", "micronutrient", "npk", "soil", "urea", "dap$", "potash", "manure",
+               "compost", "vermicompost", "nitrogen", "phosph", "potassium", "zinc", "sulphur", "sulfur", "gypsum"],
+        "hi": ["खाद", "उर्वरक", "यूरिया", "मिट्टी", "पोषक", "गोबर", "डीएपी", "पोटाश", "नाइट्रोजन", "जिंक"],
+        "mr": ["खत", "माती", "युरिया", "अन्नद्रव्य"],
+        "bn": ["সার$", "সারের", "মাটি", "ইউরিয়া", "পুষ্টি", "কম্পোস্ট"],
+        "gu": ["ખાતર", "માટી", "જમીન", "યુરિયા", "પોષક"],
+        "pa": ["ਖਾਦ", "ਮਿੱਟੀ", "ਯੂਰੀਆ", "ਪੋਸ਼ਕ", "ਡੀਏਪੀ"],
+        "ta": ["உரம்", "உரங்க", "உரத்", "மண்ணின்", "மண்$", "யூரியா", "ஊட்டச்சத்து"],
+        "te": ["ఎరువు", "నేల", "మట్టి", "యూరియా", "పోషక"],
+        "kn": ["ಗೊಬ್ಬರ", "ಮಣ್ಣ", "ಯೂರಿಯಾ", "ಪೋಷಕ"],
+    },
+    "weather": {
+        "en": ["weather", "rain", "temperat", "climate", "monsoon", "drought", "frost", "heatwave", "humid",
+               "storm", "hail", "flood", "cyclone"],
+        "hi": ["मौसम", "बारिश", "वर्षा", "बरसात", "तापमान", "सूखा", "ओलावृष्टि", "पाला$", "बाढ़", "आंधी",
+               "मानसून", "जलवायु"],
+        "mr": ["हवामान", "पाऊस", "पावसा", "दुष्काळ", "गारपीट", "मान्सून"],
+        "bn": ["আবহাওয়া", "বৃষ্টি", "তাপমাত্রা", "খরা", "বন্যা", "ঝড়", "বর্ষা"],
+        "gu": ["હવામાન", "વરસાદ", "તાપમાન", "દુષ્કાળ", "વાવાઝોડ", "પૂર$", "ચોમાસ"],
+        "pa": ["ਮੌਸਮ", "ਮੀਂਹ", "ਬਾਰਿਸ਼", "ਬਾਰਸ਼", "ਤਾਪਮਾਨ", "ਸੋਕਾ", "ਹੜ੍ਹ"],
+        "ta": ["வானிலை", "மழை", "பருவமழை", "வெப்ப", "வறட்சி", "வெள்ள", "புயல்"],
+        "te": ["వాతావరణ", "వర్ష", "ఉష్ణోగ్రత", "కరువు", "వరద", "తుఫాను"],
+        "kn": ["ಹವಾಮಾನ", "ಮಳೆ", "ತಾಪಮಾನ", "ಬರಗಾಲ", "ಪ್ರವಾಹ"],
+    },
+    "market": {
+        "en": ["price", "market", "sell", "mandi", "msp$", "buyer", "trader", "procure", "export", "enam$"],
+        "hi": ["भाव", "दाम", "कीमत", "मंडी", "बाजार", "बाज़ार", "बेच", "मूल्य", "खरीद"],
+        "mr": ["किंमत", "विक्री", "विकाय", "विकू", "हमीभाव"],
+        "bn": ["দাম", "বাজার", "বিক্রি", "মণ্ডি", "মূল্য"],
+        "gu": ["ભાવ", "બજાર", "કિંમત", "વેચ", "મંડી"],
+        "pa": ["ਭਾਅ", "ਕੀਮਤ", "ਮੰਡੀ", "ਵੇਚ", "ਬਾਜ਼ਾਰ", "ਬਜ਼ਾਰ"],
+        "ta": ["விலை", "சந்தை", "விற்ப", "விற்க", "மண்டி"],
+        "te": ["ధర", "మార్కెట్", "మండీ", "మండి", "అమ్మకం", "విక్రయ"],
+        "kn": ["ಬೆಲೆ", "ಮಾರುಕಟ್ಟೆ", "ಮಾರಾಟ", "ಮಂಡಿ"],
+    },
+    "government_schemes": {
+        "en": ["loan", "scheme", "subsid", "government", "insurance", "credit", "yojana", "pmkisan", "kcc$",
+               "pmfby$", "pension"],
+        "hi": ["योजना", "सब्सिडी", "अनुदान", "ऋण", "लोन", "कर्ज", "कर्ज़", "सरकार", "बीमा"],
+        "mr": ["शासन", "शासकीय", "विमा"],
+        "bn": ["প্রকল্প", "ভর্তুকি", "ঋণ", "সরকার", "বিমা", "বীমা"],
+        "gu": ["યોજના", "સબસિડી", "સહાય", "લોન", "સરકાર", "વીમ"],
+        "pa": ["ਯੋਜਨਾ", "ਸਕੀਮ", "ਸਬਸਿਡੀ", "ਕਰਜ਼", "ਸਰਕਾਰ", "ਬੀਮਾ"],
+        "ta": ["திட்ட", "மானிய", "கடன்", "அரசு", "காப்பீடு"],
+        "te": ["పథక", "సబ్సిడీ", "రాయితీ", "రుణ", "ప్రభుత్వ", "బీమా"],
+        "kn": ["ಯೋಜನೆ", "ಸಬ್ಸಿಡಿ", "ಸಹಾಯಧನ", "ಸಾಲ$", "ಸಾಲದ", "ಸಾಲಕ್ಕೆ", "ಸರ್ಕಾರ", "ವಿಮೆ"],
+    },
+    "cultivation": {
+        "en": ["seed", "variet", "plant", "grow", "sow", "cultivat", "irrigat", "harvest", "transplant", "yield",
+               "nursery", "spacing", "weed"],
+        "hi": ["बीज", "बुवाई", "बुआई", "किस्म", "खेती", "सिंचाई", "कटाई", "रोपाई", "उपज", "पैदावार", "उगा"],
+        "mr": ["बियाण", "पेरणी", "वाण$", "लागवड", "सिंचन", "काढणी", "उत्पादन"],
+        "bn": ["বীজ", "বপন", "জাত$", "চাষ", "সেচ", "ফলন", "রোপণ"],
+        "gu": ["બીજ", "બિયારણ", "વાવણી", "વાવેતર", "જાત$", "ખેતી", "સિંચાઈ", "લણણી", "ઉત્પાદન"],
+        "pa": ["ਬੀਜ", "ਬਿਜਾਈ", "ਕਿਸਮ", "ਖੇਤੀ", "ਸਿੰਚਾਈ", "ਵਾਢੀ", "ਝਾੜ"],
+        "ta": ["விதை", "ரகம்", "ரகங்க", "சாகுபடி", "பாசன", "அறுவடை", "நடவு", "மகசூல்"],
+        "te": ["విత్తన", "విత్తు", "రకం", "రకాల", "సాగు", "నీటిపారుదల", "దిగుబడి", "నాటు"],
+        "kn": ["ಬೀಜ", "ಬಿತ್ತನೆ", "ತಳಿ", "ಬೇಸಾಯ", "ನೀರಾವರಿ", "ಕೊಯ್ಲು", "ಇಳುವರಿ"],
+    },
+}
+
+# Letters and digits (\w), Indic letters with their vowel signs (U+0900-U+0DFF
+# without the danda punctuation), and the zero-width (non-)joiners
+WORD_CHARS = r"\w\u0900-\u0963\u0966-\u0DFF\u200C\u200D"
+WORD = re.compile(f"[{WORD_CHARS}]+")
+
+def normalize(text: str) -> str:
+    return unicodedata.normalize("NFKC", text).casefold()
+
+def tokenize(text: str) -> List[str]:
+    """Words of a text, normalized"""
+    return WORD.findall(normalize(text))
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Regular expression matching any of the words, longest first, with shared prefixes factored out"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def render(node) -> str:
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        if len(branches) == 1 and "" not in node:
+            return branches[0]
+        return f"(?:{'|'.join(branches)}){'?' if '' in node else ''}"
+
+    return render(trie)
+
+def _compile():
+    rank = {}
+    whole, prefixes = [], []
+    for position, keywords in enumerate(CATEGORIES.values()):
+        for words in keywords.values():
+            for word in words:
+                keyword = normalize(word.rstrip("$"))
+                # The same word in two categories counts for the first
+                rank.setdefault(keyword, position)
+                (whole if word.endswith("$") else prefixes).append(keyword)
+    pattern = (
+        f"(?<![{WORD_CHARS}])"
+        f"(?:{_trie_pattern(whole)}(?![{WORD_CHARS}])|{_trie_pattern(prefixes)})"
+    )
+    return re.compile(pattern), rank
+
+KEYWORDS, RANK = _compile()
+NAMES = list(CATEGORIES)
+
+def categorize(text: Optional[str]) -> str:
+    """Category of a farmer's question (GENERAL when no keyword matches)"""
+    best = len(NAMES)
+    for match in KEYWORDS.finditer(normalize(text or "")):
+        best = min(best, RANK[match.group()])
+        if best == 0:
+            break
+    return NAMES[best] if best < len(NAMES) else GENERAL
+
+def categorize_many(texts: Iterable[Optional[str]]) -> List[str]:
+    """Categories of many questions; repeated texts are categorized once"""
+    seen = {}
+    categories = []
+    for text in texts:
+        category = seen.get(text)
+        if category is None:
+            category = seen[text] = categorize(text)
+        categories.append(category)
+    return categories
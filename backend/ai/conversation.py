@@ -0,0 +1,82 @@
+"""
+CONVERSATION CONTEXT
+Per-session prompt state for the advisory chatbot
+
+A ConversationContext holds what GeminiAdvisor puts in front of each
+question: the system prompt and session context (rendered once, when the
+context is created) and the last few turns (re-rendered as turns are
+added). The advisory routes keep one per session in an in-memory LRU and
+update it after each turn is written, so a chat turn does not read the
+message history from the database.
+
+Prompt sizes are estimated in tokens (about 4 bytes of UTF-8 per token)
+and bounded by ADVISOR_MAX_PROMPT_TOKENS: the oldest turns are left out
+of the prompt until it fits.
+"""
+
+import os
+import threading
+from collections import deque
+from typing import Dict, Iterable, Optional, Tuple
+
+# Turns included in the prompt, as before (the last 5 messages)
+HISTORY_MESSAGES = 5
+MAX_PROMPT_TOKENS = int(os.getenv("ADVISOR_MAX_PROMPT_TOKENS", "2000"))
+NO_HISTORY = "No previous conversation\n"
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: ~4 characters of English, ~1-2 characters of Indic scripts"""
+    return (len(text.encode("utf-8")) + 3) // 4
+
+class ConversationContext:
+    """Rendered prompt prefix and recent turns of one chat session"""
+
+    def __init__(self, prefix: str, turns: Iterable[Tuple[str, str]] = (), version=None, context: Optional[Dict] = None):
+        """
+        Args:
+            prefix: System prompt and session context, rendered by GeminiAdvisor.new_conversation
+            turns: (role, content) of the latest messages, oldest first
+            version: ChatSession.last_activity the turns are current as of
+            context: The session context the prefix was rendered from (location, crop_interest)
+        """
+        self.context = context or {}
+        self.prefix = f"{prefix}\nPrevious conversation:\n"
+        self.prefix_tokens = estimate_tokens(self.prefix)
+        self.version = version
+        self._lines = deque(maxlen=HISTORY_MESSAGES)
+        self._lock = threading.Lock()
+        for role, content in turns:
+            self._lines.append(self._render_turn(role, content))
+        self._render_history()
+
+    @staticmethod
+    def _render_turn(role: str, content: str) -> Tuple[str, int]:
+        line = f"{'Farmer' if role == 'user' else 'Advisor'}: {content}\n"
+        return line, estimate_tokens(line)
+
+    def _render_history(self):
+        self.history = "".join(line for line, _ in self._lines)
+        self.history_tokens = sum(tokens for _, tokens in self._lines)
+
+    def add(self, role: str, content: str, version=None):
+        """Append a turn once it has been written"""
+        with self._lock:
+            self._lines.append(self._render_turn(role, content))
+            self._render_history()
+            if version is not None:
+                self.version = version
+
+    def prompt(self, message: str, language_name: str, max_tokens: Optional[int] = None) -> Tuple[str, int]:
+        """(full prompt, estimated tokens) for a question, dropping the oldest turns beyond max_tokens"""
+        suffix = f"\nUser question: {message}\n\nRespond in {language_name} language.\n"
+        budget = (max_tokens or MAX_PROMPT_TOKENS) - self.prefix_tokens - estimate_tokens(suffix)
+        with self._lock:
+            history, history_tokens = self.history, self.history_tokens
+            if history_tokens > budget:
+                lines = list(self._lines)
+                while lines and history_tokens > budget:
+                    history_tokens -= lines.pop(0)[1]
+                history = "".join(line for line, _ in lines)
+        if not history:
+            history, history_tokens = NO_HISTORY, estimate_tokens(NO_HISTORY)
+        return f"{self.prefix}{history}{suffix}", self.prefix_tokens + history_tokens + estimate_tokens(suffix)
@@ -0,0 +1,104 @@
+"""
+FAKE LLM SERVER
+Local stand-in for the Gemini API, with injected latency and failures
+
+Serves generateContent and streamGenerateContent (alt=sse) in the
+Gemini REST format, so the advisory chatbot and its LLM client can be
+run and benchmarked offline:
+
+    python -m ai.fake_llm_server --port 8090 --latency-ms 1500 --tail-rate 0.05 --error-rate 0.02
+    GEMINI_API_BASE=http://127.0.0.1:8090 uvicorn main:app
+
+Each request waits --latency-ms (plus up to --jitter-ms) before the
+first chunk, --tail-rate of them another --tail-ms (the slow tail that
+hedging is for), and --error-rate of them answer 503 instead. Streams
+send a chunk of the answer every --chunk-ms.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+
+from aiohttp import web
+
+ANSWER = (
+    "Spray neem oil at 5 ml per litre of water in the early morning or evening, "
+    "and repeat after a week if the attack continues. Remove badly affected leaves, "
+    "keep the field free of weeds, and use yellow sticky traps to watch the pest "
+    "population. For severe infestations, ask your Krishi Vigyan Kendra which "
+    "approved insecticide suits your crop and follow the label dose."
+)
+CHUNK_WORDS = 4
+
+def _chunks():
+    words = ANSWER.split(" ")
+    return [" ".join(words[i:i + CHUNK_WORDS]) + " " for i in range(0, len(words), CHUNK_WORDS)]
+
+def _payload(text: str) -> dict:
+    return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}]}
+
+def make_app(
+    latency_ms: float = 1000,
+    jitter_ms: float = 200,
+    tail_rate: float = 0.0,
+    tail_ms: float = 5000,
+    error_rate: float = 0.0,
+    chunk_ms: float = 50
+) -> web.Application:
+    stats = {"requests": 0, "errors": 0, "tail": 0}
+
+    async def delay(request: web.Request):
+        stats["requests"] += 1
+        await request.read()
+        if random.random() < error_rate:
+            stats["errors"] += 1
+            raise web.HTTPServiceUnavailable(text=json.dumps({"error": {"code": 503, "message": "overloaded"}}))
+        seconds = (latency_ms + random.uniform(0, jitter_ms)) / 1000
+        if random.random() < tail_rate:
+            stats["tail"] += 1
+            seconds += tail_ms / 1000
+        await asyncio.sleep(seconds)
+
+    async def call(request: web.Request) -> web.StreamResponse:
+        method = request.match_info["call"].rpartition(":")[2]
+        if method == "generateContent":
+            await delay(request)
+            await asyncio.sleep(chunk_ms * (len(_chunks()) - 1) / 1000)
+            return web.json_response(_payload(ANSWER))
+        if method == "streamGenerateContent":
+            await delay(request)
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+            await response.prepare(request)
+            for i, chunk in enumerate(_chunks()):
+                if i:
+                    await asyncio.sleep(chunk_ms / 1000)
+                await response.write(f"data: {json.dumps(_payload(chunk))}\r\n\r\n".encode())
+            await response.write_eof()
+            return response
+        raise web.HTTPNotFound()
+
+    async def get_stats(request: web.Request) -> web.Response:
+        return web.json_response(stats)
+
+    app = web.Application()
+    app["stats"] = stats
+    app.router.add_post("/v1beta/models/{call}", call)
+    app.router.add_get("/stats", get_stats)
+    return app
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=1000)
+    parser.add_argument("--jitter-ms", type=float, default=200)
+    parser.add_argument("--tail-rate", type=float, default=0.0)
+    parser.add_argument("--tail-ms", type=float, default=5000)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--chunk-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    web.run_app(
+        make_app(args.latency_ms, args.jitter_ms, args.tail_rate, args.tail_ms, args.error_rate, args.chunk_ms),
+        host="127.0.0.1", port=args.port
+    )
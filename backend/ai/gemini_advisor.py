@@ -7,21 +7,35 @@ Setup:
 2. Set environment variable: GEMINI_API_KEY=your_key_here
 3. Or add to .env file
 
+Without a key the advisor runs in mock mode (canned answers per topic).
+API calls go through ai/llm_client.py (non-blocking, with timeouts,
+retries and a circuit breaker); when they fail, the mock answer is given.
+
 Features:
 - Multilingual support (English, Hindi, Tamil, Telugu, etc.)
 - Context-aware responses
 - Agricultural knowledge base
 - Pest control advice
 - Weather-based recommendations
+- Response cache for near-identical questions (ai/response_cache.py)
+- Streaming responses (stream_response)
 """
 
 import os
-from typing import List, Dict, Optional
+import re
+from typing import AsyncIterator, List, Dict, Optional
 import asyncio
+from contextlib import aclosing
 from datetime import datetime
 
-# For production, install and uncomment:
-# import google.generativeai as genai
+from ai.categorizer import categorize
+from ai.conversation import ConversationContext, HISTORY_MESSAGES, estimate_tokens
+from ai.llm_client import LLMUnavailable, make_llm_client
+from ai.response_cache import ResponseCache, make_response_cache
+
+# Streamed responses are sent a few words at a time
+STREAM_WORD = re.compile(r"\S+\s*")
+STREAM_CHUNK_WORDS = 4
 
 class GeminiAdvisor:
     def __init__(self):
@@ -46,23 +60,37 @@ class GeminiAdvisor:
         If asked in a regional language, respond in that language.
         """
         
+        # Responses to recent questions, reused for near-identical ones
+        self.response_cache = make_response_cache()
+        
+        # Simulated model latency in mock mode, in seconds (benchmarks set these)
+        self.mock_first_chunk_delay = 0.0
+        self.mock_chunk_delay = 0.0
+        
         self.initialize_model()
     
     def initialize_model(self):
-        """Initialize Gemini model"""
-        # In production, uncomment:
-        # genai.configure(api_key=self.api_key)
-        # self.model = genai.GenerativeModel(self.model_name)
+        """Initialize Gemini model (mock mode without an API key or GEMINI_API_BASE)"""
+        if self.api_key == "YOUR_API_KEY_HERE" and not os.getenv("GEMINI_API_BASE"):
+            print("Gemini AI Advisor initialized (using mock mode)")
+            self.model = "mock"
+            return
         
-        print("Gemini AI Advisor initialized (using mock mode)")
-        self.model = "mock"
+        self.model = make_llm_client(self.api_key, self.model_name)
+        print(f"Gemini AI Advisor initialized ({self.model_name} at {self.model.base_url})")
+    
+    async def close(self):
+        """Close connections to the Gemini API"""
+        if self.model != "mock":
+            await self.model.close()
     
     async def generate_response(
         self,
         message: str,
         language: str,
-        history: List,
-        context: Dict
+        history: Optional[List] = None,
+        context: Optional[Dict] = None,
+        conversation: Optional[ConversationContext] = None
     ) -> Dict:
         """
         Generate AI response using Gemini
@@ -70,69 +98,112 @@ class GeminiAdvisor:
         Args:
             message: User's question
             language: Language code
-            history: Previous chat messages
+            history: Previous chat messages (not needed with a conversation)
             context: Additional context (location, crops, etc.)
+            conversation: The session's cached prompt prefix and recent turns
         
         Returns:
             Dictionary with response and metadata
         """
-        start_time = datetime.now()
+        async for event in self.stream_response(message, language, history, context, conversation, stream=False):
+            pass
+        return event
+    
+    async def stream_response(
+        self,
+        message: str,
+        language: str,
+        history: Optional[List] = None,
+        context: Optional[Dict] = None,
+        conversation: Optional[ConversationContext] = None,
+        stream: bool = True
+    ) -> AsyncIterator[Dict]:
+        """
+        Generate AI response using Gemini, as it is generated
         
-        # Build conversation context
-        conversation_history = self._build_conversation_history(history)
-        context_str = self._build_context_string(context)
+        Yields {"delta": text} for each chunk of the response, then the
+        dictionary generate_response returns (with "done": True). When the
+        model is unavailable before the first chunk, the offline (mock)
+        answer is given instead ("fallback": True).
         
-        # Full prompt
-        full_prompt = f"""{self.system_prompt}
+        Args:
+            stream: Stream from the model; False makes a single (hedged) call
+        """
+        start_time = datetime.now()
         
-Context: {context_str}
-
-Previous conversation:
-{conversation_history}
-
-User question: {message}
-
-Respond in {self._get_language_name(language)} language.
-"""
+        # Prompt prefix and history are rendered once per session and turn,
+        # not per request, when the caller keeps a ConversationContext
+        if conversation is None:
+            conversation = self.new_conversation(context or {}, [(msg.role, msg.content) for msg in history or []])
+        
+        # Categorize query
+        category = self._categorize_query(message)
         
-        # Generate response
-        if self.model == "mock":
-            response_text = self._generate_mock_response(message, language)
+        # Answer near-identical questions from the same kind of farmer from the
+        # cache; not once the session has earlier turns the answer may build on
+        cache_bucket = ResponseCache.bucket(
+            category, language, conversation.context.get("location"), conversation.context.get("crop_interest")
+        )
+        follow_up = bool(conversation.history)
+        cached = self.response_cache.get(cache_bucket, message, follow_up=follow_up)
+        chunks = []
+        fallback = False
+        if cached is not None:
+            prompt_tokens = 0
+            for chunk in self._split_chunks(cached["response"]):
+                chunks.append(chunk)
+                yield {"delta": chunk}
         else:
-            # In production, uncomment:
-            # response = self.model.generate_content(full_prompt)
-            # response_text = response.text
-            response_text = self._generate_mock_response(message, language)
+            full_prompt, prompt_tokens = conversation.prompt(message, self._get_language_name(language))
+            
+            # Generate response
+            if self.model == "mock":
+                model_chunks = self._stream_mock_response(message, language, category)
+            elif stream:
+                model_chunks = self.model.stream(full_prompt)
+            else:
+                model_chunks = self._generate_model_response(full_prompt)
+            try:
+                async with aclosing(model_chunks):
+                    async for chunk in model_chunks:
+                        chunks.append(chunk)
+                        yield {"delta": chunk}
+            except LLMUnavailable as e:
+                # A half-streamed answer cannot be replaced
+                if chunks:
+                    raise
+                print(f"Gemini unavailable, answering offline: {e}")
+                fallback = True
+                for chunk in self._split_chunks(self._generate_mock_response(message, language, category)):
+                    chunks.append(chunk)
+                    yield {"delta": chunk}
+        response_text = "".join(chunks)
+        if cached is None and not fallback:
+            self.response_cache.set(cache_bucket, message, {"response": response_text}, follow_up=follow_up)
         
         # Calculate response time
         end_time = datetime.now()
         response_time_ms = int((end_time - start_time).total_seconds() * 1000)
         
-        # Categorize query
-        category = self._categorize_query(message)
-        
         # Generate follow-up suggestions
         suggestions = self._generate_suggestions(category, language)
         
-        return {
+        yield {
+            "done": True,
             "response": response_text,
             "category": category,
-            "tokens_used": len(message.split()) + len(response_text.split()),
+            "cached": cached is not None,
+            "fallback": fallback,
+            "prompt_tokens": 0 if fallback else prompt_tokens,
+            "tokens_used": 0 if cached is not None or fallback else prompt_tokens + estimate_tokens(response_text),
             "response_time_ms": response_time_ms,
             "suggestions": suggestions
         }
     
-    def _build_conversation_history(self, history: List) -> str:
-        """Build conversation history string"""
-        if not history:
-            return "No previous conversation"
-        
-        history_str = ""
-        for msg in history[-5:]:  # Last 5 messages
-            role = "Farmer" if msg.role == "user" else "Advisor"
-            history_str += f"{role}: {msg.content}\n"
-        
-        return history_str
+    def new_conversation(self, context: Dict, turns=(), version=None) -> ConversationContext:
+        """Conversation context for a session: (role, content) turns oldest first"""
+        prefix = f"{self.system_prompt}\n        \nContext: {self._build_context_string(context)}\n"
+        return ConversationContext(prefix, turns[-HISTORY_MESSAGES:], version, context)
     
     def _build_context_string(self, context: Dict) -> str:
         """Build context string"""
@@ -160,27 +231,12 @@ Respond in {self._get_language_name(language)} language.
         return languages.get(code, "English")
     
     def _categorize_query(self, message: str) -> str:
-        """Categorize the farmer's query"""
-        message_lower = message.lower()
-        
-        if any(word in message_lower for word in ['pest', 'insect', 'disease', 'bug']):
-            return "pest_control"
-        elif any(word in message_lower for word in ['fertilizer', 'nutrient', 'npk', 'soil']):
-            return "fertilizer"
-        elif any(word in message_lower for word in ['weather', 'rain', 'temperature', 'climate']):
-            return "weather"
-        elif any(word in message_lower for word in ['price', 'market', 'sell', 'mandi']):
-            return "market"
-        elif any(word in message_lower for word in ['loan', 'scheme', 'subsidy', 'government']):
-            return "government_schemes"
-        elif any(word in message_lower for word in ['seed', 'variety', 'plant', 'grow']):
-            return "cultivation"
-        else:
-            return "general"
+        """Categorize the farmer's query (any supported language, see ai/categorizer.py)"""
+        return categorize(message)
     
-    def _generate_mock_response(self, message: str, language: str) -> str:
+    def _generate_mock_response(self, message: str, language: str, category: Optional[str] = None) -> str:
         """Generate mock response for demo"""
-        category = self._categorize_query(message)
+        category = category or self._categorize_query(message)
         
         responses = {
             "pest_control": {
@@ -211,6 +267,25 @@ Respond in {self._get_language_name(language)} language.
         
         return response
     
+    @staticmethod
+    def _split_chunks(text: str) -> List[str]:
+        """Split a response into chunks of a few words, about what a model streams at a time"""
+        words = STREAM_WORD.findall(text)
+        return ["".join(words[i:i + STREAM_CHUNK_WORDS]) for i in range(0, len(words), STREAM_CHUNK_WORDS)]
+    
+    async def _generate_model_response(self, prompt: str) -> AsyncIterator[str]:
+        """The model's whole answer as a single chunk"""
+        yield await self.model.generate(prompt)
+    
+    async def _stream_mock_response(self, message: str, language: str, category: str) -> AsyncIterator[str]:
+        """Stream the mock response in chunks, at the simulated model speed"""
+        if self.mock_first_chunk_delay:
+            await asyncio.sleep(self.mock_first_chunk_delay)
+        for chunk in self._split_chunks(self._generate_mock_response(message, language, category)):
+            yield chunk
+            if self.mock_chunk_delay:
+                await asyncio.sleep(self.mock_chunk_delay)
+    
     def _generate_suggestions(self, category: str, language: str) -> List[str]:
         """Generate follow-up suggestions"""
         suggestions_map = {
@@ -0,0 +1,325 @@
+"""
+LLM CLIENT
+Non-blocking, guarded calls to the Gemini API for the advisory chatbot
+
+The SDK's generate_content is blocking; called from an async route it
+would stall every request on the worker for the whole generation.
+LLMClient calls the Gemini REST API with aiohttp instead and guards it:
+
+- concurrency: at most LLM_MAX_CONCURRENCY calls in flight per worker;
+  a call that cannot get a slot within LLM_TIMEOUT is shed
+- timeouts: each attempt is abandoned after LLM_TIMEOUT seconds (for
+  streams: between chunks)
+- retries: timeouts, connection errors, 429 and 5xx are retried up to
+  LLM_RETRIES times, after a full-jitter exponential backoff
+- hedging: with LLM_HEDGE_AFTER_MS set, a second request is sent when
+  the first has not answered by then and a slot is free; the first
+  answer wins and the other is cancelled (not for streams)
+- circuit breaker: after LLM_BREAKER_FAILURES consecutive failed calls,
+  calls fail immediately for LLM_BREAKER_RESET seconds, then a single
+  trial call closes it again or keeps it open
+
+Every failure is raised as LLMUnavailable, which GeminiAdvisor answers
+with its offline responses. Point GEMINI_API_BASE at ai/fake_llm_server.py
+to run against a slow or failing upstream offline.
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+from contextlib import aclosing
+from typing import AsyncIterator, Optional
+
+import aiohttp
+
+GEMINI_API_BASE = "https://generativelanguage.googleapis.com"
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+class LLMUnavailable(Exception):
+    """The model did not answer: upstream errors, timeouts, overload or an open circuit"""
+
+class LLMBusy(LLMUnavailable):
+    """Every slot was taken for the whole timeout (not counted against the upstream)"""
+
+class _Retryable(Exception):
+    pass
+
+class _LoopState:
+    """aiohttp session and semaphore, which belong to one event loop"""
+
+    def __init__(self, loop, max_concurrency: int):
+        self.loop = loop
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.http = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=max_concurrency * 2))
+
+class LLMClient:
+    """Gemini generateContent / streamGenerateContent with concurrency limit, retries, hedging and circuit breaker"""
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        base_url: str = GEMINI_API_BASE,
+        max_concurrency: int = 32,
+        timeout: float = 20.0,
+        retries: int = 2,
+        backoff: float = 0.25,
+        hedge_after: Optional[float] = None,
+        breaker_failures: int = 5,
+        breaker_reset: float = 30.0
+    ):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.hedge_after = hedge_after
+        self.breaker_failures = breaker_failures
+        self.breaker_reset = breaker_reset
+        self._state: Optional[_LoopState] = None
+        # Circuit breaker: consecutive failures, when it opened, trial call in flight
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+        self.calls = 0
+        self.failures = 0
+        self.retried = 0
+        self.timeouts = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.shed = 0
+        self.rejected = 0
+        self.in_flight = 0
+
+    async def generate(self, prompt: str) -> str:
+        """The model's answer to a prompt"""
+        trial = self._admit()
+        outcome = None
+        try:
+            for attempt in range(self.retries + 1):
+                try:
+                    text = await self._hedged(prompt)
+                    outcome = True
+                    return text
+                except _Retryable as e:
+                    if attempt == self.retries:
+                        raise LLMUnavailable(f"{e} after {attempt + 1} attempts") from e
+                    await self._backoff(attempt)
+        except LLMBusy:
+            raise
+        except LLMUnavailable:
+            outcome = False
+            raise
+        finally:
+            self._record(outcome, trial)
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """The model's answer to a prompt, chunk by chunk (retried only before the first chunk)"""
+        trial = self._admit()
+        outcome = None
+        started = False
+        try:
+            for attempt in range(self.retries + 1):
+                try:
+                    async with aclosing(self._stream_attempt(prompt)) as chunks:
+                        async for chunk in chunks:
+                            started = True
+                            yield chunk
+                    outcome = True
+                    return
+                except _Retryable as e:
+                    if started or attempt == self.retries:
+                        raise LLMUnavailable(f"{e} after {attempt + 1} attempts") from e
+                    await self._backoff(attempt)
+        except LLMBusy:
+            raise
+        except LLMUnavailable:
+            outcome = False
+            raise
+        finally:
+            self._record(outcome, trial)
+
+    def _admit(self) -> bool:
+        """
+        Raise LLMUnavailable while the circuit is open; let one trial call
+        through after the reset time (returns whether this is the trial)
+        """
+        self.calls += 1
+        if self._opened_at is None:
+            return False
+        if self._trial or time.monotonic() - self._opened_at < self.breaker_reset:
+            self.rejected += 1
+            raise LLMUnavailable("circuit open")
+        self._trial = True
+        return True
+
+    def _record(self, outcome: Optional[bool], trial: bool):
+        """Update the circuit breaker with a call's outcome (None: cancelled or shed, no verdict)"""
+        if trial:
+            self._trial = False
+        if outcome is None:
+            return
+        if outcome:
+            self._failures = 0
+            self._opened_at = None
+            return
+        self.failures += 1
+        self._failures += 1
+        if self._opened_at is not None or self._failures >= self.breaker_failures:
+            self._opened_at = time.monotonic()
+
+    async def _backoff(self, attempt: int):
+        self.retried += 1
+        await asyncio.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+
+    async def _hedged(self, prompt: str) -> str:
+        """One attempt, plus a second one if the first is slower than hedge_after"""
+        if not self.hedge_after:
+            return await self._attempt(prompt)
+        tasks = [asyncio.ensure_future(self._attempt(prompt))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+            if done or self._loop_state().semaphore.locked():
+                return await tasks[0]
+            self.hedges += 1
+            tasks.append(asyncio.ensure_future(self._attempt(prompt)))
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                errors = {task: task.exception() for task in done}
+                for task, error in errors.items():
+                    if error is None:
+                        self.hedge_wins += task is tasks[1]
+                        return task.result()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _loop_state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        if self._state is None or self._state.loop is not loop:
+            self._state = _LoopState(loop, self.max_concurrency)
+        return self._state
+
+    async def _acquire(self) -> _LoopState:
+        state = self._loop_state()
+        try:
+            await asyncio.wait_for(state.semaphore.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            self.shed += 1
+            raise LLMBusy(f"no free slot in {self.timeout}s ({self.max_concurrency} calls in flight)")
+        self.in_flight += 1
+        return state
+
+    def _release(self, state: _LoopState):
+        self.in_flight -= 1
+        state.semaphore.release()
+
+    async def _attempt(self, prompt: str) -> str:
+        state = await self._acquire()
+        try:
+            async with await asyncio.wait_for(self._post(state, "generateContent", prompt), self.timeout) as response:
+                await self._check(response)
+                data = await asyncio.wait_for(response.json(), self.timeout)
+            return self._text(data)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise _Retryable(f"timed out after {self.timeout}s")
+        except aiohttp.ClientError as e:
+            raise _Retryable(f"{type(e).__name__}: {e}")
+        finally:
+            self._release(state)
+
+    async def _stream_attempt(self, prompt: str) -> AsyncIterator[str]:
+        state = await self._acquire()
+        try:
+            async with await asyncio.wait_for(
+                self._post(state, "streamGenerateContent", prompt, alt="sse"), self.timeout
+            ) as response:
+                await self._check(response)
+                while True:
+                    line = await asyncio.wait_for(response.content.readline(), self.timeout)
+                    if not line:
+                        break
+                    if line.startswith(b"data:"):
+                        text = self._text(json.loads(line[5:]))
+                        if text:
+                            yield text
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise _Retryable(f"timed out after {self.timeout}s")
+        except aiohttp.ClientError as e:
+            raise _Retryable(f"{type(e).__name__}: {e}")
+        finally:
+            self._release(state)
+
+    async def _post(self, state: _LoopState, method: str, prompt: str, **params) -> aiohttp.ClientResponse:
+        return await state.http.post(
+            f"{self.base_url}/v1beta/models/{self.model}:{method}",
+            params=params,
+            headers={"x-goog-api-key": self.api_key},
+            json={"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+        )
+
+    @staticmethod
+    async def _check(response: aiohttp.ClientResponse):
+        if response.status in RETRYABLE_STATUS:
+            raise _Retryable(f"HTTP {response.status}")
+        if response.status >= 400:
+            raise LLMUnavailable(f"HTTP {response.status}: {(await response.text())[:200]}")
+
+    @staticmethod
+    def _text(data: dict) -> str:
+        try:
+            parts = data["candidates"][0]["content"]["parts"]
+        except (KeyError, IndexError, TypeError):
+            raise LLMUnavailable(f"no answer in response: {json.dumps(data)[:200]}")
+        return "".join(part.get("text", "") for part in parts)
+
+    async def close(self):
+        if self._state is not None and self._state.loop is asyncio.get_running_loop():
+            await self._state.http.close()
+        self._state = None
+
+    def stats(self) -> dict:
+        if self._opened_at is None:
+            breaker = "closed"
+        elif self._trial or time.monotonic() - self._opened_at >= self.breaker_reset:
+            breaker = "half-open"
+        else:
+            breaker = "open"
+        return {
+            "backend": "gemini",
+            "model": self.model,
+            "base_url": self.base_url,
+            "calls": self.calls,
+            "failures": self.failures,
+            "retries": self.retried,
+            "timeouts": self.timeouts,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "shed": self.shed,
+            "rejected": self.rejected,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "circuit": breaker
+        }
+
+def make_llm_client(api_key: str, model: str) -> LLMClient:
+    hedge_after_ms = float(os.getenv("LLM_HEDGE_AFTER_MS", "0"))
+    return LLMClient(
+        api_key=api_key,
+        model=model,
+        base_url=os.getenv("GEMINI_API_BASE", GEMINI_API_BASE),
+        max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "32")),
+        timeout=float(os.getenv("LLM_TIMEOUT", "20")),
+        retries=int(os.getenv("LLM_RETRIES", "2")),
+        hedge_after=hedge_after_ms / 1000 if hedge_after_ms > 0 else None,
+        breaker_failures=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+        breaker_reset=float(os.getenv("LLM_BREAKER_RESET", "30"))
+    )
@@ -0,0 +1,205 @@
+"""
+ADVISORY RESPONSE CACHE
+Reuse answers to near-identical farmer questions instead of calling the model
+
+Farmers in one district ask the same questions in slightly different words
+("neem oil dose for cotton pests?", "Neem oil dosage for cotton pest").
+Answers are cached per (category, language, location, crop interest) and
+the numbers in the question (digits of any script, and English number
+words: a dose for 2 acres is not the dose for 5), and looked up by question:
+
+- exact:   same question after normalization (Unicode NFKC, case folded,
+           punctuation and English question words dropped)
+- similar: cosine similarity of character trigram counts of at least
+           RESPONSE_CACHE_SIMILARITY (0.92), found through a per-bucket
+           inverted index of trigrams. Paraphrases score ~0.9-1.0, the
+           same question about another crop, input or stage ~0.65-0.83.
+
+Entries expire after RESPONSE_CACHE_TTL seconds (a day) and the least
+recently used are evicted beyond RESPONSE_CACHE_SIZE. Questions that may
+depend on the conversation are neither looked up nor stored: those asked
+after earlier turns of the session (the caller passes follow_up=True), and
+those of fewer than 3 words after normalization ("and for wheat?").
+
+Works the same with the mock model, so it can be exercised offline.
+"""
+
+import math
+import os
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict, defaultdict
+from typing import Dict, Hashable, Optional, Tuple
+
+from ai.categorizer import tokenize
+
+SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.92"))
+MIN_WORDS = 3
+# Words that change how a question is phrased, not what it asks
+FILLER_WORDS = frozenset(
+    "a about an are can do does for i in is me my of on please should tell the to what".split()
+)
+
+NUMBER_WORDS = dict(zip(
+    "zero one two three four five six seven eight nine ten eleven twelve fifteen twenty "
+    "thirty forty fifty hundred thousand".split(),
+    "0 1 2 3 4 5 6 7 8 9 10 11 12 15 20 30 40 50 100 1000".split()
+))
+NUMBER_WORDS.update(half="half", quarter="quarter", double="double")
+
+def normalize(question: str) -> str:
+    return " ".join(word for word in tokenize(question) if word not in FILLER_WORDS)
+
+def numbers(normalized: str) -> tuple:
+    """Numbers in a normalized question, in order, with digits of every script as ASCII"""
+    found = []
+    for word in normalized.split():
+        if word in NUMBER_WORDS:
+            found.append(NUMBER_WORDS[word])
+        elif any(char.isdigit() for char in word):
+            found.append("".join(str(unicodedata.digit(char, char)) if char.isdigit() else char for char in word))
+    return tuple(found)
+
+def trigrams(normalized: str) -> Counter:
+    padded = f" {normalized} "
+    return Counter(padded[i:i + 3] for i in range(len(padded) - 2))
+
+class _Entry:
+    __slots__ = ("bucket", "question", "grams", "norm", "value", "expires_at")
+
+    def __init__(self, bucket, question, grams, value, expires_at):
+        self.bucket = bucket
+        self.question = question
+        self.grams = grams
+        self.norm = math.sqrt(sum(count * count for count in grams.values()))
+        self.value = value
+        self.expires_at = expires_at
+
+class ResponseCache:
+    """Thread-safe question -> response cache with similarity lookup, TTL and LRU eviction"""
+
+    def __init__(self, maxsize: int = 5000, ttl: float = 86400, similarity: float = SIMILARITY):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.similarity = similarity
+        # (bucket, normalized question) -> entry, least recently used first
+        self._entries: "OrderedDict[Tuple[Hashable, str], _Entry]" = OrderedDict()
+        # bucket -> trigram -> keys of the bucket's entries containing it
+        self._index: Dict[Hashable, Dict[str, set]] = defaultdict(lambda: defaultdict(set))
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def bucket(category: str, language: str, location: Optional[str], crop_interest: Optional[str]) -> tuple:
+        return (category, language, normalize(location or ""), normalize(crop_interest or ""))
+
+    def get(self, bucket: Hashable, question: str, follow_up: bool = False) -> Optional[dict]:
+        """
+        The cached response to this or a similar enough question with the
+        same numbers, else None (always None for a follow_up question)
+        """
+        normalized = normalize(question)
+        if follow_up or len(normalized.split()) < MIN_WORDS:
+            self.skipped += 1
+            return None
+        bucket = (bucket, numbers(normalized))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get((bucket, normalized))
+            if entry is not None and self._live(entry, now):
+                self._entries.move_to_end((bucket, normalized))
+                self.exact_hits += 1
+                return entry.value
+
+            entry = self._most_similar(bucket, trigrams(normalized), now)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((bucket, entry.question))
+            self.similar_hits += 1
+            return entry.value
+
+    def set(self, bucket: Hashable, question: str, value: dict, follow_up: bool = False):
+        normalized = normalize(question)
+        if follow_up or len(normalized.split()) < MIN_WORDS:
+            return
+        bucket = (bucket, numbers(normalized))
+        key = (bucket, normalized)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            entry = _Entry(bucket, normalized, trigrams(normalized), value, time.monotonic() + self.ttl)
+            self._entries[key] = entry
+            postings = self._index[bucket]
+            for gram in entry.grams:
+                postings[gram].add(normalized)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _live(self, entry: _Entry, now: float) -> bool:
+        if entry.expires_at > now:
+            return True
+        self._remove((entry.bucket, entry.question))
+        self.expirations += 1
+        return False
+
+    def _most_similar(self, bucket: Hashable, grams: Counter, now: float) -> Optional[_Entry]:
+        postings = self._index.get(bucket)
+        if not postings:
+            return None
+        # Dot products with every entry sharing a trigram, via the inverted index
+        dots = defaultdict(int)
+        for gram, count in grams.items():
+            for question in postings.get(gram, ()):
+                dots[question] += count * self._entries[(bucket, question)].grams[gram]
+        norm = math.sqrt(sum(count * count for count in grams.values()))
+        best, best_score = None, self.similarity
+        for question, dot in dots.items():
+            entry = self._entries[(bucket, question)]
+            score = dot / (norm * entry.norm)
+            if score >= best_score and self._live(entry, now):
+                best, best_score = entry, score
+        return best
+
+    def _remove(self, key: Tuple[Hashable, str]):
+        entry = self._entries.pop(key)
+        postings = self._index[entry.bucket]
+        for gram in entry.grams:
+            questions = postings[gram]
+            questions.discard(entry.question)
+            if not questions:
+                del postings[gram]
+        if not postings:
+            del self._index[entry.bucket]
+
+    def stats(self) -> dict:
+        hits = self.exact_hits + self.similar_hits
+        lookups = hits + self.misses
+        return {
+            "backend": "local",
+            "hits": hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "skipped": self.skipped,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "similarity_threshold": self.similarity
+        }
+
+def make_response_cache() -> ResponseCache:
+    return ResponseCache(
+        maxsize=int(os.getenv("RESPONSE_CACHE_SIZE", "5000")),
+        ttl=float(os.getenv("RESPONSE_CACHE_TTL", "86400"))
+    )
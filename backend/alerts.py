@@ -0,0 +1,403 @@
+"""
+GOVERNMENT ALERT ENGINE
+Data-driven alerts behind GET /api/government/alerts
+
+Three detectors, each fed by the rows added to its table since its
+watermark (the highest id it has processed). An evaluation only looks at
+the subjects those rows touch, plus the alerts still active, each over a
+fixed window, so its cost does not grow with the history:
+
+- price_spike:  a commodity's daily average price moved 20%+ over 7 days,
+                or is 3+ standard deviations off its previous 28 days
+                (windows end at the commodity's latest price date)
+- query_surge:  a query category in a region got 3x+ its daily average of
+                the previous 7 days today (at least 20 queries)
+- soil_deficit: 60%+ of a district's samples in the last 30 days are low
+                in nitrogen, phosphorus or potassium (at least 20 samples)
+
+Ids are not committed in order under concurrent writers, and prices
+loaded again over a stored (commodity, market, date) keep their id, so
+the watermark alone misses rows:
+
+- prices: every write updates the commodity's row in the commodity list
+  (record_commodities), so commodities whose row changed since the
+  previous evaluation, less ALERT_CHANGE_LAG seconds (the most a write
+  may take to commit), are evaluated too
+- queries and recommendations are only ever inserted: each evaluation
+  reads the ALERT_RESCAN_IDS ids below the watermark again
+
+Alerts are upserted into the alerts table, one row per subject, and
+deactivated once a later evaluation finds the condition cleared.
+A background thread evaluates at startup and then every 5 minutes
+(ALERT_EVALUATION_INTERVAL seconds, 0 disables). From the backend folder:
+
+    python alerts.py
+"""
+
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import case, func, select, update
+
+from database import dialect_insert, engine
+from models.advisory_models import FarmerQuery
+from models.analytics_models import Alert, AlertWatermark
+from models.crop_models import CropRecommendation
+from models.price_models import Commodity, CommodityPrice
+from regional_analytics import DISTRICT
+
+PRICE_SPIKE, QUERY_SURGE, SOIL_DEFICIT = "price_spike", "query_surge", "soil_deficit"
+
+PRICE_CHANGE_DAYS = 7
+PRICE_CHANGE_THRESHOLD = 0.2
+PRICE_BASELINE_DAYS = 28
+PRICE_Z_THRESHOLD = 3.0
+
+SURGE_BASELINE_DAYS = 7
+SURGE_RATIO = 3.0
+SURGE_MIN_QUERIES = 20
+
+SOIL_WINDOW_DAYS = 30
+SOIL_MIN_SAMPLES = 20
+SOIL_LOW_SHARE = 0.6
+# kg/ha, the lower band of the ranges in the crop recommendation dataset
+LOW_NUTRIENT_LEVELS = {"nitrogen": 30, "phosphorus": 20, "potassium": 20}
+
+SURGE_RECOMMENDATIONS = {
+    "pest_control": "Deploy agricultural extension services",
+    "fertilizer": "Check fertilizer availability with district suppliers",
+    "irrigation": "Review water availability and irrigation support",
+    "weather": "Issue a weather advisory for the region",
+    "market_price": "Publish current mandi prices for the region"
+}
+
+EVALUATION_INTERVAL = float(os.getenv("ALERT_EVALUATION_INTERVAL", "300"))
+RESCAN_IDS = int(os.getenv("ALERT_RESCAN_IDS", "10000"))
+CHANGE_LAG = float(os.getenv("ALERT_CHANGE_LAG", "60"))
+
+class AlertEngineBusy(Exception):
+    """Another process advanced the watermarks first; this evaluation is rolled back"""
+    pass
+
+def _active_keys(connection, alert_type: str) -> List[str]:
+    return list(connection.scalars(
+        select(Alert.alert_key).where(Alert.type == alert_type, Alert.active.is_(True))
+    ))
+
+def detect_price_spikes(
+    connection, after_id: int, until_id: int, changed_since: Optional[datetime] = None
+) -> Tuple[Dict[str, dict], Set[str]]:
+    """(alerts raised, alert keys evaluated) for commodities with new or changed prices or an active alert"""
+    latest = dict(connection.execute(
+        select(CommodityPrice.commodity_name, func.max(CommodityPrice.date))
+        .where(CommodityPrice.id > after_id, CommodityPrice.id <= until_id,
+               CommodityPrice.commodity_name.isnot(None), CommodityPrice.date.isnot(None))
+        .group_by(CommodityPrice.commodity_name)
+    ).all())
+    if changed_since is not None:
+        # Prices replaced in place keep their id; the commodity list row is updated with them
+        for commodity, last_date in connection.execute(
+            select(Commodity.name, Commodity.last_price_date).where(Commodity.updated_at >= changed_since)
+        ):
+            latest.setdefault(commodity, last_date)
+    for key in _active_keys(connection, PRICE_SPIKE):
+        latest.setdefault(key.split(":", 1)[1], None)
+
+    raised, evaluated = {}, set()
+    for commodity, last_date in latest.items():
+        key = f"{PRICE_SPIKE}:{commodity}"
+        evaluated.add(key)
+        if last_date is None:
+            last_date = connection.scalar(
+                select(func.max(CommodityPrice.date)).where(CommodityPrice.commodity_name == commodity)
+            )
+            if last_date is None:
+                continue
+        # Daily sums per state over the window: the (commodity, date) index bounds the read
+        rows = connection.execute(
+            select(CommodityPrice.date, CommodityPrice.state, func.sum(CommodityPrice.price), func.count(CommodityPrice.price))
+            .where(CommodityPrice.commodity_name == commodity,
+                   CommodityPrice.date >= last_date - timedelta(days=PRICE_BASELINE_DAYS + PRICE_CHANGE_DAYS),
+                   CommodityPrice.date <= last_date)
+            .group_by(CommodityPrice.date, CommodityPrice.state)
+        ).all()
+        alert = _price_alert(commodity, last_date, rows)
+        if alert:
+            raised[key] = alert
+    return raised, evaluated
+
+def _change(series: Dict[date, float], last_date: date):
+    """Relative change from the latest price on or before last_date - 7 days to last_date's"""
+    if last_date not in series:
+        return None
+    earlier = [day for day in series if day <= last_date - timedelta(days=PRICE_CHANGE_DAYS)]
+    if not earlier or not series[max(earlier)]:
+        return None
+    return series[last_date] / series[max(earlier)] - 1
+
+def _price_alert(commodity: str, last_date: date, rows) -> dict:
+    totals, counts = defaultdict(float), defaultdict(int)
+    by_state = defaultdict(dict)
+    for day, state, total, count in rows:
+        if not count:
+            continue
+        totals[day] += total
+        counts[day] += count
+        if state:
+            by_state[state][day] = total / count
+    series = {day: totals[day] / counts[day] for day in totals}
+
+    change = _change(series, last_date)
+    baseline = [price for day, price in series.items()
+                if last_date - timedelta(days=PRICE_BASELINE_DAYS) <= day < last_date]
+    z_score = None
+    if last_date in series and len(baseline) >= 7 and np.std(baseline, ddof=1) > 0:
+        z_score = (series[last_date] - np.mean(baseline)) / np.std(baseline, ddof=1)
+
+    spike = change is not None and abs(change) >= PRICE_CHANGE_THRESHOLD
+    outlier = z_score is not None and abs(z_score) >= PRICE_Z_THRESHOLD
+    if not (spike or outlier):
+        return None
+
+    rising = change > 0 if change is not None else z_score > 0
+    if spike:
+        message = f"{commodity} prices {'increased' if rising else 'decreased'} by {abs(change):.0%} in last 7 days"
+    else:
+        message = (f"{commodity} prices are {abs(z_score):.1f} standard deviations "
+                   f"{'above' if rising else 'below'} their 4-week average")
+    # States whose own prices moved the same way past the threshold, largest move first
+    state_changes = {state: _change(prices, last_date) for state, prices in by_state.items()}
+    affected = sorted(
+        (state for state, c in state_changes.items()
+         if c is not None and abs(c) >= PRICE_CHANGE_THRESHOLD and (c > 0) == rising),
+        key=lambda state: -abs(state_changes[state])
+    )
+    severe = (change is not None and abs(change) >= 2 * PRICE_CHANGE_THRESHOLD) or \
+             (z_score is not None and abs(z_score) >= PRICE_Z_THRESHOLD + 1)
+    return {
+        "type": PRICE_SPIKE,
+        "severity": "high" if severe else "medium",
+        "commodity": commodity,
+        "affected_regions": affected[:5],
+        "message": message,
+        "recommendation": "Consider price stabilization measures" if rising
+                          else "Consider procurement support for farmers",
+        "metric_value": round(float(change) * 100, 1) if change is not None else round(float(z_score), 2)
+    }
+
+QUERY_CATEGORY = func.coalesce(func.nullif(FarmerQuery.query_category, ""), "general")
+QUERY_REGION = func.coalesce(func.nullif(FarmerQuery.location, ""), "Unknown")
+
+def detect_query_surges(
+    connection, after_id: int, until_id: int, changed_since: Optional[datetime] = None
+) -> Tuple[Dict[str, dict], Set[str]]:
+    """(alerts raised, alert keys evaluated) for category/region pairs with new queries or an active alert"""
+    # Queries are never updated in place: changed_since is not needed
+    subjects = set(connection.execute(
+        select(QUERY_CATEGORY, QUERY_REGION)
+        .where(FarmerQuery.id > after_id, FarmerQuery.id <= until_id)
+        .distinct()
+    ).all())
+    subjects.update(tuple(key.split(":", 2)[1:]) for key in _active_keys(connection, QUERY_SURGE))
+
+    today = datetime.utcnow().date()
+    daily = defaultdict(lambda: np.zeros(SURGE_BASELINE_DAYS + 1))
+    if subjects:
+        day = func.date(FarmerQuery.created_at)
+        rows = connection.execute(
+            select(QUERY_CATEGORY, QUERY_REGION, day, func.count())
+            .where(FarmerQuery.created_at >= datetime.combine(today - timedelta(days=SURGE_BASELINE_DAYS), datetime.min.time()))
+            .group_by(QUERY_CATEGORY, QUERY_REGION, day)
+        ).all()
+        for category, region, query_day, count in rows:
+            offset = (today - _as_date(query_day)).days
+            if (category, region) in subjects and 0 <= offset <= SURGE_BASELINE_DAYS:
+                daily[(category, region)][offset] = count
+
+    raised, evaluated = {}, set()
+    for category, region in subjects:
+        key = f"{QUERY_SURGE}:{category}:{region}"
+        evaluated.add(key)
+        counts = daily[(category, region)]
+        baseline = counts[1:].mean()
+        ratio = counts[0] / baseline if baseline else float("inf")
+        if counts[0] < SURGE_MIN_QUERIES or ratio < SURGE_RATIO:
+            continue
+        raised[key] = {
+            "type": QUERY_SURGE,
+            "severity": "high" if ratio >= 2 * SURGE_RATIO else "medium",
+            "commodity": None,
+            "affected_regions": [region],
+            "message": (f"High volume of {category.replace('_', ' ')} queries from {region}: "
+                        f"{int(counts[0])} today, " +
+                        (f"{ratio:.1f}x the 7-day average" if baseline else "none in the previous 7 days")),
+            "recommendation": SURGE_RECOMMENDATIONS.get(category, "Deploy agricultural extension services"),
+            "metric_value": round(float(ratio), 2) if baseline else None
+        }
+    return raised, evaluated
+
+def detect_soil_deficits(
+    connection, after_id: int, until_id: int, changed_since: Optional[datetime] = None
+) -> Tuple[Dict[str, dict], Set[str]]:
+    """(alerts raised, alert keys evaluated) for districts with new samples or an active alert"""
+    # Recommendations are never updated in place: changed_since is not needed
+    subjects = set(connection.execute(
+        select(CropRecommendation.state, DISTRICT)
+        .where(CropRecommendation.id > after_id, CropRecommendation.id <= until_id,
+               CropRecommendation.state.isnot(None))
+        .distinct()
+    ).all())
+    subjects.update(tuple(key.split(":", 2)[1:]) for key in _active_keys(connection, SOIL_DEFICIT))
+
+    raised, evaluated = {}, set()
+    if not subjects:
+        return raised, evaluated
+    since = datetime.utcnow() - timedelta(days=SOIL_WINDOW_DAYS)
+    rows = connection.execute(
+        select(
+            CropRecommendation.state, DISTRICT, func.count(),
+            *[func.sum(case((getattr(CropRecommendation, nutrient) < level, 1), else_=0))
+              for nutrient, level in LOW_NUTRIENT_LEVELS.items()]
+        )
+        .where(CropRecommendation.created_at >= since)
+        # District first: grouping by (state, district) lets SQLite walk the whole
+        # (state, district) index for the ordering instead of the created_at range
+        .group_by(DISTRICT, CropRecommendation.state)
+    ).all()
+    samples = {(state, district): (count, lows) for state, district, count, *lows in rows
+               if (state, district) in subjects}
+
+    for state, district in subjects:
+        key = f"{SOIL_DEFICIT}:{state}:{district}"
+        evaluated.add(key)
+        count, lows = samples.get((state, district), (0, []))
+        if count < SOIL_MIN_SAMPLES:
+            continue
+        shares = {nutrient: low / count for nutrient, low in zip(LOW_NUTRIENT_LEVELS, lows)}
+        deficient = [nutrient for nutrient, share in shares.items() if share >= SOIL_LOW_SHARE]
+        if not deficient:
+            continue
+        worst = max(shares[nutrient] for nutrient in deficient)
+        place = state if district == "Unknown" else f"{district}, {state}"
+        raised[key] = {
+            "type": SOIL_DEFICIT,
+            "severity": "high" if worst >= 0.75 else "medium",
+            "commodity": None,
+            "affected_regions": [state],
+            "message": "Low " + " and ".join(f"{n} levels in {shares[n]:.0%}" for n in deficient) +
+                       f" of samples from {place} (last {SOIL_WINDOW_DAYS} days)",
+            "recommendation": f"Subsidize {' and '.join(deficient)} fertilizers",
+            "metric_value": round(float(worst) * 100, 1)
+        }
+    return raised, evaluated
+
+def _as_date(value) -> date:
+    # func.date() comes back as a string on SQLite
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+def store_alerts(connection, raised: Dict[str, dict], evaluated: Set[str]):
+    """Upsert the raised alerts; deactivate the evaluated ones that were not raised"""
+    now = datetime.utcnow()
+    if raised:
+        table = Alert.__table__
+        stmt = dialect_insert(connection.dialect.name, table)
+        fields = ["type", "severity", "commodity", "affected_regions", "message", "recommendation", "metric_value"]
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["alert_key"],
+            set_={**{name: stmt.excluded[name] for name in fields}, "active": True, "updated_at": now}
+        )
+        connection.execute(stmt, [
+            {"alert_key": key, **alert, "active": True, "created_at": now, "updated_at": now}
+            for key, alert in raised.items()
+        ])
+    cleared = list(evaluated - set(raised))
+    if cleared:
+        connection.execute(
+            update(Alert)
+            .where(Alert.alert_key.in_(cleared), Alert.active.is_(True))
+            .values(active=False, updated_at=now)
+        )
+
+# (source, table, detector, ids below the watermark read again)
+DETECTORS = [
+    ("commodity_prices", CommodityPrice, detect_price_spikes, 0),
+    ("farmer_queries", FarmerQuery, detect_query_surges, RESCAN_IDS),
+    ("crop_recommendations", CropRecommendation, detect_soil_deficits, RESCAN_IDS)
+]
+
+def read_watermarks(connection) -> Dict[str, Tuple[int, Optional[datetime]]]:
+    """{source: (highest id processed, start of the evaluation that processed it)}"""
+    return {
+        source: (last_id, evaluated_at)
+        for source, last_id, evaluated_at in connection.execute(
+            select(AlertWatermark.source, AlertWatermark.last_id, AlertWatermark.updated_at)
+        )
+    }
+
+def evaluate(connection) -> Dict[str, int]:
+    """
+    Run every detector over the rows added since its watermark (and the
+    ids below it it reads again) and the rows changed since its previous
+    evaluation; {source: ids advanced}
+    """
+    table = AlertWatermark.__table__
+    started = datetime.utcnow()
+    connection.execute(
+        dialect_insert(connection.dialect.name, table)
+        .on_conflict_do_nothing(index_elements=["source"]),
+        [{"source": source, "last_id": 0, "updated_at": None} for source, *_ in DETECTORS]
+    )
+    watermarks = read_watermarks(connection)
+
+    processed = {}
+    for source, model, detect, rescan_ids in DETECTORS:
+        after_id, evaluated_at = watermarks[source]
+        until_id = max(connection.scalar(select(func.max(model.id))) or 0, after_id)
+        # Never evaluated: every row is read from id 0 anyway
+        changed_since = evaluated_at - timedelta(seconds=CHANGE_LAG) if evaluated_at else None
+        store_alerts(connection, *detect(connection, max(after_id - rescan_ids, 0), until_id, changed_since))
+        # updated_at is when the evaluation started, the next one's changed_since
+        advanced = connection.execute(
+            update(AlertWatermark)
+            .where(AlertWatermark.source == source, AlertWatermark.last_id == after_id)
+            .values(last_id=until_id, updated_at=started)
+        )
+        if advanced.rowcount != 1:
+            raise AlertEngineBusy(source)
+        processed[source] = until_id - after_id
+    return processed
+
+def start_evaluation(interval: float = EVALUATION_INTERVAL) -> Optional[threading.Event]:
+    """Evaluate now and then every `interval` seconds in a daemon thread; set the returned event to stop"""
+    if interval <= 0:
+        return None
+    stop = threading.Event()
+
+    def run():
+        while True:
+            try:
+                with engine.begin() as connection:
+                    evaluate(connection)
+            except AlertEngineBusy:
+                pass
+            except Exception as e:
+                print(f"Alert evaluation failed: {e}")
+            if stop.wait(interval):
+                return
+
+    threading.Thread(target=run, name="alert-evaluation", daemon=True).start()
+    return stop
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    with engine.begin() as connection:
+        Alert.__table__.create(connection, checkfirst=True)
+        Commodity.__table__.create(connection, checkfirst=True)
+        AlertWatermark.__table__.create(connection, checkfirst=True)
+        processed = evaluate(connection)
+    print(f"Alerts evaluated in {time.perf_counter() - start:.1f}s, ids advanced: {processed}")
@@ -0,0 +1,277 @@
+"""
+GOVERNMENT ANALYTICS ROLLUPS
+Daily counters behind GET /api/government/analytics
+
+Every CropRecommendation and FarmerQuery written through a session adds to
+per-day counters in analytics_daily_counts, in the same transaction:
+
+- crop:           recommendations per recommended crop
+- state:          recommendations per state (rows without a state are skipped)
+- query_category: farmer queries per category
+- new_farmer:     farmers whose first recommendation was on that day
+
+ORM inserts are picked up by a flush hook (see below); bulk Core inserts
+call record_recommendations / record_queries themselves.
+
+Compaction recomputes a range of days from the event tables. A background
+thread compacts the last closed days every hour, which corrects counters
+for rows written around the hooks (e.g. by hand in SQL):
+
+    ANALYTICS_COMPACTION_INTERVAL=3600   # seconds, 0 disables
+    ANALYTICS_COMPACTION_DAYS=2
+
+Full rebuild from the backend folder:
+
+    python analytics.py [--since 2026-01-01] [--until 2026-02-01]
+
+Fill in FarmerQuery.query_category for queries stored without one (or,
+with --all, re-categorize every query after the keywords changed); the
+counters are adjusted for the rows that changed:
+
+    python analytics.py --categorize [--all]
+"""
+
+import argparse
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import String, delete, event, func, insert, literal, or_, select, update
+from sqlalchemy.orm import Session
+
+from ai.categorizer import categorize_many
+from database import dialect_insert, engine
+from models.analytics_models import AnalyticsDailyCount, AnalyticsFarmer
+from models.advisory_models import FarmerQuery
+from models.crop_models import CropRecommendation
+
+CROP = "crop"
+STATE = "state"
+QUERY_CATEGORY = "query_category"
+NEW_FARMER = "new_farmer"
+
+COMPACTION_INTERVAL = float(os.getenv("ANALYTICS_COMPACTION_INTERVAL", "3600"))
+COMPACTION_DAYS = int(os.getenv("ANALYTICS_COMPACTION_DAYS", "2"))
+
+# Farmers per multi-row INSERT, well under SQLite's bound parameter limit
+FARMER_BATCH = 5000
+# Queries read and re-categorized per round trip (ids per IN (...) at most this)
+CATEGORIZE_BATCH = 20000
+
+def _day(created_at: Optional[datetime]) -> date:
+    return (created_at or datetime.utcnow()).date()
+
+def add_counts(connection, counts: Dict[Tuple[date, str, str], int]):
+    """Add {(day, dimension, key): n} to the stored counters"""
+    if not counts:
+        return
+    table = AnalyticsDailyCount.__table__
+    stmt = dialect_insert(connection.dialect.name, table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["dimension", "day", "key"],
+        set_={"count": table.c.count + stmt.excluded.count}
+    )
+    connection.execute(stmt, [
+        {"day": day, "dimension": dimension, "key": key, "count": n}
+        for (day, dimension, key), n in counts.items()
+    ])
+
+def record_recommendations(connection, rows: Iterable[dict]):
+    """
+    Count crop recommendations, given as dicts of CropRecommendation columns
+    (created_at, farmer_id, recommended_crop, state)
+
+    Runs on the caller's connection, inside the transaction writing the rows.
+    """
+    counts = Counter()
+    first_seen = {}
+    for row in rows:
+        day = _day(row.get("created_at"))
+        counts[(day, CROP, row.get("recommended_crop") or "Unknown")] += 1
+        if row.get("state"):
+            counts[(day, STATE, row["state"])] += 1
+        farmer_id = row.get("farmer_id")
+        if farmer_id and day < first_seen.get(farmer_id, date.max):
+            first_seen[farmer_id] = day
+
+    # Only farmers not seen before are inserted, and only those come back
+    table = AnalyticsFarmer.__table__
+    farmers = list(first_seen.items())
+    for offset in range(0, len(farmers), FARMER_BATCH):
+        stmt = (
+            dialect_insert(connection.dialect.name, table)
+            .values([{"farmer_id": f, "first_seen": d} for f, d in farmers[offset:offset + FARMER_BATCH]])
+            .on_conflict_do_nothing(index_elements=["farmer_id"])
+            .returning(table.c.first_seen)
+        )
+        for (day,) in connection.execute(stmt):
+            counts[(day, NEW_FARMER, "")] += 1
+
+    add_counts(connection, counts)
+
+def record_queries(connection, rows: Iterable[dict]):
+    """Count farmer queries, given as dicts of FarmerQuery columns (created_at, query_category)"""
+    counts = Counter(
+        (_day(row.get("created_at")), QUERY_CATEGORY, row.get("query_category") or "general")
+        for row in rows
+    )
+    add_counts(connection, counts)
+
+@event.listens_for(Session, "after_flush")
+def _count_new_events(session, flush_context):
+    recommendations, queries = [], []
+    for obj in session.new:
+        if isinstance(obj, CropRecommendation):
+            recommendations.append({
+                "created_at": obj.created_at,
+                "farmer_id": obj.farmer_id,
+                "recommended_crop": obj.recommended_crop,
+                "state": obj.state
+            })
+        elif isinstance(obj, FarmerQuery):
+            queries.append({"created_at": obj.created_at, "query_category": obj.query_category})
+    if recommendations:
+        record_recommendations(session.connection(), recommendations)
+    if queries:
+        record_queries(session.connection(), queries)
+
+def compact(connection, since: Optional[date] = None, until: Optional[date] = None):
+    """
+    Recompute the counters of days in [since, until) from crop_recommendations
+    and farmer_queries (every day when neither is given)
+
+    Past days are safe to compact while the API is writing; today's counters
+    may miss rows committed while the compaction runs.
+    """
+    counts = AnalyticsDailyCount.__table__
+    farmers = AnalyticsFarmer.__table__
+
+    def in_range(column, as_datetime=False):
+        conditions = []
+        if since is not None:
+            conditions.append(column >= (datetime.combine(since, datetime.min.time()) if as_datetime else since))
+        if until is not None:
+            conditions.append(column < (datetime.combine(until, datetime.min.time()) if as_datetime else until))
+        return conditions
+
+    connection.execute(delete(counts).where(*in_range(counts.c.day)))
+    columns = ["day", "dimension", "key", "count"]
+
+    day = func.date(CropRecommendation.created_at)
+    crop = func.coalesce(func.nullif(CropRecommendation.recommended_crop, ""), "Unknown")
+    connection.execute(insert(counts).from_select(columns,
+        select(day, literal(CROP, String), crop, func.count())
+        .where(*in_range(CropRecommendation.created_at, as_datetime=True))
+        .group_by(day, crop)
+    ))
+    connection.execute(insert(counts).from_select(columns,
+        select(day, literal(STATE, String), CropRecommendation.state, func.count())
+        .where(CropRecommendation.state.isnot(None), CropRecommendation.state != "",
+               *in_range(CropRecommendation.created_at, as_datetime=True))
+        .group_by(day, CropRecommendation.state)
+    ))
+
+    query_day = func.date(FarmerQuery.created_at)
+    category = func.coalesce(func.nullif(FarmerQuery.query_category, ""), "general")
+    connection.execute(insert(counts).from_select(columns,
+        select(query_day, literal(QUERY_CATEGORY, String), category, func.count())
+        .where(*in_range(FarmerQuery.created_at, as_datetime=True))
+        .group_by(query_day, category)
+    ))
+
+    # Farmers first seen in the range; ones seen before it keep their row
+    connection.execute(delete(farmers).where(*in_range(farmers.c.first_seen)))
+    connection.execute(
+        dialect_insert(connection.dialect.name, farmers).from_select(["farmer_id", "first_seen"],
+            select(CropRecommendation.farmer_id, func.min(day))
+            .where(CropRecommendation.farmer_id.isnot(None), CropRecommendation.farmer_id != "",
+                   *in_range(CropRecommendation.created_at, as_datetime=True))
+            .group_by(CropRecommendation.farmer_id)
+        ).on_conflict_do_nothing(index_elements=["farmer_id"])
+    )
+    connection.execute(insert(counts).from_select(columns,
+        select(farmers.c.first_seen, literal(NEW_FARMER, String), literal("", String), func.count())
+        .where(*in_range(farmers.c.first_seen))
+        .group_by(farmers.c.first_seen)
+    ))
+
+def categorize_queries(connection, recategorize: bool = False, batch_size: int = CATEGORIZE_BATCH) -> int:
+    """
+    Categorize stored farmer queries without a category (every query when
+    recategorize) and move their counts to the new categories; returns the
+    number of rows changed
+    """
+    table = AnalyticsDailyCount.__table__
+    uncategorized = [] if recategorize else [or_(FarmerQuery.query_category.is_(None), FarmerQuery.query_category == "")]
+    changed, last_id = 0, 0
+    while True:
+        rows = connection.execute(
+            select(FarmerQuery.id, FarmerQuery.query_text, FarmerQuery.query_category, FarmerQuery.created_at)
+            .where(FarmerQuery.id > last_id, *uncategorized)
+            .order_by(FarmerQuery.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        # One UPDATE per category rather than per row
+        ids, counts = defaultdict(list), Counter()
+        for row, category in zip(rows, categorize_many(row.query_text for row in rows)):
+            if category == row.query_category:
+                continue
+            ids[category].append(row.id)
+            day = _day(row.created_at)
+            counts[(day, QUERY_CATEGORY, row.query_category or "general")] -= 1
+            counts[(day, QUERY_CATEGORY, category)] += 1
+        for category, row_ids in ids.items():
+            connection.execute(update(FarmerQuery).where(FarmerQuery.id.in_(row_ids)).values(query_category=category))
+            changed += len(row_ids)
+        add_counts(connection, {key: n for key, n in counts.items() if n})
+
+    connection.execute(delete(table).where(table.c.dimension == QUERY_CATEGORY, table.c.count <= 0))
+    return changed
+
+def compact_recent(days: int = COMPACTION_DAYS):
+    """Recompute the last `days` closed (UTC) days"""
+    today = datetime.utcnow().date()
+    with engine.begin() as connection:
+        compact(connection, since=today - timedelta(days=days), until=today)
+
+def start_compaction(interval: float = COMPACTION_INTERVAL) -> Optional[threading.Event]:
+    """Compact recent days every `interval` seconds in a daemon thread; set the returned event to stop"""
+    if interval <= 0:
+        return None
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            try:
+                compact_recent()
+            except Exception as e:
+                print(f"Analytics compaction failed: {e}")
+
+    threading.Thread(target=run, name="analytics-compaction", daemon=True).start()
+    return stop
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the analytics dashboard counters")
+    parser.add_argument("--since", type=date.fromisoformat, default=None, help="First day (YYYY-MM-DD)")
+    parser.add_argument("--until", type=date.fromisoformat, default=None, help="Day after the last one")
+    parser.add_argument("--categorize", action="store_true", help="Categorize queries stored without a category")
+    parser.add_argument("--all", action="store_true", help="With --categorize: re-categorize every query")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with engine.begin() as connection:
+        AnalyticsDailyCount.__table__.create(connection, checkfirst=True)
+        AnalyticsFarmer.__table__.create(connection, checkfirst=True)
+        if args.categorize:
+            changed = categorize_queries(connection, recategorize=args.all)
+            print(f"{changed} farmer queries categorized in {time.perf_counter() - start:.1f}s")
+        else:
+            compact(connection, since=args.since, until=args.until)
+            print(f"Analytics counters rebuilt in {time.perf_counter() - start:.1f}s")
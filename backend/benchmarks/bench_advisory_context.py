@@ -0,0 +1,125 @@
+"""
+BENCHMARK - ADVISORY CONVERSATION CONTEXT
+Per-turn cost of assembling the chatbot prompt for a session with a long
+history:
+
+- original: SELECT the session's messages (ordered ascending, LIMIT 10,
+  which returned the first 10 rather than the latest) and build the
+  prompt by string concatenation
+- cache miss: SELECT the latest 5 messages and build a ConversationContext
+- cache hit: the ConversationContext of the session, no query
+
+Run from the backend folder:
+
+    python benchmarks/bench_advisory_context.py [--messages 20000] [--turns 200] [--database-url URL]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SESSION = "bench-session"
+CONTEXT = {"location": "Punjab", "crop_interest": "Rice"}
+
+def seed(messages: int):
+    from sqlalchemy import delete, insert
+    from database import Base, engine
+    from models.advisory_models import ChatMessage
+
+    Base.metadata.create_all(bind=engine, tables=[ChatMessage.__table__])
+    start = datetime.utcnow() - timedelta(seconds=messages)
+    with engine.begin() as conn:
+        conn.execute(delete(ChatMessage))
+        conn.execute(insert(ChatMessage.__table__), [
+            {"session_id": SESSION, "role": "user" if i % 2 == 0 else "assistant",
+             "content": f"message {i} about pest control on cotton and rice", "original_language": "en",
+             "timestamp": start + timedelta(seconds=i)}
+            for i in range(messages)
+        ])
+        # Other sessions share the table
+        conn.execute(insert(ChatMessage.__table__), [
+            {"session_id": f"other-{i % 500}", "role": "user", "content": "hello", "original_language": "en",
+             "timestamp": start + timedelta(seconds=i)}
+            for i in range(messages)
+        ])
+
+def original_prompt(history, message):
+    """GeminiAdvisor.generate_response's prompt assembly before the context cache"""
+    system_prompt = "You are an expert agricultural advisor helping farmers in India. " * 8
+    history_str = ""
+    for msg in history[-5:]:
+        role = "Farmer" if msg.role == "user" else "Advisor"
+        history_str += f"{role}: {msg.content}\n"
+    parts = [f"Location: {CONTEXT['location']}", f"Interested in: {CONTEXT['crop_interest']}"]
+    return f"""{system_prompt}
+        
+Context: {", ".join(parts)}
+
+Previous conversation:
+{history_str}
+
+User question: {message}
+
+Respond in English language.
+"""
+
+async def run(turns: int):
+    from sqlalchemy import select
+    from ai.conversation import HISTORY_MESSAGES
+    from ai.gemini_advisor import GeminiAdvisor
+    from database import AsyncSessionLocal
+    from models.advisory_models import ChatMessage
+
+    advisor = GeminiAdvisor()
+    timings = {"original": [], "cache miss": [], "cache hit": []}
+    async with AsyncSessionLocal() as db:
+        for _ in range(turns):
+            start = time.perf_counter()
+            history = (await db.scalars(
+                select(ChatMessage).where(ChatMessage.session_id == SESSION)
+                .order_by(ChatMessage.timestamp).limit(10)
+            )).all()
+            original_prompt(history, "neem oil dose?")
+            timings["original"].append(time.perf_counter() - start)
+            db.expunge_all()
+
+            start = time.perf_counter()
+            recent = (await db.execute(
+                select(ChatMessage.role, ChatMessage.content).where(ChatMessage.session_id == SESSION)
+                .order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc()).limit(HISTORY_MESSAGES)
+            )).all()
+            conversation = advisor.new_conversation(CONTEXT, [(role, content) for role, content in reversed(recent)])
+            conversation.prompt("neem oil dose?", "English")
+            timings["cache miss"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            conversation.prompt("neem oil dose?", "English")
+            timings["cache hit"].append(time.perf_counter() - start)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    seed(args.messages)
+    timings = asyncio.run(run(args.turns))
+    print(f"\n{args.messages:,} messages in the session, {args.turns} turns")
+    print(f"{'':>12} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, samples in timings.items():
+        samples = np.array(samples) * 1000
+        print(f"{name:>12} {np.percentile(samples, 50):>9.3f} {np.percentile(samples, 99):>9.3f}")
+
+if __name__ == "__main__":
+    main()
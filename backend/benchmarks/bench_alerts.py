@@ -0,0 +1,129 @@
+"""
+BENCHMARK - ALERT ENGINE
+Cost of alerts.evaluate() as history grows at a constant daily volume:
+a full evaluation (watermarks at 0, every commodity, region and district
+is touched) versus an incremental one after a batch of new rows, which
+only re-evaluates the subjects that batch touches.
+
+Run from the backend folder:
+
+    python benchmarks/bench_alerts.py [--rows 250000 1000000] [--database-url URL]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+COMMODITIES = [f"Commodity {i}" for i in range(100)]
+STATES = ["Punjab", "Haryana", "Gujarat", "Maharashtra", "Karnataka", "Tamil Nadu", "Bihar",
+          "Uttar Pradesh", "West Bengal", "Rajasthan"]
+MARKETS_PER_COMMODITY = 25
+CATEGORIES = ["pest_control", "fertilizer", "irrigation", "weather", "market_price", "general"]
+EVENTS_PER_DAY = 2500
+BATCH = 50_000
+
+def price_rows(rng, days, start_day, commodities):
+    for offset in range(days):
+        day = start_day + timedelta(days=offset)
+        for commodity in commodities:
+            for market in range(MARKETS_PER_COMMODITY):
+                yield {"commodity_name": commodity, "date": day, "price": float(rng.normal(2000, 100)),
+                       "market": f"Market {market}", "state": STATES[market % len(STATES)]}
+
+def event_rows(rng, count, start, span):
+    """(query, recommendation) row pairs spread evenly over [start, start + span)"""
+    for i in range(count):
+        created_at = start + span * (i / count)
+        state = STATES[i % len(STATES)]
+        yield (
+            {"session_id": f"session_{i % 1000}", "query_text": "?", "query_category": CATEGORIES[i % len(CATEGORIES)],
+             "location": state, "language": "en", "created_at": created_at},
+            {"farmer_id": f"farmer_{i}", "nitrogen": float(rng.uniform(0, 140)), "phosphorus": float(rng.uniform(5, 145)),
+             "potassium": float(rng.uniform(5, 205)), "temperature": 25.0, "humidity": 70.0, "ph": 6.5, "rainfall": 150.0,
+             "state": state, "district": f"District {i // len(STATES) % 40}", "recommended_crop": "Rice",
+             "confidence_score": 0.9, "alternative_crops": [], "created_at": created_at}
+        )
+
+def insert_batched(conn, table, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH:
+            conn.execute(table.insert(), batch)
+            batch = []
+    if batch:
+        conn.execute(table.insert(), batch)
+
+def seed(rows: int):
+    """`rows` rows in each event table, EVENTS_PER_DAY queries and recommendations per day"""
+    from sqlalchemy import delete
+    from database import Base, engine
+    from models.advisory_models import FarmerQuery
+    from models.analytics_models import Alert, AlertWatermark
+    from models.crop_models import CropRecommendation
+    from models.price_models import Commodity, CommodityPrice
+
+    tables = [CommodityPrice.__table__, Commodity.__table__, FarmerQuery.__table__, CropRecommendation.__table__,
+              Alert.__table__, AlertWatermark.__table__]
+    Base.metadata.create_all(bind=engine, tables=tables)
+    rng = np.random.default_rng(42)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        for table in tables:
+            conn.execute(delete(table))
+        price_days = rows // (len(COMMODITIES) * MARKETS_PER_COMMODITY)
+        insert_batched(conn, CommodityPrice.__table__,
+                       price_rows(rng, price_days, now.date() - timedelta(days=price_days), COMMODITIES))
+        span = timedelta(days=rows / EVENTS_PER_DAY)
+        pairs = list(event_rows(rng, rows, now - span - timedelta(hours=1), span))
+        insert_batched(conn, FarmerQuery.__table__, (query for query, _ in pairs))
+        insert_batched(conn, CropRecommendation.__table__, (rec for _, rec in pairs))
+
+def add_new_rows():
+    """An hour of events and today's prices for 5 commodities"""
+    from database import engine
+    from models.advisory_models import FarmerQuery
+    from models.crop_models import CropRecommendation
+    from models.price_models import CommodityPrice
+
+    rng = np.random.default_rng(7)
+    now = datetime.utcnow()
+    pairs = list(event_rows(rng, EVENTS_PER_DAY // 24, now - timedelta(hours=1), timedelta(hours=1)))
+    with engine.begin() as conn:
+        insert_batched(conn, CommodityPrice.__table__, price_rows(rng, 1, now.date(), COMMODITIES[:5]))
+        insert_batched(conn, FarmerQuery.__table__, (query for query, _ in pairs))
+        insert_batched(conn, CropRecommendation.__table__, (rec for _, rec in pairs))
+
+def timed_evaluation():
+    from database import engine
+    from alerts import evaluate
+
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        evaluate(conn)
+    return (time.perf_counter() - start) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[250_000, 1_000_000])
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    print(f"\n{'rows per table':>15} {'full ms':>10} {'incremental ms':>15}")
+    for rows in args.rows:
+        seed(rows)
+        full_ms = timed_evaluation()
+        add_new_rows()
+        incremental_ms = timed_evaluation()
+        print(f"{rows:>15,} {full_ms:>10.0f} {incremental_ms:>15.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+BENCHMARK - GOVERNMENT ANALYTICS DASHBOARD
+Latency of GET /api/government/analytics computed from the event tables
+(the original queries, replayed here) versus the daily rollup counters
+the endpoint now reads, plus what keeping the counters costs:
+
+- rebuild:  a full compaction (first dashboard load on an existing database)
+- compact:  the periodic compaction of the last two closed days
+- per write: counting one recommendation inside its transaction
+
+Seeds --rows crop recommendations and farmer queries spread over a year,
+and 30 days of mandi prices. Run from the backend folder:
+
+    python benchmarks/bench_analytics.py [--rows 1000000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+os.environ.setdefault("ANALYTICS_COMPACTION_INTERVAL", "0")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func, insert, select
+
+import main
+from analytics import compact, compact_recent, record_recommendations
+from database import SessionLocal, engine
+from models.advisory_models import FarmerQuery
+from models.crop_models import CropRecommendation
+from models.price_models import CommodityPrice
+
+CROPS = ["Rice", "Wheat", "Maize", "Cotton", "Sugarcane", "Jute", "Coffee", "Mango", "Banana", "Chickpea"]
+STATES = ["Punjab", "Haryana", "Gujarat", "Maharashtra", "Karnataka", "Tamil Nadu", "Bihar",
+          "Uttar Pradesh", "West Bengal", "Rajasthan"]
+CATEGORIES = ["pest_control", "fertilizer", "irrigation", "weather", "market_price", "general"]
+BATCH = 100_000
+
+def seed(rows: int, farmers: int):
+    rng = np.random.default_rng(42)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        for offset in range(0, rows, BATCH):
+            size = min(BATCH, rows - offset)
+            minutes = rng.integers(0, 365 * 24 * 60, size)
+            conn.execute(insert(CropRecommendation.__table__), [
+                {"farmer_id": f"farmer_{rng.integers(farmers)}", "nitrogen": 50.0, "phosphorus": 50.0,
+                 "potassium": 50.0, "temperature": 25.0, "humidity": 70.0, "ph": 6.5, "rainfall": 150.0,
+                 "state": STATES[i % len(STATES)], "recommended_crop": CROPS[i % len(CROPS)],
+                 "confidence_score": 0.9, "alternative_crops": [], "created_at": now - timedelta(minutes=int(m))}
+                for i, m in enumerate(minutes)
+            ])
+            conn.execute(insert(FarmerQuery.__table__), [
+                {"farmer_id": f"farmer_{rng.integers(farmers)}", "query_text": "How do I protect my crop?",
+                 "query_category": CATEGORIES[i % len(CATEGORIES)], "language": "en",
+                 "response_generated": True, "created_at": now - timedelta(minutes=int(m))}
+                for i, m in enumerate(minutes)
+            ])
+        conn.execute(insert(CommodityPrice.__table__), [
+            {"commodity_name": crop, "market": f"Market {m}", "date": date.today() - timedelta(days=d),
+             "price": 2000.0 + d}
+            for crop in CROPS for m in range(100) for d in range(30)
+        ])
+
+def original_analytics(db):
+    """The queries GET /api/government/analytics ran before the rollups"""
+    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
+    count = func.count(CropRecommendation.id)
+    db.scalar(select(func.count(func.distinct(CropRecommendation.farmer_id))))
+    db.scalar(select(count))
+    db.scalar(select(count).where(CropRecommendation.created_at >= thirty_days_ago))
+    db.execute(select(CropRecommendation.recommended_crop, count)
+               .group_by(CropRecommendation.recommended_crop).order_by(count.desc()).limit(10)).all()
+    db.scalars(select(CommodityPrice).where(CommodityPrice.date >= thirty_days_ago.date())).all()
+    db.scalar(select(func.count(FarmerQuery.id)))
+    db.execute(select(FarmerQuery.query_category, func.count(FarmerQuery.id))
+               .group_by(FarmerQuery.query_category).order_by(func.count(FarmerQuery.id).desc()).limit(10)).all()
+    db.execute(select(CropRecommendation.state, count).where(CropRecommendation.state.isnot(None))
+               .group_by(CropRecommendation.state).order_by(count.desc()).limit(15)).all()
+
+def median_ms(fn, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Recommendations (and queries) to seed")
+    parser.add_argument("--farmers", type=int, default=50_000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    seed(args.rows, args.farmers)
+    print(f"\n{engine.dialect.name}: seeded {args.rows:,} recommendations and queries "
+          f"in {time.perf_counter() - start:.0f}s")
+
+    def rebuild():
+        with engine.begin() as conn:
+            compact(conn)
+
+    def write_one():
+        with engine.connect() as conn:
+            with conn.begin() as transaction:
+                record_recommendations(conn, [{"created_at": datetime.utcnow(), "farmer_id": "farmer_new",
+                                               "recommended_crop": "Rice", "state": "Punjab"}])
+                transaction.rollback()
+
+    with SessionLocal() as db:
+        original = median_ms(lambda: original_analytics(db), args.runs)
+    rebuild_ms = median_ms(rebuild, 1)
+    with TestClient(main.app) as client:
+        rollup = median_ms(lambda: client.get("/api/government/analytics").raise_for_status(), args.runs * 10)
+    compact_ms = median_ms(compact_recent, args.runs)
+    write_ms = median_ms(write_one, args.runs * 20)
+
+    print(f"{'/analytics, original queries':>32}: {original:10.1f} ms")
+    print(f"{'/analytics, rollup counters':>32}: {rollup:10.1f} ms  ({original / rollup:.0f}x)")
+    print(f"{'full rebuild':>32}: {rebuild_ms:10.1f} ms")
+    print(f"{'compact last 2 days':>32}: {compact_ms:10.1f} ms")
+    print(f"{'count one recommendation':>32}: {write_ms:10.2f} ms")
+
+if __name__ == "__main__":
+    run()
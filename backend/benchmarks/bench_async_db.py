@@ -0,0 +1,179 @@
+"""
+BENCHMARK - MIXED LOAD LATENCY
+p50/p99 latency of fast requests (chat history, commodity list, crop
+history, languages) while other clients keep hitting the slow
+GET /api/government/analytics on the same uvicorn worker
+
+With synchronous sessions each analytics query blocks the event loop, so
+every fast request queued behind it waits too. With the async engine the
+query only suspends its own request.
+
+Starts `uvicorn main:app` (one worker) from --backend-dir against a seeded
+SQLite file. To compare before and after, check out the previous commit
+into a worktree and run both:
+
+    git worktree add /tmp/before <commit>
+    python benchmarks/bench_async_db.py --backend-dir /tmp/before/backend
+    python benchmarks/bench_async_db.py
+
+Run from the backend folder. Needs httpx (already required by the
+FastAPI test client).
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import httpx
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert
+
+from database import Base
+from models.advisory_models import ChatMessage, ChatSession, FarmerQuery
+from models.crop_models import CropRecommendation
+from models.price_models import Commodity, CommodityPrice
+
+CROPS = ["Rice", "Wheat", "Maize", "Cotton", "Sugarcane", "Jute", "Coffee", "Mango"]
+STATES = ["Punjab", "Haryana", "Gujarat", "Maharashtra", "Karnataka", "Tamil Nadu", "Bihar"]
+CATEGORIES = ["pest_control", "fertilizer", "irrigation", "weather", "market_price", "general"]
+
+def seed(url: str, rows: int):
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    rng = np.random.default_rng(42)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(CropRecommendation.__table__), [
+            {
+                "farmer_id": f"farmer_{i % 5000}",
+                "nitrogen": float(rng.uniform(0, 140)), "phosphorus": float(rng.uniform(5, 145)),
+                "potassium": float(rng.uniform(5, 205)), "temperature": float(rng.uniform(10, 40)),
+                "humidity": float(rng.uniform(15, 100)), "ph": float(rng.uniform(4, 9)),
+                "rainfall": float(rng.uniform(20, 300)), "state": STATES[i % len(STATES)],
+                "recommended_crop": CROPS[i % len(CROPS)], "confidence_score": 0.9,
+                "alternative_crops": [], "created_at": now - timedelta(minutes=i)
+            }
+            for i in range(rows)
+        ])
+        conn.execute(insert(FarmerQuery.__table__), [
+            {
+                "farmer_id": f"farmer_{i % 5000}", "query_text": "How do I protect my crop?",
+                "query_category": CATEGORIES[i % len(CATEGORIES)], "language": "en",
+                "response_generated": True, "created_at": now - timedelta(minutes=i)
+            }
+            for i in range(rows)
+        ])
+        # Recent prices, which the original analytics query loaded as ORM objects
+        conn.execute(insert(CommodityPrice.__table__), [
+            {"commodity_name": CROPS[i % len(CROPS)], "market": f"Market {i // len(CROPS) % 1000}",
+             "date": date.today() - timedelta(days=i // (len(CROPS) * 1000)),
+             "price": float(rng.uniform(1000, 5000))}
+            for i in range(rows)
+        ])
+        conn.execute(insert(Commodity.__table__), [
+            {"name": crop, "first_price_date": date.today() - timedelta(days=30), "last_price_date": date.today()}
+            for crop in CROPS
+        ])
+        conn.execute(insert(ChatSession.__table__), [{"session_id": "bench", "farmer_id": "farmer_1"}])
+        conn.execute(insert(ChatMessage.__table__), [
+            {"session_id": "bench", "role": "user" if i % 2 == 0 else "assistant", "content": "Hello"}
+            for i in range(20)
+        ])
+    engine.dispose()
+
+FAST_PATHS = [
+    "/api/advisory/session/bench",
+    "/api/prices/commodities",
+    "/api/crops/history/farmer_1?limit=10",
+    "/api/advisory/languages"
+]
+
+async def slow_client(client: httpx.AsyncClient, stop: asyncio.Event, timings: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        (await client.get("/api/government/analytics")).raise_for_status()
+        timings.append((time.perf_counter() - start) * 1000)
+
+async def fast_client(client: httpx.AsyncClient, requests: int, offset: int, timings: list):
+    for i in range(requests):
+        start = time.perf_counter()
+        (await client.get(FAST_PATHS[(offset + i) % len(FAST_PATHS)])).raise_for_status()
+        timings.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.01)
+
+async def run_load(base_url: str, slow: int, fast: int, requests: int):
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        for path in FAST_PATHS + ["/api/government/analytics"]:
+            (await client.get(path)).raise_for_status()
+
+        results = {}
+        for label, slow_clients in [("fast only", 0), (f"+ {slow} analytics clients", slow)]:
+            stop = asyncio.Event()
+            slow_timings, fast_timings = [], []
+            start = time.perf_counter()
+            slow_tasks = [asyncio.create_task(slow_client(client, stop, slow_timings)) for _ in range(slow_clients)]
+            await asyncio.gather(*[fast_client(client, requests, i, fast_timings) for i in range(fast)])
+            stop.set()
+            await asyncio.gather(*slow_tasks)
+            results[label] = (fast_timings, slow_timings, time.perf_counter() - start)
+        return results
+
+def wait_until_up(base_url: str, process: subprocess.Popen, timeout: float = 300):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=2).json()["status"] == "healthy":
+                return
+        except (httpx.HTTPError, ValueError, KeyError):
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("uvicorn did not become ready in time")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend-dir", default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    parser.add_argument("--rows", type=int, default=100_000, help="Rows per seeded table")
+    parser.add_argument("--slow-clients", type=int, default=2)
+    parser.add_argument("--fast-clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=50, help="Requests per fast client")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    seed(url, args.rows)
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=args.backend_dir,
+        env={**os.environ, "DATABASE_URL": url},
+        stdout=subprocess.DEVNULL
+    )
+    try:
+        wait_until_up(base_url, process)
+        results = asyncio.run(run_load(base_url, args.slow_clients, args.fast_clients, args.requests))
+    finally:
+        process.terminate()
+        process.wait()
+
+    print(f"\n{os.path.abspath(args.backend_dir)}: {args.rows:,} rows per table, "
+          f"{args.fast_clients} fast clients x {args.requests} requests")
+    print(f"{'':>26} {'fast p50':>9} {'fast p99':>9} {'analytics p50':>14} {'analytics/s':>12}")
+    for label, (fast_timings, slow_timings, elapsed) in results.items():
+        slow_p50 = f"{np.percentile(slow_timings, 50):.0f}" if slow_timings else "-"
+        print(f"{label:>26} {np.percentile(fast_timings, 50):>9.1f} {np.percentile(fast_timings, 99):>9.1f} "
+              f"{slow_p50:>14} {len(slow_timings) / elapsed:>12.1f}")
+    print("(milliseconds)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+BENCHMARK - FARMER QUERY CATEGORIZER
+Cost and coverage of ai/categorizer.py versus the original chained
+any(word in message_lower ...) scans (English keywords only, run twice
+per chat turn: once for the category, once inside the mock response):
+
+- per question: microseconds per chat turn over a mix of questions in the
+  9 supported languages
+- coverage: share of the non-English questions given a topic other than
+  "general"
+- backfill: `analytics.categorize_queries` over --rows stored queries
+  without a category, and a check that the adjusted counters match a
+  full compaction
+
+Run from the backend folder:
+
+    python benchmarks/bench_categorizer.py [--rows 1000000] [--database-url URL]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# (language, question, expected category)
+QUESTIONS = [
+    ("en", "How to control pests in my cotton field?", "pest_control"),
+    ("en", "Which fertilizer is best for paddy after transplanting?", "fertilizer"),
+    ("en", "Will it rain this week in Nashik?", "weather"),
+    ("en", "What is the mandi price of onion today?", "market"),
+    ("en", "How do I apply for a crop loan under the KCC scheme?", "government_schemes"),
+    ("en", "Best wheat variety to sow in November", "cultivation"),
+    ("en", "My tomato leaves are turning yellow, what should I do?", "general"),
+    ("hi", "मेरी कपास की फसल में कीटों का प्रकोप है, क्या करूं?", "pest_control"),
+    ("hi", "गेहूं में कितना यूरिया डालना चाहिए?", "fertilizer"),
+    ("hi", "क्या कल बारिश होगी?", "weather"),
+    ("hi", "आज मंडी में प्याज का भाव क्या है?", "market"),
+    ("hi", "किसान क्रेडिट कार्ड पर लोन कैसे मिलेगा?", "government_schemes"),
+    ("hi", "धान की रोपाई कब करें?", "cultivation"),
+    ("mr", "सोयाबीनवर अळी आली आहे", "pest_control"),
+    ("mr", "कांद्याला आज काय भाव आहे?", "market"),
+    ("ta", "பருத்தியில் பூச்சி தாக்குதல் அதிகம்", "pest_control"),
+    ("ta", "நெல்லுக்கு எந்த உரம் போட வேண்டும்?", "fertilizer"),
+    ("ta", "நாளை மழை வருமா?", "weather"),
+    ("te", "టమాటా ధర ఎంత?", "market"),
+    ("te", "వరికి ఏ ఎరువు వేయాలి?", "fertilizer"),
+    ("bn", "ধানে পোকা লেগেছে", "pest_control"),
+    ("bn", "পেঁয়াজের দাম কত?", "market"),
+    ("gu", "કપાસમાં જીવાત આવી છે", "pest_control"),
+    ("gu", "ઘઉંનો ભાવ શું છે?", "market"),
+    ("kn", "ಭತ್ತಕ್ಕೆ ಯಾವ ಗೊಬ್ಬರ ಹಾಕಬೇಕು?", "fertilizer"),
+    ("kn", "ನಾಳೆ ಮಳೆ ಬರುತ್ತದೆಯೇ?", "weather"),
+    ("pa", "ਕਣਕ ਦੀ ਬਿਜਾਈ ਕਦੋਂ ਕਰੀਏ?", "cultivation"),
+    ("pa", "ਕਣਕ ਦਾ ਭਾਅ ਕੀ ਹੈ?", "market"),
+]
+
+def original_categorize(message: str) -> str:
+    """GeminiAdvisor._categorize_query before the categorizer"""
+    message_lower = message.lower()
+    if any(word in message_lower for word in ['pest', 'insect', 'disease', 'bug']):
+        return "pest_control"
+    elif any(word in message_lower for word in ['fertilizer', 'nutrient', 'npk', 'soil']):
+        return "fertilizer"
+    elif any(word in message_lower for word in ['weather', 'rain', 'temperature', 'climate']):
+        return "weather"
+    elif any(word in message_lower for word in ['price', 'market', 'sell', 'mandi']):
+        return "market"
+    elif any(word in message_lower for word in ['loan', 'scheme', 'subsidy', 'government']):
+        return "government_schemes"
+    elif any(word in message_lower for word in ['seed', 'variety', 'plant', 'grow']):
+        return "cultivation"
+    else:
+        return "general"
+
+def per_question(turns: int):
+    from ai.categorizer import categorize
+
+    texts = [text for _, text, _ in QUESTIONS] * (turns // len(QUESTIONS))
+    print(f"\n{'':>10} {'us/turn':>8} {'correct':>8} {'non-English topic':>18}")
+    for name, run, calls in (("original", original_categorize, 2), ("new", categorize, 1)):
+        start = time.perf_counter()
+        for text in texts:
+            for _ in range(calls):
+                run(text)
+        micros = (time.perf_counter() - start) / len(texts) * 1e6
+        correct = sum(run(text) == expected for _, text, expected in QUESTIONS)
+        other = [(text, expected) for language, text, expected in QUESTIONS if language != "en"]
+        covered = sum(run(text) != "general" for text, _ in other)
+        print(f"{name:>10} {micros:>8.2f} {correct:>4}/{len(QUESTIONS):<3} {covered:>13}/{len(other)}")
+
+def backfill(rows: int):
+    from sqlalchemy import delete, insert, select
+    from analytics import categorize_queries, compact, record_queries
+    from database import Base, engine
+    from models.advisory_models import FarmerQuery
+    from models.analytics_models import AnalyticsDailyCount, AnalyticsFarmer
+
+    Base.metadata.create_all(bind=engine)
+    rng = np.random.default_rng(7)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(delete(FarmerQuery))
+        conn.execute(delete(AnalyticsDailyCount))
+        conn.execute(delete(AnalyticsFarmer))
+        for offset in range(0, rows, 100_000):
+            picks = rng.integers(0, len(QUESTIONS), min(100_000, rows - offset))
+            minutes = rng.integers(0, 365 * 24 * 60, len(picks))
+            batch = [
+                {"farmer_id": f"farmer_{i % 5000}", "query_text": f"{QUESTIONS[p][1]} ({i % 50})",
+                 "query_category": None, "language": QUESTIONS[p][0], "response_generated": True,
+                 "created_at": now - timedelta(minutes=int(m))}
+                for i, (p, m) in enumerate(zip(picks, minutes), start=offset)
+            ]
+            conn.execute(insert(FarmerQuery.__table__), batch)
+            record_queries(conn, batch)
+
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        changed = categorize_queries(conn)
+    elapsed = time.perf_counter() - start
+
+    table = AnalyticsDailyCount.__table__
+    counters = select(table.c.day, table.c.key, table.c.count).where(table.c.dimension == "query_category")
+    with engine.begin() as conn:
+        adjusted = sorted(conn.execute(counters).all())
+        compact(conn)
+        rebuilt = sorted(conn.execute(counters).all())
+        again = categorize_queries(conn)
+    print(f"\nBackfill: {changed:,} of {rows:,} queries categorized in {elapsed:.1f}s "
+          f"({rows / elapsed:,.0f} rows/s); counters match a rebuild: {adjusted == rebuilt}; "
+          f"second run changed {again}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200_000)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    per_question(args.turns)
+    backfill(args.rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+BENCHMARK - CHAT LOG WRITE PATH
+Throughput of POST /api/advisory/chat with --users concurrent chats, over
+HTTP against a uvicorn server (run as a subprocess, one worker),
+with each turn committed inside its request (CHAT_LOG_FLUSH_MS=0, as
+before the chat log writer) versus queued and written in batches.
+
+The mock model answers at once and the response cache is off, so the
+turns measure the write path. Each run then checks that every turn was
+stored (turns that failed with an error are not). "server CPU" is the
+server process's CPU time per turn (Linux only): on a machine with few
+cores, the client competes with the server, and turns/s understates
+what the server can do.
+
+A crash run queues turns with a flush interval too long to be reached,
+kills the server (SIGKILL), and checks that the next start writes the
+turns left in the spool.
+
+Run from the backend folder:
+
+    python benchmarks/bench_chat_log.py [--turns 4000] [--users 64] [--database-url URL]
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+QUESTIONS = [
+    "How to control pests in my cotton field?",
+    "Which fertilizer is best for paddy after transplanting?",
+    "Will it rain this week in Nashik?",
+    "What is the mandi price of onion today?",
+]
+
+def start_server(env: dict):
+    import httpx
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    while True:
+        try:
+            if httpx.get(f"{base_url}/health").json()["status"] == "healthy":
+                return server, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+
+def cpu_seconds(pid: int):
+    """CPU time used by a process so far (Linux /proc; None elsewhere)"""
+    try:
+        with open(f"/proc/{pid}/stat") as stat:
+            fields = stat.read().rpartition(")")[2].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+def stop_server(server: subprocess.Popen):
+    server.send_signal(signal.SIGINT)
+    server.wait()
+
+async def chat(base_url: str, turns: int, users: int):
+    import httpx
+
+    latencies, failed = [], 0
+    queue = iter(range(turns))
+    # Idle connections dropped before uvicorn's 5 s keep-alive timeout closes them under us
+    limits = httpx.Limits(max_connections=users, keepalive_expiry=2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        sessions = [
+            (await client.post("/api/advisory/session", json={"language": "en", "location": "Nashik"})).json()["session_id"]
+            for _ in range(users)
+        ]
+
+        async def user(session_id: str):
+            nonlocal failed
+            for i in queue:
+                start = time.perf_counter()
+                response = await client.post("/api/advisory/chat", json={
+                    "session_id": session_id, "message": f"{QUESTIONS[i % len(QUESTIONS)]} ({i})", "language": "en"
+                })
+                if response.status_code != 200:
+                    # "database is locked" when SQLite's write lock is held past its busy timeout
+                    failed += 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(user(session_id) for session_id in sessions))
+        elapsed = time.perf_counter() - start
+    return (turns - failed) / elapsed, np.array(latencies) * 1000, failed
+
+def stored_turns() -> int:
+    from sqlalchemy import func, select
+    from database import engine
+    from models.advisory_models import ChatMessage
+
+    with engine.connect() as connection:
+        return connection.scalar(select(func.count()).select_from(ChatMessage)) // 2
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=4000)
+    parser.add_argument("--users", type=int, default=64)
+    parser.add_argument("--crash-turns", type=int, default=500)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp()
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": args.database_url or f"sqlite:///{os.path.join(folder, 'bench.db')}",
+        "CHAT_LOG_SPOOL_DIR": os.path.join(folder, "spool"),
+        "RESPONSE_CACHE_SIZE": "0",
+        "ANALYTICS_COMPACTION_INTERVAL": "0",
+        "ALERT_EVALUATION_INTERVAL": "0",
+        "MARKET_TRENDS_REFRESH_INTERVAL": "0",
+    })
+    os.environ["DATABASE_URL"] = env["DATABASE_URL"]
+    import httpx
+    from database import Base, engine
+    from models import advisory_models, analytics_models  # noqa: F401 (tables)
+    Base.metadata.create_all(bind=engine)
+
+    print(f"\n{args.turns} chat turns, {args.users} concurrent chats")
+    print(f"{'':>22} {'turns/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'failed':>8} {'stored':>8} "
+          f"{'server CPU ms/turn':>19} {'turns/commit':>13}")
+    for name, flush_ms in (("commit per request", "0"), ("write-behind", "50")):
+        before = stored_turns()
+        server, base_url = start_server({**env, "CHAT_LOG_FLUSH_MS": flush_ms})
+        try:
+            cpu_before = cpu_seconds(server.pid)
+            throughput, latencies, failed = asyncio.run(chat(base_url, args.turns, args.users))
+            cpu_after = cpu_seconds(server.pid)
+            log = httpx.get(f"{base_url}/api/advisory/chat-log/stats").json()
+        finally:
+            stop_server(server)
+        stored = stored_turns() - before
+        cpu = f"{(cpu_after - cpu_before) / args.turns * 1000:.2f}" if cpu_before is not None else "n/a"
+        per_commit = log["turns_per_batch"] if log["backend"] == "write-behind" else 1
+        print(f"{name:>22} {throughput:>8.0f} {np.percentile(latencies, 50):>8.1f} "
+              f"{np.percentile(latencies, 99):>8.1f} {failed:>8} {stored:>8} {cpu:>19} {per_commit:>13}")
+
+    before = stored_turns()
+    crash_env = {**env, "CHAT_LOG_FLUSH_MS": "3600000", "CHAT_LOG_BATCH": str(10 ** 9)}
+    server, base_url = start_server(crash_env)
+    asyncio.run(chat(base_url, args.crash_turns, args.users))
+    server.kill()
+    server.wait()
+    after_kill = stored_turns() - before
+    server, _ = start_server(env)
+    stop_server(server)
+    print(f"\nCrash: {args.crash_turns} turns queued, server killed; stored before restart: {after_kill}, "
+          f"after restart: {stored_turns() - before}")
+
+if __name__ == "__main__":
+    main()
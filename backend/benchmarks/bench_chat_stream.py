@@ -0,0 +1,93 @@
+"""
+BENCHMARK - STREAMING ADVISORY CHAT
+Time to first byte and total latency of POST /api/advisory/chat versus
+POST /api/advisory/chat/stream, over HTTP against a local uvicorn server
+
+The mock model is slowed down to a typical hosted LLM: --first-chunk-ms
+before the first chunk (prompt processing), then --chunk-ms per chunk of
+4 words. The response cache is disabled so every turn calls the model.
+
+Run from the backend folder:
+
+    python benchmarks/bench_chat_stream.py [--turns 20] [--first-chunk-ms 700] [--chunk-ms 60] [--database-url URL]
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+QUESTION = "How do I control pest attacks on my cotton crop this season?"
+
+def start_server(port: int):
+    import uvicorn
+    import main
+
+    server = uvicorn.Server(uvicorn.Config(main.app, port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started or not main.model_registry.ready:
+        time.sleep(0.05)
+    return server, main.model_registry.get("advisor")
+
+async def run(base_url: str, turns: int):
+    import httpx
+
+    timings = {"chat": [], "chat/stream": []}
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        session_id = (await client.post(
+            "/api/advisory/session", json={"language": "en", "location": "Guntur", "crop_interest": "Cotton"}
+        )).json()["session_id"]
+        body = {"session_id": session_id, "message": QUESTION, "language": "en"}
+        for _ in range(turns):
+            for endpoint in timings:
+                start = time.perf_counter()
+                first = None
+                async with client.stream("POST", f"/api/advisory/{endpoint}", json=body) as response:
+                    async for _ in response.aiter_bytes():
+                        if first is None:
+                            first = time.perf_counter()
+                timings[endpoint].append((first - start, time.perf_counter() - start))
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--first-chunk-ms", type=float, default=700)
+    parser.add_argument("--chunk-ms", type=float, default=60)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    for interval in ("ANALYTICS_COMPACTION_INTERVAL", "ALERT_EVALUATION_INTERVAL", "MARKET_TRENDS_REFRESH_INTERVAL"):
+        os.environ[interval] = "0"
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    from ai.response_cache import ResponseCache
+    server, advisor = start_server(port)
+    advisor.mock_first_chunk_delay = args.first_chunk_ms / 1000
+    advisor.mock_chunk_delay = args.chunk_ms / 1000
+    advisor.response_cache = ResponseCache(maxsize=0)
+    try:
+        timings = asyncio.run(run(f"http://127.0.0.1:{port}", args.turns))
+    finally:
+        server.should_exit = True
+
+    print(f"\n{args.turns} turns, model: {args.first_chunk_ms:.0f} ms to first chunk + {args.chunk_ms:.0f} ms per chunk")
+    print(f"{'':>12} {'TTFB p50 ms':>12} {'TTFB p99 ms':>12} {'total p50 ms':>13} {'total p99 ms':>13}")
+    for endpoint, samples in timings.items():
+        samples = np.array(samples) * 1000
+        print(f"{endpoint:>12} {np.percentile(samples[:, 0], 50):>12.0f} {np.percentile(samples[:, 0], 99):>12.0f} "
+              f"{np.percentile(samples[:, 1], 50):>13.0f} {np.percentile(samples[:, 1], 99):>13.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+BENCHMARK - API COLD START
+How long `import main` takes (the point where uvicorn can bind its port)
+versus how long until every model in the registry is ready
+
+Each run is a fresh interpreter. FastAPI/SQLAlchemy import time is
+reported separately, since the app cannot start faster than its framework.
+
+Run from the backend folder:
+
+    python benchmarks/bench_cold_start.py [--runs 5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, time
+start = time.perf_counter()
+import fastapi, sqlalchemy.orm, pydantic
+framework = time.perf_counter()
+import main
+imported = time.perf_counter()
+from model_registry import model_registry
+for name in model_registry.status():
+    model_registry.load(name)
+ready = time.perf_counter()
+print(json.dumps({
+    "framework_ms": (framework - start) * 1000,
+    "import_main_ms": (imported - start) * 1000,
+    "app_overhead_ms": (imported - framework) * 1000,
+    "models_ready_ms": (ready - start) * 1000,
+    "models": model_registry.status()
+}))
+"""
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+
+    runs = []
+    for _ in range(args.runs):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE],
+            cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        runs.append(json.loads(out.strip().splitlines()[-1]))
+
+    print(f"\nMedian of {args.runs} fresh interpreters (ms)")
+    for key, label in [
+        ("framework_ms", "FastAPI + SQLAlchemy imports"),
+        ("import_main_ms", "import main (cold start)"),
+        ("app_overhead_ms", "  of which app code"),
+        ("models_ready_ms", "all models ready"),
+    ]:
+        print(f"{label:>32}: {statistics.median(r[key] for r in runs):8.1f}")
+
+    print("\nPer-model load time (ms, last run)")
+    for name, status in runs[-1]["models"].items():
+        print(f"{name:>32}: {status['load_ms']:8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+BENCHMARK - BATCH CROP RECOMMENDATION
+Per-sample latency of the single-sample path (CropPredictor.predict plus
+one db.commit() per sample) versus the batch path
+(CropPredictor.predict_batch plus one bulk insert)
+
+Run from the backend folder:
+
+    python benchmarks/bench_crop_batch.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models.crop_models import CropRecommendation
+from ml.crop_predictor import CropPredictor
+
+SIZES = [1, 100, 10_000, 100_000]
+# The per-sample paths are slow, so cap how many samples they are timed on
+LOOP_LIMIT = 10_000
+COMMIT_LIMIT = 1_000
+# Repeat small sizes until at least this much time has been measured
+MIN_SECONDS = 0.2
+
+def random_samples(n: int, seed: int = 42) -> np.ndarray:
+    """Random soil/climate samples within the API's validation ranges"""
+    rng = np.random.default_rng(seed)
+    low = np.array([0, 0, 0, 0, 0, 0, 0], dtype=float)
+    high = np.array([150, 150, 250, 50, 100, 14, 500], dtype=float)
+    return rng.uniform(low, high, size=(n, 7))
+
+def time_per_sample(fn, n: int) -> float:
+    """Return microseconds per sample for fn, which processes n samples"""
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        fn()
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_SECONDS:
+            return elapsed / (runs * n) * 1e6
+
+def to_row(features, prediction) -> dict:
+    N, P, K, temp, humidity, ph, rainfall = features
+    return {
+        "farmer_id": "bench",
+        "nitrogen": N,
+        "phosphorus": P,
+        "potassium": K,
+        "temperature": temp,
+        "humidity": humidity,
+        "ph": ph,
+        "rainfall": rainfall,
+        "recommended_crop": prediction["crop"],
+        "confidence_score": prediction["confidence"],
+        "alternative_crops": prediction["alternatives"]
+    }
+
+def main():
+    predictor = CropPredictor()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=engine, tables=[CropRecommendation.__table__])
+    Session = sessionmaker(bind=engine)
+
+    def single_path(rows):
+        with Session() as db:
+            for row in rows:
+                prediction = predictor.predict(row)
+                db.add(CropRecommendation(**to_row(row, prediction)))
+                db.commit()
+
+    def batch_path(X):
+        predictions = predictor.predict_batch(X)
+        with Session() as db:
+            db.execute(insert(CropRecommendation), [
+                to_row(row, prediction) for row, prediction in zip(X.tolist(), predictions)
+            ])
+            db.commit()
+
+    print("\nModel only (microseconds per sample)")
+    print(f"{'samples':>10} {'predict':>12} {'predict_batch':>15} {'speedup':>9}")
+    for n in SIZES:
+        X = random_samples(n)
+        loop_rows = X[:min(n, LOOP_LIMIT)].tolist()
+        loop_us = time_per_sample(lambda: [predictor.predict(row) for row in loop_rows], len(loop_rows))
+        batch_us = time_per_sample(lambda: predictor.predict_batch(X), n)
+        print(f"{n:>10} {loop_us:>12.2f} {batch_us:>15.2f} {loop_us / batch_us:>8.1f}x")
+
+    print("\nModel + SQLite write (microseconds per sample)")
+    print(f"{'samples':>10} {'per-sample commit':>19} {'bulk insert':>13} {'speedup':>9}")
+    for n in SIZES:
+        X = random_samples(n)
+        commit_rows = X[:min(n, COMMIT_LIMIT)].tolist()
+        single_us = time_per_sample(lambda: single_path(commit_rows), len(commit_rows))
+        batch_us = time_per_sample(lambda: batch_path(X), n)
+        print(f"{n:>10} {single_us:>19.2f} {batch_us:>13.2f} {single_us / batch_us:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+BENCHMARK - CROP PREDICTION CACHE
+CropPredictor.predict per request on the exact reading without the
+prediction cache, and with it for three quantization steps
+(CROP_CACHE_STEPS), on the rule-based
+model and on a RandomForest trained on data/crop_data.csv (loaded from its
+artifact, as in serving):
+
+- sowing season: --requests readings from --cards soil health cards
+  (farmers of one sampling grid share its N, P, K and pH, rounded as a
+  lab reports them) and the weather of the card's district (one of 50)
+  on one of 7 days (temperature to 0.1, humidity and rainfall to 1)
+- uniform: readings drawn uniformly over the API's validation ranges,
+  where nearly every reading is new (the cache's worst case)
+
+"agree" is the share of requests whose recommended crop is the one the
+model gives for the exact reading: quantization moves readings within a
+step of a decision threshold to the step's center.
+
+Run from the backend folder:
+
+    python benchmarks/bench_crop_cache.py [--requests 50000] [--cards 2000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STEPS = {
+    "default": None,
+    "medium": "N=1,P=1,K=1,temperature=0.5,humidity=1,ph=0.05,rainfall=2",
+    "coarse": "N=5,P=5,K=5,temperature=1,humidity=5,ph=0.25,rainfall=10",
+}
+
+LOW = np.array([0, 0, 0, 0, 0, 0, 0], dtype=float)
+HIGH = np.array([150, 150, 250, 50, 100, 14, 500], dtype=float)
+
+def sowing_season(requests: int, cards: int, districts: int = 50, days: int = 7, seed: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    soil = rng.uniform(LOW[[0, 1, 2, 5]], HIGH[[0, 1, 2, 5]], size=(cards, 4))
+    soil = np.column_stack([np.round(soil[:, :3]), np.round(soil[:, 3], 1)])
+    climate = rng.uniform(LOW[[3, 4, 6]], HIGH[[3, 4, 6]], size=(districts, 3))
+    # District weather on each day of the sowing window
+    weather = climate[:, None, :] + rng.normal(0, [0.6, 2, 5], size=(districts, days, 3))
+    weather = np.clip(weather, LOW[[3, 4, 6]], HIGH[[3, 4, 6]])
+    weather = np.stack([np.round(weather[..., 0], 1), np.round(weather[..., 1]), np.round(weather[..., 2])], axis=-1)
+
+    card = rng.integers(0, cards, requests)
+    day = rng.integers(0, days, requests)
+    N, P, K, ph = soil[card].T
+    temperature, humidity, rainfall = weather[card % districts, day].T
+    return np.column_stack([N, P, K, temperature, humidity, ph, rainfall])
+
+def uniform(requests: int, seed: int = 7) -> np.ndarray:
+    return np.round(np.random.default_rng(seed).uniform(LOW, HIGH, size=(requests, 7)), 2)
+
+def predictors():
+    from ml.crop_predictor import CropPredictor
+
+    rules = CropPredictor(model_path=os.path.join(tempfile.mkdtemp(), "missing.pkl"))
+    model_path = os.path.join(tempfile.mkdtemp(), "crop_model.pkl")
+    CropPredictor(model_path=model_path).train(os.path.join(BACKEND_DIR, "data", "crop_data.csv"))
+    return {"rules": rules, "forest": CropPredictor(model_path=model_path)}
+
+def run(predictor, X: np.ndarray, steps, cached: bool):
+    from cache import LocalCache
+    from ml.crop_predictor import PREDICTION_CACHE_STEPS, parse_steps
+
+    predictor.cache = LocalCache("crop_predictions", maxsize=50_000, ttl=86400) if cached else None
+    predictor.cache_steps = parse_steps(PREDICTION_CACHE_STEPS if steps is None else steps, predictor.feature_names)
+    rows = X.tolist()
+    start = time.perf_counter()
+    crops = [predictor.predict(row)["crop"] for row in rows]
+    micros = (time.perf_counter() - start) / len(rows) * 1e6
+    hit_rate = predictor.cache.stats()["hit_rate"] if cached else None
+    return micros, crops, hit_rate
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50_000)
+    parser.add_argument("--cards", type=int, default=2000)
+    args = parser.parse_args()
+
+    workloads = {
+        "sowing season": sowing_season(args.requests, args.cards),
+        "uniform": uniform(args.requests),
+    }
+    for model_name, predictor in predictors().items():
+        for workload, X in workloads.items():
+            print(f"\n{model_name}, {workload}: {args.requests:,} requests")
+            print(f"{'':>16} {'us/request':>11} {'hit rate':>9} {'agree':>8}")
+            # No steps: every feature exact
+            micros, exact, _ = run(predictor, X, "", cached=False)
+            print(f"{'exact, no cache':>16} {micros:>11.1f} {'':>9} {'':>8}")
+            for name, steps in STEPS.items():
+                micros, crops, hit_rate = run(predictor, X, steps, cached=True)
+                agree = np.mean([a == b for a, b in zip(crops, exact)])
+                print(f"{name:>16} {micros:>11.1f} {hit_rate:>9.1%} {agree:>8.2%}")
+
+if __name__ == "__main__":
+    main()
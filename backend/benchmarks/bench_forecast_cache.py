@@ -0,0 +1,97 @@
+"""
+BENCHMARK - FORECAST CACHE
+Latency of POST /api/prices/predict on a cache miss (forecast generated and
+stored) versus a cache hit, and the hit rate for a skewed mix of requests
+where a few commodities and horizons are asked about most of the time.
+
+Uses the in-process cache and whichever price model is installed (the
+mock if none has been trained). Run from the backend folder:
+
+    python benchmarks/bench_forecast_cache.py [--requests 2000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+import main
+from database import SessionLocal
+from models.price_models import CommodityPrice
+from model_registry import model_registry
+from routes.price_routes import forecast_cache
+
+COMMODITIES = ["Rice", "Wheat", "Onion", "Tomato", "Potato", "Cotton", "Maize", "Sugarcane"]
+HORIZONS = [7, 15, 30, 90]
+
+def seed_prices():
+    today = date.today()
+    rows = [
+        {"commodity_name": commodity, "date": today - timedelta(days=day), "price": 2000.0 + day,
+         "market": "Bench", "state": "Bench"}
+        for commodity in COMMODITIES
+        for day in range(1, 61)
+    ]
+    with SessionLocal() as db:
+        db.execute(insert(CommodityPrice), rows)
+        db.commit()
+
+def median_ms(client, body, runs: int, clear: bool) -> float:
+    timings = []
+    for _ in range(runs):
+        if clear:
+            forecast_cache.clear()
+        start = time.perf_counter()
+        client.post("/api/prices/predict", json=body).raise_for_status()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    seed_prices()
+    with TestClient(main.app) as client:
+        while not model_registry.ready:
+            time.sleep(0.05)
+
+        print("\nPOST /api/prices/predict, median ms")
+        print(f"{'days':>6} {'miss':>10} {'hit':>10}")
+        for days in [7, 30, 90, 365]:
+            body = {"commodity_name": "Rice", "forecast_days": days}
+            miss = median_ms(client, body, 30, clear=True)
+            hit = median_ms(client, body, 30, clear=False)
+            print(f"{days:>6} {miss:>10.2f} {hit:>10.2f}")
+
+        # Zipf-like popularity over commodity x horizon
+        forecast_cache.clear()
+        before = forecast_cache.stats()
+        rng = np.random.default_rng(42)
+        weights = 1 / np.arange(1, len(COMMODITIES) * len(HORIZONS) + 1)
+        picks = rng.choice(len(weights), size=args.requests, p=weights / weights.sum())
+        start = time.perf_counter()
+        for pick in picks:
+            body = {
+                "commodity_name": COMMODITIES[pick // len(HORIZONS)],
+                "forecast_days": HORIZONS[pick % len(HORIZONS)]
+            }
+            client.post("/api/prices/predict", json=body).raise_for_status()
+        elapsed = time.perf_counter() - start
+        stats = forecast_cache.stats()
+        hits = stats["hits"] - before["hits"]
+        print(f"\n{args.requests} skewed requests: {hits / args.requests:.1%} hit rate, "
+              f"{elapsed / args.requests * 1000:.2f} ms/request")
+
+if __name__ == "__main__":
+    run()
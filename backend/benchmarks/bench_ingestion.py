@@ -0,0 +1,92 @@
+"""
+BENCHMARK - PRICE FILE INGESTION
+Throughput and peak memory of ingestion.ingest on a synthetic
+AGMARKNET-style CSV (dd/mm/yyyy dates, ~1% duplicate and ~1% invalid rows)
+
+Every row is loaded twice: the first pass inserts, the second (same file)
+exercises the upsert path. Peak RSS should stay flat as --rows grows,
+since only one chunk is in memory at a time.
+
+Run from the backend folder:
+
+    python benchmarks/bench_ingestion.py [--rows 500000] [--chunksize 50000] [--database-url URL]
+"""
+
+import argparse
+import csv
+import os
+import resource
+import sys
+import tempfile
+from datetime import date, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, delete
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models.price_models import CommodityPrice
+from ingestion import ingest
+
+COMMODITIES = ["Rice", "Wheat", "Onion", "Tomato", "Potato", "Cotton", "Maize", "Soyabean"]
+
+def write_csv(path: str, rows: int, markets: int):
+    rng = np.random.default_rng(42)
+    start = date(2015, 1, 1)
+    header = ["State", "District", "Market", "Commodity", "Variety", "Grade", "Arrival_Date",
+              "Min_x0020_Price", "Max_x0020_Price", "Modal_x0020_Price"]
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for i in range(rows):
+            # Walk markets fastest, then commodities, then days, so keys are unique
+            market = i % markets
+            commodity = COMMODITIES[(i // markets) % len(COMMODITIES)]
+            day = start + timedelta(days=i // (markets * len(COMMODITIES)))
+            modal = round(2000 * (1 + rng.normal(0, 0.1)), 2)
+            row = ["State", "District", f"Market {market}", commodity, "Other", "FAQ",
+                   day.strftime("%d/%m/%Y"), modal - 50, modal + 50, modal]
+            roll = rng.random()
+            if roll < 0.01:
+                row[-1] = ""  # Invalid: no price
+            writer.writerow(row)
+            if roll > 0.99:
+                writer.writerow(row)  # Duplicate
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--markets", type=int, default=2000)
+    parser.add_argument("--chunksize", type=int, default=50_000)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    csv_path = os.path.join(tmp_dir, "prices.csv")
+    write_csv(csv_path, args.rows, args.markets)
+
+    url = args.database_url or f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine, tables=[CommodityPrice.__table__])
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.execute(delete(CommodityPrice))
+        db.commit()
+
+    print(f"\n{engine.dialect.name}: {os.path.getsize(csv_path) / 1e6:.0f} MB CSV, "
+          f"chunks of {args.chunksize:,} rows")
+    for label in ["insert", "upsert"]:
+        report = ingest(csv_path, chunksize=args.chunksize, session_factory=Session).to_dict()
+        print(f"{label:>8}: {report['rows_read']:,} read, {report['rows_written']:,} written, "
+              f"{report['rows_rejected']:,} rejected, {report['duplicates']:,} duplicates, "
+              f"{report['elapsed_seconds']:.1f}s = {report['rows_per_second']:,} rows/s")
+
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"peak RSS: {peak_mb:.0f} MB")
+    engine.dispose()
+
+if __name__ == "__main__":
+    main()
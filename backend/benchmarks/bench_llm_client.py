@@ -0,0 +1,162 @@
+"""
+BENCHMARK - LLM CLIENT UNDER A SLOW UPSTREAM
+Throughput and latency of advisory model calls against ai/fake_llm_server.py
+(run as a subprocess), with --users concurrent chats on one event loop:
+
+- blocking: a synchronous HTTP call inside the async handler, as the
+  commented SDK call (generate_content) would have made; only the first
+  32 requests are run, since they are served one at a time
+- client: LLMClient (concurrency limit, timeout, retries)
+- client + hedging: LLMClient with a second request after --hedge-after-ms
+  (only sent while a slot is free, so --concurrency is above --users)
+
+"loop stall" is the longest the event loop could not run anything else
+(every other request on the worker waits that long).
+
+A second run takes the upstream down (every request 503) and compares the
+cost of failing calls with and without the circuit breaker.
+
+Run from the backend folder:
+
+    python benchmarks/bench_llm_client.py [--requests 256] [--users 32] [--concurrency 64] [--latency-ms 800] [--tail-rate 0.05]
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+BLOCKING_REQUESTS = 32
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_fake_server(port: int, *options: str) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, "-m", "ai.fake_llm_server", "--port", str(port), *options],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return server
+        except OSError:
+            time.sleep(0.05)
+
+async def watch_loop(stalls: list, stop: asyncio.Event):
+    """Longest gap between 10 ms ticks beyond the 10 ms"""
+    last = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(0.01)
+        now = time.perf_counter()
+        stalls.append(now - last - 0.01)
+        last = now
+
+async def run(call, requests: int, users: int):
+    from ai.llm_client import LLMUnavailable
+
+    latencies, failed = [], 0
+    queue = iter(range(requests))
+
+    async def user():
+        nonlocal failed
+        for _ in queue:
+            start = time.perf_counter()
+            try:
+                await call()
+            except LLMUnavailable:
+                failed += 1
+            latencies.append(time.perf_counter() - start)
+
+    stalls, stop = [], asyncio.Event()
+    watcher = asyncio.ensure_future(watch_loop(stalls, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(users)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await watcher
+    return requests / elapsed, np.array(latencies) * 1000, failed, max(stalls, default=0) * 1000
+
+def blocking_call(base_url: str):
+    import requests
+    from ai.llm_client import LLMUnavailable
+
+    async def call():
+        response = requests.post(f"{base_url}/v1beta/models/gemini-pro:generateContent",
+                                 json={"contents": [{"role": "user", "parts": [{"text": "pests?"}]}]}, timeout=30)
+        if response.status_code != 200:
+            raise LLMUnavailable(f"HTTP {response.status_code}")
+    return call
+
+def report(name: str, result):
+    throughput, latencies, failed, stall = result
+    print(f"{name:>18} {throughput:>8.1f} {np.percentile(latencies, 50):>8.0f} {np.percentile(latencies, 99):>8.0f} "
+          f"{failed:>7} {stall:>10.0f}")
+
+async def slow_upstream(args):
+    from ai.llm_client import LLMClient
+
+    port = free_port()
+    server = start_fake_server(port, "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.latency_ms / 4),
+                               "--tail-rate", str(args.tail_rate), "--tail-ms", str(args.tail_ms),
+                               "--error-rate", str(args.error_rate), "--chunk-ms", "0")
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        print(f"\nUpstream {args.latency_ms:.0f}-{args.latency_ms * 1.25:.0f} ms, {args.tail_rate:.0%} +{args.tail_ms:.0f} ms, "
+              f"{args.error_rate:.0%} 503; {args.users} concurrent chats")
+        print(f"{'':>18} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'failed':>7} {'stall ms':>10}")
+        report(f"blocking ({BLOCKING_REQUESTS})", await run(blocking_call(base_url), BLOCKING_REQUESTS, args.users))
+        for name, hedge_after in (("client", None), ("client + hedging", args.hedge_after_ms / 1000)):
+            client = LLMClient("bench", "gemini-pro", base_url, max_concurrency=args.concurrency,
+                               timeout=args.timeout, hedge_after=hedge_after)
+            report(name, await run(lambda: client.generate("pests?"), args.requests, args.users))
+            await client.close()
+    finally:
+        server.terminate()
+
+async def upstream_down(args):
+    from ai.llm_client import LLMClient
+
+    port = free_port()
+    server = start_fake_server(port, "--latency-ms", "50", "--jitter-ms", "0", "--error-rate", "1")
+    try:
+        print(f"\nUpstream down (every request 503 after 50 ms), {args.requests} calls")
+        print(f"{'':>18} {'mean ms':>8} {'p99 ms':>8} {'upstream requests':>18}")
+        for name, failures in (("no breaker", 10 ** 9), ("circuit breaker", 5)):
+            client = LLMClient("bench", "gemini-pro", f"http://127.0.0.1:{port}", timeout=args.timeout,
+                               breaker_failures=failures)
+            _, latencies, _, _ = await run(lambda: client.generate("pests?"), args.requests, args.users)
+            sent = client.calls - client.rejected + client.retried
+            print(f"{name:>18} {latencies.mean():>8.0f} {np.percentile(latencies, 99):>8.0f} {sent:>18}")
+            await client.close()
+    finally:
+        server.terminate()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--users", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--timeout", type=float, default=20)
+    parser.add_argument("--latency-ms", type=float, default=800)
+    parser.add_argument("--tail-rate", type=float, default=0.05)
+    parser.add_argument("--tail-ms", type=float, default=4000)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--hedge-after-ms", type=float, default=1500)
+    args = parser.parse_args()
+
+    asyncio.run(slow_upstream(args))
+    asyncio.run(upstream_down(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+BENCHMARK - MARKET TRENDS
+Cost of the market_trends batch job as price history grows: a full
+rebuild (every commodity month) versus the incremental refresh after a
+day of new prices for every commodity, which re-aggregates only the
+months those prices fall in.
+
+Run from the backend folder:
+
+    python benchmarks/bench_market_trends.py [--rows 250000 1000000] [--database-url URL]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+COMMODITIES = [f"Commodity {i}" for i in range(100)]
+MARKETS_PER_COMMODITY = 10
+BATCH = 50_000
+
+def price_rows(rng, first_day: date, days: int):
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        for i, commodity in enumerate(COMMODITIES):
+            for market in range(MARKETS_PER_COMMODITY):
+                yield {"commodity_name": commodity, "market": f"Market {market}", "date": day,
+                       "price": float(1000 + 10 * i + 200 * np.sin(offset / 58) + rng.normal(0, 30))}
+
+def insert_prices(conn, rows):
+    from models.price_models import CommodityPrice
+
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH:
+            conn.execute(CommodityPrice.__table__.insert(), batch)
+            batch = []
+    if batch:
+        conn.execute(CommodityPrice.__table__.insert(), batch)
+
+def seed(rows: int) -> date:
+    """`rows` prices ending yesterday; returns the first day after them"""
+    from sqlalchemy import delete
+    from database import Base, engine
+    from models.price_models import CommodityPrice, MarketTrend, PendingTrendMonth
+
+    tables = [CommodityPrice.__table__, MarketTrend.__table__, PendingTrendMonth.__table__]
+    Base.metadata.create_all(bind=engine, tables=tables)
+    days = rows // (len(COMMODITIES) * MARKETS_PER_COMMODITY)
+    today = date.today()
+    with engine.begin() as conn:
+        for table in tables:
+            conn.execute(delete(table))
+        insert_prices(conn, price_rows(np.random.default_rng(42), today - timedelta(days=days), days))
+    return today
+
+def timed_refresh(full: bool) -> float:
+    from database import engine
+    from trends import refresh
+
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        refresh(conn, full=full)
+    return (time.perf_counter() - start) * 1000
+
+def add_day(day: date):
+    """A day of prices for every commodity, marked the way ingestion marks them"""
+    from database import engine
+    from trends import mark_months
+
+    rows = list(price_rows(np.random.default_rng(7), day, 1))
+    with engine.begin() as conn:
+        insert_prices(conn, rows)
+        mark_months(conn, {(row["commodity_name"], day.year, day.month) for row in rows})
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[250_000, 1_000_000])
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    print(f"\n{'price rows':>12} {'full rebuild ms':>16} {'incremental ms':>15}")
+    for rows in args.rows:
+        next_day = seed(rows)
+        full_ms = timed_refresh(full=True)
+        add_day(next_day)
+        incremental_ms = timed_refresh(full=False)
+        print(f"{rows:>12,} {full_ms:>16.0f} {incremental_ms:>15.0f}")
+
+if __name__ == "__main__":
+    main()
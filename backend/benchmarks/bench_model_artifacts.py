@@ -0,0 +1,113 @@
+"""
+BENCHMARK - MODEL ARTIFACT LOADING
+Startup time and memory per uvicorn-style worker for three ways of loading
+the crop model:
+
+- pickle:   joblib.load, as in the original CropPredictor.load_model
+- joblib mmap: joblib.load(mmap_mode='r') on the same pickle
+- artifact: flat .npy artifact opened with np.load(mmap_mode='r')
+
+Each worker is a separate process that loads the model, runs one
+prediction and reports its RSS and PSS (proportional set size, where
+shared pages are split between the processes using them). All workers
+stay alive together, so the PSS figures show how much is really shared.
+
+Linux only (reads /proc/self/smaps_rollup). Run from the backend folder:
+
+    python benchmarks/bench_model_artifacts.py [--workers 4] [--trees 200]
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def memory_kb() -> dict:
+    """RSS and PSS of the current process in kB"""
+    usage = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("Rss", "Pss"):
+                usage[key.lower()] = int(rest.split()[0])
+    return usage
+
+def worker(mode: str, path: str, barrier, results):
+    start = time.perf_counter()
+    import numpy as np
+    import joblib
+    from ml.artifacts import load_artifact
+
+    if mode == "pickle":
+        model = joblib.load(path)
+    elif mode == "joblib mmap":
+        model = joblib.load(path, mmap_mode="r")
+    else:
+        model = load_artifact(path)
+    model.predict_proba(np.zeros((1, 7)))
+    load_ms = (time.perf_counter() - start) * 1000
+
+    # Measure while every worker is alive, so shared pages are split between them
+    barrier.wait()
+    usage = memory_kb()
+    results.put({"load_ms": load_ms, **usage})
+    barrier.wait()
+
+def run_workers(mode: str, path: str, workers: int) -> list:
+    ctx = mp.get_context("spawn")
+    barrier = ctx.Barrier(workers)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(mode, path, barrier, results)) for _ in range(workers)]
+    for proc in procs:
+        proc.start()
+    stats = [results.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--trees", type=int, default=200)
+    parser.add_argument("--samples", type=int, default=50_000)
+    args = parser.parse_args()
+
+    import joblib
+    import numpy as np
+    from sklearn.ensemble import RandomForestClassifier
+    from ml.artifacts import save_random_forest
+
+    # A synthetic model large enough for memory differences to be visible
+    rng = np.random.default_rng(42)
+    X = rng.uniform(0, 250, size=(args.samples, 7))
+    y = rng.integers(0, 7, size=args.samples)
+    model = RandomForestClassifier(n_estimators=args.trees, random_state=42, n_jobs=-1).fit(X, y)
+    model.n_jobs = 1
+
+    tmp_dir = tempfile.mkdtemp()
+    pickle_path = os.path.join(tmp_dir, "crop_model.pkl")
+    artifact_path = os.path.join(tmp_dir, "crop_model.forest")
+    joblib.dump(model, pickle_path)
+    save_random_forest(artifact_path, model, [str(c) for c in model.classes_])
+
+    artifact_mb = sum(
+        os.path.getsize(os.path.join(artifact_path, name)) for name in os.listdir(artifact_path)
+    ) / 1e6
+    print(f"\nModel: {args.trees} trees, pickle {os.path.getsize(pickle_path) / 1e6:.1f} MB, "
+          f"artifact {artifact_mb:.1f} MB, {args.workers} workers")
+    print(f"{'mode':>12} {'load (ms)':>10} {'RSS/worker (MB)':>16} {'PSS/worker (MB)':>16} {'PSS total (MB)':>15}")
+
+    for mode, path in [("pickle", pickle_path), ("joblib mmap", pickle_path), ("artifact", artifact_path)]:
+        stats = run_workers(mode, path, args.workers)
+        load_ms = np.mean([s["load_ms"] for s in stats])
+        rss = np.mean([s["rss"] for s in stats]) / 1024
+        pss = np.mean([s["pss"] for s in stats]) / 1024
+        total = sum(s["pss"] for s in stats) / 1024
+        print(f"{mode:>12} {load_ms:>10.1f} {rss:>16.1f} {pss:>16.1f} {total:>15.1f}")
+
+if __name__ == "__main__":
+    main()
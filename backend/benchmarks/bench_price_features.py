@@ -0,0 +1,119 @@
+"""
+BENCHMARK - REQUEST-TIME PRICE FEATURES
+Cost of getting lag_1/7/30 and ma_7/30 features for one price request:
+
+- query:  the original path, a 365-row CommodityPrice ORM query per
+          request, with the features recomputed by pandas
+- store:  PriceFeatureStore ring buffer lookup (seeded once, and again
+          after the commodity's prices change)
+
+Also reports recursive multi-step forecast latency for a trained model.
+
+Run from the backend folder:
+
+    python benchmarks/bench_price_features.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models.price_models import CommodityPrice
+from ml.feature_store import PriceFeatureStore, WINDOW, build_features
+from ml.price_predictor import PricePredictor
+from routes.price_routes import daily_prices_query
+
+COMMODITIES = ["Rice", "Wheat", "Onion", "Tomato", "Potato"]
+MARKETS = [f"Market {i}" for i in range(10)]
+DAYS = 3 * 365
+
+def per_call_us(fn, runs: int) -> float:
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - start) / runs * 1e6
+
+def synthetic_rows():
+    rng = np.random.default_rng(42)
+    start = date.today() - timedelta(days=DAYS)
+    for commodity in COMMODITIES:
+        price = 2000.0
+        for day in range(DAYS):
+            price *= 1 + rng.normal(0, 0.01)
+            for market in MARKETS:
+                yield {
+                    "commodity_name": commodity,
+                    "date": start + timedelta(days=day),
+                    "price": price * (1 + rng.normal(0, 0.005)),
+                    "market": market,
+                    "state": "Bench"
+                }
+
+def main():
+    import pandas as pd
+
+    tmp_dir = tempfile.mkdtemp()
+    engine = create_engine(f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}")
+    Base.metadata.create_all(bind=engine, tables=[CommodityPrice.__table__])
+    Session = sessionmaker(bind=engine)
+    rows = list(synthetic_rows())
+    with Session() as db:
+        db.execute(insert(CommodityPrice), rows)
+        db.commit()
+
+    # Train a model on the same history so recursive forecasting can be timed
+    csv_path = os.path.join(tmp_dir, "prices.csv")
+    pd.DataFrame(rows).to_csv(csv_path, index=False)
+    predictor = PricePredictor(os.path.join(tmp_dir, "price_model.pkl"))
+    predictor.train(csv_path)
+    predictor.load_model()
+
+    db = Session()
+
+    def query_features():
+        history = db.query(CommodityPrice)\
+            .filter(CommodityPrice.commodity_name == "Rice")\
+            .order_by(CommodityPrice.date.desc())\
+            .limit(365)\
+            .all()
+        prices = pd.Series([r.price for r in reversed(history)])
+        return [prices.shift(lag).iloc[-1] for lag in (1, 7, 30)] + [
+            prices.rolling(7).mean().iloc[-1],
+            prices.rolling(30).mean().iloc[-1]
+        ]
+
+    def load_daily_prices(db, commodity, days):
+        return db.execute(daily_prices_query(commodity, days)).all()
+
+    store = PriceFeatureStore()
+    store.seed("Rice", load_daily_prices(db, "Rice", WINDOW))
+
+    def store_features():
+        history, last_date = store.snapshot("Rice")
+        return build_features(history, last_date + timedelta(days=1))
+
+    print(f"\n{len(rows)} price rows ({len(COMMODITIES)} commodities x {len(MARKETS)} markets x {DAYS} days)")
+    print(f"{'query + pandas':>24}: {per_call_us(query_features, 200):10.1f} us/request")
+    print(f"{'seed store (once)':>24}: {per_call_us(lambda: load_daily_prices(db, 'Rice', WINDOW), 50):10.1f} us")
+    print(f"{'feature store lookup':>24}: {per_call_us(store_features, 5000):10.1f} us/request")
+
+    predictor.feature_store.seed("Rice", load_daily_prices(db, "Rice", WINDOW))
+    print("\nRecursive forecast with the trained model")
+    for days in [7, 30, 90, 365]:
+        ms = per_call_us(lambda: predictor.predict("Rice", forecast_days=days, columnar=True), 5) / 1000
+        print(f"{days:>20} days: {ms:10.2f} ms")
+
+    db.close()
+
+if __name__ == "__main__":
+    main()
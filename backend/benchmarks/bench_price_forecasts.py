@@ -0,0 +1,73 @@
+"""
+BENCHMARK - PRICE FORECAST GENERATION
+The original per-day Python loop in PricePredictor._generate_forecasts
+versus the vectorized NumPy version, for every commodity at every
+horizon from 1 to 365 days
+
+Run from the backend folder:
+
+    python benchmarks/bench_price_forecasts.py
+"""
+
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ml.price_predictor import PricePredictor
+
+HORIZONS = range(1, 366)
+REPORT_HORIZONS = [1, 7, 30, 90, 180, 365]
+
+def loop_forecasts(current_price: float, days: int):
+    """The original implementation, kept here as the baseline"""
+    forecasts = []
+    base_trend = np.random.choice([-0.5, 0, 0.5, 1.0], p=[0.2, 0.4, 0.3, 0.1])
+    volatility = current_price * 0.05
+    for i in range(days):
+        forecast_date = datetime.now().date() + timedelta(days=i+1)
+        trend_component = base_trend * (i / days) * current_price * 0.1
+        seasonal_component = np.sin(2 * np.pi * i / 30) * current_price * 0.02
+        random_component = np.random.randn() * volatility * 0.3
+        predicted_price = current_price + trend_component + seasonal_component + random_component
+        forecasts.append({
+            "date": forecast_date.strftime("%Y-%m-%d"),
+            "predicted_price": round(predicted_price, 2),
+            "lower_bound": round(predicted_price * 0.90, 2),
+            "upper_bound": round(predicted_price * 1.10, 2)
+        })
+    return forecasts
+
+def main():
+    predictor = PricePredictor()
+    prices = predictor.price_baselines
+
+    variants = {
+        "loop": lambda price, days: loop_forecasts(price, days),
+        "vectorized": lambda price, days: predictor._generate_forecasts("", price, days),
+        "columnar": lambda price, days: predictor._generate_forecasts("", price, days, columnar=True),
+    }
+
+    per_horizon = {name: {} for name in variants}
+    totals = {}
+    for name, fn in variants.items():
+        start_all = time.perf_counter()
+        for days in HORIZONS:
+            start = time.perf_counter()
+            for price in prices.values():
+                fn(price, days)
+            per_horizon[name][days] = (time.perf_counter() - start) / len(prices) * 1e6
+        totals[name] = time.perf_counter() - start_all
+
+    print(f"\n{len(prices)} commodities x horizons 1-365 ({len(prices) * len(HORIZONS)} forecasts)")
+    print(f"{'horizon':>8} " + " ".join(f"{name + ' (us)':>16}" for name in variants))
+    for days in REPORT_HORIZONS:
+        print(f"{days:>8} " + " ".join(f"{per_horizon[name][days]:>16.1f}" for name in variants))
+    print(f"{'total':>8} " + " ".join(f"{totals[name]:>15.2f}s" for name in variants))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+BENCHMARK - PRICE HISTORY QUERIES
+Query latency on a large commodity_prices table with the original
+single-column indexes versus the composite indexes of migration 0002:
+
+- history:  one commodity over the last 90 days, ordered by date: every
+            row (the original GET /api/prices/historical) and the first
+            1000-row page (the paginated endpoint)
+- daily:    30 latest daily averages for one commodity (feature store seeding)
+- page:     a 1000-row page deep into a 2-year history, with OFFSET versus
+            the keyset cursor the endpoint now uses
+- list:     SELECT DISTINCT commodity_name versus the commodities table
+
+Loading 10M rows takes a few minutes. Run from the backend folder:
+
+    python benchmarks/bench_price_history.py [--rows 10000000] [--database-url URL]
+"""
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+
+from database import Base
+from models.price_models import Commodity, CommodityPrice
+
+COMMODITIES = [f"Commodity {i:02d}" for i in range(20)]
+MARKETS = 500
+BATCH = 200_000
+
+OLD_INDEXES = [
+    "CREATE INDEX ix_commodity_prices_commodity_name ON commodity_prices (commodity_name)"
+]
+NEW_INDEXES = [
+    "CREATE UNIQUE INDEX uq_commodity_prices_commodity_market_date ON commodity_prices (commodity_name, market, date)",
+    "CREATE INDEX ix_commodity_prices_commodity_date ON commodity_prices (commodity_name, date)"
+]
+
+def row_batches(rows: int, days: int):
+    """(commodity, market, date, price) tuples, markets fastest, then commodities, then days"""
+    rng = np.random.default_rng(42)
+    start = date.today() - timedelta(days=days - 1)
+    per_day = len(COMMODITIES) * MARKETS
+    for offset in range(0, rows, BATCH):
+        index = np.arange(offset, min(offset + BATCH, rows))
+        prices = rng.uniform(1000, 5000, size=len(index)).round(2)
+        yield [
+            (COMMODITIES[(i // MARKETS) % len(COMMODITIES)], f"Market {i % MARKETS}",
+             start + timedelta(days=int(i // per_day)), float(price))
+            for i, price in zip(index, prices)
+        ]
+
+def load(engine, rows: int, days: int):
+    raw = engine.raw_connection()
+    cursor = raw.cursor()
+    for batch in row_batches(rows, days):
+        if engine.dialect.name == "postgresql":
+            buffer = io.StringIO("".join(f"{c}\t{m}\t{d.isoformat()}\t{p}\n" for c, m, d, p in batch))
+            cursor.copy_expert(
+                "COPY commodity_prices (commodity_name, market, date, price) FROM STDIN", buffer
+            )
+        else:
+            cursor.executemany(
+                "INSERT INTO commodity_prices (commodity_name, market, date, price) VALUES (?, ?, ?, ?)",
+                [(c, m, d.isoformat(), p) for c, m, d, p in batch]
+            )
+        raw.commit()
+    raw.close()
+
+def set_indexes(conn, create, drop):
+    for name in drop:
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    for statement in create:
+        conn.execute(text(statement))
+    conn.execute(text("ANALYZE"))
+    conn.commit()
+
+def median_ms(conn, sql: str, params: dict, runs: int = 20) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        conn.execute(text(sql), params).fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+def run_queries(conn, days: int) -> dict:
+    today = date.today()
+    commodity = COMMODITIES[7]
+    depth = MARKETS * max(days - 30, days // 2)  # A page near the end of the history
+
+    # The keyset cursor for that page, as the previous page would have returned it
+    cursor_date, cursor_id = conn.execute(text(
+        "SELECT date, id FROM commodity_prices WHERE commodity_name = :c "
+        "ORDER BY date, id LIMIT 1 OFFSET :o"
+    ), {"c": commodity, "o": depth - 1}).one()
+
+    return {
+        "history, all rows": median_ms(conn,
+            "SELECT * FROM commodity_prices WHERE commodity_name = :c AND date >= :d ORDER BY date",
+            {"c": commodity, "d": today - timedelta(days=90)}, runs=5),
+        "history, first page": median_ms(conn,
+            "SELECT * FROM commodity_prices WHERE commodity_name = :c AND date >= :d ORDER BY date, id LIMIT 1000",
+            {"c": commodity, "d": today - timedelta(days=90)}),
+        "daily averages (30)": median_ms(conn,
+            "SELECT date, avg(price) FROM commodity_prices WHERE commodity_name = :c "
+            "GROUP BY date ORDER BY date DESC LIMIT 30",
+            {"c": commodity}),
+        "deep page, OFFSET": median_ms(conn,
+            "SELECT * FROM commodity_prices WHERE commodity_name = :c AND date >= :d "
+            "ORDER BY date, id LIMIT 1000 OFFSET :o",
+            {"c": commodity, "d": today - timedelta(days=days), "o": depth}, runs=5),
+        "deep page, keyset": median_ms(conn,
+            "SELECT * FROM commodity_prices WHERE commodity_name = :c AND date >= :cd "
+            "AND (date > :cd OR id > :ci) ORDER BY date, id LIMIT 1000",
+            {"c": commodity, "cd": cursor_date, "ci": cursor_id}),
+        "commodity list": median_ms(conn,
+            "SELECT DISTINCT commodity_name FROM commodity_prices", {}, runs=3),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    days = -(-args.rows // (len(COMMODITIES) * MARKETS))
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    engine = create_engine(url)
+    tables = [CommodityPrice.__table__, Commodity.__table__]
+    Base.metadata.drop_all(bind=engine, tables=tables)
+    Base.metadata.create_all(bind=engine, tables=tables)
+
+    # Load without secondary indexes, then build each set
+    with engine.connect() as conn:
+        for index in CommodityPrice.__table__.indexes:
+            conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+        conn.commit()
+    start = time.perf_counter()
+    load(engine, args.rows, days)
+    print(f"\n{engine.dialect.name}: loaded {args.rows:,} rows ({len(COMMODITIES)} commodities x "
+          f"{MARKETS} markets x {days} days) in {time.perf_counter() - start:.0f}s")
+
+    with engine.connect() as conn:
+        set_indexes(conn, OLD_INDEXES + ["CREATE INDEX ix_commodity_prices_date ON commodity_prices (date)"], [])
+        old = run_queries(conn, days)
+        set_indexes(conn, NEW_INDEXES, ["ix_commodity_prices_commodity_name"])
+        new = run_queries(conn, days)
+        conn.execute(text(
+            "INSERT INTO commodities (name, first_price_date, last_price_date) "
+            "SELECT commodity_name, MIN(date), MAX(date) FROM commodity_prices GROUP BY commodity_name"
+        ))
+        conn.commit()
+        new["commodity list"] = median_ms(conn, "SELECT name FROM commodities ORDER BY name", {})
+
+    print(f"{'median ms':>22} {'single-column':>14} {'composite':>10}")
+    for name in old:
+        print(f"{name:>22} {old[name]:>14.2f} {new[name]:>10.2f}")
+    print("(composite 'commodity list' reads the commodities table)")
+    engine.dispose()
+
+if __name__ == "__main__":
+    main()
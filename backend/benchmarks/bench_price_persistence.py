@@ -0,0 +1,111 @@
+"""
+BENCHMARK - PRICE PREDICTION PERSISTENCE
+Time /api/prices/predict spends storing its forecasts, per request:
+
+- orm:      the original path, one PricePrediction ORM object per forecast
+            day added to the session, then commit
+- bulk:     save_predictions, one executemany INSERT through SQLAlchemy Core
+- deferred: defer_persistence=true, the rows are handed to a background
+            task, so the response only pays for building them
+
+Defaults to a temporary SQLite file. Pass --database-url to run against
+PostgreSQL, e.g. a local throwaway server:
+
+    python benchmarks/bench_price_persistence.py --database-url postgresql://postgres:@/postgres?host=/tmp/pgdata
+
+Run from the backend folder:
+
+    python benchmarks/bench_price_persistence.py [--requests 50]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import BackgroundTasks
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from database import Base, async_database_url
+from models.price_models import PricePrediction
+from routes.price_routes import prediction_rows, save_predictions, save_predictions_in_background
+
+def synthetic_forecasts(days: int) -> dict:
+    start = date.today()
+    return {
+        "date": [(start + timedelta(days=d + 1)).isoformat() for d in range(days)],
+        "predicted_price": [2000.0 + d for d in range(days)],
+        "lower_bound": [1900.0 + d for d in range(days)],
+        "upper_bound": [2100.0 + d for d in range(days)]
+    }
+
+async def save_orm(db, commodity: str, forecasts: dict, horizon: int):
+    for forecast_date, price, lower, upper in zip(
+        forecasts["date"],
+        forecasts["predicted_price"],
+        forecasts["lower_bound"],
+        forecasts["upper_bound"]
+    ):
+        db.add(PricePrediction(
+            commodity_name=commodity,
+            prediction_date=date.fromisoformat(forecast_date),
+            predicted_price=price,
+            confidence_interval_lower=lower,
+            confidence_interval_upper=upper,
+            model_type="mock",
+            model_version="1.0",
+            forecast_horizon_days=horizon
+        ))
+    await db.commit()
+
+async def run(args):
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    engine = create_async_engine(async_database_url(url))
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: Base.metadata.create_all(sync_conn, tables=[PricePrediction.__table__]))
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def orm(db, forecasts, days):
+        await save_orm(db, "Bench", forecasts, days)
+
+    async def bulk(db, forecasts, days):
+        await save_predictions(db, prediction_rows("Bench", forecasts, days, "mock"))
+
+    async def deferred(db, forecasts, days):
+        tasks = BackgroundTasks()
+        tasks.add_task(save_predictions_in_background, prediction_rows("Bench", forecasts, days, "mock"))
+
+    print(f"\n{engine.dialect.name} ({engine.dialect.driver}), median of {args.requests} requests (ms per request)")
+    print(f"{'days':>6} {'orm':>10} {'bulk':>10} {'deferred':>10} {'speedup':>9}")
+    for days in [7, 30, 90, 365]:
+        forecasts = synthetic_forecasts(days)
+        medians = {}
+        for name, fn in [("orm", orm), ("bulk", bulk), ("deferred", deferred)]:
+            timings = []
+            async with Session() as db:
+                for _ in range(args.requests):
+                    start = time.perf_counter()
+                    await fn(db, forecasts, days)
+                    timings.append((time.perf_counter() - start) * 1000)
+                await db.execute(delete(PricePrediction))
+                await db.commit()
+            medians[name] = sorted(timings)[len(timings) // 2]
+        print(f"{days:>6} {medians['orm']:>10.2f} {medians['bulk']:>10.2f} "
+              f"{medians['deferred']:>10.3f} {medians['orm'] / medians['bulk']:>8.1f}x")
+
+    await engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--requests", type=int, default=50)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+BENCHMARK - REGIONAL ANALYTICS
+GET /api/government/regions for one state and for the whole country:
+the original implementation (every CropRecommendation loaded as an ORM
+object, counted and averaged in Python) versus the SQL aggregation in
+regional_analytics.py, which also adds percentiles and a district
+breakdown.
+
+Each run happens in a fresh process, so peak RSS is per variant.
+Run from the backend folder:
+
+    python benchmarks/bench_regional_analytics.py [--rows 1000000] [--database-url URL]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STATES = ["Punjab", "Haryana", "Gujarat", "Maharashtra", "Karnataka", "Tamil Nadu", "Bihar",
+          "Uttar Pradesh", "West Bengal", "Rajasthan"]
+CROPS = ["Rice", "Wheat", "Maize", "Cotton", "Sugarcane", "Jute", "Coffee", "Mango", "Banana", "Chickpea"]
+DISTRICTS_PER_STATE = 40
+BATCH = 100_000
+
+def seed(rows: int):
+    from sqlalchemy import delete, insert
+    from database import Base, engine
+    from models.crop_models import CropRecommendation
+
+    Base.metadata.create_all(bind=engine, tables=[CropRecommendation.__table__])
+    rng = np.random.default_rng(42)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(delete(CropRecommendation))
+        for offset in range(0, rows, BATCH):
+            size = min(BATCH, rows - offset)
+            soil = rng.uniform([0, 5, 5, 4], [140, 145, 205, 9], size=(size, 4)).round(2)
+            conn.execute(insert(CropRecommendation.__table__), [
+                {"farmer_id": f"farmer_{offset + i}", "nitrogen": float(n), "phosphorus": float(p),
+                 "potassium": float(k), "temperature": 25.0, "humidity": 70.0, "ph": float(ph),
+                 "rainfall": 150.0, "state": STATES[(offset + i) % len(STATES)],
+                 "district": f"District {(offset + i) // len(STATES) % DISTRICTS_PER_STATE}",
+                 "recommended_crop": CROPS[(offset + i) % len(CROPS)], "confidence_score": 0.9,
+                 "alternative_crops": [], "created_at": now - timedelta(minutes=offset + i)}
+                for i, (n, p, k, ph) in enumerate(soil)
+            ])
+
+def original(state):
+    """The endpoint before this change"""
+    from sqlalchemy import select
+    from database import SessionLocal
+    from models.crop_models import CropRecommendation
+
+    with SessionLocal() as db:
+        query = select(CropRecommendation)
+        if state:
+            query = query.where(CropRecommendation.state == state)
+        recommendations = db.scalars(query).all()
+        crop_distribution = {}
+        soil_health = {"avg_n": 0, "avg_p": 0, "avg_k": 0, "avg_ph": 0}
+        for rec in recommendations:
+            crop_distribution[rec.recommended_crop] = crop_distribution.get(rec.recommended_crop, 0) + 1
+            soil_health["avg_n"] += rec.nitrogen
+            soil_health["avg_p"] += rec.phosphorus
+            soil_health["avg_k"] += rec.potassium
+            soil_health["avg_ph"] += rec.ph
+        return len(recommendations)
+
+def aggregated(state):
+    from database import AsyncSessionLocal
+    from routes.government_routes import get_regional_analysis
+
+    async def run():
+        async with AsyncSessionLocal() as db:
+            response = await get_regional_analysis(
+                state=state, district=None, start_date=None, end_date=None, breakdown=True, db=db
+            )
+            if not isinstance(response, dict):  # Streamed
+                async for _ in response.body_iterator:
+                    pass
+    asyncio.run(run())
+
+def measure(name, state, queue):
+    fn = {"original": original, "aggregated": aggregated}[name]
+    import routes.government_routes  # noqa: F401 (imports are not part of the timing)
+    start = time.perf_counter()
+    fn(state)
+    elapsed = (time.perf_counter() - start) * 1000
+    queue.put((elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    start = time.perf_counter()
+    seed(args.rows)
+    print(f"\nseeded {args.rows:,} recommendations ({len(STATES)} states x {DISTRICTS_PER_STATE} districts) "
+          f"in {time.perf_counter() - start:.0f}s")
+
+    # Fresh interpreter per run, so ru_maxrss is the run's own peak
+    context = multiprocessing.get_context("spawn")
+    print(f"{'':>22} {'original ms':>12} {'peak MB':>8} {'aggregated ms':>14} {'peak MB':>8}")
+    for label, state in [("one state", STATES[0]), ("whole country", None)]:
+        results = []
+        for name in ["original", "aggregated"]:
+            queue = context.Queue()
+            process = context.Process(target=measure, args=(name, state, queue))
+            process.start()
+            results.append(queue.get())
+            process.join()
+        (old_ms, old_mb), (new_ms, new_mb) = results
+        print(f"{label:>22} {old_ms:>12.0f} {old_mb:>8.0f} {new_ms:>14.0f} {new_mb:>8.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+BENCHMARK - ADVISORY RESPONSE CACHE
+Hit rate, wrong-answer rate and lookup cost of the response cache over a
+synthetic stream of farmer questions: a few hundred distinct questions
+(topic x crop x input, and x area for doses per acre) in several phrasings
+each, asked from a handful of districts with Zipf-distributed popularity.
+
+A hit is wrong when the cached answer was stored for a different question
+(another crop, input, area or topic). Model time per miss is simulated
+(--model-ms) to show the latency the hits save.
+
+Run from the backend folder:
+
+    python benchmarks/bench_response_cache.py [--questions 50000] [--size 5000] [--model-ms 1500]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CROPS = ["wheat", "rice", "cotton", "maize", "mustard", "tomato", "onion", "sugarcane", "soybean", "chickpea"]
+INPUTS = ["urea", "DAP", "potash", "neem oil", "zinc sulphate"]
+PHRASINGS = {
+    "dose": [
+        "How much {input} should I apply to {crop}?",
+        "how much {input} to apply for {crop}",
+        "{input} dose for {crop}?",
+        "What is the {input} dose for my {crop}",
+    ],
+    "timing": [
+        "When should I apply {input} to {crop}?",
+        "when to apply {input} on {crop}",
+        "Best time to apply {input} for {crop}?",
+    ],
+    "area": [
+        "How much {input} for {acres} acres of {crop}?",
+        "how much {input} to apply on {acres} acres {crop}",
+        "{input} needed for {acres} acres of {crop}",
+    ],
+    "pests": [
+        "How to control aphids in {crop}",
+        "how to control aphids on {crop} crop",
+        "Aphids on my {crop}, what should I do?",
+    ],
+}
+DISTRICTS = ["Ludhiana", "Guntur", "Nashik", "Indore", "Karnal"]
+ACRES = [1, 2, 5, 10, 20]
+
+def question_stream(count: int, seed: int = 7):
+    """(district, intent, question) tuples, popular intents asked more often"""
+    intents = [(topic, crop, item, acres) for topic in PHRASINGS for crop in CROPS
+               for item in (INPUTS if topic != "pests" else [None])
+               for acres in (ACRES if topic == "area" else [None])]
+    rng = np.random.default_rng(seed)
+    weights = 1 / np.arange(1, len(intents) + 1) ** 0.9
+    picks = rng.choice(len(intents), size=count, p=weights / weights.sum())
+    districts = rng.integers(0, len(DISTRICTS), size=count)
+    for pick, district in zip(picks, districts):
+        topic, crop, item, acres = intents[pick]
+        template = PHRASINGS[topic][rng.integers(0, len(PHRASINGS[topic]))]
+        yield DISTRICTS[district], intents[pick], template.format(crop=crop, input=item, acres=acres)
+
+def run(questions: int, size: int, similarity: float):
+    from ai.response_cache import ResponseCache
+
+    cache = ResponseCache(maxsize=size, similarity=similarity)
+    lookups, wrong = [], 0
+    for district, intent, question in question_stream(questions):
+        bucket = ResponseCache.bucket("general", "en", district, None)
+        start = time.perf_counter()
+        cached = cache.get(bucket, question)
+        lookups.append(time.perf_counter() - start)
+        if cached is None:
+            cache.set(bucket, question, {"intent": intent})
+        elif cached["intent"] != intent:
+            wrong += 1
+    return cache.stats(), wrong, np.array(lookups) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=50_000)
+    parser.add_argument("--size", type=int, default=5000)
+    parser.add_argument("--model-ms", type=float, default=1500)
+    args = parser.parse_args()
+
+    print(f"\n{args.questions:,} questions, cache size {args.size:,}, model {args.model_ms:.0f} ms per miss")
+    print(f"{'threshold':>9} {'hit rate':>9} {'exact':>7} {'similar':>8} {'wrong':>6} "
+          f"{'lookup p50 ms':>14} {'p99 ms':>7} {'mean answer ms':>15}")
+    for similarity in (1.01, 0.95, 0.92, 0.88, 0.80):
+        stats, wrong, lookups = run(args.questions, args.size, similarity)
+        answer_ms = lookups.mean() + (1 - stats["hit_rate"]) * args.model_ms
+        label = "exact" if similarity > 1 else f"{similarity:.2f}"
+        print(f"{label:>9} {stats['hit_rate']:>9.1%} {stats['exact_hits']:>7} {stats['similar_hits']:>8} {wrong:>6} "
+              f"{np.percentile(lookups, 50):>14.4f} {np.percentile(lookups, 99):>7.4f} {answer_ms:>15.0f}")
+
+if __name__ == "__main__":
+    main()
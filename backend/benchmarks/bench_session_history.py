@@ -0,0 +1,178 @@
+"""
+BENCHMARK - CHAT SESSION HISTORY
+GET /api/advisory/session/{session_id} on a session of --messages
+messages, before (every message loaded as an ORM object, counted with
+len() and encoded by FastAPI) and after (keyset pages of the (session_id,
+timestamp, id) index, message_count read from the session):
+
+- latency and response size of the whole history, the first page, a page
+  from the middle of the session and the latest page (order=desc), in the
+  rows and columns formats
+- a walk through every page, checked against the full history
+- message_count and last_message_id of every session, as maintained by
+  the chat log writes, checked against COUNT(*) and MAX(id)
+
+The route is called in-process (no HTTP), so the times are the query and
+the JSON encoding.
+
+Run from the backend folder:
+
+    python benchmarks/bench_session_history.py [--messages 20000] [--limit 100] [--database-url URL]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ANSWER = "Weather advisory: light rain is expected this week. Delay irrigation and spraying until the fields drain. " * 3
+
+def seed(messages: int, other_sessions: int):
+    """One long session and --other-sessions short ones, written as the chat log writer does"""
+    from database import Base, engine
+    from chat_log import write_turns
+    from models import advisory_models, analytics_models  # noqa: F401 (tables)
+    from models.advisory_models import ChatSession
+
+    Base.metadata.create_all(bind=engine)
+    long_session = str(uuid.uuid4())
+    sessions = [long_session] + [str(uuid.uuid4()) for _ in range(other_sessions)]
+    with engine.begin() as conn:
+        conn.execute(ChatSession.__table__.insert(), [
+            {"session_id": session_id, "farmer_id": f"farmer_{i}", "language": "en", "is_active": True}
+            for i, session_id in enumerate(sessions)
+        ])
+
+    start = datetime.utcnow() - timedelta(days=60)
+    turns = []
+    for i in range(messages // 2):
+        # Every tenth turn in a short session, interleaved with the long one
+        session_id = sessions[1 + i // 10 % other_sessions] if other_sessions and i % 10 == 9 else long_session
+        at = start + timedelta(seconds=30 * i)
+        turns.append({
+            "session_id": session_id, "farmer_id": "farmer_0", "location": "Nashik", "language": "en",
+            "message": f"Will it rain this week in Nashik? ({i})", "response": ANSWER, "category": "weather",
+            "tokens_used": 180, "response_time_ms": 900,
+            "asked_at": at, "answered_at": at + timedelta(seconds=2), "last_activity": at + timedelta(seconds=2)
+        })
+    for offset in range(0, len(turns), 500):
+        with engine.begin() as conn:
+            write_turns(conn, turns[offset:offset + 500])
+    return long_session
+
+async def original_history(db, session_id: str) -> bytes:
+    """get_session_history before pagination, and FastAPI's encoding of its result"""
+    from fastapi.encoders import jsonable_encoder
+    from sqlalchemy import select
+    from models.advisory_models import ChatMessage, ChatSession
+
+    session = await db.scalar(select(ChatSession).where(ChatSession.session_id == session_id))
+    messages = (await db.scalars(
+        select(ChatMessage).where(ChatMessage.session_id == session_id).order_by(ChatMessage.timestamp)
+    )).all()
+    content = {"session": session, "messages": messages, "message_count": len(messages)}
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+async def page(db, session_id: str, limit: int, cursor=None, order="asc", response_format="rows") -> bytes:
+    from routes.advisory_routes import get_session_history
+
+    response = await get_session_history(
+        session_id, limit=limit, cursor=cursor, order=order, response_format=response_format, db=db
+    )
+    return response.body
+
+async def timed(run, repeat: int):
+    from database import AsyncSessionLocal
+
+    times = []
+    for _ in range(repeat):
+        async with AsyncSessionLocal() as db:
+            start = time.perf_counter()
+            body = await run(db)
+            times.append(time.perf_counter() - start)
+    return np.median(times) * 1000, len(body)
+
+async def run(session_id: str, limit: int, repeat: int):
+    from database import AsyncSessionLocal
+
+    # Cursor of the page in the middle of the session
+    async with AsyncSessionLocal() as db:
+        full = json.loads(await original_history(db, session_id))
+    middle = full["messages"][len(full["messages"]) // 2]
+    middle_cursor = f"{middle['timestamp']}:{middle['id']}"
+
+    print(f"\nSession of {full['message_count']:,} messages, pages of {limit}")
+    print(f"{'':>34} {'ms':>9} {'KB':>10}")
+    cases = [
+        ("original (whole history)", lambda db: original_history(db, session_id), max(1, repeat // 10)),
+        ("first page, rows", lambda db: page(db, session_id, limit), repeat),
+        ("first page, columns", lambda db: page(db, session_id, limit, response_format="columns"), repeat),
+        ("middle page, rows", lambda db: page(db, session_id, limit, middle_cursor), repeat),
+        ("latest page (desc), rows", lambda db: page(db, session_id, limit, order="desc"), repeat),
+        ("latest page (desc), columns", lambda db: page(db, session_id, limit, order="desc", response_format="columns"), repeat),
+    ]
+    for name, case, times in cases:
+        ms, size = await timed(case, times)
+        print(f"{name:>34} {ms:>9.2f} {size / 1024:>10.1f}")
+
+    for response_format in ("rows", "columns"):
+        ids, cursor, pages = [], None, 0
+        start = time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            while True:
+                body = json.loads(await page(db, session_id, limit, cursor, response_format=response_format))
+                messages = body["messages"]
+                ids += messages["id"] if response_format == "columns" else [m["id"] for m in messages]
+                cursor, pages = body["next_cursor"], pages + 1
+                if cursor is None:
+                    break
+        elapsed = time.perf_counter() - start
+        print(f"Walk ({response_format}): {pages} pages in {elapsed * 1000:.0f} ms; "
+              f"matches the full history: {ids == [m['id'] for m in full['messages']]}")
+
+def check_counts():
+    from sqlalchemy import func, select
+    from database import engine
+    from models.advisory_models import ChatMessage, ChatSession
+
+    with engine.connect() as conn:
+        stored = {
+            session_id: (count, last) for session_id, count, last in conn.execute(
+                select(ChatSession.session_id, ChatSession.message_count, ChatSession.last_message_id)
+            )
+        }
+        counted = {session_id: (0, None) for session_id in stored}
+        counted.update({
+            session_id: (count, last) for session_id, count, last in conn.execute(
+                select(ChatMessage.session_id, func.count(), func.max(ChatMessage.id)).group_by(ChatMessage.session_id)
+            )
+        })
+    print(f"message_count and last_message_id match COUNT(*) and MAX(id) for all {len(stored)} sessions: "
+          f"{stored == counted}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--other-sessions", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    session_id = seed(args.messages, args.other_sessions)
+    asyncio.run(run(session_id, args.limit, args.repeat))
+    check_counts()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+BENCHMARK - CHAT SESSION LIFECYCLE
+One run of session_lifecycle.py over --sessions chat sessions holding
+--messages messages spread evenly over the last --days days (written as
+the chat log writer does), with the size of chat_messages and its indexes
+and the latency of the chat's reads before archiving, after it, and after
+--reclaim (VACUUM / VACUUM FULL):
+
+- recent turns: a session's latest messages (load_conversation)
+- history page: the first page of GET /api/advisory/session/{session_id}
+- count: COUNT(*) over chat_messages, which scans a whole index
+
+Then checks that no message was lost (hot + archived = written, and the
+archived ones decompress to the rows written), that every session's
+message_count equals its messages left in chat_messages, and that a
+second run moves nothing.
+
+Run from the backend folder:
+
+    python benchmarks/bench_session_lifecycle.py [--messages 200000] [--sessions 2000] [--days 90] [--database-url URL]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ANSWER = "Weather advisory: light rain is expected this week. Delay irrigation and spraying until the fields drain. "
+
+def seed(messages: int, sessions: int, days: int):
+    from database import Base, engine
+    from chat_log import write_turns
+    from models import advisory_models, analytics_models  # noqa: F401 (tables)
+    from models.advisory_models import ChatSession
+
+    Base.metadata.create_all(bind=engine)
+    session_ids = [str(uuid.uuid4()) for _ in range(sessions)]
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(ChatSession.__table__.insert(), [
+            {"session_id": session_id, "farmer_id": f"farmer_{i}", "language": "en", "is_active": True,
+             "started_at": now - timedelta(days=days), "last_activity": now - timedelta(days=days)}
+            for i, session_id in enumerate(session_ids)
+        ])
+
+    rng = np.random.default_rng(7)
+    turns = messages // 2
+    owners = rng.integers(0, sessions, turns)
+    step = timedelta(days=days) / turns
+    start = now - timedelta(days=days)
+    batch = []
+    for i, owner in enumerate(owners):
+        at = start + step * i
+        batch.append({
+            "session_id": session_ids[owner], "farmer_id": f"farmer_{owner}", "location": "Nashik", "language": "en",
+            "message": f"Will it rain this week in Nashik? ({i})", "response": ANSWER * (1 + i % 4),
+            "category": "weather", "tokens_used": 180, "response_time_ms": 900,
+            "asked_at": at, "answered_at": at + timedelta(seconds=2), "last_activity": at + timedelta(seconds=2)
+        })
+        if len(batch) == 1000:
+            with engine.begin() as conn:
+                write_turns(conn, batch)
+            batch = []
+    if batch:
+        with engine.begin() as conn:
+            write_turns(conn, batch)
+    return turns * 2
+
+def show(name: str, report: dict):
+    index_bytes = sum((report["index_bytes"] or {}).values()) if report["index_bytes"] else None
+    table = f"{report['table_bytes'] / 2 ** 20:.1f}" if report["table_bytes"] is not None else "n/a"
+    indexes = f"{index_bytes / 2 ** 20:.1f}" if index_bytes is not None else "n/a"
+    print(f"{name:>16} {report['rows']:>10,} {table:>9} {indexes:>11} {report['recent_turns_ms']:>16.3f} "
+          f"{report['history_page_ms']:>16.3f} {report['count_ms']:>10.1f}")
+
+def check(written: int):
+    from sqlalchemy import func, select
+    from database import engine
+    from models.advisory_models import ChatArchive, ChatMessage, ChatSession
+    import session_lifecycle
+
+    with engine.connect() as conn:
+        hot = conn.scalar(select(func.count()).select_from(ChatMessage))
+        # On a fresh database, turn i wrote messages 2i + 1 (question) and 2i + 2 (answer)
+        archived, mismatched = 0, 0
+        for count, payload in conn.execute(select(ChatArchive.message_count, ChatArchive.messages)):
+            archived += count
+            columns = session_lifecycle.decompress(payload)
+            for message_id, content in zip(columns["id"], columns["content"]):
+                turn = (message_id - 1) // 2
+                expected = f"Will it rain this week in Nashik? ({turn})" if message_id % 2 else ANSWER * (1 + turn % 4)
+                mismatched += content != expected
+        compressed = conn.scalar(select(func.sum(func.length(ChatArchive.messages))))
+        stored = {
+            session_id: count or 0 for session_id, count in conn.execute(select(ChatSession.session_id, ChatSession.message_count))
+        }
+        counted = dict.fromkeys(stored, 0)
+        counted.update(conn.execute(select(ChatMessage.session_id, func.count()).group_by(ChatMessage.session_id)).all())
+    print(f"\nhot {hot:,} + archived {archived:,} = {hot + archived:,} of {written:,} written; "
+          f"archived messages differing from those written: {mismatched}; "
+          f"archive {compressed / 2 ** 20:.1f} MB compressed; message_count matches for all {len(stored)} sessions: "
+          f"{stored == counted}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    import session_lifecycle
+
+    start = time.perf_counter()
+    written = seed(args.messages, args.sessions, args.days)
+    print(f"\n{written:,} messages in {args.sessions} sessions over {args.days} days, "
+          f"written in {time.perf_counter() - start:.0f}s; archive after "
+          f"{session_lifecycle.ARCHIVE_AFTER.days} days")
+
+    result = session_lifecycle.run()
+    print(f"Run: {result['expired_sessions']} sessions expired, {result['archived_messages']:,} messages of "
+          f"{result['archived_sessions']} sessions archived in {result['seconds']:.1f}s "
+          f"(including both reports)")
+    start = time.perf_counter()
+    session_lifecycle.reclaim()
+    reclaimed = session_lifecycle.report()
+    print(f"Reclaim: {time.perf_counter() - start:.1f}s")
+
+    print(f"\n{'':>16} {'messages':>10} {'table MB':>9} {'indexes MB':>11} {'recent turns ms':>16} "
+          f"{'history page ms':>16} {'count ms':>10}")
+    show("before", result["before"])
+    show("after", result["after"])
+    show("after reclaim", reclaimed)
+    for name, size in (reclaimed["index_bytes"] or {}).items():
+        before = result["before"]["index_bytes"].get(name)
+        print(f"{name:>40}: {before / 2 ** 20 if before else 0:.1f} -> {size / 2 ** 20:.1f} MB")
+
+    check(written)
+    again = session_lifecycle.run()
+    print(f"Second run: {again['expired_sessions']} expired, {again['archived_messages']} archived")
+
+if __name__ == "__main__":
+    main()
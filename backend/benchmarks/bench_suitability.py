@@ -0,0 +1,175 @@
+"""
+BENCHMARK - CROP SUITABILITY
+Scoring readings against the ideal ranges of crop_database, per crop in a
+Python loop (one query's worth of rows walked feature by feature) and in
+SuitabilityIndex's single broadcast, for the 7 crops of data/crop_data.csv
+and for a catalogue of --crops crops (ranges drawn around random centers):
+
+- score: the suitability of every crop, for 1 reading and batches
+- rank: the top 3 crops with their gaps and reason (the alternatives of
+  a recommendation)
+
+Checks that both give the same scores and the same ranked explanations.
+Then GET /api/crops/database (called in-process, no HTTP) querying the
+table per request, as before, and served from crop_reference's in-memory
+copy.
+
+Run from the backend folder:
+
+    python benchmarks/bench_suitability.py [--crops 200] [--batch 10000] [--database-url URL]
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LOW = np.array([0, 0, 0, 0, 0, 0, 0], dtype=float)
+HIGH = np.array([150, 150, 250, 50, 100, 14, 500], dtype=float)
+
+def catalogue(crops: int, seed: int = 7):
+    from ml.suitability import COLUMNS
+
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(LOW, HIGH, size=(crops, 7))
+    widths = rng.uniform(0.02, 0.15, size=(crops, 7)) * HIGH
+    return [
+        {
+            "crop_name": f"crop_{i:04d}",
+            **{f"{column}_min": float(centers[i, f] - widths[i, f] / 2) for f, column in enumerate(COLUMNS)},
+            **{f"{column}_max": float(centers[i, f] + widths[i, f] / 2) for f, column in enumerate(COLUMNS)},
+        }
+        for i in range(crops)
+    ]
+
+def loop_gaps(crops, row) -> list:
+    """Signed gap of a reading to each crop's range, one crop and feature at a time"""
+    from ml.suitability import COLUMNS
+
+    gaps = []
+    for crop in crops:
+        crop_gaps = []
+        for f, column in enumerate(COLUMNS):
+            low, high = crop[f"{column}_min"], crop[f"{column}_max"]
+            crop_gaps.append(
+                row[f] - low if low is not None and row[f] < low else
+                row[f] - high if high is not None and row[f] > high else 0.0
+            )
+        gaps.append(crop_gaps)
+    return gaps
+
+def loop_score(crop_gaps) -> float:
+    from ml.suitability import SPANS, SUITABILITY_TOLERANCE
+
+    distance = math.sqrt(sum((gap / span) ** 2 for gap, span in zip(crop_gaps, SPANS.tolist())))
+    return max(0.0, 1.0 - distance / SUITABILITY_TOLERANCE)
+
+def loop_scores(crops, X) -> list:
+    return [[loop_score(crop_gaps) for crop_gaps in loop_gaps(crops, row)] for row in X.tolist()]
+
+def loop_rank(crops, X, top_k: int = 3) -> list:
+    """The top_k crops per reading with their gaps and reason, as SuitabilityIndex.rank gives them"""
+    from ml.suitability import COLUMNS, FEATURES, UNITS
+
+    ranked = []
+    for row in X.tolist():
+        gaps = loop_gaps(crops, row)
+        scores = [loop_score(crop_gaps) for crop_gaps in gaps]
+        alternatives = []
+        for j in sorted(range(len(crops)), key=lambda j: -scores[j])[:top_k]:
+            crop, outside, details = crops[j], {}, []
+            for f, column in enumerate(COLUMNS):
+                gap = round(gaps[j][f], 4)
+                if gap:
+                    outside[FEATURES[f]] = gap
+                    low, high = crop[f"{column}_min"], crop[f"{column}_max"]
+                    details.append(f"{FEATURES[f]} {abs(gap):g}{UNITS[f]} {'below' if gap < 0 else 'above'} "
+                                   f"its {'any' if low is None else f'{low:g}'}-{'any' if high is None else f'{high:g}'} range")
+            alternatives.append({
+                "crop": crop["crop_name"], "suitability": round(scores[j], 4), "gaps": outside,
+                "reason": "Within its ideal ranges" if not details else "Outside its ideal ranges: " + "; ".join(details)
+            })
+        ranked.append(alternatives)
+    return ranked
+
+def timed(run, repeat: int):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return np.median(times) * 1000
+
+def scoring(name: str, crops, batch: int):
+    from ml.suitability import SuitabilityIndex
+
+    index = SuitabilityIndex(crops)
+    rng = np.random.default_rng(11)
+    print(f"\n{name}: {len(crops)} crops")
+    print(f"{'':>22} {'loop ms':>10} {'vectorized ms':>14} {'speedup':>8}")
+    for size in (1, 100, batch):
+        X = np.round(rng.uniform(LOW, HIGH, size=(size, 7)), 1)
+        repeat = max(3, min(200, 2000 // size))
+        for case, loop, vectorized in (
+            ("score", lambda: loop_scores(crops, X), lambda: index.score(X)),
+            ("rank + explain", lambda: loop_rank(crops, X), lambda: index.rank(X, 3)),
+        ):
+            loop_ms = timed(loop, max(1, repeat // 10) if size == batch else repeat)
+            vectorized_ms = timed(vectorized, repeat)
+            print(f"{f'{case}, {size:,}':>22} {loop_ms:>10.3f} {vectorized_ms:>14.3f} {loop_ms / vectorized_ms:>7.1f}x")
+    X = np.round(rng.uniform(LOW, HIGH, size=(min(batch, 2000), 7)), 1)
+    print(f"Same scores as the loop: {np.allclose(index.score(X), loop_scores(crops, X))}; "
+          f"same top 3 and explanations: {index.rank(X, 3) == loop_rank(crops, X)}")
+
+async def database(repeat: int):
+    from sqlalchemy import select
+    from database import AsyncSessionLocal
+    from models.crop_models import CropDatabase
+    from routes.crop_routes import get_crop_database
+
+    async def per_request(db):
+        crops = (await db.scalars(select(CropDatabase))).all()
+        return {"crops": crops, "total": len(crops)}
+
+    print(f"\nGET /api/crops/database")
+    for name, route in (("query per request", per_request), ("in memory", lambda db: get_crop_database(db=db))):
+        times = []
+        for _ in range(repeat):
+            async with AsyncSessionLocal() as db:
+                start = time.perf_counter()
+                await route(db)
+                times.append(time.perf_counter() - start)
+        print(f"{name:>22} {np.median(times) * 1000:>10.3f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--crops", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    from database import Base, engine
+    from models import crop_models  # noqa: F401 (tables)
+    import crop_reference
+
+    Base.metadata.create_all(bind=engine)
+    crop_reference.seed(os.path.join(BACKEND_DIR, "data", "crop_data.csv"))
+    seeded = crop_reference.ranges_from_training_data(os.path.join(BACKEND_DIR, "data", "crop_data.csv"))
+
+    scoring("crop_data.csv", seeded, args.batch)
+    scoring("catalogue", catalogue(args.crops), args.batch)
+    asyncio.run(database(args.repeat))
+
+if __name__ == "__main__":
+    main()
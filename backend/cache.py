@@ -0,0 +1,160 @@
+"""
+RESULT CACHE
+TTL + LRU caches for expensive, repeatable API results
+
+Two interchangeable backends:
+- LocalCache: in-process OrderedDict, one per worker (default, and the
+  stand-in used in development and benchmarks)
+- RedisCache: shared between uvicorn workers, so a forecast computed by
+  one worker is served by all of them
+
+    cache = make_cache("forecasts", maxsize=1024, ttl=3600, url=os.getenv("FORECAST_CACHE_URL"))
+    cache.set(key, value)
+    cache.get(key)  # None on a miss
+
+Invalidation uses per-namespace generation counters rather than deleting
+keys: callers put generation(name) into their keys, and bump(name) makes
+every older key unreachable. Stale entries then age out through TTL/LRU.
+This works the same way locally and in Redis, and across workers.
+
+Redis is optional (pip install redis). Configure it with
+maxmemory-policy volatile-lru so entries, which all carry a TTL, are
+evicted least-recently-used while generation counters are kept.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+class LocalCache:
+    """Thread-safe in-process cache with a per-entry TTL and LRU eviction"""
+
+    backend = "local"
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 3600):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def generation(self, name: str) -> int:
+        return self._generations.get(name, 0)
+
+    def bump(self, name: str) -> int:
+        """Invalidate every key built with the current generation of name"""
+        with self._lock:
+            self._generations[name] = self._generations.get(name, 0) + 1
+            return self._generations[name]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl
+        }
+
+class RedisCache:
+    """
+    Cache shared between workers, stored in Redis
+
+    Values must be JSON-serializable. Hit/miss counters are per worker;
+    eviction is left to Redis (see module docstring).
+    """
+
+    backend = "redis"
+
+    def __init__(self, name: str, url: str, maxsize: int = 1024, ttl: float = 3600):
+        import redis
+
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.client = redis.Redis.from_url(url)
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, key: Hashable) -> str:
+        return f"{self.name}:{json.dumps(key, default=str)}"
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        raw = self.client.get(self._key(key))
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key: Hashable, value: Any):
+        self.client.set(self._key(key), json.dumps(value), ex=max(1, int(self.ttl)))
+
+    def generation(self, name: str) -> int:
+        return int(self.client.get(f"{self.name}:generation:{name}") or 0)
+
+    def bump(self, name: str) -> int:
+        return int(self.client.incr(f"{self.name}:generation:{name}"))
+
+    def clear(self):
+        keys = list(self.client.scan_iter(f"{self.name}:*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl
+        }
+
+def make_cache(name: str, maxsize: int = 1024, ttl: float = 3600, url: Optional[str] = None):
+    """RedisCache if a redis:// URL is given, otherwise a LocalCache"""
+    if url:
+        return RedisCache(name, url, maxsize=maxsize, ttl=ttl)
+    return LocalCache(name, maxsize=maxsize, ttl=ttl)
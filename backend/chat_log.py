@@ -0,0 +1,408 @@
+"""
+CHAT LOG WRITER
+Write-behind storage of advisory chat turns
+
+A chat turn stores the question and the answer (two ChatMessage rows), a
+FarmerQuery row for analytics and the session's last_activity. Committed
+inside the request, every turn waits for its own commit, and on SQLite
+every commit takes the database-wide write lock, so concurrent chats are
+serialized on it. ChatLogWriter queues the turns instead and one
+background task writes them, a batch per transaction: as soon as
+CHAT_LOG_BATCH turns are queued, or CHAT_LOG_FLUSH_MS after the first.
+
+- backpressure: at most CHAT_LOG_QUEUE_SIZE turns wait to be written;
+  further chats wait for room, at the pace the database takes them
+- spool: each turn is appended to a local file in CHAT_LOG_SPOOL_DIR
+  before it is queued, and checked off once its batch is committed. At
+  startup, turns left in the spool by a worker that died are written.
+  A crash between a commit and its checkpoint writes that batch again:
+  turns are stored at least once, never lost
+- shutdown: the queue is flushed before the app stops (turns that
+  cannot be written within CLOSE_TIMEOUT stay in the spool)
+
+A failed batch is retried with backoff. Turns show up in
+GET /api/advisory/session/{session_id} once written; the worker's
+conversation cache has them right away, so the next turn does not wait.
+
+    CHAT_LOG_FLUSH_MS=50           # 0 writes each turn inside its request
+    CHAT_LOG_BATCH=500
+    CHAT_LOG_QUEUE_SIZE=10000
+    CHAT_LOG_SPOOL_DIR=./chat_spool
+
+The spool is locked by the worker writing it (fcntl, not on Windows,
+where only one worker may use a spool directory).
+"""
+
+import asyncio
+import glob
+import json
+import os
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import DateTime, Integer, bindparam, case, func, insert, or_, update
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from analytics import record_queries
+from database import async_engine
+from models.advisory_models import ChatMessage, ChatSession, FarmerQuery
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+FLUSH_INTERVAL = float(os.getenv("CHAT_LOG_FLUSH_MS", "50")) / 1000
+BATCH_SIZE = int(os.getenv("CHAT_LOG_BATCH", "500"))
+QUEUE_SIZE = int(os.getenv("CHAT_LOG_QUEUE_SIZE", "10000"))
+SPOOL_DIR = os.getenv("CHAT_LOG_SPOOL_DIR", "./chat_spool")
+
+# Seconds to flush the queue at shutdown
+CLOSE_TIMEOUT = 10.0
+# A spool that is never fully checked off (sustained load) is rewritten with
+# only its pending turns once it is this large
+SPOOL_REWRITE_BYTES = 16 * 1024 * 1024
+MAX_RETRY_DELAY = 30.0
+
+TIMESTAMPS = ("asked_at", "answered_at", "last_activity")
+
+def chat_turn(session: ChatSession, message: str, language: str, ai_response: dict) -> dict:
+    """A chat turn as queued and spooled"""
+    asked_at = datetime.utcnow()
+    return {
+        "session_id": session.session_id,
+        "farmer_id": session.farmer_id,
+        "location": session.farmer_location,
+        "language": language,
+        "message": message,
+        "response": ai_response["response"],
+        "category": ai_response.get("category", "general"),
+        "tokens_used": ai_response.get("tokens_used", 0),
+        "response_time_ms": ai_response.get("response_time_ms", 0),
+        "asked_at": asked_at,
+        "answered_at": datetime.utcnow(),
+        "last_activity": datetime.utcnow()
+    }
+
+def write_turns(connection, turns: List[dict]):
+    """
+    Insert the messages and query log rows of chat turns and update their
+    sessions: last_activity, message_count, last_message_id and is_active
+    """
+    messages = []
+    for turn in turns:
+        messages.append({
+            "session_id": turn["session_id"], "role": "user", "content": turn["message"],
+            "original_language": turn["language"], "timestamp": turn["asked_at"]
+        })
+        messages.append({
+            "session_id": turn["session_id"], "role": "assistant", "content": turn["response"],
+            "original_language": turn["language"], "tokens_used": turn["tokens_used"],
+            "response_time_ms": turn["response_time_ms"], "timestamp": turn["answered_at"]
+        })
+    table = ChatMessage.__table__
+    ids = connection.execute(
+        insert(table).returning(table.c.id, sort_by_parameter_order=True), messages
+    ).scalars().all()
+
+    queries = [
+        {"farmer_id": turn["farmer_id"], "query_text": turn["message"], "query_category": turn["category"],
+         "language": turn["language"], "response_generated": True, "location": turn["location"],
+         "created_at": turn["asked_at"]}
+        for turn in turns
+    ]
+    connection.execute(insert(FarmerQuery.__table__), queries)
+    record_queries(connection, queries)
+
+    # Per session: latest turn, messages added and the last of their ids
+    changes = {}
+    for i, turn in enumerate(turns):
+        change = changes.setdefault(turn["session_id"], {
+            "b_session_id": turn["session_id"], "b_last_activity": turn["last_activity"],
+            "b_messages": 0, "b_last_message_id": ids[2 * i + 1]
+        })
+        change["b_last_activity"] = max(change["b_last_activity"], turn["last_activity"])
+        change["b_messages"] += 2
+        change["b_last_message_id"] = max(change["b_last_message_id"], ids[2 * i + 1])
+    sessions = ChatSession.__table__
+    last_activity = bindparam("b_last_activity", type_=DateTime)
+    last_message_id = bindparam("b_last_message_id", type_=Integer)
+    connection.execute(
+        update(sessions)
+        .where(sessions.c.session_id == bindparam("b_session_id"))
+        .values(
+            message_count=func.coalesce(sessions.c.message_count, 0) + bindparam("b_messages", type_=Integer),
+            # Sessions expired while idle (session_lifecycle.py) are active again
+            is_active=True,
+            # Never moved back past a turn another worker wrote later
+            last_activity=case(
+                (or_(sessions.c.last_activity.is_(None), sessions.c.last_activity < last_activity), last_activity),
+                else_=sessions.c.last_activity
+            ),
+            last_message_id=case(
+                (or_(sessions.c.last_message_id.is_(None), sessions.c.last_message_id < last_message_id), last_message_id),
+                else_=sessions.c.last_message_id
+            )
+        ),
+        list(changes.values())
+    )
+
+def _encode(entry: dict) -> str:
+    return json.dumps(
+        {key: value.isoformat() if key in TIMESTAMPS else value for key, value in entry.items()},
+        ensure_ascii=False
+    )
+
+def _decode(line: str) -> dict:
+    entry = json.loads(line)
+    for key in TIMESTAMPS:
+        if key in entry:
+            entry[key] = datetime.fromisoformat(entry[key])
+    return entry
+
+def _lock(file, blocking: bool = True) -> bool:
+    """Exclusive lock on an open spool file (always granted without fcntl)"""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        return True
+    except BlockingIOError:
+        return False
+
+class Spool:
+    """Append-only file of a worker's queued turns ({"seq": n, ...}) and checkpoints ({"flushed": n})"""
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{uuid.uuid4().hex}.spool")
+        self.file = self._open()
+
+    def _open(self):
+        file = open(self.path, "a", encoding="utf-8")
+        _lock(file)
+        return file
+
+    def append(self, entry: dict):
+        # Flushed to the OS, so it survives the worker process (not a power cut)
+        self.file.write(_encode(entry) + "\n")
+        self.file.flush()
+
+    def checkpoint(self, seq: int, pending: Iterable[dict]):
+        """Check off the turns up to seq; the file restarts empty when nothing is pending"""
+        pending = list(pending)
+        if not pending:
+            self.file.seek(0)
+            self.file.truncate()
+        elif self.file.tell() > SPOOL_REWRITE_BYTES:
+            temporary = f"{self.path}.tmp"
+            with open(temporary, "w", encoding="utf-8") as file:
+                file.writelines(_encode(entry) + "\n" for entry in pending)
+            self.file.close()
+            os.replace(temporary, self.path)
+            self.file = self._open()
+        else:
+            self.append({"flushed": seq})
+
+    def close(self, remove: bool):
+        self.file.close()
+        if remove:
+            os.remove(self.path)
+
+def orphaned_spools(directory: str) -> Iterator[Tuple[str, List[dict]]]:
+    """
+    Path and unwritten turns of each spool no running worker holds; the
+    spool stays locked until the caller moves on, so only one worker
+    recovers it (a line cut short by a crash is skipped)
+    """
+    for path in sorted(glob.glob(os.path.join(directory, "*.spool"))):
+        with open(path, "r", encoding="utf-8") as file:
+            # Held by a running worker, or recovered by another one meanwhile
+            if not _lock(file, blocking=False) or not os.path.exists(path):
+                continue
+            turns, flushed = [], 0
+            for line in file:
+                try:
+                    entry = _decode(line)
+                except ValueError:
+                    continue
+                if "flushed" in entry:
+                    flushed = max(flushed, entry["flushed"])
+                else:
+                    turns.append(entry)
+            yield path, [turn for turn in turns if turn["seq"] > flushed]
+
+class ChatLogWriter:
+    """Bounded queue of chat turns, written in batches by a background task"""
+
+    def __init__(
+        self,
+        flush_interval: float = FLUSH_INTERVAL,
+        batch_size: int = BATCH_SIZE,
+        queue_size: int = QUEUE_SIZE,
+        spool_dir: str = SPOOL_DIR
+    ):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.spool_dir = spool_dir
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._spool: Optional[Spool] = None
+        # Its own connection: requests waiting for room in the queue may hold every pooled one
+        self._connection: Optional[AsyncConnection] = None
+        self._seq = 0
+        # Queued turns by seq, and the latest queued last_activity per session
+        self._pending: "OrderedDict[int, dict]" = OrderedDict()
+        self._activity: Dict[str, datetime] = {}
+        self.queued = 0
+        self.written = 0
+        self.batches = 0
+        self.waited = 0
+        self.failures = 0
+        self.recovered = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self):
+        """Write the turns left in orphaned spools, then start the background writer (unless disabled)"""
+        for path, turns in orphaned_spools(self.spool_dir):
+            if turns:
+                async with async_engine.begin() as connection:
+                    await connection.run_sync(write_turns, turns)
+                print(f"Chat log: {len(turns)} unwritten turns recovered from {path}")
+                self.recovered += len(turns)
+            os.remove(path)
+        if self.flush_interval <= 0 or self.running:
+            return
+        self._spool = Spool(self.spool_dir)
+        self._queue = asyncio.Queue(self.queue_size)
+        self._task = asyncio.create_task(self._run())
+
+    async def submit(self, turn: dict, db: Optional[AsyncSession] = None):
+        """
+        Queue a turn (waits while the queue is full). When the writer is not
+        running it is written and committed right away, with the request's
+        session if given (so a request does not take a second connection)
+        """
+        if not self.running:
+            if db is not None:
+                await db.run_sync(lambda session: write_turns(session.connection(), [turn]))
+                await db.commit()
+            else:
+                async with async_engine.begin() as connection:
+                    await connection.run_sync(write_turns, [turn])
+            self.written += 1
+            return
+        self._seq += 1
+        turn = {"seq": self._seq, **turn}
+        if self._queue.full():
+            self.waited += 1
+        await self._queue.put(turn)
+        # No await between the put and the spool write: the batch cannot be checked off in between
+        self._spool.append(turn)
+        self._pending[turn["seq"]] = turn
+        session_id = turn["session_id"]
+        self._activity[session_id] = max(self._activity.get(session_id, turn["last_activity"]), turn["last_activity"])
+        self.queued += 1
+
+    def last_activity(self, session_id: str) -> Optional[datetime]:
+        """last_activity of the session's latest turn still in the queue (None when all are written)"""
+        return self._activity.get(session_id)
+
+    def pending_turns(self, session_id: str) -> List[dict]:
+        """The session's turns still in the queue, oldest first"""
+        if session_id not in self._activity:
+            return []
+        return [turn for turn in self._pending.values() if turn["session_id"] == session_id]
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        closing = False
+        while not closing:
+            turn = await self._queue.get()
+            if turn is None:
+                break
+            batch = [turn]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    turn = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        turn = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if turn is None:
+                    closing = True
+                    break
+                batch.append(turn)
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[dict]):
+        delay = self.flush_interval or 0.1
+        while True:
+            try:
+                if self._connection is None:
+                    self._connection = await async_engine.connect()
+                async with self._connection.begin():
+                    await self._connection.run_sync(write_turns, batch)
+                break
+            except Exception as e:
+                # Retried on a new connection, in case this one is broken
+                connection, self._connection = self._connection, None
+                if connection is not None:
+                    await connection.invalidate()
+                self.failures += 1
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+                print(f"Chat log: writing {len(batch)} turns failed, retrying in {delay:.1f}s: {e}")
+                await asyncio.sleep(delay)
+        for turn in batch:
+            del self._pending[turn["seq"]]
+            session_id = turn["session_id"]
+            if self._activity.get(session_id) == turn["last_activity"]:
+                del self._activity[session_id]
+        self._spool.checkpoint(batch[-1]["seq"], self._pending.values())
+        self.written += len(batch)
+        self.batches += 1
+
+    async def close(self):
+        """Flush the queue and stop; turns not written within CLOSE_TIMEOUT stay in the spool"""
+        if not self.running:
+            return
+        task, self._task = self._task, None
+        await self._queue.put(None)
+        try:
+            await asyncio.wait_for(task, CLOSE_TIMEOUT)
+        except asyncio.TimeoutError:
+            print(f"Chat log: {len(self._pending)} turns left unwritten in {self._spool.path}")
+        self._spool.close(remove=not self._pending)
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    def stats(self) -> dict:
+        return {
+            "backend": "write-behind" if self.running else "direct",
+            "queued": self.queued,
+            "written": self.written,
+            "batches": self.batches,
+            "turns_per_batch": round(self.written / self.batches, 1) if self.batches else 0.0,
+            "pending": len(self._pending),
+            "waited_for_room": self.waited,
+            "failures": self.failures,
+            "recovered": self.recovered,
+            "queue_size": self.queue_size,
+            "batch_size": self.batch_size,
+            "flush_interval_ms": self.flush_interval * 1000
+        }
+
+# One writer per worker, started and flushed by the app's lifespan
+chat_log = ChatLogWriter()
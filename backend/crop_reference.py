@@ -0,0 +1,172 @@
+"""
+CROP REFERENCE DATA
+crop_database held in memory, with the SuitabilityIndex of its ranges
+
+The table only changes when the reference data is edited, yet
+GET /api/crops/database and every crop recommendation read it. Each
+worker loads it once and serves it from memory:
+
+- commits that insert, update or delete CropDatabase rows through the ORM
+  (objects or ORM-enabled insert/update/delete statements) drop the loaded
+  copy; Core writes call invalidate() themselves
+- CROP_REFERENCE_TTL: seconds a loaded copy is trusted, which bounds how
+  long a worker serves rows another worker or a script changed
+- the next read reloads the table and rebuilds the index
+
+Seed the table from the per-crop ranges of the training data (crops
+already present are left as they are):
+
+    python crop_reference.py --seed [data/crop_data.csv]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from itertools import chain
+from typing import Dict, List
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from models.crop_models import CropDatabase
+
+REFERENCE_TTL = float(os.getenv("CROP_REFERENCE_TTL", "300"))
+
+# crop_type of the crops in data/crop_data.csv
+CROP_TYPES = {
+    "Rice": "cereal", "Wheat": "cereal", "Maize": "cereal",
+    "Cotton": "cash", "Sugarcane": "cash",
+    "Potato": "vegetable", "Tomato": "vegetable",
+}
+
+class CropReference:
+    """crop_database rows (sorted by crop_name) and their SuitabilityIndex, loaded on demand"""
+
+    def __init__(self, ttl: float = REFERENCE_TTL):
+        self.ttl = ttl
+        self._crops: List[Dict] = None
+        self._index = None
+        self._loaded_at = 0.0
+        self._loaded_generation = -1
+        self._generation = 0
+        self._lock = asyncio.Lock()
+        self.loads = 0
+        self.hits = 0
+        self.invalidations = 0
+
+    def invalidate(self):
+        """Reload the table on the next read"""
+        self._generation += 1
+        self.invalidations += 1
+
+    def _fresh(self) -> bool:
+        return (
+            self._crops is not None
+            and self._loaded_generation == self._generation
+            and time.monotonic() - self._loaded_at < self.ttl
+        )
+
+    async def _ensure(self, db):
+        if self._fresh():
+            self.hits += 1
+            return
+        async with self._lock:
+            # Another request may have reloaded it while this one waited
+            if self._fresh():
+                self.hits += 1
+                return
+            # An invalidation during the load leaves the copy stale
+            generation, loaded_at = self._generation, time.monotonic()
+            result = await db.execute(select(CropDatabase.__table__).order_by(CropDatabase.crop_name))
+            crops = [dict(row) for row in result.mappings()]
+            # Imported here so app startup (routes import this module) stays fast
+            from ml.suitability import SuitabilityIndex
+            self._crops, self._index = crops, SuitabilityIndex(crops)
+            self._loaded_generation, self._loaded_at = generation, loaded_at
+            self.loads += 1
+
+    async def crops(self, db) -> List[Dict]:
+        """Every crop_database row, as dicts of its columns"""
+        await self._ensure(db)
+        return self._crops
+
+    async def index(self, db) -> "SuitabilityIndex":
+        """SuitabilityIndex over the ideal ranges of every crop"""
+        await self._ensure(db)
+        return self._index
+
+    def stats(self) -> Dict:
+        return {
+            "backend": "local",
+            "crops": len(self._crops) if self._crops is not None else None,
+            "index_version": self._index.version if self._index is not None else None,
+            "fresh": self._fresh(),
+            "loads": self.loads,
+            "hits": self.hits,
+            "invalidations": self.invalidations,
+            "ttl_seconds": self.ttl,
+        }
+
+crop_reference = CropReference()
+
+@event.listens_for(Session, "after_flush")
+def _note_changed_crops(session, flush_context):
+    if any(isinstance(obj, CropDatabase) for obj in chain(session.new, session.dirty, session.deleted)):
+        session.info["crop_reference_changed"] = True
+
+@event.listens_for(Session, "do_orm_execute")
+def _note_crop_statements(orm_execute_state):
+    if (
+        (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete)
+        and orm_execute_state.bind_mapper is CropDatabase.__mapper__
+    ):
+        orm_execute_state.session.info["crop_reference_changed"] = True
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_crops(session):
+    if session.info.pop("crop_reference_changed", False):
+        crop_reference.invalidate()
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_crops(session):
+    session.info.pop("crop_reference_changed", None)
+
+def ranges_from_training_data(path: str) -> List[Dict]:
+    """crop_database rows with each crop's min/max of every feature in a training CSV"""
+    from ml.datasets import read_csv
+    from ml.suitability import COLUMNS, FEATURES
+
+    df = read_csv(path)
+    ranges = df.groupby("label")[FEATURES].agg(["min", "max"])
+    return [
+        {
+            "crop_name": crop,
+            "crop_type": CROP_TYPES.get(crop),
+            **{
+                f"{column}_{bound}": float(ranges.loc[crop, (feature, bound)])
+                for feature, column in zip(FEATURES, COLUMNS) for bound in ("min", "max")
+            }
+        }
+        for crop in ranges.index
+    ]
+
+def seed(path: str) -> List[str]:
+    """Insert the training data's ranges of the crops not in crop_database yet; returns their names"""
+    from database import SessionLocal
+
+    rows = ranges_from_training_data(path)
+    with SessionLocal() as session:
+        present = set(session.scalars(select(CropDatabase.crop_name)))
+        added = [row for row in rows if row["crop_name"] not in present]
+        session.add_all(CropDatabase(**row) for row in added)
+        session.commit()
+    return [row["crop_name"] for row in added]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed crop_database with the per-crop ranges of the training data")
+    parser.add_argument("--seed", nargs="?", const="data/crop_data.csv", metavar="CSV", required=True)
+    args = parser.parse_args()
+
+    added = seed(args.seed)
+    print(f"Added {len(added)} crops: {', '.join(added) or 'none'}")
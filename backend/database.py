@@ -7,9 +7,15 @@ For production, use PostgreSQL:
 
 For development/demo, use SQLite:
     DATABASE_URL=sqlite:///./agritech.db
+
+API routes use the async engine (asyncpg / aiosqlite), so a slow query
+only suspends its own request instead of blocking the event loop. The
+sync engine is kept for create_all, Alembic, the ingestion CLI and other
+scripts that run outside the event loop.
 """
 
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -17,22 +23,41 @@ import os
 # Database URL - change this for production
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./agritech.db")
 
+def async_database_url(url: str) -> str:
+    """The same database with an asyncio driver (asyncpg for PostgreSQL, aiosqlite for SQLite)"""
+    scheme, _, rest = url.partition("://")
+    if scheme.startswith("postgresql"):
+        return f"postgresql+asyncpg://{rest}"
+    if scheme.startswith("sqlite"):
+        return f"sqlite+aiosqlite://{rest}"
+    return url
+
 # Create engine
 engine = create_engine(
     DATABASE_URL,
     connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
 )
+async_engine = create_async_engine(async_database_url(DATABASE_URL))
 
 # Create session
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Objects stay usable after commit; reloading expired attributes would need an await
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 # Base class for models
 Base = declarative_base()
 
+def dialect_insert(dialect_name: str, table):
+    """INSERT supporting ON CONFLICT (upserts) for SQLite and PostgreSQL"""
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Upserts are not supported on {dialect_name}")
+    return insert(table)
+
 # Dependency for database sessions
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -0,0 +1,300 @@
+"""
+PRICE DATA INGESTION
+Streaming loader for mandi price files into commodity_prices
+
+Reads CSV (AGMARKNET exports, data/price_data.csv) or Parquet files in
+fixed-size chunks, so memory stays bounded however large the file is.
+Each chunk is validated and coerced, de-duplicated on
+(commodity, market, date) and bulk-upserted: a price that is loaded
+again replaces the stored one instead of adding a second row.
+
+Command line (from the backend folder):
+
+    python ingestion.py data/price_data.csv [more files...] [--chunksize 50000]
+
+Over HTTP: POST /api/prices/ingest with the file as multipart upload,
+then poll GET /api/prices/ingest/{job_id} for progress.
+
+Parquet needs pyarrow (pip install pyarrow).
+"""
+
+import argparse
+import os
+import threading
+import time
+import uuid
+from typing import IO, Callable, Dict, Iterator, Optional, Set, Union
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import and_, delete, func, inspect, select
+from database import SessionLocal, dialect_insert
+from models.price_models import Commodity, CommodityPrice, PendingTrendMonth
+from trends import mark_months, months_in
+from ml.datasets import iter_csv_chunks
+
+DEFAULT_CHUNKSIZE = 50_000
+
+# AGMARKNET / data.gov.in column names -> CommodityPrice columns
+COLUMN_ALIASES = {
+    "commodity": "commodity_name",
+    "arrival_date": "date",
+    "price_date": "date",
+    "min_x0020_price": "min_price",
+    "max_x0020_price": "max_price",
+    "modal_x0020_price": "modal_price",
+    "arrivals": "arrival_quantity",
+    "arrivals_tonnes": "arrival_quantity"
+}
+
+KEY_COLUMNS = ["commodity_name", "market", "date"]
+TEXT_COLUMNS = ["commodity_name", "market", "state", "district"]
+NUMERIC_COLUMNS = ["price", "arrival_quantity", "min_price", "max_price", "modal_price"]
+VALUE_COLUMNS = ["price", "state", "district", "arrival_quantity", "min_price", "max_price", "modal_price"]
+
+class IngestionError(Exception):
+    """Raised when a file cannot be ingested at all (e.g. a required column is missing)"""
+
+class IngestionReport:
+    """Progress and throughput of one ingestion run"""
+
+    def __init__(self, source: str):
+        self.job_id = uuid.uuid4().hex
+        self.source = source
+        self.state = "running"
+        self.error: Optional[str] = None
+        self.chunks = 0
+        self.rows_read = 0
+        self.rows_rejected = 0
+        self.duplicates = 0
+        self.rows_written = 0
+        self.commodities: Set[str] = set()
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    @property
+    def elapsed_seconds(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def to_dict(self) -> Dict:
+        elapsed = self.elapsed_seconds
+        return {
+            "job_id": self.job_id,
+            "source": self.source,
+            "state": self.state,
+            "chunks": self.chunks,
+            "rows_read": self.rows_read,
+            "rows_rejected": self.rows_rejected,
+            "duplicates": self.duplicates,
+            "rows_written": self.rows_written,
+            "commodities": sorted(self.commodities),
+            "elapsed_seconds": round(elapsed, 2),
+            "rows_per_second": round(self.rows_read / elapsed) if elapsed > 0 else 0,
+            **({"error": self.error} if self.error else {})
+        }
+
+# Reports of runs started through the API, by job id
+ingestion_jobs: Dict[str, IngestionReport] = {}
+
+def iter_chunks(source: Union[str, IO[str]], chunksize: int = DEFAULT_CHUNKSIZE) -> Iterator[pd.DataFrame]:
+    """Raw DataFrames of at most chunksize rows from a CSV or Parquet file"""
+    if isinstance(source, str) and source.lower().endswith((".parquet", ".pq")):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from iter_csv_chunks(source, chunksize, dtype=str, keep_default_na=False)
+
+def _parse_dates(values: pd.Series) -> pd.Series:
+    """ISO dates, falling back to day-first (AGMARKNET uses dd/mm/yyyy)"""
+    parsed = pd.to_datetime(values, format="ISO8601", errors="coerce")
+    missing = parsed.isna() & values.notna()
+    if missing.any():
+        parsed[missing] = pd.to_datetime(values[missing], dayfirst=True, format="mixed", errors="coerce")
+    return parsed
+
+def clean_chunk(df: pd.DataFrame) -> tuple:
+    """
+    Validate and coerce one chunk
+
+    Returns (clean rows, rejected count, duplicate count). Rows without a
+    commodity, market, parseable date or positive price are rejected; the
+    last of several rows for the same (commodity, market, date) wins.
+    """
+    df = df.rename(columns=lambda c: str(c).strip().lower().replace(" ", "_"))
+    df = df.rename(columns=COLUMN_ALIASES)
+    if "price" not in df.columns and "modal_price" in df.columns:
+        df["price"] = df["modal_price"]
+    missing = [c for c in KEY_COLUMNS + ["price"] if c not in df.columns]
+    if missing:
+        raise IngestionError(f"Missing required columns: {', '.join(missing)}")
+
+    out = pd.DataFrame(index=df.index)
+    for column in TEXT_COLUMNS:
+        if column in df.columns:
+            text = df[column].astype("string").str.strip()
+            out[column] = text.mask(text == "")
+        else:
+            out[column] = None
+    for column in NUMERIC_COLUMNS:
+        out[column] = pd.to_numeric(df[column], errors="coerce") if column in df.columns else np.nan
+    out["date"] = _parse_dates(df["date"].astype("string").str.strip()).dt.date
+
+    valid = out["commodity_name"].notna() & out["market"].notna() & out["date"].notna() & (out["price"] > 0)
+    out = out[valid]
+    deduped = out.drop_duplicates(KEY_COLUMNS, keep="last")
+
+    # None instead of NaN/NA, so the database gets NULLs
+    deduped = deduped.astype(object).where(deduped.notna(), None)
+    return deduped, int((~valid).sum()), len(out) - len(deduped)
+
+def _upsert_statement(dialect_name: str):
+    stmt = dialect_insert(dialect_name, CommodityPrice.__table__)
+    return stmt.on_conflict_do_update(
+        index_elements=KEY_COLUMNS,
+        set_={column: stmt.excluded[column] for column in VALUE_COLUMNS}
+    )
+
+def remove_duplicate_prices(connection) -> int:
+    """
+    Delete all but the latest (highest id) row of each (commodity, market,
+    date), as stored before the upsert existed, and queue their trend
+    months for the next refresh; returns the rows deleted
+    """
+    table = CommodityPrice.__table__
+    keyed = and_(*(table.c[column].isnot(None) for column in KEY_COLUMNS))
+    latest = select(func.max(table.c.id)).where(keyed).group_by(*(table.c[column] for column in KEY_COLUMNS))
+    duplicate = and_(keyed, table.c.id.not_in(latest))
+    months = connection.execute(select(table.c.commodity_name, table.c.date).where(duplicate).distinct()).all()
+    if not months:
+        return 0
+    deleted = connection.execute(delete(table).where(duplicate)).rowcount
+    mark_months(connection, months_in([name for name, _ in months], [day for _, day in months]))
+    return deleted
+
+def ensure_schema(bind):
+    """
+    Create the (commodity, market, date) unique index, the commodity list
+    and the pending trend months on databases created without them (by
+    create_all before they existed, rather than by the Alembic migrations).
+    Duplicate prices are deleted before the index is created.
+    """
+    Commodity.__table__.create(bind, checkfirst=True)
+    PendingTrendMonth.__table__.create(bind, checkfirst=True)
+    existing = {index["name"] for index in inspect(bind).get_indexes(CommodityPrice.__tablename__)}
+    for index in CommodityPrice.__table__.indexes:
+        if index.unique and index.name not in existing:
+            with bind.begin() as connection:
+                removed = remove_duplicate_prices(connection)
+                index.create(connection)
+            if removed:
+                print(f"Removed {removed} duplicate prices to create {index.name}")
+
+def ingest(
+    source: Union[str, IO[str]],
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    session_factory: Callable = SessionLocal,
+    report: Optional[IngestionReport] = None,
+    on_progress: Optional[Callable[[IngestionReport], None]] = None
+) -> IngestionReport:
+    """
+    Stream a price file into commodity_prices
+
+    Each chunk is committed on its own, so an interrupted run keeps the
+    chunks already loaded and can simply be repeated. The commodity list is
+    updated with each chunk; cached forecasts for every commodity that
+    received prices are invalidated at the end.
+    """
+    # Imported here: the route module registers models and caches, which the
+    # command line does not otherwise need
+    from routes.price_routes import invalidate_forecasts, record_commodities
+
+    report = report or IngestionReport(source if isinstance(source, str) else getattr(source, "name", "upload"))
+    db = session_factory()
+    try:
+        ensure_schema(db.get_bind())
+        upsert = _upsert_statement(db.get_bind().dialect.name)
+
+        for chunk in iter_chunks(source, chunksize):
+            rows, rejected, duplicates = clean_chunk(chunk)
+            report.chunks += 1
+            report.rows_read += len(chunk)
+            report.rows_rejected += rejected
+            report.duplicates += duplicates
+            if len(rows):
+                # zip over column lists is several times faster than DataFrame.to_dict("records")
+                columns = list(rows.columns)
+                records = [dict(zip(columns, values)) for values in zip(*(rows[c].tolist() for c in columns))]
+                db.execute(upsert, records)
+                date_ranges = rows.groupby("commodity_name")["date"].agg(["min", "max"])
+                record_commodities(db.connection(), {
+                    name: (first, last) for name, first, last in date_ranges.itertuples()
+                })
+                mark_months(db.connection(), months_in(rows["commodity_name"], rows["date"]))
+                db.commit()
+                report.rows_written += len(records)
+                report.commodities.update(rows["commodity_name"].unique())
+            if on_progress:
+                on_progress(report)
+        report.state = "completed"
+    except Exception as e:
+        db.rollback()
+        report.state = "failed"
+        report.error = str(e)
+        raise
+    finally:
+        db.close()
+        report.finished = time.perf_counter()
+        for commodity in report.commodities:
+            invalidate_forecasts(commodity)
+    return report
+
+def start_ingestion_job(
+    path: str,
+    source_name: Optional[str] = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    delete_after: bool = False
+) -> IngestionReport:
+    """
+    Ingest a file in a background thread; progress is in ingestion_jobs
+
+    delete_after removes the file once it has been loaded (used for
+    uploads, which are spooled to a temporary file first).
+    """
+    report = IngestionReport(source_name or path)
+    ingestion_jobs[report.job_id] = report
+
+    def run():
+        try:
+            ingest(path, chunksize=chunksize, report=report)
+        except Exception as e:
+            print(f"Ingestion of {report.source} failed: {e}")
+        finally:
+            if delete_after:
+                os.remove(path)
+
+    threading.Thread(target=run, name=f"ingest-{report.job_id[:8]}", daemon=True).start()
+    return report
+
+def _print_progress(report: IngestionReport):
+    stats = report.to_dict()
+    print(f"  chunk {stats['chunks']}: {stats['rows_read']:,} rows read, "
+          f"{stats['rows_written']:,} written, {stats['rows_rejected']:,} rejected, "
+          f"{stats['rows_per_second']:,} rows/s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load mandi price files into commodity_prices")
+    parser.add_argument("files", nargs="+", help="CSV or Parquet files")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args()
+
+    from database import Base, engine
+    Base.metadata.create_all(bind=engine, tables=[CommodityPrice.__table__])
+
+    for path in args.files:
+        print(f"Ingesting {path}")
+        result = ingest(path, chunksize=args.chunksize, on_progress=_print_progress).to_dict()
+        print(f"Done: {result['rows_written']:,} rows written, {result['rows_rejected']:,} rejected, "
+              f"{result['duplicates']:,} duplicates in {result['elapsed_seconds']}s "
+              f"({result['rows_per_second']:,} rows/s)")
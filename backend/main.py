@@ -19,26 +19,58 @@ ARCHITECTURE:
 - CORS enabled for frontend integration
 """
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from typing import List, Optional
-import uvicorn
 
-from database import get_db, engine, Base
-from models import crop_models, price_models, advisory_models
+from database import get_db, engine, async_engine, Base
+from models import crop_models, price_models, advisory_models, analytics_models
 from routes import crop_routes, price_routes, advisory_routes, government_routes
+from model_registry import model_registry
+from analytics import start_compaction
+from alerts import start_evaluation
+from trends import start_refresh
+from session_lifecycle import start_lifecycle
+from chat_log import chat_log
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load ML models and the GenAI advisor in the background, so the server
+    # starts accepting requests immediately (model endpoints return 503 until ready)
+    model_registry.warm_up()
+    # Periodically recompute recent dashboard counters from the event tables
+    compaction = start_compaction()
+    # Re-evaluate government alerts over the rows added since the last run
+    evaluation = start_evaluation()
+    # Recompute market trends for the months that received new prices
+    trend_refresh = start_refresh()
+    # Expire idle chat sessions and archive old chat messages
+    lifecycle = start_lifecycle()
+    # Write chat turns in batches (and those a crashed worker left in its spool)
+    await chat_log.start()
+    yield
+    await chat_log.close()
+    for stop in (compaction, evaluation, trend_refresh, lifecycle):
+        if stop:
+            stop.set()
+    advisor = model_registry.loaded("advisor")
+    if advisor:
+        await advisor.close()
+    await async_engine.dispose()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="AgriTech AI Platform API",
     description="AI-driven agriculture platform with ML and GenAI capabilities",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # CORS configuration - Allow frontend to access API
@@ -67,7 +99,11 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "database": "connected"}
+    return {
+        "status": "healthy" if model_registry.ready else "starting",
+        "database": "connected",
+        "models": model_registry.status()
+    }
 
 # Include routers for each module
 app.include_router(crop_routes.router, prefix="/api/crops", tags=["Crop Recommendation"])
@@ -76,4 +112,5 @@ app.include_router(advisory_routes.router, prefix="/api/advisory", tags=["Farmer
 app.include_router(government_routes.router, prefix="/api/government", tags=["Government Dashboard"])
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,164 @@
+"""
+Baseline schema, as created by Base.metadata.create_all before migrations
+
+Databases already created by the app can skip this revision with
+`alembic stamp 0001`.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "commodity_prices",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("commodity_name", sa.String()),
+        sa.Column("date", sa.Date()),
+        sa.Column("price", sa.Float()),
+        sa.Column("market", sa.String()),
+        sa.Column("state", sa.String()),
+        sa.Column("district", sa.String()),
+        sa.Column("arrival_quantity", sa.Float()),
+        sa.Column("min_price", sa.Float()),
+        sa.Column("max_price", sa.Float()),
+        sa.Column("modal_price", sa.Float()),
+        sa.Column("created_at", sa.DateTime())
+    )
+    op.create_index("ix_commodity_prices_id", "commodity_prices", ["id"])
+    op.create_index("ix_commodity_prices_commodity_name", "commodity_prices", ["commodity_name"])
+    op.create_index("ix_commodity_prices_date", "commodity_prices", ["date"])
+
+    op.create_table(
+        "price_predictions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("commodity_name", sa.String()),
+        sa.Column("prediction_date", sa.Date()),
+        sa.Column("predicted_price", sa.Float()),
+        sa.Column("confidence_interval_lower", sa.Float()),
+        sa.Column("confidence_interval_upper", sa.Float()),
+        sa.Column("model_type", sa.String()),
+        sa.Column("model_version", sa.String()),
+        sa.Column("features_used", sa.JSON()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("forecast_horizon_days", sa.Integer())
+    )
+    op.create_index("ix_price_predictions_id", "price_predictions", ["id"])
+    op.create_index("ix_price_predictions_commodity_name", "price_predictions", ["commodity_name"])
+
+    op.create_table(
+        "market_trends",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("commodity_name", sa.String()),
+        sa.Column("month", sa.String()),
+        sa.Column("year", sa.Integer()),
+        sa.Column("avg_price", sa.Float()),
+        sa.Column("price_volatility", sa.Float()),
+        sa.Column("trend_direction", sa.String()),
+        sa.Column("seasonal_factor", sa.Float()),
+        sa.Column("created_at", sa.DateTime())
+    )
+    op.create_index("ix_market_trends_id", "market_trends", ["id"])
+    op.create_index("ix_market_trends_commodity_name", "market_trends", ["commodity_name"])
+
+    op.create_table(
+        "crop_recommendations",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("farmer_id", sa.String()),
+        sa.Column("nitrogen", sa.Float()),
+        sa.Column("phosphorus", sa.Float()),
+        sa.Column("potassium", sa.Float()),
+        sa.Column("temperature", sa.Float()),
+        sa.Column("humidity", sa.Float()),
+        sa.Column("ph", sa.Float()),
+        sa.Column("rainfall", sa.Float()),
+        sa.Column("soil_type", sa.String()),
+        sa.Column("state", sa.String()),
+        sa.Column("recommended_crop", sa.String()),
+        sa.Column("confidence_score", sa.Float()),
+        sa.Column("alternative_crops", sa.JSON()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("model_version", sa.String())
+    )
+    op.create_index("ix_crop_recommendations_id", "crop_recommendations", ["id"])
+    op.create_index("ix_crop_recommendations_farmer_id", "crop_recommendations", ["farmer_id"])
+
+    op.create_table(
+        "crop_database",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("crop_name", sa.String()),
+        sa.Column("crop_type", sa.String()),
+        *[
+            sa.Column(f"ideal_{name}_{bound}", sa.Float())
+            for name in ["n", "p", "k", "temp", "humidity", "ph", "rainfall"]
+            for bound in ["min", "max"]
+        ],
+        sa.Column("growing_season", sa.String()),
+        sa.Column("duration_days", sa.Integer()),
+        sa.Column("market_price_avg", sa.Float()),
+        sa.Column("description", sa.String())
+    )
+    op.create_index("ix_crop_database_id", "crop_database", ["id"])
+    op.create_index("ix_crop_database_crop_name", "crop_database", ["crop_name"], unique=True)
+
+    op.create_table(
+        "chat_sessions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("session_id", sa.String()),
+        sa.Column("farmer_id", sa.String()),
+        sa.Column("language", sa.String()),
+        sa.Column("started_at", sa.DateTime()),
+        sa.Column("last_activity", sa.DateTime()),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("farmer_location", sa.String()),
+        sa.Column("crop_interest", sa.String()),
+        sa.Column("farm_size", sa.Float())
+    )
+    op.create_index("ix_chat_sessions_id", "chat_sessions", ["id"])
+    op.create_index("ix_chat_sessions_session_id", "chat_sessions", ["session_id"], unique=True)
+    op.create_index("ix_chat_sessions_farmer_id", "chat_sessions", ["farmer_id"])
+
+    op.create_table(
+        "chat_messages",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("session_id", sa.String()),
+        sa.Column("role", sa.String()),
+        sa.Column("content", sa.Text()),
+        sa.Column("original_language", sa.String()),
+        sa.Column("translated_content", sa.Text()),
+        sa.Column("timestamp", sa.DateTime()),
+        sa.Column("tokens_used", sa.Integer()),
+        sa.Column("response_time_ms", sa.Integer())
+    )
+    op.create_index("ix_chat_messages_id", "chat_messages", ["id"])
+    op.create_index("ix_chat_messages_session_id", "chat_messages", ["session_id"])
+
+    op.create_table(
+        "farmer_queries",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("farmer_id", sa.String()),
+        sa.Column("query_text", sa.Text()),
+        sa.Column("query_category", sa.String()),
+        sa.Column("language", sa.String()),
+        sa.Column("response_generated", sa.Boolean()),
+        sa.Column("satisfaction_score", sa.Integer()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("location", sa.String())
+    )
+    op.create_index("ix_farmer_queries_id", "farmer_queries", ["id"])
+    op.create_index("ix_farmer_queries_farmer_id", "farmer_queries", ["farmer_id"])
+
+def downgrade():
+    for table in [
+        "farmer_queries", "chat_messages", "chat_sessions", "crop_database",
+        "crop_recommendations", "market_trends", "price_predictions", "commodity_prices"
+    ]:
+        op.drop_table(table)
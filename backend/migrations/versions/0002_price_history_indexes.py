@@ -0,0 +1,67 @@
+"""
+Composite indexes for price history and a materialized commodity list
+
+- uq_commodity_prices_commodity_market_date: the ingestion upsert key
+  (may already exist on databases the ingestion CLI has loaded). Rows
+  loaded more than once before it existed are deleted first, keeping the
+  latest (highest id) of each (commodity, market, date)
+- ix_commodity_prices_commodity_date: commodity + date range reads,
+  replacing the single-column commodity_name index it is a prefix of
+- commodities: one row per commodity, backfilled from commodity_prices
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.execute(
+        "DELETE FROM commodity_prices "
+        "WHERE commodity_name IS NOT NULL AND market IS NOT NULL AND date IS NOT NULL "
+        "AND id NOT IN (SELECT MAX(id) FROM commodity_prices "
+        "WHERE commodity_name IS NOT NULL AND market IS NOT NULL AND date IS NOT NULL "
+        "GROUP BY commodity_name, market, date)"
+    )
+    op.create_index(
+        "uq_commodity_prices_commodity_market_date",
+        "commodity_prices",
+        ["commodity_name", "market", "date"],
+        unique=True,
+        if_not_exists=True
+    )
+    op.create_index(
+        "ix_commodity_prices_commodity_date",
+        "commodity_prices",
+        ["commodity_name", "date"],
+        if_not_exists=True
+    )
+    op.drop_index("ix_commodity_prices_commodity_name", table_name="commodity_prices", if_exists=True)
+
+    if not sa.inspect(op.get_bind()).has_table("commodities"):
+        op.create_table(
+            "commodities",
+            sa.Column("name", sa.String(), primary_key=True),
+            sa.Column("first_price_date", sa.Date()),
+            sa.Column("last_price_date", sa.Date()),
+            sa.Column("updated_at", sa.DateTime())
+        )
+    op.execute(
+        "INSERT INTO commodities (name, first_price_date, last_price_date, updated_at) "
+        "SELECT commodity_name, MIN(date), MAX(date), CURRENT_TIMESTAMP FROM commodity_prices "
+        "WHERE commodity_name IS NOT NULL AND commodity_name NOT IN (SELECT name FROM commodities) "
+        "GROUP BY commodity_name"
+    )
+
+def downgrade():
+    op.drop_table("commodities")
+    op.create_index("ix_commodity_prices_commodity_name", "commodity_prices", ["commodity_name"])
+    op.drop_index("ix_commodity_prices_commodity_date", table_name="commodity_prices")
+    op.drop_index("uq_commodity_prices_commodity_market_date", table_name="commodity_prices")
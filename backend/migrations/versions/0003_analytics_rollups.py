@@ -0,0 +1,45 @@
+"""
+Daily rollup counters for the government analytics dashboard
+
+- analytics_daily_counts: events per (dimension, day, key)
+- analytics_farmers: first recommendation day per farmer
+- created_at indexes on crop_recommendations and farmer_queries, for
+  compacting a range of days
+
+The counters start empty: the first dashboard request rebuilds them, or
+run `python analytics.py` after upgrading.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "analytics_daily_counts",
+        sa.Column("dimension", sa.String(), primary_key=True),
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("key", sa.String(), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False)
+    )
+    op.create_table(
+        "analytics_farmers",
+        sa.Column("farmer_id", sa.String(), primary_key=True),
+        sa.Column("first_seen", sa.Date(), nullable=False)
+    )
+    op.create_index("ix_crop_recommendations_created_at", "crop_recommendations", ["created_at"])
+    op.create_index("ix_farmer_queries_created_at", "farmer_queries", ["created_at"])
+
+def downgrade():
+    op.drop_index("ix_farmer_queries_created_at", table_name="farmer_queries")
+    op.drop_index("ix_crop_recommendations_created_at", table_name="crop_recommendations")
+    op.drop_table("analytics_farmers")
+    op.drop_table("analytics_daily_counts")
@@ -0,0 +1,27 @@
+"""
+District on crop recommendations, for the regional analytics breakdown
+
+- crop_recommendations.district: nullable, older rows count as "Unknown"
+- ix_crop_recommendations_state_district: one state grouped by district
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("crop_recommendations", sa.Column("district", sa.String(), nullable=True))
+    op.create_index("ix_crop_recommendations_state_district", "crop_recommendations", ["state", "district"])
+
+def downgrade():
+    op.drop_index("ix_crop_recommendations_state_district", table_name="crop_recommendations")
+    with op.batch_alter_table("crop_recommendations") as batch_op:
+        batch_op.drop_column("district")
@@ -0,0 +1,53 @@
+"""
+Alert engine tables, for data-driven government alerts
+
+- alerts: one row per subject (alert_key), active until the condition clears
+- alert_watermarks: highest row id processed per event table
+
+Both start empty: the server evaluates at startup, or run
+`python alerts.py` after upgrading.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "alerts",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("alert_key", sa.String(), nullable=False),
+        sa.Column("type", sa.String(), nullable=False),
+        sa.Column("severity", sa.String(), nullable=False),
+        sa.Column("commodity", sa.String(), nullable=True),
+        sa.Column("affected_regions", sa.JSON(), nullable=True),
+        sa.Column("message", sa.String(), nullable=True),
+        sa.Column("recommendation", sa.String(), nullable=True),
+        sa.Column("metric_value", sa.Float(), nullable=True),
+        sa.Column("active", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.UniqueConstraint("alert_key")
+    )
+    op.create_index("ix_alerts_id", "alerts", ["id"])
+    op.create_index("ix_alerts_active", "alerts", ["active"])
+    op.create_table(
+        "alert_watermarks",
+        sa.Column("source", sa.String(), primary_key=True),
+        sa.Column("last_id", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True)
+    )
+
+def downgrade():
+    op.drop_table("alert_watermarks")
+    op.drop_index("ix_alerts_active", table_name="alerts")
+    op.drop_index("ix_alerts_id", table_name="alerts")
+    op.drop_table("alerts")
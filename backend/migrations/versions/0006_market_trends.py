@@ -0,0 +1,43 @@
+"""
+Monthly market trends computed from commodity prices
+
+- market_trends.month_number, and a unique (commodity_name, year,
+  month_number) index for upserting one row per commodity month
+- market_trend_pending: commodity months with new prices, recomputed by
+  the next refresh
+
+The table was never populated before; the first GET /api/prices/trends
+builds it, or run `python trends.py --full` after upgrading.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("market_trends", sa.Column("month_number", sa.Integer(), nullable=True))
+    op.create_index(
+        "uq_market_trends_commodity_year_month", "market_trends",
+        ["commodity_name", "year", "month_number"], unique=True
+    )
+    op.create_table(
+        "market_trend_pending",
+        sa.Column("commodity_name", sa.String(), primary_key=True),
+        sa.Column("year", sa.Integer(), primary_key=True),
+        sa.Column("month_number", sa.Integer(), primary_key=True),
+        sa.Column("marked_at", sa.DateTime(), nullable=True)
+    )
+
+def downgrade():
+    op.drop_table("market_trend_pending")
+    op.drop_index("uq_market_trends_commodity_year_month", table_name="market_trends")
+    with op.batch_alter_table("market_trends") as batch_op:
+        batch_op.drop_column("month_number")
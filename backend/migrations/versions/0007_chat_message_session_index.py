@@ -0,0 +1,23 @@
+"""
+(session_id, timestamp) index on chat messages
+
+A chat turn whose conversation context is not cached reads the session's
+latest messages; without it, every message of the session is sorted.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index("ix_chat_messages_session_timestamp", "chat_messages", ["session_id", "timestamp"])
+
+def downgrade():
+    op.drop_index("ix_chat_messages_session_timestamp", table_name="chat_messages")
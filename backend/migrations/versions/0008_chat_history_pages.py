@@ -0,0 +1,40 @@
+"""
+Paged chat session history
+
+- ix_chat_messages_session_timestamp_id replaces the (session_id,
+  timestamp) index: history pages are keyset ranges on all three
+- chat_sessions.message_count, last_message_id: maintained as turns are
+  written, backfilled here from chat_messages
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index("ix_chat_messages_session_timestamp_id", "chat_messages", ["session_id", "timestamp", "id"])
+    op.drop_index("ix_chat_messages_session_timestamp", table_name="chat_messages")
+    op.add_column("chat_sessions", sa.Column("message_count", sa.Integer(), nullable=True))
+    op.add_column("chat_sessions", sa.Column("last_message_id", sa.Integer(), nullable=True))
+    op.execute(
+        """
+        UPDATE chat_sessions SET
+            message_count = (SELECT count(*) FROM chat_messages WHERE chat_messages.session_id = chat_sessions.session_id),
+            last_message_id = (SELECT max(id) FROM chat_messages WHERE chat_messages.session_id = chat_sessions.session_id)
+        """
+    )
+
+def downgrade():
+    with op.batch_alter_table("chat_sessions") as batch_op:
+        batch_op.drop_column("last_message_id")
+        batch_op.drop_column("message_count")
+    op.create_index("ix_chat_messages_session_timestamp", "chat_messages", ["session_id", "timestamp"])
+    op.drop_index("ix_chat_messages_session_timestamp_id", table_name="chat_messages")
@@ -0,0 +1,42 @@
+"""
+Chat session expiry and message archive
+
+- chat_archives: messages moved out of chat_messages by
+  session_lifecycle.py, one compressed row per session and run
+- ix_chat_messages_session_id dropped: the (session_id, timestamp, id)
+  index already serves lookups by session
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "chat_archives",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("session_id", sa.String(), nullable=False),
+        sa.Column("first_message_id", sa.Integer(), nullable=True),
+        sa.Column("last_message_id", sa.Integer(), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("ended_at", sa.DateTime(), nullable=True),
+        sa.Column("message_count", sa.Integer(), nullable=True),
+        sa.Column("summary", sa.JSON(), nullable=True),
+        sa.Column("messages", sa.LargeBinary(), nullable=True),
+        sa.Column("archived_at", sa.DateTime(), nullable=True)
+    )
+    op.create_index("ix_chat_archives_id", "chat_archives", ["id"])
+    op.create_index("ix_chat_archives_session_ended", "chat_archives", ["session_id", "ended_at"])
+    op.drop_index("ix_chat_messages_session_id", table_name="chat_messages")
+
+def downgrade():
+    op.create_index("ix_chat_messages_session_id", "chat_messages", ["session_id"])
+    op.drop_table("chat_archives")
@@ -0,0 +1,331 @@
+"""
+COMPACT MODEL ARTIFACTS
+Flat, memory-mappable storage for tree ensembles
+
+A pickled scikit-learn forest is unpickled into private memory, so every
+uvicorn worker holds its own copy. This format lays all trees out as flat
+NumPy arrays, one .npy file each, which workers open with
+np.load(mmap_mode='r'). The OS page cache then backs every worker with
+the same physical pages.
+
+Layout of an artifact directory (e.g. ml/models/crop_model.forest/):
+    header.json     - format name, version, model metadata, array checksums
+    feature.npy     - int32, split feature per node (0 for leaves)
+    threshold.npy   - float64, split threshold per node (+inf for leaves)
+    left.npy        - int32, absolute index of the left child; the right
+                      child is always left + 1, and leaves point to themselves
+    value.npy       - float64, nodes x outputs, leaf output values
+    roots.npy       - int32, index of each tree's root node
+
+With that layout one traversal step is just
+    node = left[node] + (x[feature[node]] > threshold[node])
+and samples that already reached a leaf stay there.
+
+Supported kinds (header "kind"):
+    forest_classifier   - RandomForestClassifier, class probabilities
+                          averaged over trees (crop model)
+    boosted_regressor   - XGBRegressor, leaf values summed plus base_score
+                          (price model)
+"""
+
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+FORMAT_NAME = "agritech-tree-ensemble"
+FORMAT_VERSION = 1
+
+ARRAY_NAMES = ["feature", "threshold", "left", "value", "roots"]
+
+# Rows traversed per step; bounds the samples x trees working set
+CHUNK_SIZE = 4096
+
+class ArtifactError(Exception):
+    """Raised when an artifact is missing, corrupt or from an unsupported version"""
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def flatten_sklearn_trees(estimators: List, normalize: bool) -> Dict[str, np.ndarray]:
+    """
+    Concatenate fitted scikit-learn decision trees into flat node arrays
+
+    Args:
+        estimators: Fitted DecisionTreeClassifier/DecisionTreeRegressor objects
+        normalize: Normalize leaf values to class probabilities (classifiers)
+    """
+    trees = []
+    for estimator in estimators:
+        tree = estimator.tree_
+        value = tree.value.reshape(tree.node_count, -1).astype(np.float64)
+        if normalize:
+            totals = value.sum(axis=1, keepdims=True)
+            value = np.divide(value, totals, out=np.zeros_like(value), where=totals > 0)
+        trees.append((tree.children_left, tree.children_right, tree.feature, tree.threshold, value))
+    return _flatten_trees(trees)
+
+def flatten_xgboost_booster(booster) -> Dict[str, np.ndarray]:
+    """
+    Concatenate the trees of a fitted XGBoost regressor into flat node arrays
+
+    XGBoost goes left when x < split (in float32); the flat layout goes
+    right when x > threshold, so each threshold becomes the next float32
+    below the split. Missing-value routing is not kept: features must be
+    finite.
+    """
+    trees = []
+    for dump in booster.get_dump(dump_format="json"):
+        nodes = {}
+        stack = [json.loads(dump)]
+        while stack:
+            node = stack.pop()
+            nodes[node["nodeid"]] = node
+            stack.extend(node.get("children", []))
+
+        count = max(nodes) + 1
+        children_left = np.full(count, -1, dtype=np.int64)
+        children_right = np.full(count, -1, dtype=np.int64)
+        feature = np.zeros(count, dtype=np.int64)
+        threshold = np.zeros(count, dtype=np.float64)
+        value = np.zeros((count, 1), dtype=np.float64)
+        for node_id, node in nodes.items():
+            if "leaf" in node:
+                value[node_id, 0] = node["leaf"]
+            else:
+                children_left[node_id] = node["yes"]
+                children_right[node_id] = node["no"]
+                feature[node_id] = int(node["split"].lstrip("f"))
+                split = np.float32(node["split_condition"])
+                threshold[node_id] = np.nextafter(split, np.float32(-np.inf))
+        trees.append((children_left, children_right, feature, threshold, value))
+    return _flatten_trees(trees)
+
+def _flatten_trees(trees: List) -> Dict[str, np.ndarray]:
+    """
+    Lay trees out in the flat artifact format
+
+    Args:
+        trees: (children_left, children_right, feature, threshold, value) per
+               tree, scikit-learn style: -1 children mark leaves, node 0 is the root
+    """
+    features, thresholds, lefts, values, roots = [], [], [], [], []
+    offset = 0
+    for children_left, children_right, feature, threshold, value in trees:
+        order, position = _sibling_order(children_left, children_right)
+        node_count = len(order)
+        is_leaf = children_left[order] == -1
+
+        own_index = np.arange(node_count) + offset
+        left_child = position[np.maximum(children_left[order], 0)] + offset
+
+        roots.append(offset)
+        features.append(np.where(is_leaf, 0, feature[order]).astype(np.int32))
+        thresholds.append(np.where(is_leaf, np.inf, threshold[order]).astype(np.float64))
+        lefts.append(np.where(is_leaf, own_index, left_child).astype(np.int32))
+        values.append(np.asarray(value, dtype=np.float64)[order])
+        offset += node_count
+
+    return {
+        "feature": np.concatenate(features),
+        "threshold": np.concatenate(thresholds),
+        "left": np.concatenate(lefts),
+        "value": np.concatenate(values),
+        "roots": np.array(roots, dtype=np.int32)
+    }
+
+def _sibling_order(children_left: np.ndarray, children_right: np.ndarray):
+    """
+    Renumber a tree breadth-first so every right child directly follows its left sibling
+
+    Returns:
+        (order, position) where order[new] = old and position[old] = new
+    """
+    order = [0]
+    for old in order:
+        if children_left[old] != -1:
+            order.append(int(children_left[old]))
+            order.append(int(children_right[old]))
+    order = np.array(order, dtype=np.int64)
+    # Sized for the original ids, which may be sparse (unreachable ids are never looked up)
+    position = np.zeros(len(children_left), dtype=np.int64)
+    position[order] = np.arange(len(order))
+    return order, position
+
+def save_artifact(path: str, arrays: Dict[str, np.ndarray], metadata: Dict):
+    """
+    Write flat ensemble arrays and a header to an artifact directory
+
+    Args:
+        path: Artifact directory, created if missing
+        arrays: Output of flatten_sklearn_trees (or an equivalent layout)
+        metadata: JSON-serializable model info, e.g. kind, classes, feature_names
+    """
+    os.makedirs(path, exist_ok=True)
+
+    array_info = {}
+    for name in ARRAY_NAMES:
+        file_name = f"{name}.npy"
+        file_path = os.path.join(path, file_name)
+        # Plain .npy (not .npz) so the file can be memory-mapped
+        np.save(file_path, np.ascontiguousarray(arrays[name]), allow_pickle=False)
+        array_info[name] = {
+            "file": file_name,
+            "dtype": str(arrays[name].dtype),
+            "shape": list(arrays[name].shape),
+            "sha256": _sha256(file_path)
+        }
+
+    header = {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        **metadata,
+        "max_depth": _max_depth(arrays),
+        "arrays": array_info
+    }
+
+    # Write the header last and atomically, so a half-written artifact is never loadable
+    tmp_path = os.path.join(path, "header.json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(header, f, indent=2)
+    os.replace(tmp_path, os.path.join(path, "header.json"))
+
+def load_artifact(path: str, mmap: bool = True, verify: bool = True) -> "TreeEnsemble":
+    """
+    Load an artifact directory written by save_artifact
+
+    Args:
+        path: Artifact directory
+        mmap: Memory-map the arrays read-only (shared between processes)
+        verify: Check every array file against its recorded SHA-256
+    """
+    header_path = os.path.join(path, "header.json")
+    if not os.path.exists(header_path):
+        raise ArtifactError(f"No artifact header at {header_path}")
+
+    with open(header_path) as f:
+        header = json.load(f)
+
+    if header.get("format") != FORMAT_NAME:
+        raise ArtifactError(f"Unknown artifact format: {header.get('format')}")
+    if header.get("version") != FORMAT_VERSION:
+        raise ArtifactError(
+            f"Unsupported artifact version {header.get('version')} (expected {FORMAT_VERSION})"
+        )
+
+    arrays = {}
+    for name in ARRAY_NAMES:
+        info = header["arrays"][name]
+        file_path = os.path.join(path, info["file"])
+        if verify and _sha256(file_path) != info["sha256"]:
+            raise ArtifactError(f"Checksum mismatch for {file_path}")
+        array = np.load(file_path, mmap_mode="r" if mmap else None, allow_pickle=False)
+        if str(array.dtype) != info["dtype"] or list(array.shape) != info["shape"]:
+            raise ArtifactError(f"{file_path} does not match the header's dtype/shape")
+        arrays[name] = array
+
+    return TreeEnsemble(arrays, header)
+
+def _max_depth(arrays: Dict[str, np.ndarray]) -> int:
+    """Depth of the deepest tree, i.e. how many traversal steps predict needs"""
+    left = arrays["left"]
+    depth = 0
+    nodes = np.asarray(arrays["roots"])
+    while True:
+        # Leaves point to themselves, so only internal nodes have children
+        nodes = nodes[left[nodes] != nodes]
+        if not nodes.size:
+            return depth
+        nodes = np.concatenate([left[nodes], left[nodes] + 1])
+        depth += 1
+
+class TreeEnsemble:
+    """
+    Vectorized inference over a flat tree ensemble
+
+    All trees are walked together, one level per step, so a batch costs
+    max_depth NumPy steps rather than one Python call per tree.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], header: Dict):
+        self.header = header
+        self.kind = header.get("kind", "forest_classifier")
+        self.n_features = header.get("n_features")
+        self.max_depth = header["max_depth"]
+        # Plain ndarray views of the (possibly memory-mapped) arrays skip
+        # np.memmap's per-operation subclass overhead without copying
+        self.feature = arrays["feature"].view(np.ndarray)
+        self.threshold = arrays["threshold"].view(np.ndarray)
+        self.left = arrays["left"].view(np.ndarray)
+        self.value = arrays["value"].view(np.ndarray)
+        self.roots = arrays["roots"].view(np.ndarray)
+
+        # Class names in predict_proba column order (classifiers only)
+        self.classes_ = np.array(header["classes"]) if header.get("classes") else None
+
+    def _aggregate_leaves(self, X: np.ndarray, reduce) -> np.ndarray:
+        """
+        Walk every tree for every sample and reduce the leaf values over trees
+
+        Args:
+            X: N x n_features matrix
+            reduce: Function from a chunk's samples x trees x outputs leaf values
+                    to samples x outputs
+        """
+        # scikit-learn compares float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or (self.n_features is not None and X.shape[1] != self.n_features):
+            raise ValueError(f"Expected an N x {self.n_features} feature matrix, got shape {X.shape}")
+
+        out = np.empty((len(X), self.value.shape[1]), dtype=np.float64)
+        for start in range(0, len(X), CHUNK_SIZE):
+            chunk = X[start:start + CHUNK_SIZE]
+            rows = np.arange(len(chunk))[:, None]
+            node = np.broadcast_to(self.roots, (len(chunk), len(self.roots)))
+            for _ in range(self.max_depth):
+                go_right = chunk[rows, self.feature[node]] > self.threshold[node]
+                node = self.left[node] + go_right
+            out[start:start + len(chunk)] = reduce(self.value[node])
+        return out
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Class probabilities averaged over trees (random forest semantics)"""
+        return self._aggregate_leaves(X, lambda leaves: leaves.mean(axis=1))
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predicted class names (classifiers) or values (boosted regressors)"""
+        if self.kind == "boosted_regressor":
+            total = self._aggregate_leaves(X, lambda leaves: leaves.sum(axis=1))
+            return total[:, 0] + self.header.get("base_score", 0.0)
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+def save_random_forest(path: str, model, class_names: List[str], feature_names: Optional[List[str]] = None):
+    """Save a fitted RandomForestClassifier as a flat artifact"""
+    arrays = flatten_sklearn_trees(model.estimators_, normalize=True)
+    save_artifact(path, arrays, {
+        "kind": "forest_classifier",
+        "n_features": int(model.n_features_in_),
+        "feature_names": list(feature_names) if feature_names is not None else None,
+        "classes": [str(c) for c in class_names]
+    })
+
+def save_xgboost_regressor(path: str, model, feature_names: Optional[List[str]] = None, metadata: Optional[Dict] = None):
+    """Save a fitted XGBRegressor as a flat artifact"""
+    booster = model.get_booster()
+    config = json.loads(booster.save_config())
+    base_score = config["learner"]["learner_model_param"]["base_score"]
+    arrays = flatten_xgboost_booster(booster)
+    save_artifact(path, arrays, {
+        "kind": "boosted_regressor",
+        "n_features": int(booster.num_features()),
+        "feature_names": list(feature_names) if feature_names is not None else None,
+        # Newer XGBoost versions write this as a one-element list, e.g. "[5E-1]"
+        "base_score": float(str(base_score).strip("[]")),
+        **(metadata or {})
+    })
@@ -13,22 +13,63 @@ For hackathon: Use pre-trained model or train on sample data
 """
 
 import numpy as np
-import pandas as pd
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.preprocessing import LabelEncoder
 import joblib
+import hashlib
+import json
 import os
-from typing import List, Dict
+import time
+from typing import List, Dict, Optional
+
+from cache import LocalCache
+from ml.artifacts import load_artifact, save_random_forest
+
+# Prediction cache: size (0 disables), seconds an entry lives, and the
+# quantization step of each feature (0 = exact value). Every prediction is
+# made at the step's center, cached or not, so inputs in the same step
+# share one prediction whatever the batch size or cache settings.
+PREDICTION_CACHE_SIZE = int(os.getenv("CROP_CACHE_SIZE", "50000"))
+PREDICTION_CACHE_TTL = float(os.getenv("CROP_CACHE_TTL", "86400"))
+# Larger batches (lab uploads) skip the cache: they are vectorized already,
+# and their mostly distinct readings would evict the single requests' entries
+PREDICTION_CACHE_MAX_BATCH = int(os.getenv("CROP_CACHE_MAX_BATCH", "1000"))
+# Default steps: the precision of soil lab reports and weather readings
+PREDICTION_CACHE_STEPS = os.getenv(
+    "CROP_CACHE_STEPS", "N=1,P=1,K=1,temperature=0.1,humidity=1,ph=0.1,rainfall=1"
+)
+
+def parse_steps(spec: str, feature_names: List[str]) -> np.ndarray:
+    """Quantization steps per feature from "name=step,..." (features not listed are exact)"""
+    steps = dict.fromkeys(feature_names, 0.0)
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, step = item.partition("=")
+        if name.strip() not in steps:
+            raise ValueError(f"Unknown feature in CROP_CACHE_STEPS: {name.strip()}")
+        steps[name.strip()] = float(step)
+    return np.array([steps[name] for name in feature_names], dtype=float)
 
 class CropPredictor:
     def __init__(self, model_path: str = "ml/models/crop_model.pkl"):
         """Initialize crop predictor with pre-trained model"""
         self.model_path = model_path
+        self.artifact_path = model_path.replace('.pkl', '.forest')
         self.model = None
         self.label_encoder = None
         self.feature_names = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
         
+        # Crops scored by the rule-based mock model, in rule order (Maize is the default)
+        self.rule_crops = ["Rice", "Wheat", "Cotton", "Sugarcane", "Maize", "Potato", "Tomato"]
+        
+        # Inference latency
+        self.last_latency_ms = 0.0
+        self.latency_stats = {"calls": 0, "samples": 0, "total_ms": 0.0, "max_ms": 0.0}
+        
+        # Model outputs per quantized input; keys include model_version, so
+        # entries of a replaced model are never served
+        self.model_version = None
+        self.cache_steps = parse_steps(PREDICTION_CACHE_STEPS, self.feature_names)
+        self.cache = LocalCache("crop_predictions", maxsize=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL) \
+            if PREDICTION_CACHE_SIZE > 0 else None
+        
         # Crop knowledge base for recommendations
         self.crop_info = {
             "Rice": {
@@ -61,11 +102,29 @@ class CropPredictor:
         self.load_model()
     
     def load_model(self):
-        """Load pre-trained model or create new one"""
+        """Load pre-trained model or create new one
+        
+        Prefers the flat artifact (ml/models/crop_model.forest/), which is
+        memory-mapped so all uvicorn workers share one copy of the trees.
+        Falls back to the joblib pickle, then to the mock model.
+        """
+        if os.path.exists(self.artifact_path):
+            try:
+                self.model = load_artifact(self.artifact_path)
+                self.label_encoder = None  # Class names are stored in the artifact
+                # The header holds the checksum of every array
+                header = json.dumps(self.model.header, sort_keys=True).encode()
+                self._set_model_version(f"artifact-{hashlib.sha256(header).hexdigest()[:12]}")
+                print("Model artifact loaded successfully")
+                return
+            except Exception as e:
+                print(f"Error loading model artifact: {e}")
+        
         if os.path.exists(self.model_path):
             try:
                 self.model = joblib.load(self.model_path)
                 self.label_encoder = joblib.load(self.model_path.replace('.pkl', '_encoder.pkl'))
+                self._set_model_version(f"pickle-{os.stat(self.model_path).st_mtime_ns}")
                 print("Model loaded successfully")
             except Exception as e:
                 print(f"Error loading model: {e}")
@@ -79,76 +138,285 @@ class CropPredictor:
         # Create simple decision rules instead of trained model
         self.model = "mock"
         self.label_encoder = None
+        self._set_model_version("rules")
+    
+    def _set_model_version(self, version: str):
+        """Record the loaded model's version and drop the cached outputs of the previous one"""
+        if version != self.model_version and self.cache is not None:
+            self.cache.clear()
+        self.model_version = version
     
-    def predict(self, features: List[float]) -> Dict:
+    def predict(self, features: List[float], suitability=None) -> Dict:
         """
         Predict crop based on input features
         
         Args:
             features: [N, P, K, temperature, humidity, ph, rainfall]
+            suitability: SuitabilityIndex ranking the alternatives (see predict_batch)
         
         Returns:
             Dictionary with prediction results
         """
-        N, P, K, temp, humidity, ph, rainfall = features
+        return self.predict_batch(np.asarray([features], dtype=float), suitability=suitability)[0]
+    
+    def predict_batch(self, features: np.ndarray, top_k: int = 3, suitability=None) -> List[Dict]:
+        """
+        Predict crops for many samples in one vectorized pass
         
-        # Rule-based prediction (replace with ML model in production)
-        crop = self._rule_based_prediction(N, P, K, temp, humidity, ph, rainfall)
+        The model is called once for the whole matrix, at CROP_CACHE_STEPS
+        resolution (each reading moved to the center of its step), so
+        identical and same-step inputs always give identical outputs.
+        Batches of up to CROP_CACHE_MAX_BATCH rows go through the prediction
+        cache: the model runs once over the distinct steps it does not hold.
         
-        # Get alternatives
-        alternatives = self._get_alternatives(crop, features)
+        Args:
+            features: N x 7 matrix, columns ordered as self.feature_names
+            top_k: Number of alternative crops to return per sample
+            suitability: SuitabilityIndex of the crop_database ranges; when it
+                holds crops, the alternatives are the crops whose ideal ranges
+                fit the sample best (confidence = suitability), with the gap
+                of each feature outside them. Otherwise they are the model's
+                next best crops.
+        
+        Returns:
+            List of prediction dictionaries, one per input row
+        """
+        start_time = time.perf_counter()
+        
+        X = np.asarray(features, dtype=float)
+        if X.ndim != 2 or X.shape[1] != len(self.feature_names):
+            raise ValueError(f"Expected an N x {len(self.feature_names)} feature matrix, got shape {X.shape}")
+        
+        # The crop and its alternatives come from the same quantized reading on every path
+        codes, centers = self.quantize(X)
+        if self.cache is None or len(X) > PREDICTION_CACHE_MAX_BATCH:
+            outputs = self._model_outputs(centers, top_k)
+        else:
+            outputs = self._cached_model_outputs(codes, centers, top_k)
+        
+        if suitability is not None and len(suitability):
+            ranked = suitability.rank(centers, top_k, exclude=[crop for crop, _, _ in outputs])
+            alternatives = [
+                [
+                    {"crop": alt["crop"], "confidence": alt["suitability"], "gaps": alt["gaps"], "reason": alt["reason"]}
+                    for alt in row
+                ]
+                for row in ranked
+            ]
+        else:
+            alternatives = [
+                [
+                    {
+                        "crop": alt_crop,
+                        "confidence": alt_confidence,
+                        "reason": "Alternative based on similar conditions"
+                    }
+                    for alt_crop, alt_confidence in output[2]
+                ]
+                for output in outputs
+            ]
+        
+        results = []
+        # The reasoning quotes the values sent
+        for row, (crop, confidence, _), row_alternatives in zip(X.tolist(), outputs, alternatives):
+            info = self.crop_info.get(crop, {})
+            results.append({
+                "crop": crop,
+                "confidence": confidence,
+                "alternatives": row_alternatives,
+                "reasoning": self._generate_reasoning(crop, row),
+                "ideal_conditions": info.get("ideal_conditions", "N/A"),
+                "expected_yield": info.get("expected_yield", "N/A"),
+                "market_potential": info.get("market_potential", "N/A")
+            })
+        
+        self._record_latency(len(X), (time.perf_counter() - start_time) * 1000)
+        
+        return results
+    
+    def _model_outputs(self, X: np.ndarray, top_k: int) -> List[tuple]:
+        """(crop, confidence, ((alternative crop, confidence), ...)) per row, from one model call"""
+        classes, scores = self.predict_scores(X)
+        rows = np.arange(len(X))
+        
+        primary = np.argmax(scores, axis=1)
+        confidences = scores[rows, primary]
         
-        # Generate reasoning
-        reasoning = self._generate_reasoning(crop, features)
+        # Top-k alternatives without fully sorting every row
+        alt_scores = scores.copy()
+        alt_scores[rows, primary] = -np.inf
+        k = min(top_k, len(classes) - 1)
+        top = np.argpartition(-alt_scores, k - 1, axis=1)[:, :k] if k > 0 else np.empty((len(X), 0), dtype=int)
+        top_scores = alt_scores[rows[:, None], top]
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = top[rows[:, None], order]
+        top_scores = top_scores[rows[:, None], order]
         
+        return [
+            (crop, confidence, tuple(zip(alt_crops, alt_confidences)))
+            for crop, confidence, alt_crops, alt_confidences in zip(
+                classes[primary].tolist(),
+                confidences.tolist(),
+                classes[top].tolist(),
+                top_scores.tolist()
+            )
+        ]
+    
+    def quantize(self, X: np.ndarray):
+        """
+        Step codes and step centers of an N x 7 matrix
+        
+        Returns:
+            (codes, centers): the step number of each quantized feature (the
+            value of the exact ones), the cache key of a row with the model
+            version and top_k, and the matrix with each quantized feature
+            moved to the center of its step
+        """
+        steps = self.cache_steps
+        quantized = steps > 0
+        if quantized.all():
+            codes = np.rint(X / steps)
+            centers = codes * steps
+        else:
+            safe_steps = np.where(quantized, steps, 1.0)
+            codes = np.where(quantized, np.rint(X / safe_steps), X)
+            centers = np.where(quantized, codes * safe_steps, X)
+        return codes, centers
+    
+    def _cached_model_outputs(self, codes: np.ndarray, centers: np.ndarray, top_k: int) -> List[tuple]:
+        """Model outputs from the cache, the model run once over the distinct missed steps"""
+        outputs: List[Optional[tuple]] = [None] * len(codes)
+        missed: Dict[tuple, List[int]] = {}
+        for i, code in enumerate(codes.tolist()):
+            key = (self.model_version, top_k, tuple(code))
+            output = self.cache.get(key)
+            if output is None:
+                missed.setdefault(key, []).append(i)
+            else:
+                outputs[i] = output
+        
+        if missed:
+            first_rows = [rows[0] for rows in missed.values()]
+            for (key, rows), output in zip(missed.items(), self._model_outputs(centers[first_rows], top_k)):
+                self.cache.set(key, output)
+                for i in rows:
+                    outputs[i] = output
+        return outputs
+    
+    def predict_scores(self, X: np.ndarray):
+        """
+        Score every crop for every sample
+        
+        Returns:
+            (classes, scores) where classes is an array of crop names and
+            scores is an N x len(classes) matrix
+        """
+        if self.is_trained:
+            # One predict_proba call for the whole batch
+            return self.classes, self.model.predict_proba(X)
+        
+        # Rule-based prediction (replace with ML model in production)
+        return self._rule_based_scores(X)
+    
+    @property
+    def is_trained(self) -> bool:
+        """Whether a trained model is loaded (as opposed to the mock rules)"""
+        return self.model is not None and not isinstance(self.model, str)
+    
+    @property
+    def classes(self) -> np.ndarray:
+        """Crop names in the column order of predict_scores"""
+        if self.is_trained:
+            if self.label_encoder is None:
+                return self.model.classes_
+            return self.label_encoder.inverse_transform(self.model.classes_)
+        return np.array(self.rule_crops)
+    
+    def _record_latency(self, samples: int, latency_ms: float):
+        """Track per-call inference latency"""
+        self.last_latency_ms = latency_ms
+        self.latency_stats["calls"] += 1
+        self.latency_stats["samples"] += samples
+        self.latency_stats["total_ms"] += latency_ms
+        self.latency_stats["max_ms"] = max(self.latency_stats["max_ms"], latency_ms)
+    
+    def get_model_info(self) -> Dict:
+        """Model type, classes and inference latency statistics"""
+        calls = self.latency_stats["calls"]
+        return {
+            "model_type": "random_forest" if self.is_trained else "rule_based",
+            "model_format": ("artifact" if self.label_encoder is None else "pickle") if self.is_trained else None,
+            "classes": self.classes.tolist(),
+            "last_latency_ms": round(self.last_latency_ms, 3),
+            "avg_latency_ms": round(self.latency_stats["total_ms"] / calls, 3) if calls else 0.0,
+            "max_latency_ms": round(self.latency_stats["max_ms"], 3),
+            "calls": calls,
+            "samples": self.latency_stats["samples"],
+            "model_version": self.model_version,
+            "cache": self.cache_stats()
+        }
+    
+    def cache_stats(self) -> Dict:
+        """Prediction cache hit/miss counters and quantization steps"""
+        if self.cache is None:
+            return {"backend": "disabled"}
         return {
-            "crop": crop,
-            "confidence": 0.85 + np.random.random() * 0.1,  # Mock confidence
-            "alternatives": alternatives,
-            "reasoning": reasoning,
-            "ideal_conditions": self.crop_info.get(crop, {}).get("ideal_conditions", "N/A"),
-            "expected_yield": self.crop_info.get(crop, {}).get("expected_yield", "N/A"),
-            "market_potential": self.crop_info.get(crop, {}).get("market_potential", "N/A")
+            **self.cache.stats(),
+            "steps": dict(zip(self.feature_names, self.cache_steps.tolist())),
+            "max_batch": PREDICTION_CACHE_MAX_BATCH
         }
     
+    def _rule_conditions(self, X: np.ndarray) -> List[List[np.ndarray]]:
+        """Conditions for each crop in self.rule_crops, evaluated over an N x 7 matrix"""
+        N, P, K, temp, humidity, ph, rainfall = X.T
+        
+        return [
+            # Rice: High rainfall, warm temp
+            [rainfall > 200, temp > 25, humidity > 70],
+            # Wheat: Moderate rainfall, cool temp
+            [rainfall < 100, temp < 25, ph > 6.0],
+            # Cotton: Moderate rainfall, warm temp, high K
+            [K > 40, temp > 25, rainfall > 50],
+            # Sugarcane: High rainfall, hot temp
+            [rainfall > 150, temp > 30],
+        ]
+    
     def _rule_based_prediction(self, N, P, K, temp, humidity, ph, rainfall):
         """Simple rule-based crop prediction"""
-        # Rice: High rainfall, warm temp
-        if rainfall > 200 and temp > 25 and humidity > 70:
-            return "Rice"
-        
-        # Wheat: Moderate rainfall, cool temp
-        elif rainfall < 100 and temp < 25 and ph > 6.0:
-            return "Wheat"
+        features = np.array([[N, P, K, temp, humidity, ph, rainfall]], dtype=float)
+        return str(self._rule_based_prediction_batch(features)[0])
+    
+    def _rule_based_prediction_batch(self, X: np.ndarray) -> np.ndarray:
+        """Vectorized rule-based prediction over an N x 7 matrix, first matching rule wins"""
+        classes, scores = self._rule_based_scores(X)
+        return classes[np.argmax(scores, axis=1)]
+    
+    def _rule_based_scores(self, X: np.ndarray):
+        """
+        Deterministic mock scores from the decision rules
         
-        # Cotton: Moderate rainfall, warm temp, high K
-        elif K > 40 and temp > 25 and rainfall > 50:
-            return "Cotton"
+        The first matching rule's crop scores 0.85-0.95 and every other crop
+        scores 0.5-0.8, scaled by the fraction of its conditions that hold.
+        Maize is the default when no rule matches.
+        """
+        conditions = self._rule_conditions(X)
         
-        # Sugarcane: High rainfall, hot temp
-        elif rainfall > 150 and temp > 30:
-            return "Sugarcane"
+        # Fraction of each crop's conditions met: N x crops
+        fractions = np.zeros((len(X), len(self.rule_crops)))
+        for j, crop_conditions in enumerate(conditions):
+            fractions[:, j] = sum(crop_conditions) / len(crop_conditions)
+        fractions[:, self.rule_crops.index("Maize")] = 0.5
         
-        # Maize: Default moderate conditions
-        else:
-            return "Maize"
-    
-    def _get_alternatives(self, primary_crop: str, features: List[float]) -> List[Dict]:
-        """Get alternative crop recommendations"""
-        all_crops = ["Rice", "Wheat", "Cotton", "Maize", "Sugarcane", "Potato", "Tomato"]
-        alternatives = []
+        # Apply rules last to first so the earliest matching rule wins
+        winner = np.full(len(X), self.rule_crops.index("Maize"))
+        for j in range(len(conditions) - 1, -1, -1):
+            winner[fractions[:, j] == 1.0] = j
         
-        for crop in all_crops:
-            if crop != primary_crop:
-                alternatives.append({
-                    "crop": crop,
-                    "confidence": 0.5 + np.random.random() * 0.3,
-                    "reason": f"Alternative based on similar conditions"
-                })
+        scores = 0.5 + fractions * 0.3
+        rows = np.arange(len(X))
+        scores[rows, winner] = 0.85 + fractions[rows, winner] * 0.1
         
-        # Return top 3 alternatives
-        alternatives.sort(key=lambda x: x['confidence'], reverse=True)
-        return alternatives[:3]
+        return self.classes, scores
     
     def _generate_reasoning(self, crop: str, features: List[float]) -> str:
         """Generate human-readable reasoning"""
@@ -162,11 +430,17 @@ class CropPredictor:
     
     def train(self, data_path: str):
         """Train model on crop dataset"""
+        # Training-only dependencies, kept out of the serving path
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.model_selection import train_test_split
+        from sklearn.preprocessing import LabelEncoder
+        from ml.datasets import read_csv
+        
         # Load data
-        df = pd.read_csv(data_path)
+        df = read_csv(data_path)
         
-        # Prepare features and labels
-        X = df[self.feature_names]
+        # Prepare features and labels (as a plain matrix, which is what predict passes)
+        X = df[self.feature_names].to_numpy(dtype=float)
         y = df['label']
         
         # Encode labels
@@ -198,6 +472,13 @@ class CropPredictor:
         os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
         joblib.dump(self.model, self.model_path)
         joblib.dump(self.label_encoder, self.model_path.replace('.pkl', '_encoder.pkl'))
+        save_random_forest(
+            self.artifact_path,
+            self.model,
+            self.label_encoder.inverse_transform(self.model.classes_),
+            self.feature_names
+        )
+        self._set_model_version(f"pickle-{os.stat(self.model_path).st_mtime_ns}")
         
         return {"train_accuracy": train_score, "test_accuracy": test_score}
 
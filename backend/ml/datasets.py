@@ -0,0 +1,69 @@
+"""
+DATASET HELPERS
+Shared CSV loading for the training datasets in data/
+
+The sample CSVs start with a triple-quoted description block before the
+real header row, which pd.read_csv cannot parse on its own.
+"""
+
+import itertools
+from typing import IO, Iterable, Iterator, Union
+
+import pandas as pd
+
+def _preamble_length(lines: Iterable[str]) -> int:
+    """Number of leading lines in the \"\"\"...\"\"\" block or blank"""
+    skip = 0
+    in_docstring = False
+    for line in lines:
+        stripped = line.strip()
+        if in_docstring:
+            skip += 1
+            if stripped.endswith('"""'):
+                in_docstring = False
+        elif stripped.startswith('"""'):
+            skip += 1
+            # A one-line """...""" block closes on the same line
+            in_docstring = not (len(stripped) > 3 and stripped.endswith('"""'))
+        elif not stripped:
+            skip += 1
+        else:
+            break
+    return skip
+
+def count_preamble_lines(path: str) -> int:
+    """Number of lines before the CSV header (the leading \"\"\"...\"\"\" block and blank lines)"""
+    with open(path, encoding="utf-8") as f:
+        return _preamble_length(f)
+
+def skip_preamble(f: IO[str]):
+    """Position a seekable text stream on its CSV header row"""
+    skip = _preamble_length(f)
+    f.seek(0)
+    for _ in itertools.islice(f, skip):
+        pass
+
+def read_csv(path: str, **kwargs) -> pd.DataFrame:
+    """
+    pd.read_csv that skips the description block at the top of the file
+
+    The block is skipped on the open file rather than with skiprows,
+    because pandas would parse the quotes as one multi-line field.
+    """
+    with open(path, encoding="utf-8") as f:
+        skip_preamble(f)
+        return pd.read_csv(f, **kwargs)
+
+def iter_csv_chunks(source: Union[str, IO[str]], chunksize: int, **kwargs) -> Iterator[pd.DataFrame]:
+    """
+    Read a CSV path or seekable text stream in DataFrames of chunksize rows,
+    skipping the description block like read_csv
+    """
+    if isinstance(source, str):
+        with open(source, encoding="utf-8") as f:
+            yield from iter_csv_chunks(f, chunksize, **kwargs)
+        return
+
+    skip_preamble(source)
+    with pd.read_csv(source, chunksize=chunksize, **kwargs) as reader:
+        yield from reader
@@ -0,0 +1,128 @@
+"""
+PRICE FEATURE STORE
+Per-commodity price history for serving
+
+The price model needs lag_1/7/30 and ma_7/30 features at request time.
+Instead of re-reading a year of CommodityPrice rows and recomputing them
+for every request, each commodity keeps a ring buffer of its last 30
+daily prices, and the features are read straight off the buffer.
+
+Buffers are not updated in place as prices arrive: ingestion can correct
+a stored day, and a stored day is the average of every market's price.
+The buffer is rebuilt from the database instead, on first use and
+whenever the commodity's prices have changed (routes/price_routes.py
+compares the version of its row in the commodity list).
+
+One value per day: several prices on the same day (e.g. from different
+markets) are averaged, matching how the model is trained.
+"""
+
+import threading
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Longest lag / moving-average window the model uses
+WINDOW = 30
+
+# Model features in column order; lags and moving averages are relative to
+# lag_1, so one global model fits every commodity regardless of price level
+FEATURE_NAMES = [
+    "day_of_week",
+    "month",
+    "lag_7_ratio",
+    "lag_30_ratio",
+    "ma_7_ratio",
+    "ma_30_ratio"
+]
+
+def build_features(history: np.ndarray, target_date: date) -> List[float]:
+    """
+    Model features for predicting the price on target_date
+
+    Args:
+        history: Daily prices, oldest first, ending the day before target_date;
+                 needs at least WINDOW values
+        target_date: Day being predicted
+    """
+    lag_1 = history[-1]
+    return [
+        target_date.weekday(),
+        target_date.month,
+        history[-7] / lag_1,
+        history[-WINDOW] / lag_1,
+        history[-7:].mean() / lag_1,
+        history[-WINDOW:].mean() / lag_1
+    ]
+
+class _Series:
+    """Ring buffer of one commodity's last WINDOW daily prices"""
+
+    def __init__(self):
+        self.buffer = np.zeros(WINDOW, dtype=np.float64)
+        self.head = 0  # Slot the next day will be written to
+        self.count = 0  # Days stored, up to WINDOW
+        self.last_date: Optional[date] = None
+        # Running total of the current (last) day, for same-day averaging
+        self.day_sum = 0.0
+        self.day_count = 0
+
+    def append(self, day: date, price: float):
+        if self.last_date is not None and day == self.last_date:
+            self.day_sum += price
+            self.day_count += 1
+            self.buffer[(self.head - 1) % WINDOW] = self.day_sum / self.day_count
+            return
+
+        self.buffer[self.head] = price
+        self.head = (self.head + 1) % WINDOW
+        self.count = min(self.count + 1, WINDOW)
+        self.last_date = day
+        self.day_sum = price
+        self.day_count = 1
+
+    def history(self) -> np.ndarray:
+        """Stored prices, oldest first"""
+        ordered = np.roll(self.buffer, -self.head)
+        return ordered[WINDOW - self.count:].copy()
+
+class PriceFeatureStore:
+    """Thread-safe ring buffers of recent daily prices, keyed by commodity"""
+
+    def __init__(self):
+        self._series: Dict[str, _Series] = {}
+        self._lock = threading.Lock()
+
+    def has(self, commodity: str) -> bool:
+        return commodity in self._series
+
+    def seed(self, commodity: str, daily_prices: Iterable[Tuple[date, float]]):
+        """
+        (Re)build a commodity's buffer from (date, price) rows in any order
+
+        Called on first use and after the commodity's prices change, with
+        at most WINDOW daily averages from the database.
+        """
+        series = _Series()
+        for day, price in sorted(daily_prices, key=lambda row: row[0])[-WINDOW:]:
+            series.append(day, float(price))
+        with self._lock:
+            if series.count:
+                self._series[commodity] = series
+            else:
+                self._series.pop(commodity, None)
+
+    def last_date(self, commodity: str) -> Optional[date]:
+        """Date of the newest stored price"""
+        series = self._series.get(commodity)
+        return series.last_date if series is not None else None
+
+    def snapshot(self, commodity: str) -> Tuple[np.ndarray, Optional[date]]:
+        """Copy of (daily prices oldest first, date of the newest price)"""
+        with self._lock:
+            series = self._series.get(commodity)
+            if series is None:
+                return np.empty(0), None
+            return series.history(), series.last_date
+
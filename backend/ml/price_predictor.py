@@ -17,21 +17,29 @@ Training process:
 """
 
 import numpy as np
-import pandas as pd
-from datetime import datetime, timedelta
-from typing import List, Dict
+from datetime import datetime, timedelta, date
+from typing import List, Dict, Optional
 import joblib
 import os
 
-# For production, uncomment these:
-# from xgboost import XGBRegressor
-# from sklearn.preprocessing import StandardScaler
+from ml.artifacts import load_artifact, save_xgboost_regressor
+from ml.feature_store import PriceFeatureStore, FEATURE_NAMES, WINDOW, build_features
+
+# Days between the newest stored price and today that recursive forecasting
+# steps through; older data is treated as if it were today's
+MAX_GAP_DAYS = 30
 
 class PricePredictor:
     def __init__(self, model_path: str = "ml/models/price_model.pkl"):
         """Initialize price predictor"""
         self.model_path = model_path
+        self.artifact_path = model_path.replace('.pkl', '.boosted')
         self.model = None
+        # Training metrics, e.g. validation accuracy and residual spread
+        self.metadata = {}
+        
+        # Recent daily prices per commodity, for request-time features
+        self.feature_store = PriceFeatureStore()
         
         # Price baselines for different commodities (mock data)
         self.price_baselines = {
@@ -50,10 +58,24 @@ class PricePredictor:
         self.load_model()
     
     def load_model(self):
-        """Load pre-trained model"""
+        """Load pre-trained model
+        
+        Prefers the flat, memory-mapped artifact (ml/models/price_model.boosted/),
+        then the joblib pickle, then falls back to mock forecasts.
+        """
+        if os.path.exists(self.artifact_path):
+            try:
+                self.model = load_artifact(self.artifact_path)
+                self.metadata = self.model.header.get("metrics", {})
+                print("Price prediction model artifact loaded")
+                return
+            except Exception as e:
+                print(f"Error loading model artifact: {e}")
+        
         if os.path.exists(self.model_path):
             try:
                 self.model = joblib.load(self.model_path)
+                self.metadata = joblib.load(self.model_path.replace('.pkl', '_meta.pkl'))
                 print("Price prediction model loaded")
             except Exception as e:
                 print(f"Error loading model: {e}")
@@ -62,29 +84,45 @@ class PricePredictor:
             print("Using mock price prediction")
             self.model = "mock"
     
-    def predict(self, commodity: str, historical_data: List, forecast_days: int) -> Dict:
+    @property
+    def is_trained(self) -> bool:
+        """Whether a trained model is loaded (as opposed to mock forecasts)"""
+        return self.model is not None and not isinstance(self.model, str)
+    
+    def predict(self, commodity: str, historical_data: Optional[List] = None, forecast_days: int = 30, columnar: bool = False) -> Dict:
         """
         Predict commodity prices
         
         Args:
             commodity: Commodity name
-            historical_data: Historical price records
+            historical_data: Historical price records (newest first), used to
+                seed the feature store if it has nothing for this commodity
             forecast_days: Number of days to forecast
+            columnar: Return forecasts as one list per field instead of one dict per day
         
         Returns:
             Dictionary with forecasts and analysis
         """
+        if historical_data and not self.feature_store.has(commodity):
+            self.feature_store.seed(commodity, [(r.date, r.price) for r in historical_data])
+        history, last_date = self.feature_store.snapshot(commodity)
+        
         # Get current price from historical data
-        if historical_data:
-            current_price = historical_data[0].price
+        if len(history):
+            current_price = float(history[-1])
         else:
             current_price = self.price_baselines.get(commodity, 2000)
         
         # Generate forecasts
-        forecasts = self._generate_forecasts(commodity, current_price, forecast_days)
+        if self.is_trained and len(history) >= WINDOW:
+            forecasts = self._recursive_forecasts(history, last_date, forecast_days)
+            model_accuracy = self.metadata.get("accuracy", 0.0)
+        else:
+            forecasts = self._generate_forecasts(commodity, current_price, forecast_days, columnar=True)
+            model_accuracy = 0.82 + np.random.random() * 0.1  # Mock accuracy
         
         # Calculate trend
-        future_price = forecasts[-1]["predicted_price"]
+        future_price = forecasts["predicted_price"][-1]
         price_change_pct = ((future_price - current_price) / current_price) * 100
         
         # Determine trend
@@ -101,90 +139,188 @@ class PricePredictor:
         return {
             "commodity_name": commodity,
             "current_price": round(current_price, 2),
-            "forecasts": forecasts,
+            "forecasts": forecasts if columnar else self.forecast_records(forecasts),
             "trend": trend,
             "price_change_percentage": round(price_change_pct, 2),
             "recommendation": recommendation,
-            "model_accuracy": 0.82 + np.random.random() * 0.1  # Mock accuracy
+            "model_accuracy": model_accuracy
         }
     
-    def _generate_forecasts(self, commodity: str, current_price: float, days: int) -> List[Dict]:
-        """Generate price forecasts using time series model"""
-        forecasts = []
+    def _recursive_forecasts(self, history: np.ndarray, last_date: date, days: int) -> Dict[str, List]:
+        """
+        Multi-step forecast with the trained model
+        
+        Each day's prediction is appended to the history and feeds the lag
+        and moving-average features of the next day. Days between the newest
+        stored price and today (up to MAX_GAP_DAYS) are forecast first, so
+        the returned horizon starts tomorrow like the mock forecasts.
+        """
+        today = datetime.now().date()
+        gap = min(max((today - last_date).days, 0), MAX_GAP_DAYS)
+        start_date = today - timedelta(days=gap - 1)
+        steps = gap + days
+        
+        prices = np.empty(WINDOW + steps)
+        prices[:WINDOW] = history[-WINDOW:]
+        for step in range(steps):
+            target_date = start_date + timedelta(days=step)
+            features = build_features(prices[step:WINDOW + step], target_date)
+            predicted_return = float(self.model.predict(np.array([features]))[0])
+            prices[WINDOW + step] = prices[WINDOW + step - 1] * (1 + predicted_return)
+        
+        predicted_price = prices[WINDOW + gap:]
+        
+        # Interval widens with the horizon: z * residual std * sqrt(days ahead), capped at 50%
+        horizon = np.arange(1, days + 1)
+        spread = np.minimum(1.96 * self.metadata.get("residual_std", 0.05) * np.sqrt(horizon), 0.5)
+        dates = np.datetime64(today, "D") + horizon
+        
+        return {
+            "date": np.datetime_as_string(dates, unit="D").tolist(),
+            "predicted_price": np.round(predicted_price, 2).tolist(),
+            "lower_bound": np.round(predicted_price * (1 - spread), 2).tolist(),
+            "upper_bound": np.round(predicted_price * (1 + spread), 2).tolist()
+        }
+    
+    def _generate_forecasts(self, commodity: str, current_price: float, days: int, columnar: bool = False):
+        """
+        Generate price forecasts using time series model
         
+        The whole horizon is computed at once as NumPy arrays: trend,
+        seasonal and noise components, and a datetime64 date axis.
+        
+        Returns:
+            With columnar=True, a dict of equal-length lists keyed by
+            date, predicted_price, lower_bound and upper_bound.
+            Otherwise a list with one dict per forecast day.
+        """
         # Simulate price movement with trend and seasonality
         base_trend = np.random.choice([-0.5, 0, 0.5, 1.0], p=[0.2, 0.4, 0.3, 0.1])
         volatility = current_price * 0.05  # 5% volatility
         
-        for i in range(days):
-            # Calculate days from today
-            forecast_date = datetime.now().date() + timedelta(days=i+1)
-            
-            # Price prediction with trend and random walk
-            trend_component = base_trend * (i / days) * current_price * 0.1
-            seasonal_component = np.sin(2 * np.pi * i / 30) * current_price * 0.02
-            random_component = np.random.randn() * volatility * 0.3
-            
-            predicted_price = current_price + trend_component + seasonal_component + random_component
-            
-            # Confidence intervals (±10%)
-            lower_bound = predicted_price * 0.90
-            upper_bound = predicted_price * 1.10
-            
-            forecasts.append({
-                "date": forecast_date.strftime("%Y-%m-%d"),
-                "predicted_price": round(predicted_price, 2),
-                "lower_bound": round(lower_bound, 2),
-                "upper_bound": round(upper_bound, 2)
-            })
-        
-        return forecasts
+        # Days from today: forecast i is for today + i + 1
+        i = np.arange(days)
+        dates = np.datetime64(datetime.now().date(), "D") + i + 1
+        
+        # Price prediction with trend and random walk
+        trend_component = base_trend * (i / days) * current_price * 0.1
+        seasonal_component = np.sin(2 * np.pi * i / 30) * current_price * 0.02
+        random_component = np.random.randn(days) * volatility * 0.3
+        
+        predicted_price = current_price + trend_component + seasonal_component + random_component
+        
+        # Confidence intervals (±10%)
+        forecasts = {
+            "date": np.datetime_as_string(dates, unit="D").tolist(),
+            "predicted_price": np.round(predicted_price, 2).tolist(),
+            "lower_bound": np.round(predicted_price * 0.90, 2).tolist(),
+            "upper_bound": np.round(predicted_price * 1.10, 2).tolist()
+        }
+        
+        return forecasts if columnar else self.forecast_records(forecasts)
+    
+    def forecast_records(self, forecasts: Dict[str, List]) -> List[Dict]:
+        """Convert columnar forecasts to one dict per forecast day"""
+        return [
+            {"date": d, "predicted_price": p, "lower_bound": lo, "upper_bound": hi}
+            for d, p, lo, hi in zip(
+                forecasts["date"],
+                forecasts["predicted_price"],
+                forecasts["lower_bound"],
+                forecasts["upper_bound"]
+            )
+        ]
     
     def train(self, data_path: str):
-        """Train XGBoost model on historical price data"""
-        # Load data
-        df = pd.read_csv(data_path)
-        df['date'] = pd.to_datetime(df['date'])
-        df = df.sort_values('date')
+        """Train XGBoost model on historical price data
+        
+        One global model for all commodities predicts the next day's price
+        change. Lags and moving averages are relative to the previous day's
+        price (see ml/feature_store.py), so commodities at very different
+        price levels share one model.
+        """
+        # Training-only dependencies, kept out of the serving path
+        from xgboost import XGBRegressor
+        from ml.datasets import read_csv
+        
+        # Load data, one (daily average) price per commodity per day
+        df = read_csv(data_path, parse_dates=['date'])
+        df = df.groupby(['commodity_name', 'date'], as_index=False)['price'].mean()
+        df = df.sort_values(['commodity_name', 'date'])
         
-        # Feature engineering
+        # Feature engineering, per commodity
+        prices = df.groupby('commodity_name')['price']
+        lag_1 = prices.shift(1)
         df['day_of_week'] = df['date'].dt.dayofweek
         df['month'] = df['date'].dt.month
-        df['year'] = df['date'].dt.year
         
         # Lag features
-        for lag in [1, 7, 30]:
-            df[f'price_lag_{lag}'] = df['price'].shift(lag)
+        df['lag_7_ratio'] = prices.shift(7) / lag_1
+        df['lag_30_ratio'] = prices.shift(WINDOW) / lag_1
+        
+        # Rolling averages of the days before each target day
+        df['ma_7_ratio'] = prices.transform(lambda s: s.shift(1).rolling(7).mean()) / lag_1
+        df['ma_30_ratio'] = prices.transform(lambda s: s.shift(1).rolling(WINDOW).mean()) / lag_1
         
-        # Rolling averages
-        df['price_ma_7'] = df['price'].rolling(window=7).mean()
-        df['price_ma_30'] = df['price'].rolling(window=30).mean()
+        # Target: next-day relative change
+        df['lag_1'] = lag_1
+        df['target'] = df['price'] / lag_1 - 1
         
         # Drop NaN values
         df = df.dropna()
+        if len(df) < 50:
+            raise ValueError(
+                f"Not enough price history to train: {len(df)} usable rows, "
+                f"each commodity needs more than {WINDOW} days of prices"
+            )
+        
+        # Time-based split: validate on the most recent 20% of days
+        cutoff = df['date'].quantile(0.8)
+        train_df = df[df['date'] <= cutoff]
+        valid_df = df[df['date'] > cutoff]
+        
+        X_train = train_df[FEATURE_NAMES].to_numpy(dtype=float)
+        y_train = train_df['target'].to_numpy(dtype=float)
+        
+        # Train XGBoost
+        self.model = XGBRegressor(
+            n_estimators=100,
+            max_depth=5,
+            learning_rate=0.1,
+            random_state=42
+        )
+        self.model.fit(X_train, y_train)
+        
+        # Evaluate on next-day prices
+        residuals = y_train - self.model.predict(X_train)
+        if len(valid_df):
+            valid_returns = self.model.predict(valid_df[FEATURE_NAMES].to_numpy(dtype=float))
+            predicted = valid_df['lag_1'].to_numpy() * (1 + valid_returns)
+            actual = valid_df['price'].to_numpy()
+            mape = float(np.mean(np.abs(predicted - actual) / actual))
+            residuals = valid_df['target'].to_numpy() - valid_returns
+        else:
+            mape = float(np.mean(np.abs(residuals)))
+        
+        self.metadata = {
+            "accuracy": round(1 - mape, 4),
+            "residual_std": float(np.std(residuals)),
+            "train_rows": int(len(train_df)),
+            "validation_rows": int(len(valid_df)),
+            "commodities": sorted(df['commodity_name'].unique().tolist())
+        }
         
-        # Prepare features and target
-        feature_cols = ['day_of_week', 'month', 'year', 'price_lag_1', 
-                       'price_lag_7', 'price_lag_30', 'price_ma_7', 'price_ma_30']
-        X = df[feature_cols]
-        y = df['price']
-        
-        # Train XGBoost (uncomment in production)
-        # self.model = XGBRegressor(
-        #     n_estimators=100,
-        #     max_depth=5,
-        #     learning_rate=0.1,
-        #     random_state=42
-        # )
-        # self.model.fit(X, y)
+        print(f"Validation accuracy (1 - MAPE): {self.metadata['accuracy']:.4f}")
         
         # Save model
-        # os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
-        # joblib.dump(self.model, self.model_path)
+        os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
+        joblib.dump(self.model, self.model_path)
+        joblib.dump(self.metadata, self.model_path.replace('.pkl', '_meta.pkl'))
+        save_xgboost_regressor(self.artifact_path, self.model, FEATURE_NAMES, {"metrics": self.metadata})
         
         print("Model training complete")
         
-        return {"status": "success"}
+        return {"status": "success", **self.metadata}
 
 # Example usage
 if __name__ == "__main__":
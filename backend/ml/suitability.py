@@ -0,0 +1,137 @@
+"""
+CROP SUITABILITY
+Score soil and climate readings against the ideal ranges of every crop
+
+The ranges of crop_database (min/max of N, P, K, temperature, humidity,
+pH and rainfall per crop) are held as one crops x 7 x 2 array. A batch of
+readings is scored against every crop in one broadcast:
+
+- gap:         signed distance of each reading to each crop's range per
+               feature (negative below the minimum, positive above the
+               maximum, 0 inside; a missing bound is open)
+- distance:    Euclidean norm of the gaps, each divided by its feature's
+               span (the API's validation range), so units compare
+- suitability: 1 - distance / SUITABILITY_TOLERANCE, floored at 0: 1 inside
+               every range, 0 once the readings are, together, half of the
+               features' spans away
+
+Used by CropPredictor for the alternatives of a recommendation, with a
+reason naming each feature outside the crop's range.
+"""
+
+import hashlib
+import math
+from typing import Dict, List, Optional
+
+import numpy as np
+
+FEATURES = ["N", "P", "K", "temperature", "humidity", "ph", "rainfall"]
+# crop_database column prefix and unit of each feature
+COLUMNS = ["ideal_n", "ideal_p", "ideal_k", "ideal_temp", "ideal_humidity", "ideal_ph", "ideal_rainfall"]
+UNITS = [" kg/ha", " kg/ha", " kg/ha", "°C", "%", "", " mm"]
+# Width of each feature's valid input (CropRecommendationRequest)
+SPANS = np.array([150, 150, 250, 50, 100, 14, 500], dtype=float)
+
+SUITABILITY_TOLERANCE = 0.5
+# Readings scored per broadcast (chunk x crops x 7 gaps in memory at a time)
+CHUNK_ROWS = 10_000
+
+class SuitabilityIndex:
+    """Ideal ranges of every crop, scored in vectorized passes"""
+
+    def __init__(self, crops: List[Dict]):
+        """
+        Args:
+            crops: crop_database rows (dicts with crop_name and the
+                ideal_*_min / ideal_*_max columns)
+        """
+        self.names = np.array([crop["crop_name"] for crop in crops], dtype=object)
+        ranges = np.array(
+            [[[crop.get(f"{column}_min"), crop.get(f"{column}_max")] for column in COLUMNS] for crop in crops],
+            dtype=float
+        ).reshape(len(crops), len(FEATURES), 2)
+        # Missing bounds are open
+        ranges[:, :, 0] = np.where(np.isnan(ranges[:, :, 0]), -np.inf, ranges[:, :, 0])
+        ranges[:, :, 1] = np.where(np.isnan(ranges[:, :, 1]), np.inf, ranges[:, :, 1])
+        self.ranges = ranges
+        # Python copies for building explanations (numpy scalars format slowly)
+        self._names = self.names.tolist()
+        self._bounds = [[[_bound(value) for value in pair] for pair in crop] for crop in ranges.tolist()]
+        self.version = hashlib.sha256(
+            ranges.tobytes() + "\n".join(self._names).encode()
+        ).hexdigest()[:12]
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def gaps(self, X: np.ndarray) -> np.ndarray:
+        """Signed gap of each reading to each crop's range: N x crops x 7"""
+        X = np.asarray(X, dtype=float)[:, None, :]
+        return np.minimum(X - self.ranges[None, :, :, 0], 0) + np.maximum(X - self.ranges[None, :, :, 1], 0)
+
+    @staticmethod
+    def _scores(gaps: np.ndarray) -> np.ndarray:
+        distance = np.sqrt(np.square(gaps / SPANS).sum(axis=2))
+        return np.maximum(0.0, 1.0 - distance / SUITABILITY_TOLERANCE)
+
+    def score(self, X: np.ndarray) -> np.ndarray:
+        """Suitability of each crop for each reading: N x crops, in [0, 1]"""
+        X = np.asarray(X, dtype=float)
+        scores = np.empty((len(X), len(self)))
+        for start in range(0, len(X), CHUNK_ROWS):
+            scores[start:start + CHUNK_ROWS] = self._scores(self.gaps(X[start:start + CHUNK_ROWS]))
+        return scores
+
+    def rank(self, X: np.ndarray, top_k: Optional[int] = None, exclude: Optional[List[str]] = None) -> List[List[Dict]]:
+        """
+        Crops ranked by suitability for each reading, with their gaps
+
+        Args:
+            X: N x 7 readings, columns ordered as FEATURES
+            top_k: Crops per reading (all when None)
+            exclude: Crop name to leave out, per reading (e.g. the recommended one)
+
+        Returns:
+            Per reading, up to top_k dicts: crop, suitability, gaps (feature ->
+            signed gap, only features outside the range) and reason
+        """
+        X = np.asarray(X, dtype=float)
+        if not len(self):
+            return [[] for _ in range(len(X))]
+        # One extra crop per reading in case the excluded one is among the best
+        k = len(self) if top_k is None else min(top_k + (exclude is not None), len(self))
+        ranked = []
+        for start in range(0, len(X), CHUNK_ROWS):
+            gaps = self.gaps(X[start:start + CHUNK_ROWS])
+            scores = self._scores(gaps)
+            rows = np.arange(len(gaps))[:, None]
+            # Ties keep the crops' (name) order
+            order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+            for i, (crops, crop_scores, crop_gaps) in enumerate(zip(
+                order.tolist(), scores[rows, order].tolist(), np.round(gaps[rows, order], 4).tolist()
+            )):
+                skip = exclude[start + i] if exclude is not None else None
+                row = [
+                    self._explain(j, suitability, crop_gap)
+                    for j, suitability, crop_gap in zip(crops, crop_scores, crop_gaps)
+                    if self._names[j] != skip
+                ]
+                ranked.append(row[:top_k] if top_k is not None else row)
+        return ranked
+
+    def _explain(self, crop: int, suitability: float, gaps: List[float]) -> Dict:
+        outside = {FEATURES[f]: gap for f, gap in enumerate(gaps) if gap}
+        details = [
+            f"{FEATURES[f]} {abs(gap):g}{UNITS[f]} {'below' if gap < 0 else 'above'} "
+            f"its {self._bounds[crop][f][0]}-{self._bounds[crop][f][1]} range"
+            for f, gap in enumerate(gaps) if gap
+        ]
+        return {
+            "crop": self._names[crop],
+            "suitability": round(suitability, 4),
+            "gaps": outside,
+            "reason": "Within its ideal ranges" if not details else "Outside its ideal ranges: " + "; ".join(details)
+        }
+
+def _bound(value: float) -> str:
+    return "any" if math.isinf(value) else f"{value:g}"
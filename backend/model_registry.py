@@ -0,0 +1,161 @@
+"""
+MODEL REGISTRY
+Lazy, background loading of the ML models and the GenAI advisor
+
+Building CropPredictor, PricePredictor and GeminiAdvisor pulls in
+numpy/scikit-learn/joblib and reads model files, which used to happen at
+import time, before uvicorn could bind its port. Route modules now
+register a loader function instead, and the FastAPI lifespan warms every
+model up in a background thread while the API is already serving.
+
+Usage in a route module:
+
+    model_registry.register("crop", load_crop_predictor)
+
+    @router.post("/recommend")
+    async def recommend(crop_predictor = Depends(model_registry.dependency("crop"))):
+        ...
+
+Until a model is ready its endpoints return 503 with a Retry-After header.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+# Seconds clients are asked to wait before retrying a request for a model that is still loading
+RETRY_AFTER_SECONDS = 5
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+class ModelNotReady(Exception):
+    """Raised when a model is requested before it has finished loading"""
+
+    def __init__(self, name: str, state: str, error: Optional[str] = None):
+        self.name = name
+        self.state = state
+        self.error = error
+        super().__init__(f"Model '{name}' is {state}" + (f": {error}" if error else ""))
+
+class _Entry:
+    def __init__(self, loader: Callable):
+        self.loader = loader
+        self.state = PENDING
+        self.instance = None
+        self.error = None
+        self.load_ms = None
+
+class ModelRegistry:
+    """Named models that are loaded once, off the request path"""
+
+    def __init__(self):
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader: Callable):
+        """Register a zero-argument function that builds the model"""
+        with self._lock:
+            self._entries[name] = _Entry(loader)
+
+    def get(self, name: str):
+        """
+        Return a loaded model
+
+        Raises ModelNotReady if it is still loading. If nothing has started
+        loading it yet (e.g. the app was run without its lifespan), a
+        background load is started first. A failed load is retried.
+        """
+        entry = self._entries[name]
+        if entry.state == READY:
+            return entry.instance
+        error = entry.error
+        self._start_background(self._claim([name]))
+        raise ModelNotReady(name, entry.state, error)
+
+    def loaded(self, name: str):
+        """Return the model if it has been loaded, else None (never starts a load)"""
+        entry = self._entries[name]
+        return entry.instance if entry.state == READY else None
+
+    def load(self, name: str):
+        """Load a model in the calling thread (no-op if already loaded or loading)"""
+        for claimed in self._claim([name]):
+            self._load(claimed)
+
+    def warm_up(self) -> Optional[threading.Thread]:
+        """Load every registered model in a background thread"""
+        return self._start_background(self._claim(list(self._entries)))
+
+    def _claim(self, names):
+        """Mark pending or failed models as loading; returns the ones this caller must load"""
+        claimed = []
+        with self._lock:
+            for name in names:
+                entry = self._entries[name]
+                if entry.state in (PENDING, FAILED):
+                    entry.state = LOADING
+                    entry.error = None
+                    claimed.append(name)
+        return claimed
+
+    def _load(self, name: str):
+        entry = self._entries[name]
+        start = time.perf_counter()
+        try:
+            instance = entry.loader()
+        except Exception as e:
+            entry.load_ms = round((time.perf_counter() - start) * 1000, 1)
+            entry.error = str(e)
+            entry.state = FAILED
+            print(f"Failed to load model '{name}': {e}")
+        else:
+            entry.load_ms = round((time.perf_counter() - start) * 1000, 1)
+            entry.instance = instance
+            entry.state = READY
+
+    def _start_background(self, names) -> Optional[threading.Thread]:
+        if not names:
+            return None
+
+        def run():
+            for name in names:
+                self._load(name)
+
+        thread = threading.Thread(target=run, name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    @property
+    def ready(self) -> bool:
+        return all(entry.state == READY for entry in self._entries.values())
+
+    def status(self) -> Dict[str, Dict]:
+        """Per-model state for /health"""
+        return {
+            name: {
+                "state": entry.state,
+                "load_ms": entry.load_ms,
+                **({"error": entry.error} if entry.error else {})
+            }
+            for name, entry in self._entries.items()
+        }
+
+    def dependency(self, name: str) -> Callable:
+        """FastAPI dependency returning the model, or a 503 with Retry-After while it loads"""
+        async def get_model():
+            try:
+                return self.get(name)
+            except ModelNotReady as e:
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"{e}, please retry shortly",
+                    headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+                )
+        return get_model
+
+model_registry = ModelRegistry()
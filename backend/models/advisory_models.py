@@ -3,7 +3,7 @@ FARMER ADVISORY SYSTEM - DATABASE MODELS
 SQLAlchemy models for AI advisory chatbot
 """
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, JSON
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime, Boolean, JSON, Index, LargeBinary
 from datetime import datetime
 from database import Base
 
@@ -20,21 +20,31 @@ class ChatSession(Base):
     
     started_at = Column(DateTime, default=datetime.utcnow)
     last_activity = Column(DateTime, default=datetime.utcnow)
-    is_active = Column(Boolean, default=True)
+    is_active = Column(Boolean, default=True)  # False once idle (session_lifecycle.py), True again on the next turn
     
     # Context
     farmer_location = Column(String)
     crop_interest = Column(String)
     farm_size = Column(Float)
+    
+    # Maintained as turns are written (chat_log.write_turns) and archived
+    # (session_lifecycle.py), so the history endpoint does not count the messages
+    message_count = Column(Integer, default=0)  # in chat_messages, not archived
+    last_message_id = Column(Integer)
 
 class ChatMessage(Base):
     """
     Store individual chat messages
     """
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        # A session's latest messages (read when its conversation context is not
+        # cached) and the keyset pages of its history
+        Index("ix_chat_messages_session_timestamp_id", "session_id", "timestamp", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    session_id = Column(String, index=True)
+    session_id = Column(String)  # leads ix_chat_messages_session_timestamp_id
     
     # Message content
     role = Column(String)  # user, assistant, system
@@ -47,6 +57,30 @@ class ChatMessage(Base):
     tokens_used = Column(Integer)
     response_time_ms = Column(Integer)
     
+class ChatArchive(Base):
+    """
+    Chat messages moved out of chat_messages by session_lifecycle.py: one row
+    per session and archive run, the messages zlib-compressed
+    """
+    __tablename__ = "chat_archives"
+    __table_args__ = (
+        Index("ix_chat_archives_session_ended", "session_id", "ended_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(String, nullable=False)
+    
+    # Archived messages: ids and timestamps of the first and last, how many
+    first_message_id = Column(Integer)
+    last_message_id = Column(Integer)
+    started_at = Column(DateTime)
+    ended_at = Column(DateTime)
+    message_count = Column(Integer)
+    
+    summary = Column(JSON)  # questions, answers, tokens, topics, first/last question
+    messages = Column(LargeBinary)  # zlib-compressed JSON, one array per field
+    archived_at = Column(DateTime, default=datetime.utcnow)
+    
 class FarmerQuery(Base):
     """
     Aggregate farmer queries for analytics
@@ -63,5 +97,5 @@ class FarmerQuery(Base):
     response_generated = Column(Boolean)
     satisfaction_score = Column(Integer)  # 1-5 rating
     
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     location = Column(String)
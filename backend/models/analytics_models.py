@@ -0,0 +1,65 @@
+"""
+GOVERNMENT ANALYTICS DASHBOARD - DATABASE MODELS
+Pre-aggregated counters and alerts behind the analytics dashboard
+"""
+
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Boolean, JSON
+from datetime import datetime
+from database import Base
+
+class AnalyticsDailyCount(Base):
+    """
+    Events per day for one dimension value, e.g. ("crop", 2026-10-17, "Rice") -> 42
+
+    Kept up to date by analytics.py as recommendations and queries are
+    written, so the dashboard sums O(days) rows instead of scanning events.
+    """
+    __tablename__ = "analytics_daily_counts"
+
+    # Primary key leads with dimension: the dashboard reads one dimension at a time
+    dimension = Column(String, primary_key=True)  # crop, state, query_category, new_farmer
+    day = Column(Date, primary_key=True)
+    key = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class AnalyticsFarmer(Base):
+    """
+    Farmers seen in crop recommendations, with the day of their first one
+
+    Lets a write tell whether its farmer is new, so distinct farmers can be
+    counted as a daily "new_farmer" counter.
+    """
+    __tablename__ = "analytics_farmers"
+
+    farmer_id = Column(String, primary_key=True)
+    first_seen = Column(Date, nullable=False)
+
+class Alert(Base):
+    """
+    Alert raised by the alert engine (alerts.py), one row per subject
+
+    alert_key identifies the subject, e.g. "price_spike:Onion". Re-evaluating
+    it updates the row; when the condition clears it is marked inactive.
+    """
+    __tablename__ = "alerts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    alert_key = Column(String, unique=True, nullable=False)
+    type = Column(String, nullable=False)  # price_spike, query_surge, soil_deficit
+    severity = Column(String, nullable=False)  # high, medium
+    commodity = Column(String)
+    affected_regions = Column(JSON)
+    message = Column(String)
+    recommendation = Column(String)
+    metric_value = Column(Float)  # Percent change, surge ratio or low-sample share
+    active = Column(Boolean, default=True, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class AlertWatermark(Base):
+    """Highest row id of an event table the alert engine has processed, and when it last evaluated it"""
+    __tablename__ = "alert_watermarks"
+
+    source = Column(String, primary_key=True)  # commodity_prices, farmer_queries, crop_recommendations
+    last_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
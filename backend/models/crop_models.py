@@ -3,7 +3,7 @@ CROP RECOMMENDATION SYSTEM - DATABASE MODELS
 SQLAlchemy models for crop recommendation data
 """
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, JSON
+from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, Index
 from datetime import datetime
 from database import Base
 
@@ -12,6 +12,10 @@ class CropRecommendation(Base):
     Store crop recommendation requests and results
     """
     __tablename__ = "crop_recommendations"
+    __table_args__ = (
+        # Regional analytics: one state, grouped by district
+        Index("ix_crop_recommendations_state_district", "state", "district"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     farmer_id = Column(String, index=True)
@@ -26,6 +30,7 @@ class CropRecommendation(Base):
     rainfall = Column(Float)
     soil_type = Column(String)
     state = Column(String)
+    district = Column(String)
     
     # Prediction results
     recommended_crop = Column(String)
@@ -33,7 +38,7 @@ class CropRecommendation(Base):
     alternative_crops = Column(JSON)  # Store as JSON array
     
     # Metadata
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     model_version = Column(String, default="1.0")
 
 class CropDatabase(Base):
@@ -3,18 +3,25 @@ PRICE PREDICTION SYSTEM - DATABASE MODELS
 SQLAlchemy models for commodity price prediction
 """
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, Date, JSON
+from sqlalchemy import Column, Integer, String, Float, DateTime, Date, JSON, Index
 from datetime import datetime
 from database import Base
 
 class CommodityPrice(Base):
     """
     Historical commodity price data
+
+    One row per commodity, market and day; ingestion upserts on that key.
     """
     __tablename__ = "commodity_prices"
+    __table_args__ = (
+        Index("uq_commodity_prices_commodity_market_date", "commodity_name", "market", "date", unique=True),
+        # Per-commodity date ranges and latest-first reads (history, feature store seeding)
+        Index("ix_commodity_prices_commodity_date", "commodity_name", "date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    commodity_name = Column(String, index=True)
+    commodity_name = Column(String)  # Leading column of the composite indexes above
     date = Column(Date, index=True)
     
     # Price data
@@ -31,6 +38,20 @@ class CommodityPrice(Base):
     
     created_at = Column(DateTime, default=datetime.utcnow)
 
+class Commodity(Base):
+    """
+    Materialized list of commodities with price data
+
+    Maintained as prices are written, so listing commodities does not need
+    a SELECT DISTINCT over the whole commodity_prices table.
+    """
+    __tablename__ = "commodities"
+
+    name = Column(String, primary_key=True)
+    first_price_date = Column(Date)
+    last_price_date = Column(Date)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class PricePrediction(Base):
     """
     Store price predictions
@@ -57,17 +78,36 @@ class PricePrediction(Base):
 class MarketTrend(Base):
     """
     Aggregate market trends and insights
+
+    One row per commodity and calendar month, computed by trends.py.
     """
     __tablename__ = "market_trends"
+    __table_args__ = (
+        Index("uq_market_trends_commodity_year_month", "commodity_name", "year", "month_number", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     commodity_name = Column(String, index=True)
-    month = Column(String)
+    month = Column(String)  # January, February, ...
+    month_number = Column(Integer)  # 1-12, for ordering
     year = Column(Integer)
     
-    avg_price = Column(Float)
-    price_volatility = Column(Float)
-    trend_direction = Column(String)  # increasing, decreasing, stable
-    seasonal_factor = Column(Float)
+    avg_price = Column(Float)  # Mean of the daily average prices
+    price_volatility = Column(Float)  # Std / mean of the daily average prices
+    trend_direction = Column(String)  # increasing, decreasing, stable (vs the previous month)
+    seasonal_factor = Column(Float)  # avg_price / mean of the last 12 months
     
     created_at = Column(DateTime, default=datetime.utcnow)
+
+class PendingTrendMonth(Base):
+    """
+    Commodity month whose prices changed since its MarketTrend row was computed
+
+    Marked as prices are written; trends.py recomputes and clears them.
+    """
+    __tablename__ = "market_trend_pending"
+
+    commodity_name = Column(String, primary_key=True)
+    year = Column(Integer, primary_key=True)
+    month_number = Column(Integer, primary_key=True)
+    marked_at = Column(DateTime, default=datetime.utcnow)
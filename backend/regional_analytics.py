@@ -0,0 +1,177 @@
+"""
+REGIONAL ANALYTICS
+SQL aggregation behind GET /api/government/regions
+
+Everything is computed in the database with GROUP BY / AVG over
+crop_recommendations, filtered by state, district and creation date, so
+memory stays flat however many recommendations a region has:
+
+- summary:     recommendation count, crop distribution, soil averages
+- percentiles: 25th / 50th / 75th of N, P, K and pH (percentile_cont on
+               PostgreSQL, a ROW_NUMBER window elsewhere; one sort per metric)
+- districts:   per-district count, crop distribution and soil averages,
+               read from a cursor in district order so the endpoint can
+               stream them
+"""
+
+import math
+from datetime import date, datetime, time, timedelta
+from typing import AsyncIterator, Dict, List, Optional
+
+from sqlalchemy import Float, func, select
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.crop_models import CropRecommendation
+
+# Response key -> column, in the order of the original soil_health_average
+SOIL_COLUMNS = {
+    "n": CropRecommendation.nitrogen,
+    "p": CropRecommendation.phosphorus,
+    "k": CropRecommendation.potassium,
+    "ph": CropRecommendation.ph
+}
+PERCENTILES = (0.25, 0.5, 0.75)
+
+# Recommendations without a district are grouped as "Unknown"
+DISTRICT = func.coalesce(func.nullif(CropRecommendation.district, ""), "Unknown")
+
+def region_conditions(
+    state: Optional[str] = None,
+    district: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+) -> list:
+    """WHERE conditions for a region and an inclusive date range"""
+    conditions = []
+    if state:
+        conditions.append(CropRecommendation.state == state)
+    if district:
+        conditions.append(CropRecommendation.district == district)
+    if start_date:
+        conditions.append(CropRecommendation.created_at >= datetime.combine(start_date, time.min))
+    if end_date:
+        conditions.append(CropRecommendation.created_at < datetime.combine(end_date + timedelta(days=1), time.min))
+    return conditions
+
+def _soil_average(sums: Dict[str, float], counts: Dict[str, int]) -> Dict[str, Optional[float]]:
+    return {
+        f"avg_{key}": round(sums[key] / counts[key], 2) if counts[key] else None
+        for key in SOIL_COLUMNS
+    }
+
+async def region_summary(db: AsyncSession, conditions: list) -> dict:
+    """Count, crop distribution and soil averages of the matching recommendations (one scan)"""
+    keys = list(SOIL_COLUMNS)
+    crop_count = func.count()
+    rows = (await db.execute(
+        select(
+            CropRecommendation.recommended_crop,
+            crop_count,
+            *[func.sum(column) for column in SOIL_COLUMNS.values()],
+            *[func.count(column) for column in SOIL_COLUMNS.values()]
+        )
+        .where(*conditions)
+        .group_by(CropRecommendation.recommended_crop)
+        .order_by(crop_count.desc())
+    )).all()
+
+    sums, counts = dict.fromkeys(keys, 0.0), dict.fromkeys(keys, 0)
+    for row in rows:
+        for i, key in enumerate(keys):
+            sums[key] += row[2 + i] or 0.0
+            counts[key] += row[2 + len(keys) + i]
+
+    return {
+        "count": sum(row[1] for row in rows),
+        "crop_distribution": {row[0] or "Unknown": row[1] for row in rows},
+        "soil_health_average": _soil_average(sums, counts),
+        "soil_value_counts": counts
+    }
+
+async def _percentiles_by_rank(db: AsyncSession, column, conditions: list, count: int) -> List[float]:
+    """Linear interpolation between the two ranks around each percentile, as percentile_cont does"""
+    positions = {}
+    for point in PERCENTILES:
+        rank = point * (count - 1)
+        positions[point] = (math.floor(rank), min(math.floor(rank) + 1, count - 1), rank - math.floor(rank))
+    wanted = {position for low, high, _ in positions.values() for position in (low, high)}
+
+    ranked = (
+        select(column.label("value"), (func.row_number().over(order_by=column) - 1).label("rank"))
+        .where(column.isnot(None), *conditions)
+        .subquery()
+    )
+    values = dict((await db.execute(
+        select(ranked.c.rank, ranked.c.value).where(ranked.c.rank.in_(wanted))
+    )).all())
+    return [values[low] + (values[high] - values[low]) * fraction for low, high, fraction in positions.values()]
+
+async def region_percentiles(db: AsyncSession, conditions: list, value_counts: Dict[str, int]) -> dict:
+    """{"n": {"p25": ..., "p50": ..., "p75": ...}, ...} for the soil metrics with any values"""
+    labels = [f"p{round(point * 100)}" for point in PERCENTILES]
+    keys = [key for key in SOIL_COLUMNS if value_counts.get(key)]
+    if not keys:
+        return {}
+
+    if db.get_bind().dialect.name == "postgresql":
+        points = array(PERCENTILES, type_=Float)
+        row = (await db.execute(
+            select(*[func.percentile_cont(points).within_group(SOIL_COLUMNS[key]) for key in keys])
+            .where(*conditions)
+        )).one()
+        values = dict(zip(keys, row))
+    else:
+        values = {
+            key: await _percentiles_by_rank(db, SOIL_COLUMNS[key], conditions, value_counts[key])
+            for key in keys
+        }
+
+    return {
+        key: {label: round(float(value), 2) for label, value in zip(labels, values[key])}
+        for key in keys
+    }
+
+def district_breakdown_query(conditions: list):
+    """(district, crop) groups with counts and soil sums, ordered by district"""
+    return (
+        select(
+            DISTRICT,
+            CropRecommendation.recommended_crop,
+            func.count(),
+            *[func.sum(column) for column in SOIL_COLUMNS.values()],
+            *[func.count(column) for column in SOIL_COLUMNS.values()]
+        )
+        .where(*conditions)
+        .group_by(DISTRICT, CropRecommendation.recommended_crop)
+        .order_by(DISTRICT, CropRecommendation.recommended_crop)
+    )
+
+async def iter_districts(rows: AsyncIterator) -> AsyncIterator[dict]:
+    """Merge the (district, crop) groups of district_breakdown_query into one dict per district"""
+    keys = list(SOIL_COLUMNS)
+    current = None
+    async for row in rows:
+        district, crop, count = row[0], row[1] or "Unknown", row[2]
+        if current is None or current["district"] != district:
+            if current is not None:
+                yield _finish_district(current)
+            current = {
+                "district": district, "total": 0, "crop_distribution": {},
+                "sums": dict.fromkeys(keys, 0.0), "counts": dict.fromkeys(keys, 0)
+            }
+        current["total"] += count
+        current["crop_distribution"][crop] = current["crop_distribution"].get(crop, 0) + count
+        for i, key in enumerate(keys):
+            current["sums"][key] += row[3 + i] or 0.0
+            current["counts"][key] += row[3 + len(keys) + i]
+    if current is not None:
+        yield _finish_district(current)
+
+def _finish_district(district: dict) -> dict:
+    return {
+        "district": district["district"],
+        "total": district["total"],
+        "crop_distribution": dict(sorted(district["crop_distribution"].items(), key=lambda item: -item[1])),
+        "soil_health_average": _soil_average(district["sums"], district["counts"])
+    }
@@ -4,26 +4,54 @@ FastAPI endpoints for multilingual AI chatbot using Gemini
 
 Endpoints:
 - POST /api/advisory/chat - Send message and get AI response
+- POST /api/advisory/chat/stream - Send message and stream the AI response (SSE)
 - POST /api/advisory/session - Create new chat session
-- GET /api/advisory/session/{session_id} - Get session history
+- GET /api/advisory/session/{session_id} - Get session history (paginated)
+- GET /api/advisory/session/{session_id}/archive - Archived messages of a session
+- GET /api/advisory/cache/stats - Response cache hit/miss counters
+- GET /api/advisory/llm/stats - Gemini API client counters and circuit state
+- GET /api/advisory/chat-log/stats - Chat log write queue counters
+- GET /api/advisory/session-lifecycle/stats - Session expiry and archive run report
 - GET /api/advisory/languages - Get supported languages
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
+import json
+import os
 import uuid
 
+from ai.conversation import HISTORY_MESSAGES
+from cache import LocalCache
+from chat_log import chat_log, chat_turn
 from database import get_db
-from models.advisory_models import ChatSession, ChatMessage, FarmerQuery
-from ai.gemini_advisor import GeminiAdvisor
+from models.advisory_models import ChatArchive, ChatSession, ChatMessage
+from model_registry import model_registry
+import session_lifecycle
 
 router = APIRouter()
 
-# Initialize Gemini AI advisor
-gemini_advisor = GeminiAdvisor()
+def load_gemini_advisor():
+    """Initialize the Gemini AI advisor (imported here so app startup stays fast)"""
+    from ai.gemini_advisor import GeminiAdvisor
+    return GeminiAdvisor()
+
+# Gemini AI advisor is initialized in the background during app startup
+model_registry.register("advisor", load_gemini_advisor)
+get_gemini_advisor = model_registry.dependency("advisor")
+
+# Prompt prefix and recent turns per chat session, updated as turns are written
+conversation_cache = LocalCache(
+    "conversations",
+    maxsize=int(os.getenv("CONVERSATION_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("CONVERSATION_CACHE_TTL", "3600"))
+)
 
 # Request/Response schemas
 class ChatRequest(BaseModel):
@@ -40,6 +68,8 @@ class ChatResponse(BaseModel):
     language: str
     timestamp: datetime
     suggestions: List[str]
+    prompt_tokens: Optional[int] = Field(None, description="Estimated prompt size sent to the model")
+    cached: bool = Field(False, description="Answered from the response cache, without a model call")
 
 class SessionCreateRequest(BaseModel):
     """Create new chat session"""
@@ -49,10 +79,75 @@ class SessionCreateRequest(BaseModel):
     crop_interest: Optional[str] = None
     farm_size: Optional[float] = None
 
+async def load_conversation(db: AsyncSession, session: ChatSession, gemini_advisor):
+    """
+    The session's prompt prefix and recent turns, from the context cache
+    
+    The history is only read when the session is not cached, or another
+    worker has written to it since (last_activity moved past this worker's
+    latest turn, which may still be queued in the chat log). Turns still
+    queued are added to the history read, as they are not stored yet.
+    """
+    conversation = conversation_cache.get(session.session_id)
+    # Turns this worker has queued but not written yet are already in the cached conversation
+    queued = chat_log.last_activity(session.session_id)
+    version = max(session.last_activity, queued) if queued else session.last_activity
+    if conversation is None or conversation.version != version:
+        recent = (await db.execute(
+            select(ChatMessage.role, ChatMessage.content, ChatMessage.timestamp)
+            .where(ChatMessage.session_id == session.session_id)
+            .order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc())
+            .limit(HISTORY_MESSAGES)
+        )).all()
+        history = [(role, content) for role, content, _ in reversed(recent)]
+        # A batch may have been written while the history was read
+        stored = {(content, timestamp) for role, content, timestamp in recent if role == "assistant"}
+        for turn in chat_log.pending_turns(session.session_id):
+            if (turn["response"], turn["answered_at"]) not in stored:
+                history += [("user", turn["message"]), ("assistant", turn["response"])]
+        conversation = gemini_advisor.new_conversation(
+            {"location": session.farmer_location, "crop_interest": session.crop_interest},
+            history,
+            version=version
+        )
+        conversation_cache.set(session.session_id, conversation)
+    return conversation
+
+async def save_turn(
+    session: ChatSession,
+    request: ChatRequest,
+    ai_response: dict,
+    conversation,
+    db: Optional[AsyncSession] = None
+):
+    """Queue the question, the answer and the analytics log row of a chat turn for the chat log writer"""
+    turn = chat_turn(session, request.message, request.language, ai_response)
+    await chat_log.submit(turn, db)
+    conversation.add("user", request.message)
+    conversation.add("assistant", ai_response["response"], version=turn["last_activity"])
+
+def chat_response(request: ChatRequest, ai_response: dict) -> ChatResponse:
+    """Response body of a chat turn"""
+    return ChatResponse(
+        session_id=request.session_id,
+        message=request.message,
+        response=ai_response["response"],
+        language=request.language,
+        timestamp=datetime.utcnow(),
+        suggestions=ai_response.get("suggestions", []),
+        prompt_tokens=ai_response.get("prompt_tokens"),
+        cached=ai_response.get("cached", False)
+    )
+
+def server_sent_event(event: str, data: dict) -> str:
+    """One Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
 @router.post("/chat", response_model=ChatResponse)
 async def chat_with_ai(
     request: ChatRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    gemini_advisor = Depends(get_gemini_advisor)
 ):
     """
     Send message to AI advisor and get response
@@ -60,85 +155,96 @@ async def chat_with_ai(
     """
     try:
         # Verify session exists
-        session = db.query(ChatSession)\
-            .filter(ChatSession.session_id == request.session_id)\
-            .first()
+        session = await db.scalar(
+            select(ChatSession).where(ChatSession.session_id == request.session_id)
+        )
         
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
         
-        # Get chat history for context
-        history = db.query(ChatMessage)\
-            .filter(ChatMessage.session_id == request.session_id)\
-            .order_by(ChatMessage.timestamp)\
-            .limit(10)\
-            .all()
+        conversation = await load_conversation(db, session, gemini_advisor)
         
         # Generate AI response using Gemini
         ai_response = await gemini_advisor.generate_response(
             message=request.message,
             language=request.language,
-            history=history,
-            context={
-                "location": session.farmer_location,
-                "crop_interest": session.crop_interest
-            }
-        )
-        
-        # Store user message
-        user_message = ChatMessage(
-            session_id=request.session_id,
-            role="user",
-            content=request.message,
-            original_language=request.language,
-            timestamp=datetime.utcnow()
+            conversation=conversation
         )
-        db.add(user_message)
         
-        # Store AI response
-        ai_message = ChatMessage(
-            session_id=request.session_id,
-            role="assistant",
-            content=ai_response["response"],
-            original_language=request.language,
-            tokens_used=ai_response.get("tokens_used", 0),
-            response_time_ms=ai_response.get("response_time_ms", 0),
-            timestamp=datetime.utcnow()
-        )
-        db.add(ai_message)
+        await save_turn(session, request, ai_response, conversation, db)
         
-        # Update session activity
-        session.last_activity = datetime.utcnow()
+        return chat_response(request, ai_response)
         
-        # Log query for analytics
-        query_log = FarmerQuery(
-            farmer_id=session.farmer_id,
-            query_text=request.message,
-            query_category=ai_response.get("category", "general"),
-            language=request.language,
-            response_generated=True,
-            location=session.farmer_location
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Chat failed: {str(e)}")
+
+@router.post("/chat/stream")
+async def stream_chat_with_ai(
+    request: ChatRequest,
+    db: AsyncSession = Depends(get_db),
+    gemini_advisor = Depends(get_gemini_advisor)
+):
+    """
+    Send message to AI advisor and stream the response (Server-Sent Events)
+    
+    Events: "delta" ({"text": ...}) for each chunk of the answer as it is
+    generated, then "done" (the /chat response) or "error" ({"detail": ...}).
+    The turn is queued for storage after the last event has been sent.
+    """
+    try:
+        session = await db.scalar(
+            select(ChatSession).where(ChatSession.session_id == request.session_id)
         )
-        db.add(query_log)
         
-        db.commit()
+        if not session:
+            raise HTTPException(status_code=404, detail="Session not found")
         
-        return ChatResponse(
-            session_id=request.session_id,
-            message=request.message,
-            response=ai_response["response"],
-            language=request.language,
-            timestamp=datetime.utcnow(),
-            suggestions=ai_response.get("suggestions", [])
-        )
+        conversation = await load_conversation(db, session, gemini_advisor)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat failed: {str(e)}")
+    
+    # Filled in by the stream; stored by the background task once it is sent
+    turn = {}
+    
+    async def events():
+        try:
+            async for event in gemini_advisor.stream_response(
+                message=request.message,
+                language=request.language,
+                conversation=conversation
+            ):
+                if "delta" in event:
+                    yield server_sent_event("delta", {"text": event["delta"]})
+            turn["ai_response"] = event
+            yield server_sent_event("done", chat_response(request, event).model_dump(mode="json"))
+        except Exception as e:
+            yield server_sent_event("error", {"detail": f"Chat failed: {str(e)}"})
+    
+    async def store_turn():
+        if "ai_response" not in turn:
+            return
+        try:
+            await save_turn(session, request, turn["ai_response"], conversation)
+        except Exception as e:
+            print(f"Failed to store chat turn of session {request.session_id}: {e}")
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Proxies must not buffer the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(store_turn)
+    )
 
 @router.post("/session")
 async def create_session(
     request: SessionCreateRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Create new chat session"""
     session_id = str(uuid.uuid4())
@@ -153,7 +259,7 @@ async def create_session(
     )
     
     db.add(session)
-    db.commit()
+    await db.commit()
     
     return {
         "session_id": session_id,
@@ -162,29 +268,163 @@ async def create_session(
         "created_at": session.started_at
     }
 
+# Message fields returned by the session history, in order
+HISTORY_COLUMNS = (
+    ChatMessage.id, ChatMessage.role, ChatMessage.content, ChatMessage.original_language,
+    ChatMessage.translated_content, ChatMessage.timestamp, ChatMessage.tokens_used,
+    ChatMessage.response_time_ms
+)
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
 @router.get("/session/{session_id}")
 async def get_session_history(
     session_id: str,
-    db: Session = Depends(get_db)
+    limit: int = Query(100, ge=1, le=1000, description="Messages per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    order: str = Query("asc", pattern="^(asc|desc)$", description="asc: oldest first; desc: latest first"),
+    response_format: str = Query("rows", alias="format", pattern="^(rows|columns)$", description="rows: one object per message; columns: one array per field"),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get chat session history"""
-    session = db.query(ChatSession)\
-        .filter(ChatSession.session_id == session_id)\
-        .first()
+    """
+    Get chat session history
+    
+    Keyset-paginated on (timestamp, id): pass next_cursor back as cursor to
+    get the following page. Each page is a range scan of the (session_id,
+    timestamp, id) index, however long the session. message_count is kept on
+    the session as turns are written, not counted here.
+    """
+    session = (await db.execute(
+        select(
+            ChatSession.session_id, ChatSession.farmer_id, ChatSession.language,
+            ChatSession.started_at, ChatSession.last_activity, ChatSession.is_active,
+            ChatSession.farmer_location, ChatSession.crop_interest, ChatSession.farm_size,
+            ChatSession.message_count, ChatSession.last_message_id
+        ).where(ChatSession.session_id == session_id)
+    )).mappings().first()
     
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    messages = db.query(ChatMessage)\
-        .filter(ChatMessage.session_id == session_id)\
-        .order_by(ChatMessage.timestamp)\
-        .all()
+    query = select(*HISTORY_COLUMNS).where(ChatMessage.session_id == session_id)
+    if cursor:
+        try:
+            cursor_timestamp, _, cursor_id = cursor.rpartition(":")
+            cursor_timestamp, after_id = datetime.fromisoformat(cursor_timestamp), int(cursor_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        # A single timestamp bound, so the index seeks straight to the page
+        if order == "asc":
+            query = query.where(
+                ChatMessage.timestamp >= cursor_timestamp,
+                or_(ChatMessage.timestamp > cursor_timestamp, ChatMessage.id > after_id)
+            )
+        else:
+            query = query.where(
+                ChatMessage.timestamp <= cursor_timestamp,
+                or_(ChatMessage.timestamp < cursor_timestamp, ChatMessage.id < after_id)
+            )
+    if order == "asc":
+        query = query.order_by(ChatMessage.timestamp, ChatMessage.id)
+    else:
+        query = query.order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc())
     
-    return {
-        "session": session,
+    rows = (await db.execute(query.limit(limit + 1))).all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = f"{rows[-1].timestamp.isoformat()}:{rows[-1].id}"
+    
+    # Plain JSON values, returned as they are (no per-field encoding pass)
+    names = [column.name for column in HISTORY_COLUMNS]
+    values = [
+        (message_id, role, content, original_language, translated_content, _isoformat(timestamp), tokens_used, response_time_ms)
+        for message_id, role, content, original_language, translated_content, timestamp, tokens_used, response_time_ms in rows
+    ]
+    if response_format == "columns":
+        messages = {name: list(column) for name, column in zip(names, zip(*values))} if values else {name: [] for name in names}
+    else:
+        messages = [dict(zip(names, row), session_id=session_id) for row in values]
+    
+    return JSONResponse({
+        "session": {
+            **session,
+            "started_at": _isoformat(session["started_at"]),
+            "last_activity": _isoformat(session["last_activity"]),
+            "message_count": session["message_count"] or 0
+        },
         "messages": messages,
-        "message_count": len(messages)
-    }
+        "message_count": session["message_count"] or 0,
+        "count": len(values),
+        "next_cursor": next_cursor
+    })
+
+@router.get("/session/{session_id}/archive")
+async def get_session_archive(
+    session_id: str,
+    include_messages: bool = Query(False, description="Decompress the archived messages (one array per field)"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Messages of a session moved out of its history by session_lifecycle.py, oldest first"""
+    try:
+        columns = [
+            ChatArchive.id, ChatArchive.first_message_id, ChatArchive.last_message_id,
+            ChatArchive.started_at, ChatArchive.ended_at, ChatArchive.message_count,
+            ChatArchive.summary, ChatArchive.archived_at
+        ]
+        if include_messages:
+            columns.append(ChatArchive.messages)
+        archives = (await db.execute(
+            select(*columns)
+            .where(ChatArchive.session_id == session_id)
+            .order_by(ChatArchive.ended_at, ChatArchive.id)
+        )).mappings().all()
+        
+        if not archives and not await db.scalar(
+            select(ChatSession.id).where(ChatSession.session_id == session_id)
+        ):
+            raise HTTPException(status_code=404, detail="Session not found")
+        
+        archives = [dict(archive) for archive in archives]
+        if include_messages:
+            for archive in archives:
+                archive["messages"] = session_lifecycle.decompress(archive["messages"])
+        
+        return {
+            "session_id": session_id,
+            "archives": archives,
+            "count": len(archives),
+            "message_count": sum(archive["message_count"] or 0 for archive in archives)
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to read archive: {str(e)}")
+
+@router.get("/cache/stats")
+async def get_response_cache_stats(gemini_advisor = Depends(get_gemini_advisor)):
+    """Response cache hit/miss counters (per worker)"""
+    return gemini_advisor.response_cache.stats()
+
+@router.get("/llm/stats")
+async def get_llm_stats(gemini_advisor = Depends(get_gemini_advisor)):
+    """Gemini API client counters and circuit state (per worker)"""
+    if gemini_advisor.model == "mock":
+        return {"backend": "mock"}
+    return gemini_advisor.model.stats()
+
+@router.get("/chat-log/stats")
+async def get_chat_log_stats():
+    """Chat log write queue counters (per worker)"""
+    return chat_log.stats()
+
+@router.get("/session-lifecycle/stats")
+async def get_session_lifecycle_stats():
+    """Session expiry and archive settings, and the report of the last run (per worker)"""
+    return session_lifecycle.stats()
 
 @router.get("/languages")
 async def get_supported_languages():
@@ -4,24 +4,38 @@ FastAPI endpoints for crop recommendation
 
 Endpoints:
 - POST /api/crops/recommend - Get crop recommendations
+- POST /api/crops/recommend/batch - Get crop recommendations for many samples
+- POST /api/crops/suitability - Rank every crop's ideal ranges against a reading
 - GET /api/crops/database - Get crop information database
+- GET /api/crops/database/stats - Crop reference data loads and invalidations
+- GET /api/crops/model - Get model type and inference latency
+- GET /api/crops/cache/stats - Prediction cache hit/miss counters
 - GET /api/crops/history/{farmer_id} - Get farmer's recommendation history
 """
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 
 from database import get_db
-from models.crop_models import CropRecommendation, CropDatabase
-from ml.crop_predictor import CropPredictor
+from analytics import record_recommendations
+from crop_reference import crop_reference
+from models.crop_models import CropRecommendation
+from model_registry import model_registry
 
 router = APIRouter()
 
-# Initialize ML model (load pre-trained model)
-crop_predictor = CropPredictor()
+def load_crop_predictor():
+    """Load the pre-trained ML model (imported here so app startup stays fast)"""
+    from ml.crop_predictor import CropPredictor
+    return CropPredictor()
+
+# ML model is loaded in the background during app startup
+model_registry.register("crop", load_crop_predictor)
+get_crop_predictor = model_registry.dependency("crop")
 
 # Request/Response schemas
 class CropRecommendationRequest(BaseModel):
@@ -35,6 +49,7 @@ class CropRecommendationRequest(BaseModel):
     rainfall: float = Field(..., ge=0, le=500, description="Rainfall (mm)")
     soil_type: Optional[str] = Field(None, description="Soil type")
     state: Optional[str] = Field(None, description="State/Region")
+    district: Optional[str] = Field(None, description="District")
     farmer_id: Optional[str] = Field(None, description="Farmer ID")
 
 class CropRecommendationResponse(BaseModel):
@@ -43,14 +58,24 @@ class CropRecommendationResponse(BaseModel):
     confidence_score: float
     alternative_crops: List[dict]
     reasoning: str
-    ideal_conditions: dict
+    ideal_conditions: str
     expected_yield: str
     market_potential: str
 
+class CropBatchRecommendationRequest(BaseModel):
+    """Many soil samples, e.g. a soil lab upload"""
+    samples: List[CropRecommendationRequest] = Field(..., min_length=1, max_length=100000)
+
+class CropBatchRecommendationResponse(BaseModel):
+    """Crop recommendation results, in the same order as the samples"""
+    results: List[CropRecommendationResponse]
+    count: int
+
 @router.post("/recommend", response_model=CropRecommendationResponse)
 async def recommend_crop(
     request: CropRecommendationRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    crop_predictor = Depends(get_crop_predictor)
 ):
     """
     Get crop recommendation based on soil and climate parameters
@@ -68,8 +93,8 @@ async def recommend_crop(
             request.rainfall
         ]
         
-        # Get prediction from ML model
-        prediction = crop_predictor.predict(features)
+        # Get prediction from ML model, alternatives ranked by the crops' ideal ranges
+        prediction = crop_predictor.predict(features, suitability=await crop_reference.index(db))
         
         # Store in database
         recommendation = CropRecommendation(
@@ -83,12 +108,13 @@ async def recommend_crop(
             rainfall=request.rainfall,
             soil_type=request.soil_type,
             state=request.state,
+            district=request.district,
             recommended_crop=prediction["crop"],
             confidence_score=prediction["confidence"],
             alternative_crops=prediction["alternatives"]
         )
         db.add(recommendation)
-        db.commit()
+        await db.commit()
         
         return CropRecommendationResponse(
             recommended_crop=prediction["crop"],
@@ -103,28 +129,140 @@ async def recommend_crop(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
+@router.post("/recommend/batch", response_model=CropBatchRecommendationResponse)
+async def recommend_crops_batch(
+    request: CropBatchRecommendationRequest,
+    db: AsyncSession = Depends(get_db),
+    crop_predictor = Depends(get_crop_predictor)
+):
+    """
+    Get crop recommendations for many samples at once
+    Runs the model once over the whole N x 7 feature matrix and stores
+    all recommendations with a single bulk insert
+    """
+    try:
+        features = [
+            [
+                sample.nitrogen,
+                sample.phosphorus,
+                sample.potassium,
+                sample.temperature,
+                sample.humidity,
+                sample.ph,
+                sample.rainfall
+            ]
+            for sample in request.samples
+        ]
+        
+        predictions = crop_predictor.predict_batch(features, suitability=await crop_reference.index(db))
+        
+        # Store in database, counting them for the analytics dashboard in the same transaction
+        now = datetime.utcnow()
+        rows = [
+            {
+                "farmer_id": sample.farmer_id or "anonymous",
+                "nitrogen": sample.nitrogen,
+                "phosphorus": sample.phosphorus,
+                "potassium": sample.potassium,
+                "temperature": sample.temperature,
+                "humidity": sample.humidity,
+                "ph": sample.ph,
+                "rainfall": sample.rainfall,
+                "soil_type": sample.soil_type,
+                "state": sample.state,
+                "district": sample.district,
+                "recommended_crop": prediction["crop"],
+                "confidence_score": prediction["confidence"],
+                "alternative_crops": prediction["alternatives"],
+                "created_at": now
+            }
+            for sample, prediction in zip(request.samples, predictions)
+        ]
+        await db.execute(insert(CropRecommendation), rows)
+        await db.run_sync(lambda session: record_recommendations(session.connection(), rows))
+        await db.commit()
+        
+        results = [
+            CropRecommendationResponse(
+                recommended_crop=prediction["crop"],
+                confidence_score=prediction["confidence"],
+                alternative_crops=prediction["alternatives"],
+                reasoning=prediction["reasoning"],
+                ideal_conditions=prediction["ideal_conditions"],
+                expected_yield=prediction["expected_yield"],
+                market_potential=prediction["market_potential"]
+            )
+            for prediction in predictions
+        ]
+        
+        return CropBatchRecommendationResponse(results=results, count=len(results))
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch prediction failed: {str(e)}")
+
+@router.get("/model")
+async def get_model_info(crop_predictor = Depends(get_crop_predictor)):
+    """Get the loaded model type, its crop classes and inference latency"""
+    return crop_predictor.get_model_info()
+
+@router.get("/cache/stats")
+async def get_prediction_cache_stats(crop_predictor = Depends(get_crop_predictor)):
+    """Prediction cache hit/miss counters and quantization steps (per worker)"""
+    return crop_predictor.cache_stats()
+
+@router.post("/suitability")
+async def score_crop_suitability(
+    request: CropRecommendationRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Rank every crop in the crop database by how well its ideal ranges fit
+    the reading, with the gap of each feature outside them
+    """
+    try:
+        features = [
+            request.nitrogen,
+            request.phosphorus,
+            request.potassium,
+            request.temperature,
+            request.humidity,
+            request.ph,
+            request.rainfall
+        ]
+        index = await crop_reference.index(db)
+        crops = index.rank([features])[0]
+        return {"crops": crops, "total": len(crops), "index_version": index.version}
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Suitability scoring failed: {str(e)}")
+
 @router.get("/database")
 async def get_crop_database(
     crop_type: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get crop information database"""
-    query = db.query(CropDatabase)
+    """Get crop information database (held in memory, see crop_reference.py)"""
+    crops = await crop_reference.crops(db)
     if crop_type:
-        query = query.filter(CropDatabase.crop_type == crop_type)
-    crops = query.all()
+        crops = [crop for crop in crops if crop["crop_type"] == crop_type]
     return {"crops": crops, "total": len(crops)}
 
+@router.get("/database/stats")
+async def get_crop_database_stats():
+    """Crop reference data loads, hits and invalidations (per worker)"""
+    return crop_reference.stats()
+
 @router.get("/history/{farmer_id}")
 async def get_farmer_history(
     farmer_id: str,
     limit: int = 10,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get farmer's recommendation history"""
-    recommendations = db.query(CropRecommendation)\
-        .filter(CropRecommendation.farmer_id == farmer_id)\
-        .order_by(CropRecommendation.created_at.desc())\
-        .limit(limit)\
-        .all()
+    recommendations = (await db.scalars(
+        select(CropRecommendation)
+        .where(CropRecommendation.farmer_id == farmer_id)
+        .order_by(CropRecommendation.created_at.desc())
+        .limit(limit)
+    )).all()
     return {"recommendations": recommendations, "count": len(recommendations)}
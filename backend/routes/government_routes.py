@@ -4,26 +4,41 @@ FastAPI endpoints for government intervention and analytics
 
 Endpoints:
 - GET /api/government/analytics - Overall agriculture analytics
-- GET /api/government/regions - Regional analysis
+- GET /api/government/regions - Regional analysis by state, district and date range
 - GET /api/government/alerts - Critical alerts and interventions needed
 - POST /api/government/intervention - Record intervention action
 - GET /api/government/trends - Trend analysis
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
-from datetime import datetime, timedelta
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import date, datetime, timedelta
+from sqlalchemy import case, func, select
+import json
 
-from database import get_db
-from models.crop_models import CropRecommendation
-from models.price_models import CommodityPrice, MarketTrend
-from models.advisory_models import FarmerQuery
+from database import get_db, AsyncSessionLocal
+from analytics import CROP, STATE, QUERY_CATEGORY, NEW_FARMER, compact
+from regional_analytics import (
+    region_conditions, region_summary, region_percentiles,
+    district_breakdown_query, iter_districts
+)
+from models.analytics_models import AnalyticsDailyCount, Alert
+from models.price_models import MarketTrend
 
 router = APIRouter()
 
+# Regional analyses with more districts than this are streamed
+STREAM_DISTRICTS_OVER = 100
+
+# Supported /trends metrics -> analytics rollup dimension (market_prices reads market_trends)
+TREND_METRICS = {"crop_adoption": CROP, "platform_usage": QUERY_CATEGORY, "market_prices": None}
+
+SEVERITY_ORDER = case({"high": 0, "medium": 1}, value=Alert.severity, else_=2)
+
 class InterventionRequest(BaseModel):
     """Government intervention record"""
     region: str
@@ -32,61 +47,78 @@ class InterventionRequest(BaseModel):
     budget_allocated: float
     crops_affected: List[str]
 
+def top_counts(dimension: str, limit: int):
+    """Keys of one rollup dimension with the most events over all days"""
+    total = func.sum(AnalyticsDailyCount.count)
+    return (
+        select(AnalyticsDailyCount.key, total)
+        .where(AnalyticsDailyCount.dimension == dimension)
+        .group_by(AnalyticsDailyCount.key)
+        .order_by(total.desc())
+        .limit(limit)
+    )
+
 @router.get("/analytics")
-async def get_analytics(db: Session = Depends(get_db)):
+async def get_analytics(db: AsyncSession = Depends(get_db)):
     """
     Get comprehensive agriculture analytics
     - Total farmers using platform
     - Crop recommendations statistics
     - Price trends
     - Common farmer queries
+
+    Reads the daily rollup counters (analytics.py), so the cost grows with
+    the number of days, not with the number of recommendations and queries.
     """
     try:
         # Get date range
         thirty_days_ago = datetime.utcnow() - timedelta(days=30)
         
-        # Total farmers
-        total_farmers = db.query(func.count(func.distinct(CropRecommendation.farmer_id))).scalar()
+        totals_query = (
+            select(AnalyticsDailyCount.dimension, func.sum(AnalyticsDailyCount.count))
+            .group_by(AnalyticsDailyCount.dimension)
+        )
+        totals = dict((await db.execute(totals_query)).all())
+        if not totals:
+            # Counters not built yet (e.g. a database from before the rollups): one full scan
+            await db.run_sync(lambda session: compact(session.connection()))
+            await db.commit()
+            totals = dict((await db.execute(totals_query)).all())
         
-        # Crop recommendations
-        total_recommendations = db.query(func.count(CropRecommendation.id)).scalar()
-        recent_recommendations = db.query(func.count(CropRecommendation.id))\
-            .filter(CropRecommendation.created_at >= thirty_days_ago)\
-            .scalar()
+        # Farmers, total and recent recommendations
+        total_farmers = totals.get(NEW_FARMER)
+        total_recommendations = totals.get(CROP)
+        recent_recommendations = await db.scalar(
+            select(func.sum(AnalyticsDailyCount.count))
+            .where(AnalyticsDailyCount.dimension == CROP, AnalyticsDailyCount.day >= thirty_days_ago.date())
+        )
         
         # Top recommended crops
-        top_crops = db.query(
-            CropRecommendation.recommended_crop,
-            func.count(CropRecommendation.id).label('count')
-        ).group_by(CropRecommendation.recommended_crop)\
-         .order_by(func.count(CropRecommendation.id).desc())\
-         .limit(10)\
-         .all()
-        
-        # Price volatility analysis
-        price_data = db.query(CommodityPrice)\
-            .filter(CommodityPrice.date >= thirty_days_ago.date())\
-            .all()
+        top_crops = (await db.execute(top_counts(CROP, 10))).all()
         
         # Farmer queries analysis
-        total_queries = db.query(func.count(FarmerQuery.id)).scalar()
-        query_categories = db.query(
-            FarmerQuery.query_category,
-            func.count(FarmerQuery.id).label('count')
-        ).group_by(FarmerQuery.query_category)\
-         .order_by(func.count(FarmerQuery.id).desc())\
-         .limit(10)\
-         .all()
+        total_queries = totals.get(QUERY_CATEGORY)
+        query_categories = (await db.execute(top_counts(QUERY_CATEGORY, 10))).all()
         
         # Regional distribution
-        regional_data = db.query(
-            CropRecommendation.state,
-            func.count(CropRecommendation.id).label('count')
-        ).filter(CropRecommendation.state.isnot(None))\
-         .group_by(CropRecommendation.state)\
-         .order_by(func.count(CropRecommendation.id).desc())\
-         .limit(15)\
-         .all()
+        regional_data = (await db.execute(top_counts(STATE, 15))).all()
+        
+        # Most and least volatile commodities in the latest month with prices
+        latest_month = (await db.execute(
+            select(MarketTrend.year, MarketTrend.month_number)
+            .order_by(MarketTrend.year.desc(), MarketTrend.month_number.desc()).limit(1)
+        )).first()
+        volatility = {"high_volatility_commodities": [], "stable_commodities": []}
+        if latest_month:
+            ranked = (await db.scalars(
+                select(MarketTrend.commodity_name)
+                .where(MarketTrend.year == latest_month[0], MarketTrend.month_number == latest_month[1])
+                .order_by(MarketTrend.price_volatility.desc(), MarketTrend.commodity_name)
+            )).all()
+            # One ranking split in two, so a commodity is never both (stable: least volatile first)
+            high = ranked[:3]
+            volatility["high_volatility_commodities"] = high
+            volatility["stable_commodities"] = ranked[len(high):][::-1][:3]
         
         return {
             "overview": {
@@ -99,101 +131,133 @@ async def get_analytics(db: Session = Depends(get_db)):
             "top_crops": [{"crop": crop, "count": count} for crop, count in top_crops],
             "query_categories": [{"category": cat or "general", "count": count} for cat, count in query_categories],
             "regional_distribution": [{"state": state or "Unknown", "count": count} for state, count in regional_data],
-            "price_volatility": {
-                "high_volatility_commodities": ["Onion", "Tomato", "Potato"],
-                "stable_commodities": ["Rice", "Wheat", "Maize"]
-            }
+            "price_volatility": volatility
         }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analytics failed: {str(e)}")
 
+async def stream_regional_analysis(response: dict, head: List[dict], districts, session):
+    """The regional analysis JSON, with the district list written as it is read"""
+    try:
+        yield json.dumps(jsonable_encoder(response))[:-1] + ', "districts": ['
+        yield ", ".join(json.dumps(district) for district in head)
+        async for district in districts:
+            yield ", " + json.dumps(district)
+        yield "]}"
+    finally:
+        await session.close()
+
 @router.get("/regions")
 async def get_regional_analysis(
     state: Optional[str] = None,
-    db: Session = Depends(get_db)
+    district: Optional[str] = None,
+    start_date: Optional[date] = Query(None, description="First day (inclusive)"),
+    end_date: Optional[date] = Query(None, description="Last day (inclusive)"),
+    breakdown: bool = Query(True, description="Include per-district figures"),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get detailed regional analysis"""
-    query = db.query(CropRecommendation)
-    
-    if state:
-        query = query.filter(CropRecommendation.state == state)
-    
-    recommendations = query.all()
+    """
+    Get detailed regional analysis
+    Aggregated in the database (see regional_analytics.py); the response is
+    streamed when the district breakdown is large
+    """
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
     
-    if not recommendations:
-        return {
+    try:
+        conditions = region_conditions(state, district, start_date, end_date)
+        summary = await region_summary(db, conditions)
+        
+        if not summary["count"]:
+            return {
+                "state": state,
+                "data": [],
+                "message": "No data available for this region"
+            }
+        
+        response = {
             "state": state,
-            "data": [],
-            "message": "No data available for this region"
+            "district": district,
+            "start_date": start_date,
+            "end_date": end_date,
+            "total_farmers": summary["count"],
+            "crop_distribution": summary["crop_distribution"],
+            "soil_health_average": summary["soil_health_average"],
+            "soil_health_percentiles": await region_percentiles(db, conditions, summary["soil_value_counts"]),
+            "recommendations": "Focus on soil enrichment programs"
         }
-    
-    # Aggregate data
-    crop_distribution = {}
-    soil_health = {"avg_n": 0, "avg_p": 0, "avg_k": 0, "avg_ph": 0}
-    
-    for rec in recommendations:
-        crop = rec.recommended_crop
-        crop_distribution[crop] = crop_distribution.get(crop, 0) + 1
+        if not breakdown:
+            return response
         
-        soil_health["avg_n"] += rec.nitrogen
-        soil_health["avg_p"] += rec.phosphorus
-        soil_health["avg_k"] += rec.potassium
-        soil_health["avg_ph"] += rec.ph
-    
-    count = len(recommendations)
-    for key in soil_health:
-        soil_health[key] = round(soil_health[key] / count, 2)
-    
-    return {
-        "state": state,
-        "total_farmers": count,
-        "crop_distribution": crop_distribution,
-        "soil_health_average": soil_health,
-        "recommendations": "Focus on soil enrichment programs"
-    }
+        # Read districts from a cursor on a session of their own (the request's
+        # is closed when this returns); stream once there are too many to buffer
+        session = AsyncSessionLocal()
+        try:
+            districts = iter_districts(await session.stream(district_breakdown_query(conditions)))
+            head = []
+            async for district in districts:
+                head.append(district)
+                if len(head) > STREAM_DISTRICTS_OVER:
+                    return StreamingResponse(
+                        stream_regional_analysis(response, head, districts, session),
+                        media_type="application/json"
+                    )
+        except Exception:
+            await session.close()
+            raise
+        await session.close()
+        
+        response["districts"] = head
+        return response
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Regional analysis failed: {str(e)}")
 
 @router.get("/alerts")
-async def get_critical_alerts(db: Session = Depends(get_db)):
-    """Get critical alerts requiring government intervention"""
-    alerts = [
-        {
-            "id": 1,
-            "severity": "high",
-            "type": "price_volatility",
-            "commodity": "Onion",
-            "message": "Onion prices increased by 45% in last 7 days",
-            "affected_regions": ["Maharashtra", "Karnataka"],
-            "recommendation": "Consider price stabilization measures",
-            "created_at": datetime.utcnow().isoformat()
-        },
-        {
-            "id": 2,
-            "severity": "medium",
-            "type": "pest_outbreak",
-            "commodity": "Cotton",
-            "message": "High volume of pest control queries from Punjab",
-            "affected_regions": ["Punjab", "Haryana"],
-            "recommendation": "Deploy agricultural extension services",
-            "created_at": datetime.utcnow().isoformat()
-        },
-        {
-            "id": 3,
-            "severity": "high",
-            "type": "soil_health",
-            "message": "Low nitrogen levels detected in 60% of samples from Gujarat",
-            "affected_regions": ["Gujarat"],
-            "recommendation": "Subsidize nitrogen fertilizers",
-            "created_at": datetime.utcnow().isoformat()
+async def get_critical_alerts(
+    type: Optional[str] = None,
+    severity: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get critical alerts requiring government intervention (active alerts, most severe first)"""
+    try:
+        query = select(Alert).where(Alert.active.is_(True))
+        if type:
+            query = query.where(Alert.type == type)
+        if severity:
+            query = query.where(Alert.severity == severity)
+        alerts = (await db.scalars(
+            query.order_by(SEVERITY_ORDER, Alert.updated_at.desc()).limit(limit)
+        )).all()
+
+        return {
+            "alerts": [
+                {
+                    "id": alert.id,
+                    "severity": alert.severity,
+                    "type": alert.type,
+                    "commodity": alert.commodity,
+                    "message": alert.message,
+                    "affected_regions": alert.affected_regions or [],
+                    "recommendation": alert.recommendation,
+                    "metric_value": alert.metric_value,
+                    "created_at": alert.created_at.isoformat(),
+                    "updated_at": alert.updated_at.isoformat()
+                }
+                for alert in alerts
+            ],
+            "count": len(alerts)
         }
-    ]
-    
-    return {"alerts": alerts, "count": len(alerts)}
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Alerts failed: {str(e)}")
 
 @router.post("/intervention")
 async def record_intervention(
     request: InterventionRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Record government intervention action"""
     # In production, this would store in a separate InterventionLog table
@@ -208,30 +272,89 @@ async def record_intervention(
 async def get_trends(
     metric: str = "crop_adoption",
     period: str = "monthly",
-    db: Session = Depends(get_db)
+    commodity: Optional[str] = None,
+    months: int = Query(6, ge=2, le=60),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get trend analysis for various metrics"""
-    # Mock trend data
-    trends = {
-        "crop_adoption": {
-            "labels": ["Jan", "Feb", "Mar", "Apr", "May", "Jun"],
-            "data": [120, 145, 168, 192, 210, 245],
-            "growth_rate": "+15.2%"
-        },
-        "platform_usage": {
-            "labels": ["Jan", "Feb", "Mar", "Apr", "May", "Jun"],
-            "data": [850, 920, 1050, 1180, 1320, 1500],
-            "growth_rate": "+12.8%"
-        },
-        "farmer_satisfaction": {
-            "labels": ["Jan", "Feb", "Mar", "Apr", "May", "Jun"],
-            "data": [78, 81, 83, 85, 87, 89],
-            "growth_rate": "+2.3%"
+    """
+    Get trend analysis for various metrics, over the last `months` months
+    - crop_adoption: recommendations per month (analytics rollups)
+    - platform_usage: farmer queries per month (analytics rollups)
+    - market_prices: average price of `commodity`, or without one an
+      equal-weighted price index of all commodities (first month = 100),
+      up to the latest month with prices (market_trends)
+    """
+    if metric not in TREND_METRICS:
+        raise HTTPException(status_code=400, detail=f"metric must be one of: {', '.join(TREND_METRICS)}")
+    if period != "monthly":
+        raise HTTPException(status_code=400, detail="Only monthly trends are available")
+
+    try:
+        if metric == "market_prices":
+            periods, data = await market_price_series(db, commodity, months)
+        else:
+            periods, data = await monthly_counts(db, TREND_METRICS[metric], months)
+
+        growth_rate = None
+        if len(data) >= 2 and data[-1] is not None and data[-2]:
+            growth_rate = f"{(data[-1] / data[-2] - 1) * 100:+.1f}%"
+
+        return {
+            "metric": metric,
+            "period": period,
+            "trend": {
+                "labels": [month.strftime("%b %Y") for month in periods],
+                "data": data,
+                "growth_rate": growth_rate
+            }
         }
-    }
-    
-    return {
-        "metric": metric,
-        "period": period,
-        "trend": trends.get(metric, trends["crop_adoption"])
-    }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Trend analysis failed: {str(e)}")
+
+async def monthly_counts(db: AsyncSession, dimension: str, months: int):
+    """Monthly totals of one rollup dimension, for the current month and the months before it"""
+    # Imported here so app startup stays fast
+    import pandas as pd
+
+    periods = pd.period_range(end=pd.Period(datetime.utcnow(), freq="M"), periods=months, freq="M")
+    rows = (await db.execute(
+        select(AnalyticsDailyCount.day, func.sum(AnalyticsDailyCount.count))
+        .where(AnalyticsDailyCount.dimension == dimension,
+               AnalyticsDailyCount.day >= periods[0].start_time.date())
+        .group_by(AnalyticsDailyCount.day)
+    )).all()
+    daily = pd.DataFrame(rows, columns=["day", "count"])
+    totals = daily.groupby(pd.to_datetime(daily["day"]).dt.to_period("M"))["count"].sum()
+    return periods, [int(count) for count in totals.reindex(periods, fill_value=0)]
+
+async def market_price_series(db: AsyncSession, commodity: Optional[str], months: int):
+    """Monthly average price of a commodity, or the price index of all of them"""
+    import pandas as pd
+
+    latest = select(MarketTrend.year, MarketTrend.month_number)
+    if commodity:
+        latest = latest.where(MarketTrend.commodity_name == commodity)
+    latest = (await db.execute(
+        latest.order_by(MarketTrend.year.desc(), MarketTrend.month_number.desc()).limit(1)
+    )).first()
+    if latest is None:
+        return [], []
+
+    periods = pd.period_range(end=pd.Period(year=latest[0], month=latest[1], freq="M"), periods=months, freq="M")
+    query = (
+        select(MarketTrend.commodity_name, MarketTrend.year, MarketTrend.month_number, MarketTrend.avg_price)
+        .where(MarketTrend.year * 100 + MarketTrend.month_number >= periods[0].year * 100 + periods[0].month)
+    )
+    if commodity:
+        query = query.where(MarketTrend.commodity_name == commodity)
+    trends = pd.DataFrame((await db.execute(query)).all(), columns=["commodity", "year", "month", "avg_price"])
+    trends["period"] = pd.PeriodIndex.from_fields(year=trends["year"], month=trends["month"], freq="M")
+    prices = trends.pivot(index="period", columns="commodity", values="avg_price").reindex(periods)
+
+    if commodity:
+        series = prices[commodity].round(2)
+    else:
+        # Each commodity relative to its first month in the window, averaged
+        series = (prices / prices.bfill().iloc[0] * 100).mean(axis=1).round(1)
+    return periods, [None if pd.isna(value) else float(value) for value in series]
@@ -4,25 +4,62 @@ FastAPI endpoints for commodity price prediction
 
 Endpoints:
 - POST /api/prices/predict - Get price predictions
+- GET /api/prices/cache/stats - Forecast cache hit/miss counters
+- POST /api/prices/ingest - Load a CSV/Parquet price file (background job)
+- GET /api/prices/ingest/{job_id} - Ingestion progress
 - GET /api/prices/historical/{commodity} - Get historical price data
 - GET /api/prices/trends - Get market trends
 - GET /api/prices/commodities - List all commodities
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+import os
+import shutil
+import tempfile
+import time
+from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, Query, UploadFile
+from sqlalchemy import case, event, func, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple, Union
 from datetime import datetime, timedelta, date
 
-from database import get_db
-from models.price_models import CommodityPrice, PricePrediction, MarketTrend
-from ml.price_predictor import PricePredictor
+from cache import make_cache
+from database import dialect_insert, get_db, AsyncSessionLocal
+from models.price_models import Commodity, CommodityPrice, PricePrediction, MarketTrend
+from model_registry import model_registry
+from trends import mark_months, refresh as refresh_trends
 
 router = APIRouter()
 
-# Initialize ML model
-price_predictor = PricePredictor()
+def load_price_predictor():
+    """Load the price model (imported here so app startup stays fast)"""
+    from ml.price_predictor import PricePredictor
+    return PricePredictor()
+
+# ML model is loaded in the background during app startup
+model_registry.register("price", load_price_predictor)
+get_price_predictor = model_registry.dependency("price")
+
+# Forecasts are cached per (commodity, horizon, latest price date, price
+# version). Set FORECAST_CACHE_URL=redis://... to share the cache between workers.
+forecast_cache = make_cache(
+    "forecasts",
+    maxsize=int(os.getenv("FORECAST_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("FORECAST_CACHE_TTL", "3600")),
+    url=os.getenv("FORECAST_CACHE_URL")
+)
+
+# Price version each commodity's feature store buffer was seeded at; a
+# different version means prices changed (in any worker) and the buffer
+# must be rebuilt
+_seeded_versions: Dict[str, tuple] = {}
+
+# Seconds a commodity's price version read from the database is reused, so
+# cache hits mostly skip the query; prices written by other workers show up
+# within this long (this worker's own writes at once, see invalidate_forecasts)
+PRICE_VERSION_TTL = float(os.getenv("PRICE_VERSION_TTL", "5"))
+_read_versions: Dict[str, Tuple[float, Optional[str]]] = {}
 
 # Request/Response schemas
 class PricePredictionRequest(BaseModel):
@@ -31,6 +68,8 @@ class PricePredictionRequest(BaseModel):
     forecast_days: int = Field(30, ge=1, le=365, description="Days to forecast")
     state: Optional[str] = Field(None, description="State/Region")
     market: Optional[str] = Field(None, description="Market name")
+    columnar: bool = Field(False, description="Return forecasts as one array per field instead of one object per day")
+    defer_persistence: bool = Field(False, description="Store the forecasts after the response is sent instead of before")
 
 class PriceForecast(BaseModel):
     """Price forecast for a specific date"""
@@ -39,107 +78,372 @@ class PriceForecast(BaseModel):
     lower_bound: float
     upper_bound: float
 
+class PriceForecastColumns(BaseModel):
+    """Price forecasts as parallel arrays, one entry per forecast day"""
+    date: List[str]
+    predicted_price: List[float]
+    lower_bound: List[float]
+    upper_bound: List[float]
+
 class PricePredictionResponse(BaseModel):
     """Price prediction results"""
     commodity_name: str
     current_price: float
-    forecasts: List[PriceForecast]
+    forecasts: Union[List[PriceForecast], PriceForecastColumns]
     trend: str
     price_change_percentage: float
     recommendation: str
     model_accuracy: float
 
+def daily_prices_query(commodity: str, days: int = 30):
+    """Most recent daily average prices for a commodity, as (date, price) rows"""
+    return select(CommodityPrice.date, func.avg(CommodityPrice.price))\
+        .where(CommodityPrice.commodity_name == commodity)\
+        .group_by(CommodityPrice.date)\
+        .order_by(CommodityPrice.date.desc())\
+        .limit(days)
+
+async def load_daily_prices(db: AsyncSession, commodity: str, days: int = 30):
+    return (await db.execute(daily_prices_query(commodity, days))).all()
+
+async def price_version(db: AsyncSession, commodity: str) -> Optional[str]:
+    """
+    Version of a commodity's prices: the updated_at of its commodity list row,
+    which every price write sets (see record_commodities), read at most every
+    PRICE_VERSION_TTL seconds. None when the commodity is not in the list.
+    """
+    now = time.monotonic()
+    read_at, version = _read_versions.get(commodity, (None, None))
+    if read_at is None or now - read_at >= PRICE_VERSION_TTL:
+        updated_at = await db.scalar(select(Commodity.updated_at).where(Commodity.name == commodity))
+        version = updated_at.isoformat() if updated_at is not None else None
+        _read_versions[commodity] = (now, version)
+    return version
+
+def prediction_rows(commodity: str, forecasts: dict, horizon: int, model_type: str) -> List[dict]:
+    """PricePrediction rows for columnar forecasts, ready for a bulk insert"""
+    return [
+        {
+            "commodity_name": commodity,
+            "prediction_date": date.fromisoformat(forecast_date),
+            "predicted_price": price,
+            "confidence_interval_lower": lower,
+            "confidence_interval_upper": upper,
+            "model_type": model_type,
+            "model_version": "1.0",
+            "forecast_horizon_days": horizon
+        }
+        for forecast_date, price, lower, upper in zip(
+            forecasts["date"],
+            forecasts["predicted_price"],
+            forecasts["lower_bound"],
+            forecasts["upper_bound"]
+        )
+    ]
+
+async def save_predictions(db: AsyncSession, rows: List[dict]):
+    """Store prediction rows with a single executemany INSERT"""
+    if rows:
+        await db.execute(insert(PricePrediction.__table__), rows)
+    await db.commit()
+
+async def save_predictions_in_background(rows: List[dict]):
+    """Background task variant of save_predictions with its own session"""
+    async with AsyncSessionLocal() as db:
+        try:
+            await save_predictions(db, rows)
+        except Exception as e:
+            await db.rollback()
+            print(f"Failed to store {len(rows)} price predictions: {e}")
+
+def invalidate_forecasts(commodity: str):
+    """
+    Call after new CommodityPrice rows for a commodity are committed
+
+    Cached forecasts for the commodity become unreachable in this worker (in
+    every worker with a shared Redis cache). Other workers notice new prices
+    through the commodity list's updated_at, which record_commodities sets in
+    the writing transaction: the price version is part of the cache key and
+    decides when a feature store buffer is rebuilt. ORM inserts do both
+    automatically (see below); bulk Core inserts must call
+    record_commodities and this themselves.
+    """
+    forecast_cache.bump(commodity)
+
+def record_commodities(connection, date_ranges: Dict[str, Tuple[date, date]]):
+    """
+    Add commodities to the materialized commodity list, widening the stored
+    first/last price dates to include {commodity: (first, last)}
+
+    Runs on the caller's connection, inside the transaction writing the prices.
+    """
+    if not date_ranges:
+        return
+    table = Commodity.__table__
+    stmt = dialect_insert(connection.dialect.name, table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["name"],
+        set_={
+            "first_price_date": case(
+                (stmt.excluded.first_price_date < table.c.first_price_date, stmt.excluded.first_price_date),
+                else_=table.c.first_price_date
+            ),
+            "last_price_date": case(
+                (stmt.excluded.last_price_date > table.c.last_price_date, stmt.excluded.last_price_date),
+                else_=table.c.last_price_date
+            ),
+            "updated_at": stmt.excluded.updated_at
+        }
+    )
+    now = datetime.utcnow()
+    connection.execute(stmt, [
+        {"name": name, "first_price_date": first, "last_price_date": last, "updated_at": now}
+        for name, (first, last) in date_ranges.items()
+    ])
+
+async def refresh_commodity_list(db: AsyncSession):
+    """Rebuild the commodity list from commodity_prices (one full scan)"""
+    rows = (await db.execute(
+        select(CommodityPrice.commodity_name, func.min(CommodityPrice.date), func.max(CommodityPrice.date))
+        .where(CommodityPrice.commodity_name.isnot(None))
+        .group_by(CommodityPrice.commodity_name)
+    )).all()
+    date_ranges = {name: (first, last) for name, first, last in rows}
+    await db.run_sync(lambda session: record_commodities(session.connection(), date_ranges))
+    await db.commit()
+
+@event.listens_for(Session, "after_flush")
+def _collect_new_prices(session, flush_context):
+    date_ranges, months = {}, set()
+    for obj in session.new:
+        if isinstance(obj, CommodityPrice) and obj.commodity_name and obj.date:
+            first, last = date_ranges.get(obj.commodity_name, (obj.date, obj.date))
+            date_ranges[obj.commodity_name] = (min(first, obj.date), max(last, obj.date))
+            months.add((obj.commodity_name, obj.date.year, obj.date.month))
+    if date_ranges:
+        record_commodities(session.connection(), date_ranges)
+        mark_months(session.connection(), months)
+        session.info.setdefault("new_price_commodities", set()).update(date_ranges)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_new_prices(session):
+    for commodity in session.info.pop("new_price_commodities", ()):
+        invalidate_forecasts(commodity)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_new_prices(session):
+    session.info.pop("new_price_commodities", None)
+
 @router.post("/predict", response_model=PricePredictionResponse)
 async def predict_prices(
     request: PricePredictionRequest,
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    price_predictor = Depends(get_price_predictor)
 ):
     """
     Predict commodity prices using time series forecasting
     Uses XGBoost with historical price data and seasonal patterns
     """
     try:
-        # Get historical data
-        historical_data = db.query(CommodityPrice)\
-            .filter(CommodityPrice.commodity_name == request.commodity_name)\
-            .order_by(CommodityPrice.date.desc())\
-            .limit(365)\
-            .all()
+        # Recent daily prices come from the predictor's feature store; prices
+        # are only read the first time a commodity is requested, or after
+        # prices for it were written (by any worker or ingestion job)
+        feature_store = price_predictor.feature_store
+        version = (
+            await price_version(db, request.commodity_name),
+            forecast_cache.generation(request.commodity_name)
+        )
+        if not feature_store.has(request.commodity_name) or \
+                _seeded_versions.get(request.commodity_name) != version:
+            feature_store.seed(request.commodity_name, await load_daily_prices(db, request.commodity_name))
+            _seeded_versions[request.commodity_name] = version
         
-        if not historical_data:
+        latest_price_date = feature_store.last_date(request.commodity_name)
+        if latest_price_date is None:
             raise HTTPException(status_code=404, detail="No historical data found for commodity")
         
-        # Generate predictions
-        predictions = price_predictor.predict(
-            commodity=request.commodity_name,
-            historical_data=historical_data,
-            forecast_days=request.forecast_days
+        # Forecasts start tomorrow, so today's date is part of the key too.
+        # state and market are not: the forecast does not depend on them.
+        cache_key = (
+            request.commodity_name,
+            request.forecast_days,
+            latest_price_date.isoformat(),
+            date.today().isoformat(),
+            *version
         )
+        predictions = forecast_cache.get(cache_key)
         
-        # Store predictions in database
-        for pred in predictions["forecasts"]:
-            prediction_record = PricePrediction(
-                commodity_name=request.commodity_name,
-                prediction_date=datetime.strptime(pred["date"], "%Y-%m-%d").date(),
-                predicted_price=pred["predicted_price"],
-                confidence_interval_lower=pred["lower_bound"],
-                confidence_interval_upper=pred["upper_bound"],
-                model_type="xgboost",
-                model_version="1.0",
-                forecast_horizon_days=request.forecast_days
+        if predictions is None:
+            # Generate predictions
+            predictions = price_predictor.predict(
+                commodity=request.commodity_name,
+                forecast_days=request.forecast_days,
+                columnar=True
             )
-            db.add(prediction_record)
-        db.commit()
+            
+            # Store predictions in database (cached forecasts are already stored)
+            rows = prediction_rows(
+                request.commodity_name,
+                predictions["forecasts"],
+                request.forecast_days,
+                "xgboost" if price_predictor.is_trained else "mock"
+            )
+            if request.defer_persistence:
+                background_tasks.add_task(save_predictions_in_background, rows)
+            else:
+                await save_predictions(db, rows)
+            
+            forecast_cache.set(cache_key, predictions)
+        
+        # Cached dicts are shared, so build the response without modifying them
+        forecasts = predictions["forecasts"]
+        if not request.columnar:
+            forecasts = price_predictor.forecast_records(forecasts)
         
-        return PricePredictionResponse(**predictions)
+        return PricePredictionResponse(**{**predictions, "forecasts": forecasts})
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
+@router.get("/cache/stats")
+async def get_forecast_cache_stats():
+    """Forecast cache hit/miss counters (per worker)"""
+    return forecast_cache.stats()
+
+@router.post("/ingest", status_code=202)
+def ingest_prices(file: UploadFile = File(..., description="CSV or Parquet price file")):
+    """
+    Load a price file into commodity_prices in the background
+
+    The upload is spooled to a temporary file and ingested in chunks;
+    poll GET /ingest/{job_id} for progress.
+    """
+    from ingestion import start_ingestion_job
+
+    suffix = os.path.splitext(file.filename or "")[1].lower() or ".csv"
+    if suffix not in (".csv", ".parquet", ".pq"):
+        raise HTTPException(status_code=400, detail="Expected a .csv or .parquet file")
+
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as spool:
+        shutil.copyfileobj(file.file, spool, length=1024 * 1024)
+    report = start_ingestion_job(spool.name, source_name=file.filename, delete_after=True)
+    return report.to_dict()
+
+@router.get("/ingest/{job_id}")
+async def get_ingestion_progress(job_id: str):
+    """Progress and throughput of an ingestion job"""
+    from ingestion import ingestion_jobs
+
+    report = ingestion_jobs.get(job_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return report.to_dict()
+
 @router.get("/historical/{commodity}")
 async def get_historical_prices(
     commodity: str,
     days: int = Query(90, ge=1, le=730),
-    db: Session = Depends(get_db)
+    limit: int = Query(1000, ge=1, le=10000, description="Rows per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get historical price data for a commodity"""
+    """
+    Get historical price data for a commodity, oldest first
+
+    Keyset-paginated on (date, id): pass next_cursor back as cursor to get
+    the following page. Each page is an index range scan, however deep.
+    """
     cutoff_date = datetime.now().date() - timedelta(days=days)
     
-    prices = db.query(CommodityPrice)\
-        .filter(
+    start_date, after_id = cutoff_date, None
+    if cursor:
+        try:
+            cursor_date, cursor_id = cursor.split(":")
+            cursor_date, after_id = date.fromisoformat(cursor_date), int(cursor_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if cursor_date < cutoff_date:
+            after_id = None  # Every row in the window comes after the cursor
+        else:
+            start_date = cursor_date
+    
+    # A single lower date bound, so the (commodity_name, date) index seeks
+    # straight to the page (with two, the database may scan from the earlier)
+    query = select(CommodityPrice)\
+        .where(
             CommodityPrice.commodity_name == commodity,
-            CommodityPrice.date >= cutoff_date
-        )\
-        .order_by(CommodityPrice.date)\
-        .all()
+            CommodityPrice.date >= start_date
+        )
+    if after_id is not None:
+        query = query.where(or_(
+            CommodityPrice.date > start_date,
+            CommodityPrice.id > after_id
+        ))
+    
+    prices = (await db.scalars(query.order_by(CommodityPrice.date, CommodityPrice.id).limit(limit + 1))).all()
+    
+    next_cursor = None
+    if len(prices) > limit:
+        prices = prices[:limit]
+        next_cursor = f"{prices[-1].date.isoformat()}:{prices[-1].id}"
     
     return {
         "commodity": commodity,
         "data": prices,
-        "count": len(prices)
+        "count": len(prices),
+        "next_cursor": next_cursor
     }
 
 @router.get("/trends")
 async def get_market_trends(
     commodity: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get market trends and insights"""
-    query = db.query(MarketTrend)
-    if commodity:
-        query = query.filter(MarketTrend.commodity_name == commodity)
-    
-    trends = query.order_by(MarketTrend.year.desc(), MarketTrend.month.desc()).limit(50).all()
-    
-    return {"trends": trends, "count": len(trends)}
+    """Get market trends and insights (monthly, precomputed by trends.py; latest first)"""
+    try:
+        if await db.scalar(select(MarketTrend.id).limit(1)) is None:
+            # Trends not built yet (e.g. prices loaded before the job existed): one full pass
+            await db.run_sync(lambda session: refresh_trends(session.connection(), full=True))
+            await db.commit()
+
+        query = select(MarketTrend)
+        if commodity:
+            query = query.where(MarketTrend.commodity_name == commodity)
+        
+        trends = (await db.scalars(
+            query.order_by(MarketTrend.year.desc(), MarketTrend.month_number.desc(), MarketTrend.commodity_name)
+            .limit(50)
+        )).all()
+        
+        return {
+            "trends": [
+                {
+                    "commodity_name": trend.commodity_name,
+                    "month": trend.month,
+                    "year": trend.year,
+                    "avg_price": trend.avg_price,
+                    "price_volatility": trend.price_volatility,
+                    "trend_direction": trend.trend_direction,
+                    "seasonal_factor": trend.seasonal_factor
+                }
+                for trend in trends
+            ],
+            "count": len(trends)
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Market trends failed: {str(e)}")
 
 @router.get("/commodities")
-async def list_commodities(db: Session = Depends(get_db)):
+async def list_commodities(db: AsyncSession = Depends(get_db)):
     """List all available commodities"""
-    commodities = db.query(CommodityPrice.commodity_name)\
-        .distinct()\
-        .all()
-    
-    commodity_list = [c[0] for c in commodities]
+    commodity_list = (await db.scalars(select(Commodity.name).order_by(Commodity.name))).all()
+    if not commodity_list:
+        # Database created before the list was materialized: build it once
+        await refresh_commodity_list(db)
+        commodity_list = (await db.scalars(select(Commodity.name).order_by(Commodity.name))).all()
     
     return {"commodities": commodity_list, "count": len(commodity_list)}
@@ -0,0 +1,333 @@
+"""
+CHAT SESSION LIFECYCLE
+Session expiry and message archiving, so chat_messages stays small
+
+A run:
+
+- expire:  sessions idle for SESSION_IDLE_MINUTES (1440) are marked
+           is_active = False (the next turn written to one reactivates it)
+- archive: messages older than CHAT_ARCHIVE_AFTER_DAYS (30) are moved to
+           chat_archives, one row per session and run: a summary (questions,
+           answers, tokens, topics, first and last question) and the messages
+           as zlib-compressed JSON, one array per field. The session's
+           message_count drops by the messages moved.
+
+Archiving walks chat_messages in id (= write) order from its head, which is
+always the oldest unarchived messages, so a run reads what it moves plus
+one batch. Each group of ARCHIVE_SESSION_BATCH sessions is its own
+transaction; a group whose messages another worker moved first is rolled
+back, counted as skipped, and the run goes on with the next.
+
+A background thread runs every hour (SESSION_LIFECYCLE_INTERVAL seconds,
+0 disables) and keeps, for GET /api/advisory/session-lifecycle/stats, the
+counts of its last run with the size of chat_messages and its indexes and
+the latency of probe queries before and after. Run once from the backend
+folder (--reclaim then returns the freed space to the file system: VACUUM
+on SQLite, VACUUM FULL on PostgreSQL, which reuses it otherwise):
+
+    python session_lifecycle.py [--reclaim]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+import zlib
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import Integer, bindparam, delete, func, insert, or_, select, text, update
+
+from ai.categorizer import categorize
+from ai.conversation import HISTORY_MESSAGES
+from database import engine
+from models.advisory_models import ChatArchive, ChatMessage, ChatSession
+
+IDLE_TIMEOUT = timedelta(minutes=float(os.getenv("SESSION_IDLE_MINUTES", "1440")))
+ARCHIVE_AFTER = timedelta(days=float(os.getenv("CHAT_ARCHIVE_AFTER_DAYS", "30")))
+LIFECYCLE_INTERVAL = float(os.getenv("SESSION_LIFECYCLE_INTERVAL", "3600"))
+
+# Messages read per step of the walk from the head of chat_messages
+SCAN_BATCH = 5000
+# Sessions archived per transaction
+ARCHIVE_SESSION_BATCH = int(os.getenv("ARCHIVE_SESSION_BATCH", "200"))
+# Ids per IN (...), well under SQLite's bound parameter limit
+ID_BATCH = 500
+# Sessions timed by the latency probe
+PROBE_SESSIONS = 20
+
+# Archived message fields, in order
+ARCHIVE_COLUMNS = (
+    ChatMessage.id, ChatMessage.role, ChatMessage.content, ChatMessage.original_language,
+    ChatMessage.translated_content, ChatMessage.timestamp, ChatMessage.tokens_used,
+    ChatMessage.response_time_ms
+)
+
+# Counts of the last background run (per worker)
+last_run: Dict = {}
+
+class ArchiveConflict(Exception):
+    """Another worker archived some of a group's messages first; the group is rolled back"""
+    pass
+
+def expire_sessions(connection, now: Optional[datetime] = None) -> int:
+    """Mark sessions idle for IDLE_TIMEOUT inactive; the number marked"""
+    cutoff = (now or datetime.utcnow()) - IDLE_TIMEOUT
+    sessions = ChatSession.__table__
+    return connection.execute(
+        update(sessions)
+        .where(
+            or_(sessions.c.is_active.is_(None), sessions.c.is_active.is_(True)),
+            func.coalesce(sessions.c.last_activity, sessions.c.started_at) < cutoff
+        )
+        .values(is_active=False)
+    ).rowcount
+
+def summarize(messages: List[tuple]) -> dict:
+    """Summary of a session's archived messages (rows of ARCHIVE_COLUMNS, oldest first)"""
+    questions = [content or "" for _, role, content, *_ in messages if role == "user"]
+    topics = Counter(categorize(question) for question in questions)
+    return {
+        "questions": len(questions),
+        "answers": sum(role == "assistant" for _, role, *_ in messages),
+        "tokens_used": sum(row[6] or 0 for row in messages),
+        "topics": dict(topics.most_common()),
+        "first_question": questions[0][:200] if questions else None,
+        "last_question": questions[-1][:200] if questions else None
+    }
+
+def compress(messages: List[tuple]) -> bytes:
+    """Messages (rows of ARCHIVE_COLUMNS) as zlib-compressed JSON, one array per field"""
+    columns = {
+        column.name: [
+            value.isoformat() if isinstance(value, datetime) else value for value in values
+        ]
+        for column, values in zip(ARCHIVE_COLUMNS, zip(*messages))
+    }
+    return zlib.compress(json.dumps(columns, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+def decompress(payload: bytes) -> dict:
+    """The archived messages of a chat_archives row, one array per field"""
+    return json.loads(zlib.decompress(payload))
+
+def sessions_to_archive(connection, cutoff: datetime) -> List[str]:
+    """Up to ARCHIVE_SESSION_BATCH sessions with messages older than `cutoff`, from the head of chat_messages"""
+    sessions, after_id = {}, 0
+    while len(sessions) < ARCHIVE_SESSION_BATCH:
+        head = connection.execute(
+            select(ChatMessage.id, ChatMessage.session_id, ChatMessage.timestamp)
+            .where(ChatMessage.id > after_id)
+            .order_by(ChatMessage.id)
+            .limit(SCAN_BATCH)
+        ).all()
+        old = [session_id for _, session_id, timestamp in head if timestamp is not None and timestamp < cutoff]
+        for session_id in old:
+            sessions.setdefault(session_id, None)
+        # Past the archived age: later messages were written after these
+        if len(old) < len(head) or len(head) < SCAN_BATCH:
+            break
+        after_id = head[-1].id
+    return list(sessions)[:ARCHIVE_SESSION_BATCH]
+
+def archive_sessions(connection, session_ids: List[str], cutoff: datetime) -> int:
+    """Move the messages of `session_ids` older than `cutoff` to chat_archives; the number moved"""
+    rows = connection.execute(
+        select(ChatMessage.session_id, *ARCHIVE_COLUMNS)
+        .where(ChatMessage.session_id.in_(session_ids), ChatMessage.timestamp < cutoff)
+        .order_by(ChatMessage.session_id, ChatMessage.timestamp, ChatMessage.id)
+    ).all()
+    by_session = defaultdict(list)
+    for session_id, *message in rows:
+        by_session[session_id].append(tuple(message))
+    if not by_session:
+        return 0
+
+    ids = [message[0] for messages in by_session.values() for message in messages]
+    deleted = 0
+    for offset in range(0, len(ids), ID_BATCH):
+        deleted += connection.execute(
+            delete(ChatMessage.__table__).where(ChatMessage.id.in_(ids[offset:offset + ID_BATCH]))
+        ).rowcount
+    if deleted != len(ids):
+        # Another worker archived some of them first; its archive stands
+        raise ArchiveConflict(f"{len(ids) - deleted} of {len(ids)} messages already archived")
+
+    now = datetime.utcnow()
+    connection.execute(insert(ChatArchive.__table__), [
+        {
+            "session_id": session_id,
+            "first_message_id": min(message[0] for message in messages),
+            "last_message_id": max(message[0] for message in messages),
+            "started_at": messages[0][5],
+            "ended_at": messages[-1][5],
+            "message_count": len(messages),
+            "summary": summarize(messages),
+            "messages": compress(messages),
+            "archived_at": now
+        }
+        for session_id, messages in by_session.items()
+    ])
+    sessions = ChatSession.__table__
+    connection.execute(
+        update(sessions)
+        .where(sessions.c.session_id == bindparam("b_session_id"))
+        .values(message_count=func.coalesce(sessions.c.message_count, 0) - bindparam("b_archived", type_=Integer)),
+        [{"b_session_id": session_id, "b_archived": len(messages)} for session_id, messages in by_session.items()]
+    )
+    return len(ids)
+
+def archive_messages(now: Optional[datetime] = None) -> dict:
+    """Archive every message older than ARCHIVE_AFTER, one transaction per group of sessions"""
+    cutoff = (now or datetime.utcnow()) - ARCHIVE_AFTER
+    archived = sessions = skipped = 0
+    while True:
+        try:
+            with engine.begin() as connection:
+                session_ids = sessions_to_archive(connection, cutoff)
+                if not session_ids:
+                    break
+                archived += archive_sessions(connection, session_ids, cutoff)
+                sessions += len(session_ids)
+        except ArchiveConflict:
+            # The next group starts from the head as the other worker left it
+            skipped += len(session_ids)
+    return {"archived_messages": archived, "archived_sessions": sessions, "skipped_sessions": skipped}
+
+def storage(connection) -> dict:
+    """Rows of chat_messages and bytes of the table and each of its indexes (None where not available)"""
+    report = {"rows": connection.scalar(select(func.count()).select_from(ChatMessage.__table__))}
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        report["table_bytes"] = connection.scalar(text("SELECT pg_relation_size('chat_messages')"))
+        report["index_bytes"] = dict(connection.execute(text(
+            "SELECT indexrelname, pg_relation_size(indexrelid) FROM pg_stat_user_indexes "
+            "WHERE relname = 'chat_messages' ORDER BY indexrelname"
+        )).all())
+    elif dialect == "sqlite":
+        try:
+            sizes = dict(connection.execute(text(
+                "SELECT name, SUM(pgsize) FROM dbstat WHERE name IN "
+                "(SELECT name FROM sqlite_master WHERE tbl_name = 'chat_messages') GROUP BY name ORDER BY name"
+            )).all())
+        except Exception:
+            # SQLite built without the dbstat table
+            sizes = {}
+        report["table_bytes"] = sizes.pop("chat_messages", None)
+        report["index_bytes"] = sizes or None
+    else:
+        report["table_bytes"] = report["index_bytes"] = None
+    return report
+
+def probe_latency(connection) -> dict:
+    """Median milliseconds of the chat's reads of chat_messages, over the most recently active sessions"""
+    session_ids = connection.scalars(
+        select(ChatSession.session_id).order_by(ChatSession.last_activity.desc()).limit(PROBE_SESSIONS)
+    ).all()
+    queries = {
+        # load_conversation, when the session is not cached
+        "recent_turns_ms": lambda session_id: select(ChatMessage.role, ChatMessage.content)
+            .where(ChatMessage.session_id == session_id)
+            .order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc())
+            .limit(HISTORY_MESSAGES),
+        # First page of GET /api/advisory/session/{session_id}
+        "history_page_ms": lambda session_id: select(*ARCHIVE_COLUMNS)
+            .where(ChatMessage.session_id == session_id)
+            .order_by(ChatMessage.timestamp, ChatMessage.id)
+            .limit(100),
+    }
+    report = {}
+    for name, query in queries.items():
+        times = []
+        for session_id in session_ids:
+            start = time.perf_counter()
+            connection.execute(query(session_id)).all()
+            times.append(time.perf_counter() - start)
+        report[name] = round(statistics.median(times) * 1000, 3) if times else None
+    start = time.perf_counter()
+    connection.scalar(select(func.count()).select_from(ChatMessage.__table__))
+    report["count_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    return report
+
+def report() -> dict:
+    """Storage and probe latencies of chat_messages"""
+    with engine.connect() as connection:
+        return {**storage(connection), **probe_latency(connection)}
+
+def run(now: Optional[datetime] = None) -> dict:
+    """Expire idle sessions and archive old messages; counts, with the report before and after"""
+    start = time.perf_counter()
+    before = report()
+    with engine.begin() as connection:
+        expired = expire_sessions(connection, now)
+    archived = archive_messages(now)
+    return {
+        "expired_sessions": expired,
+        **archived,
+        "seconds": round(time.perf_counter() - start, 3),
+        "finished_at": datetime.utcnow().isoformat(),
+        "before": before,
+        "after": report()
+    }
+
+def reclaim():
+    """Return the space freed by archiving to the file system (locks chat_messages while it runs)"""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        if connection.dialect.name == "postgresql":
+            connection.execute(text("VACUUM FULL ANALYZE chat_messages"))
+        elif connection.dialect.name == "sqlite":
+            connection.execute(text("VACUUM"))
+
+def stats() -> dict:
+    """Settings and the last background run (empty until the first)"""
+    return {
+        "backend": "background" if LIFECYCLE_INTERVAL > 0 else "disabled",
+        "idle_minutes": IDLE_TIMEOUT.total_seconds() / 60,
+        "archive_after_days": ARCHIVE_AFTER.total_seconds() / 86400,
+        "interval_seconds": LIFECYCLE_INTERVAL,
+        "last_run": last_run or None
+    }
+
+def start_lifecycle(interval: float = LIFECYCLE_INTERVAL) -> Optional[threading.Event]:
+    """Run every `interval` seconds in a daemon thread; set the returned event to stop"""
+    if interval <= 0:
+        return None
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(interval):
+            try:
+                result = run()
+                last_run.clear()
+                last_run.update(result)
+            except Exception as e:
+                print(f"Session lifecycle run failed: {e}")
+
+    threading.Thread(target=loop, name="session-lifecycle", daemon=True).start()
+    return stop
+
+def _print_report(name: str, report: dict):
+    sizes = ", ".join(f"{index} {size / 1024:,.0f} KB" for index, size in (report["index_bytes"] or {}).items())
+    table = f"{report['table_bytes'] / 1024:,.0f} KB" if report["table_bytes"] is not None else "n/a"
+    print(f"{name:>7}: {report['rows']:,} messages, table {table}; indexes: {sizes or 'n/a'}")
+    print(f"{'':>7}  recent turns {report['recent_turns_ms']} ms, history page {report['history_page_ms']} ms, "
+          f"count {report['count_ms']} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Expire idle chat sessions and archive old chat messages")
+    parser.add_argument("--reclaim", action="store_true", help="Then return the freed space to the file system")
+    args = parser.parse_args()
+
+    ChatArchive.__table__.create(engine, checkfirst=True)
+    result = run()
+    print(f"{result['expired_sessions']} sessions expired, {result['archived_messages']:,} messages of "
+          f"{result['archived_sessions']} sessions archived in {result['seconds']:.1f}s")
+    _print_report("before", result["before"])
+    _print_report("after", result["after"])
+    if args.reclaim:
+        start = time.perf_counter()
+        reclaim()
+        print(f"Space reclaimed in {time.perf_counter() - start:.1f}s")
+        _print_report("reclaim", report())
@@ -0,0 +1,32 @@
+"""
+TEST SETUP
+Run from the backend folder:
+
+    python -m pytest tests
+
+App modules are imported by their top-level names, as the app and the
+scripts import them, and read DATABASE_URL when first imported: here it
+points to a throwaway SQLite file, whose tables are emptied per test.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+TEST_DIR = tempfile.mkdtemp(prefix="agritech-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DIR, 'test.db')}"
+
+@pytest.fixture
+def engine():
+    """The sync engine, with every table created empty"""
+    from database import Base, engine
+    from models import advisory_models, analytics_models, crop_models, price_models  # noqa: F401 (tables)
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield engine
@@ -0,0 +1,107 @@
+"""Alert engine: alerts raised and cleared, rows changed in place, racing evaluations"""
+
+import io
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import func, insert, select
+
+import alerts
+from alerts import AlertEngineBusy, evaluate, read_watermarks
+from ingestion import ingest
+from models.advisory_models import FarmerQuery
+from models.analytics_models import Alert, AlertWatermark
+from models.price_models import CommodityPrice
+
+FIRST_DAY = date(2026, 9, 1)
+
+def price_rows(prices: dict, commodity: str = "Onion") -> list:
+    """{day offset: price} -> rows of one market"""
+    return [
+        {"commodity_name": commodity, "market": "Lasalgaon", "state": "Maharashtra",
+         "date": FIRST_DAY + timedelta(days=day), "price": price}
+        for day, price in prices.items()
+    ]
+
+def price_file(prices: dict) -> io.StringIO:
+    lines = ["commodity,market,state,arrival_date,modal_price"]
+    lines += [f"{row['commodity_name']},{row['market']},{row['state']},{row['date']},{row['price']}"
+              for row in price_rows(prices)]
+    return io.StringIO("\n".join(lines) + "\n")
+
+def stored_alerts(connection) -> dict:
+    return {alert.alert_key: alert for alert in connection.execute(select(Alert)).all()}
+
+def test_price_spike_is_raised_then_cleared(engine):
+    with engine.begin() as connection:
+        connection.execute(insert(CommodityPrice), price_rows({**{day: 2000.0 for day in range(14)}, 14: 3000.0}))
+        evaluate(connection)
+        alert = stored_alerts(connection)["price_spike:Onion"]
+    assert alert.active and alert.severity == "high"
+    assert alert.metric_value == 50.0
+    assert alert.affected_regions == ["Maharashtra"]
+
+    # The next day's price is back to the week before's
+    with engine.begin() as connection:
+        connection.execute(insert(CommodityPrice), price_rows({15: 2000.0}))
+        evaluate(connection)
+        assert not stored_alerts(connection)["price_spike:Onion"].active
+
+def test_price_loaded_again_in_place_is_evaluated(engine):
+    ingest(price_file({day: 2000.0 for day in range(15)}))
+    with engine.begin() as connection:
+        evaluate(connection)
+        assert stored_alerts(connection) == {}
+        last_id = connection.scalar(select(func.max(CommodityPrice.id)))
+
+    # The last day loaded again: its row keeps its id, below the watermark
+    ingest(price_file({14: 3000.0}))
+    with engine.begin() as connection:
+        assert connection.scalar(select(func.max(CommodityPrice.id))) == last_id
+        processed = evaluate(connection)
+        alert = stored_alerts(connection)["price_spike:Onion"]
+    assert processed["commodity_prices"] == 0
+    assert alert.active and alert.metric_value == 50.0
+
+def test_query_surge_needs_the_minimum_count(engine):
+    def ask(count: int):
+        with engine.begin() as connection:
+            connection.execute(insert(FarmerQuery), [
+                {"farmer_id": f"farmer-{i}", "query_text": "Leaf curl on chilli", "query_category": "pest_control",
+                 "location": "Guntur", "created_at": datetime.utcnow()}
+                for i in range(count)
+            ])
+            evaluate(connection)
+            return stored_alerts(connection)
+
+    assert ask(alerts.SURGE_MIN_QUERIES - 1) == {}
+    alert = ask(1)["query_surge:pest_control:Guntur"]
+    assert alert.active and alert.metric_value is None
+    assert alert.message.startswith(f"High volume of pest control queries from Guntur: {alerts.SURGE_MIN_QUERIES} today")
+
+def test_racing_evaluations_advance_the_watermark_once(engine, monkeypatch):
+    with engine.begin() as connection:
+        connection.execute(insert(CommodityPrice), price_rows({day: 2000.0 for day in range(10)}))
+        evaluate(connection)
+        connection.execute(insert(CommodityPrice), price_rows({day: 2000.0 for day in range(10, 15)}))
+        stale = read_watermarks(connection)
+
+    # Another worker evaluates and commits between this evaluation's read and its update
+    with engine.begin() as connection:
+        assert evaluate(connection)["commodity_prices"] == 5
+        advanced = read_watermarks(connection)
+        connection.execute(insert(CommodityPrice), price_rows({15: 3000.0}))
+
+    monkeypatch.setattr(alerts, "read_watermarks", lambda connection: stale)
+    with pytest.raises(AlertEngineBusy):
+        with engine.begin() as connection:
+            evaluate(connection)
+    monkeypatch.undo()
+
+    with engine.begin() as connection:
+        assert read_watermarks(connection) == advanced
+        assert stored_alerts(connection) == {}
+        # The rows the busy evaluation would have covered are left to the next one
+        assert evaluate(connection)["commodity_prices"] == 1
+        assert connection.scalar(select(AlertWatermark.last_id).where(AlertWatermark.source == "commodity_prices")) == 16
+        assert stored_alerts(connection)["price_spike:Onion"].active
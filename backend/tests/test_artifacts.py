@@ -0,0 +1,79 @@
+"""Flat tree artifacts predict what the models they were saved from predict"""
+
+import json
+import os
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from ml.artifacts import ArtifactError, load_artifact, save_random_forest, save_xgboost_regressor
+
+FEATURES = ["N", "P", "K", "temperature", "humidity", "ph", "rainfall"]
+
+def crop_like_data(rows: int = 2000, seed: int = 5):
+    rng = np.random.default_rng(seed)
+    X = rng.uniform([0, 0, 0, 0, 0, 0, 0], [150, 150, 250, 50, 100, 14, 500], size=(rows, 7))
+    y = np.where(X[:, 6] > 200, "Rice", np.where(X[:, 3] > 25, "Cotton", np.where(X[:, 5] < 6, "Potato", "Wheat")))
+    # Some label noise, so trees grow deep and leaves hold mixed class counts
+    noisy = rng.random(rows) < 0.1
+    y[noisy] = rng.choice(["Rice", "Cotton", "Potato", "Wheat"], size=noisy.sum())
+    return X, y
+
+@pytest.fixture(scope="module")
+def forest():
+    X, y = crop_like_data()
+    return RandomForestClassifier(n_estimators=25, min_samples_leaf=2, random_state=0).fit(X, y), X
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_forest_artifact_matches_sklearn(forest, tmp_path, mmap):
+    model, X = forest
+    path = str(tmp_path / "crop_model.forest")
+    save_random_forest(path, model, list(model.classes_), FEATURES)
+    artifact = load_artifact(path, mmap=mmap)
+
+    # Training rows, unseen rows and rows exactly on split thresholds
+    thresholds = model.estimators_[0].tree_.threshold
+    on_split = X[:50].copy()
+    on_split[:, model.estimators_[0].tree_.feature[0]] = thresholds[0]
+    unseen, _ = crop_like_data(500, seed=9)
+    for rows in (X, unseen, on_split):
+        np.testing.assert_allclose(artifact.predict_proba(rows), model.predict_proba(rows), rtol=0, atol=1e-12)
+        np.testing.assert_array_equal(artifact.predict(rows), model.predict(rows))
+    assert list(artifact.classes_) == list(model.classes_)
+
+def test_boosted_artifact_matches_xgboost(tmp_path):
+    xgboost = pytest.importorskip("xgboost")
+    rng = np.random.default_rng(7)
+    # Price-like features: lagged prices, rolling means, calendar fields
+    X = np.column_stack([rng.uniform(1000, 4000, size=(3000, 4)), rng.integers(1, 13, 3000), rng.integers(0, 7, 3000)])
+    y = 0.6 * X[:, 0] + 0.3 * X[:, 2] + 80 * np.sin(X[:, 4] / 2) + rng.normal(0, 40, 3000)
+    model = xgboost.XGBRegressor(n_estimators=120, max_depth=5, learning_rate=0.1, random_state=0).fit(X, y)
+    path = str(tmp_path / "price_model.boosted")
+    save_xgboost_regressor(path, model, [f"f{i}" for i in range(X.shape[1])])
+    artifact = load_artifact(path)
+
+    unseen = np.column_stack([rng.uniform(800, 4200, size=(1000, 4)), rng.integers(1, 13, 1000), rng.integers(0, 7, 1000)])
+    # XGBoost goes left below the split: rows exactly on the first tree's root split go right
+    root = json.loads(model.get_booster().get_dump(dump_format="json")[0])
+    on_split = X[:50].copy()
+    on_split[:, int(root["split"].lstrip("f"))] = np.float32(root["split_condition"])
+    for rows in (X, unseen, on_split):
+        # XGBoost sums leaves in float32
+        np.testing.assert_allclose(artifact.predict(rows), model.predict(rows), rtol=1e-6)
+
+def test_tampered_artifact_is_rejected(forest, tmp_path):
+    model, _ = forest
+    path = str(tmp_path / "crop_model.forest")
+    save_random_forest(path, model, list(model.classes_), FEATURES)
+    threshold = np.load(os.path.join(path, "threshold.npy"))
+    threshold[0] += 1
+    np.save(os.path.join(path, "threshold.npy"), threshold)
+
+    with pytest.raises(ArtifactError, match="Checksum mismatch"):
+        load_artifact(path)
+    assert load_artifact(path, verify=False) is not None
+
+def test_missing_artifact_is_rejected(tmp_path):
+    with pytest.raises(ArtifactError, match="No artifact header"):
+        load_artifact(str(tmp_path / "missing.forest"))
@@ -0,0 +1,112 @@
+"""Chat log writer: spool recovery and queued turns"""
+
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from chat_log import ChatLogWriter, Spool, orphaned_spools
+from models.advisory_models import ChatMessage, ChatSession, FarmerQuery
+
+def make_turn(session_id: str, message: str, minutes: int = 0) -> dict:
+    at = datetime(2026, 10, 1, 9, 0) + timedelta(minutes=minutes)
+    return {
+        "session_id": session_id, "farmer_id": "farmer-1", "location": "Guntur", "language": "en",
+        "message": message, "response": f"Answer to {message}", "category": "general",
+        "tokens_used": 10, "response_time_ms": 5,
+        "asked_at": at, "answered_at": at, "last_activity": at
+    }
+
+def add_session(engine, session_id: str):
+    with engine.begin() as connection:
+        connection.execute(insert(ChatSession), [{
+            "session_id": session_id, "message_count": 0, "last_activity": datetime(2026, 9, 1)
+        }])
+
+def test_recovers_unwritten_turns_of_an_orphaned_spool(engine, tmp_path):
+    add_session(engine, "s1")
+    turns = [{"seq": seq, **make_turn("s1", f"question {seq}", seq)} for seq in (1, 2, 3)]
+    spool = Spool(str(tmp_path))
+    for turn in turns:
+        spool.append(turn)
+    # Turn 1 was written before the worker died; its last line was cut short
+    spool.checkpoint(1, turns[1:])
+    spool.file.write('{"seq": 4, "session_id": "s1", "mess')
+    spool.close(remove=False)
+
+    writer = ChatLogWriter(flush_interval=0, spool_dir=str(tmp_path))
+    asyncio.run(writer.start())
+
+    with engine.connect() as connection:
+        messages = connection.execute(
+            select(ChatMessage.role, ChatMessage.content).order_by(ChatMessage.id)
+        ).all()
+        queries = connection.scalars(select(FarmerQuery.query_text).order_by(FarmerQuery.id)).all()
+        session = connection.execute(select(ChatSession).where(ChatSession.session_id == "s1")).one()
+    assert messages == [
+        ("user", "question 2"), ("assistant", "Answer to question 2"),
+        ("user", "question 3"), ("assistant", "Answer to question 3")
+    ]
+    assert queries == ["question 2", "question 3"]
+    assert session.message_count == 4
+    assert session.last_activity == turns[2]["last_activity"]
+    assert writer.recovered == 2
+    assert not os.listdir(tmp_path)
+
+def test_leaves_the_spool_of_a_running_worker_alone(engine, tmp_path):
+    spool = Spool(str(tmp_path))
+    spool.append({"seq": 1, **make_turn("s1", "question 1")})
+
+    assert list(orphaned_spools(str(tmp_path))) == []
+    spool.close(remove=True)
+
+def test_close_writes_the_queued_turns(engine, tmp_path):
+    add_session(engine, "s1")
+
+    async def run():
+        # No flush before close: the interval is longer than the test
+        writer = ChatLogWriter(flush_interval=60, spool_dir=str(tmp_path))
+        await writer.start()
+        for minute in (1, 2, 3):
+            await writer.submit(make_turn("s1", f"question {minute}", minute))
+        written = writer.stats()["written"]
+        await writer.close()
+        return writer, written
+
+    writer, written = asyncio.run(run())
+
+    assert written == 0 and writer.stats()["written"] == 3
+    with engine.connect() as connection:
+        contents = connection.scalars(
+            select(ChatMessage.content).where(ChatMessage.role == "user").order_by(ChatMessage.id)
+        ).all()
+        session = connection.execute(select(ChatSession).where(ChatSession.session_id == "s1")).one()
+    assert contents == ["question 1", "question 2", "question 3"]
+    assert session.message_count == 6
+    assert session.last_activity == datetime(2026, 10, 1, 9, 3)
+    assert not os.listdir(tmp_path)
+
+def test_queued_turns_are_pending_until_written(engine, tmp_path):
+    add_session(engine, "s1")
+    add_session(engine, "s2")
+
+    async def run():
+        writer = ChatLogWriter(flush_interval=60, spool_dir=str(tmp_path))
+        await writer.start()
+        await writer.submit(make_turn("s1", "question 1", 1))
+        await writer.submit(make_turn("s2", "question 2", 2))
+        await writer.submit(make_turn("s1", "question 3", 3))
+        pending = [turn["message"] for turn in writer.pending_turns("s1")]
+        last_activity = writer.last_activity("s1")
+        await writer.close()
+        return writer, pending, last_activity
+
+    writer, pending, last_activity = asyncio.run(run())
+
+    assert pending == ["question 1", "question 3"]
+    assert last_activity == datetime(2026, 10, 1, 9, 3)
+    assert writer.pending_turns("s1") == [] and writer.last_activity("s1") is None
+    with engine.connect() as connection:
+        assert connection.scalar(select(ChatSession.message_count).where(ChatSession.session_id == "s1")) == 4
+    assert not os.listdir(tmp_path)
@@ -0,0 +1,97 @@
+"""Session lifecycle: archived messages, and groups archived by another worker"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event, insert, select
+
+import session_lifecycle
+from models.advisory_models import ChatArchive, ChatMessage, ChatSession
+from session_lifecycle import ARCHIVE_COLUMNS, ArchiveConflict, archive_messages, archive_sessions
+
+NOW = datetime(2026, 10, 1, 12, 0)
+CUTOFF = NOW - session_lifecycle.ARCHIVE_AFTER
+
+def add_session(engine, session_id: str, turns: list):
+    """A session with a question and an answer at each of `turns` (days before NOW)"""
+    messages = []
+    for turn, days in enumerate(turns):
+        at = NOW - timedelta(days=days)
+        messages += [
+            {"session_id": session_id, "role": "user", "content": f"How much urea for paddy? ({turn})",
+             "original_language": "en", "timestamp": at, "tokens_used": None, "response_time_ms": None},
+            {"session_id": session_id, "role": "assistant", "content": f"About 100 kg per acre ({turn})",
+             "original_language": "en", "timestamp": at + timedelta(seconds=2), "tokens_used": 40, "response_time_ms": 900}
+        ]
+    with engine.begin() as connection:
+        connection.execute(insert(ChatSession), [{"session_id": session_id, "message_count": len(messages)}])
+        connection.execute(insert(ChatMessage), messages)
+
+def message_count(connection, session_id: str) -> int:
+    return connection.scalar(select(ChatSession.message_count).where(ChatSession.session_id == session_id))
+
+def test_archive_holds_exactly_the_moved_messages(engine):
+    add_session(engine, "s1", [45, 40, 31, 2])
+    add_session(engine, "s2", [1])
+    with engine.connect() as connection:
+        old = connection.execute(
+            select(*ARCHIVE_COLUMNS)
+            .where(ChatMessage.session_id == "s1", ChatMessage.timestamp < CUTOFF)
+            .order_by(ChatMessage.id)
+        ).all()
+
+    assert archive_messages(NOW) == {"archived_messages": 6, "archived_sessions": 1, "skipped_sessions": 0}
+
+    with engine.connect() as connection:
+        remaining = connection.scalars(select(ChatMessage.id).order_by(ChatMessage.id)).all()
+        assert message_count(connection, "s1") == 2
+        assert message_count(connection, "s2") == 2
+    assert set(remaining).isdisjoint(row.id for row in old) and len(remaining) == 4
+
+    from routes.advisory_routes import router
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api/advisory")
+    with TestClient(app) as client:
+        response = client.get("/api/advisory/session/s1/archive", params={"include_messages": True})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["count"] == 1 and body["message_count"] == 6
+    archive = body["archives"][0]
+    assert archive["summary"]["questions"] == 3 and archive["summary"]["tokens_used"] == 120
+    assert archive["messages"] == {
+        column.name: [value.isoformat() if isinstance(value, datetime) else value for value in values]
+        for column, values in zip(ARCHIVE_COLUMNS, zip(*old))
+    }
+
+def test_group_archived_by_another_worker_is_rolled_back(engine):
+    add_session(engine, "s1", [40, 35])
+    add_session(engine, "s2", [50, 33, 32])
+
+    def archive_first(connection, cursor, statement, *args):
+        # Another worker archives s1 between this group's read and its delete
+        if statement.startswith("DELETE FROM chat_messages") and not raced:
+            raced.append(statement)
+            with engine.begin() as other:
+                archive_sessions(other, ["s1"], CUTOFF)
+
+    raced = []
+    event.listen(engine, "before_cursor_execute", archive_first)
+    try:
+        with pytest.raises(ArchiveConflict):
+            with engine.begin() as connection:
+                archive_sessions(connection, ["s1", "s2"], CUTOFF)
+    finally:
+        event.remove(engine, "before_cursor_execute", archive_first)
+
+    with engine.connect() as connection:
+        archives = connection.execute(select(ChatArchive.session_id, ChatArchive.message_count)).all()
+        # s1 is archived once, by the other worker; s2 is left as it was
+        assert archives == [("s1", 4)]
+        assert message_count(connection, "s1") == 0
+        assert message_count(connection, "s2") == 6
+        assert len(connection.scalars(select(ChatMessage.id).where(ChatMessage.session_id == "s2")).all()) == 6
+
+    assert archive_messages(NOW) == {"archived_messages": 6, "archived_sessions": 1, "skipped_sessions": 0}
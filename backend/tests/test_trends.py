@@ -0,0 +1,72 @@
+"""Market trends: a refresh of the pending months matches a full rebuild"""
+
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import delete, insert, select, update
+
+from models.price_models import CommodityPrice, MarketTrend, PendingTrendMonth
+from trends import mark_months, months_in, refresh
+
+def price_rows(rng, commodity: str, first: date, days: int, base: float, markets=("Lasalgaon", "Pimpalgaon")) -> list:
+    return [
+        {"commodity_name": commodity, "market": market, "state": "Maharashtra",
+         "date": first + timedelta(days=day), "price": float(base * (1 + 0.3 * np.sin(day / 30)) + rng.normal(0, 50))}
+        for day in range(days) for market in markets
+    ]
+
+def write_prices(connection, rows: list):
+    connection.execute(insert(CommodityPrice), rows)
+    mark_months(connection, months_in([row["commodity_name"] for row in rows], [row["date"] for row in rows]))
+
+def stored_trends(connection) -> dict:
+    rows = connection.execute(select(
+        MarketTrend.commodity_name, MarketTrend.year, MarketTrend.month_number, MarketTrend.avg_price,
+        MarketTrend.price_volatility, MarketTrend.trend_direction, MarketTrend.seasonal_factor
+    )).all()
+    return {(commodity, year, month): values for commodity, year, month, *values in rows}
+
+def test_refresh_matches_full_rebuild(engine):
+    rng = np.random.default_rng(3)
+    with engine.begin() as connection:
+        write_prices(connection, price_rows(rng, "Onion", date(2025, 1, 1), 540, 2000))
+        write_prices(connection, price_rows(rng, "Tomato", date(2025, 3, 10), 400, 1500))
+        refresh(connection, full=True)
+        assert connection.scalar(select(PendingTrendMonth.commodity_name)) is None
+
+    with engine.begin() as connection:
+        # New months, prices of another market in a stored month, a changed price and a month removed
+        write_prices(connection, price_rows(rng, "Onion", date(2026, 6, 25), 60, 2600))
+        write_prices(connection, price_rows(rng, "Tomato", date(2025, 7, 1), 31, 900, markets=("Kolar",)))
+        write_prices(connection, price_rows(rng, "Garlic", date(2026, 5, 1), 90, 8000))
+        removed = CommodityPrice.date.between(date(2025, 11, 1), date(2025, 11, 30))
+        connection.execute(delete(CommodityPrice).where(CommodityPrice.commodity_name == "Onion", removed))
+        mark_months(connection, {("Onion", 2025, 11)})
+        connection.execute(
+            update(CommodityPrice)
+            .where(CommodityPrice.commodity_name == "Tomato", CommodityPrice.date == date(2026, 2, 14))
+            .values(price=CommodityPrice.price * 3)
+        )
+        mark_months(connection, {("Tomato", 2026, 2)})
+
+    with engine.begin() as connection:
+        assert refresh(connection) > 0
+        refreshed = stored_trends(connection)
+        assert connection.scalar(select(PendingTrendMonth.commodity_name)) is None
+    with engine.begin() as connection:
+        refresh(connection, full=True)
+        rebuilt = stored_trends(connection)
+
+    assert ("Onion", 2025, 11) not in rebuilt
+    assert refreshed.keys() == rebuilt.keys()
+    for key, (avg_price, volatility, direction, seasonal) in rebuilt.items():
+        assert refreshed[key][0] == pytest.approx(avg_price, rel=1e-9), key
+        assert refreshed[key][1] == pytest.approx(volatility, rel=1e-9), key
+        assert refreshed[key][2] == direction, key
+        assert refreshed[key][3] == pytest.approx(seasonal, abs=1e-4), key
+
+def test_refresh_without_pending_months_writes_nothing(engine):
+    with engine.begin() as connection:
+        assert refresh(connection) == 0
+        assert stored_trends(connection) == {}
@@ -0,0 +1,287 @@
+"""
+MARKET TRENDS
+Monthly price statistics behind GET /api/prices/trends and GET /api/government/trends
+
+One market_trends row per commodity and calendar month, computed from
+commodity_prices with pandas groupbys:
+
+- avg_price:        mean of the daily average prices (all markets)
+- price_volatility: standard deviation / mean of those daily prices
+- trend_direction:  increasing / decreasing / stable, vs the previous month (2% band)
+- seasonal_factor:  avg_price / mean avg_price of the last 12 months
+
+Writing prices marks their (commodity, month) in market_trend_pending
+(the flush hook in routes/price_routes.py and ingestion.py call
+mark_months). A refresh re-aggregates only the pending months from the raw
+prices, then re-derives direction and seasonal factor from the stored
+monthly series for the months at and after them. A background thread
+refreshes every 10 minutes (MARKET_TRENDS_REFRESH_INTERVAL seconds,
+0 disables). Full rebuild from the backend folder:
+
+    python trends.py [--full]
+"""
+
+import argparse
+import calendar
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, bindparam, delete, func, or_, select
+
+from database import dialect_insert, engine
+from models.price_models import CommodityPrice, MarketTrend, PendingTrendMonth
+
+# Month-over-month change below which a commodity counts as stable
+TREND_THRESHOLD = 0.02
+SEASONAL_WINDOW_MONTHS = 12
+
+REFRESH_INTERVAL = float(os.getenv("MARKET_TRENDS_REFRESH_INTERVAL", "600"))
+
+# Commodities per IN (...) when reading stored trends, well under SQLite's bound parameter limit
+COMMODITY_BATCH = 500
+
+Month = Tuple[str, int, int]  # (commodity, year, month number)
+
+def months_in(commodities: Iterable[str], dates: Iterable[date]) -> Set[Month]:
+    """Distinct (commodity, year, month) of paired commodity names and dates (None skipped)"""
+    return {
+        (commodity, day.year, day.month)
+        for commodity, day in zip(commodities, dates)
+        if commodity is not None and day is not None
+    }
+
+def mark_months(connection, months: Set[Month]):
+    """
+    Queue commodity months for the next refresh
+
+    Runs on the caller's connection, inside the transaction writing the prices.
+    """
+    if not months:
+        return
+    table = PendingTrendMonth.__table__
+    stmt = dialect_insert(connection.dialect.name, table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["commodity_name", "year", "month_number"],
+        set_={"marked_at": stmt.excluded.marked_at}
+    )
+    now = datetime.utcnow()
+    connection.execute(stmt, [
+        {"commodity_name": commodity, "year": year, "month_number": month, "marked_at": now}
+        for commodity, year, month in months
+    ])
+
+def _month_ranges(months: List[Tuple[int, int]]) -> List[Tuple[date, date]]:
+    """[first day, day after) of each run of consecutive (year, month)s"""
+    ranges = []
+    for year, month in sorted(months):
+        start = date(year, month, 1)
+        end = date(year + month // 12, month % 12 + 1, 1)
+        if ranges and ranges[-1][1] == start:
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((start, end))
+    return ranges
+
+def aggregate_months(connection, pending: Optional[Dict[str, Set[Tuple[int, int]]]]) -> "pd.DataFrame":
+    """
+    avg_price and price_volatility per (commodity, month), from the daily
+    average prices of the given {commodity: {(year, month)}}, or of every
+    commodity and month when pending is None
+    """
+    # Imported here so app startup (routes import this module) stays fast
+    import pandas as pd
+
+    query = (
+        select(CommodityPrice.commodity_name, CommodityPrice.date, func.avg(CommodityPrice.price))
+        .where(CommodityPrice.commodity_name.isnot(None), CommodityPrice.date.isnot(None),
+               CommodityPrice.price.isnot(None))
+        .group_by(CommodityPrice.commodity_name, CommodityPrice.date)
+    )
+    if pending is None:
+        rows = connection.execute(query).all()
+    else:
+        # One query per commodity, so each reads (commodity, date) index ranges
+        rows = []
+        for commodity, months in pending.items():
+            rows.extend(connection.execute(query.where(
+                CommodityPrice.commodity_name == commodity,
+                or_(*[and_(CommodityPrice.date >= start, CommodityPrice.date < end)
+                      for start, end in _month_ranges(list(months))])
+            )).all())
+
+    daily = pd.DataFrame(rows, columns=["commodity", "date", "price"])
+    daily["date"] = pd.to_datetime(daily["date"])
+    daily["price"] = daily["price"].astype(float)
+    prices = daily.groupby(["commodity", daily["date"].dt.to_period("M").rename("period")])["price"]
+    monthly = prices.agg(["mean", "std"]).rename(columns={"mean": "avg_price"})
+    monthly["price_volatility"] = (monthly.pop("std") / monthly["avg_price"]).fillna(0.0).round(4)
+    # Rounded as stored, so derive() gives the same result from fresh and stored months
+    monthly["avg_price"] = monthly["avg_price"].round(2)
+    return monthly
+
+def derive(monthly: "pd.DataFrame") -> "pd.DataFrame":
+    """Add trend_direction and seasonal_factor to a (commodity, period) indexed avg_price frame"""
+    import numpy as np
+    import pandas as pd
+
+    if monthly.empty:
+        return monthly.assign(trend_direction=None, seasonal_factor=None)
+    commodities = monthly.index.get_level_values("commodity")
+    periods = monthly.index.get_level_values("period")
+    month = pd.Series(periods.year * 12 + periods.month - 1, index=commodities)
+
+    # Every calendar month from each commodity's first to its last, so the shift and
+    # the rolling window count gaps (months without prices) as months, not as zeros
+    first, last = month.groupby(level=0).min(), month.groupby(level=0).max()
+    lengths = (last - first + 1).to_numpy()
+    starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    grid = pd.MultiIndex.from_arrays([
+        np.repeat(first.index.to_numpy(), lengths),
+        np.repeat(first.to_numpy(), lengths) + np.arange(lengths.sum()) - starts
+    ])
+    series = pd.Series(monthly["avg_price"].to_numpy(), index=pd.MultiIndex.from_arrays([commodities, month])) \
+        .reindex(grid)
+    by_commodity = series.groupby(level=0)
+
+    change = series / by_commodity.shift(1) - 1
+    direction = pd.Series(np.select(
+        [change > TREND_THRESHOLD, change < -TREND_THRESHOLD, change.notna()],
+        ["increasing", "decreasing", "stable"], default=None
+    ), index=grid)
+    trailing_mean = by_commodity.rolling(SEASONAL_WINDOW_MONTHS, min_periods=1).mean().droplevel(0)
+    seasonal = series / trailing_mean
+
+    rows = pd.MultiIndex.from_arrays([commodities, month])
+    return monthly.assign(
+        trend_direction=direction.reindex(rows).to_numpy(),
+        seasonal_factor=seasonal.reindex(rows).to_numpy()
+    )
+
+def _stored_months(connection, commodities: List[str]) -> "pd.DataFrame":
+    import pandas as pd
+
+    rows = []
+    for i in range(0, len(commodities), COMMODITY_BATCH):
+        rows.extend(connection.execute(
+            select(MarketTrend.commodity_name, MarketTrend.year, MarketTrend.month_number,
+                   MarketTrend.avg_price, MarketTrend.price_volatility)
+            .where(MarketTrend.commodity_name.in_(commodities[i:i + COMMODITY_BATCH]))
+        ).all())
+    stored = pd.DataFrame(rows, columns=["commodity", "year", "month", "avg_price", "price_volatility"])
+    stored["period"] = pd.PeriodIndex.from_fields(year=stored["year"], month=stored["month"], freq="M")
+    return stored.set_index(["commodity", "period"])[["avg_price", "price_volatility"]]
+
+def _write(connection, trends: "pd.DataFrame"):
+    if trends.empty:
+        return
+    table = MarketTrend.__table__
+    stmt = dialect_insert(connection.dialect.name, table)
+    columns = ["month", "avg_price", "price_volatility", "trend_direction", "seasonal_factor"]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["commodity_name", "year", "month_number"],
+        set_={column: stmt.excluded[column] for column in columns}
+    )
+    now = datetime.utcnow()
+    connection.execute(stmt, [
+        {"commodity_name": commodity, "year": period.year, "month_number": period.month,
+         "month": calendar.month_name[period.month], "avg_price": float(avg),
+         "price_volatility": float(volatility), "trend_direction": direction,
+         "seasonal_factor": round(float(seasonal), 4), "created_at": now}
+        for (commodity, period), avg, volatility, direction, seasonal in trends[
+            ["avg_price", "price_volatility", "trend_direction", "seasonal_factor"]
+        ].itertuples()
+    ])
+
+def refresh(connection, full: bool = False) -> int:
+    """Recompute the pending commodity months (every month with full=True); returns rows written"""
+    import pandas as pd
+
+    started = datetime.utcnow()
+    if full:
+        monthly = aggregate_months(connection, None)
+        connection.execute(delete(MarketTrend))
+        trends = derive(monthly)
+        _write(connection, trends)
+        connection.execute(delete(PendingTrendMonth).where(PendingTrendMonth.marked_at <= started))
+        return len(trends)
+
+    marked = connection.execute(select(
+        PendingTrendMonth.commodity_name, PendingTrendMonth.year,
+        PendingTrendMonth.month_number, PendingTrendMonth.marked_at
+    )).all()
+    if not marked:
+        return 0
+    pending = defaultdict(set)
+    for commodity, year, month, _ in marked:
+        pending[commodity].add((year, month))
+
+    fresh = aggregate_months(connection, pending)
+    stored = _stored_months(connection, list(pending))
+    touched = pd.MultiIndex.from_tuples(
+        [(commodity, pd.Period(year=year, month=month, freq="M")) for commodity, year, month, _ in marked],
+        names=["commodity", "period"]
+    )
+    # Pending months replace their stored rows; those left without prices are removed
+    monthly = pd.concat([stored.drop(touched, errors="ignore"), fresh]).sort_index()
+    emptied = touched.difference(fresh.index)
+    if len(emptied):
+        connection.execute(
+            delete(MarketTrend).where(
+                MarketTrend.commodity_name == bindparam("c"), MarketTrend.year == bindparam("y"),
+                MarketTrend.month_number == bindparam("m")
+            ),
+            [{"c": commodity, "y": period.year, "m": period.month} for commodity, period in emptied]
+        )
+
+    # Direction and the trailing seasonal mean change from the earliest pending month on
+    trends = derive(monthly) if len(monthly) else monthly
+    if len(trends):
+        first_touched = pd.Series(touched.get_level_values("period"), index=touched.get_level_values("commodity"))
+        first_touched = first_touched.groupby(level=0).min()
+        periods = trends.index.get_level_values("period")
+        commodities = trends.index.get_level_values("commodity")
+        trends = trends[periods >= first_touched.reindex(commodities).values]
+    _write(connection, trends)
+
+    # A month marked again while this ran keeps its newer marked_at and stays pending
+    connection.execute(
+        delete(PendingTrendMonth).where(
+            PendingTrendMonth.commodity_name == bindparam("c"), PendingTrendMonth.year == bindparam("y"),
+            PendingTrendMonth.month_number == bindparam("m"), PendingTrendMonth.marked_at == bindparam("t")
+        ),
+        [{"c": commodity, "y": year, "m": month, "t": marked_at} for commodity, year, month, marked_at in marked]
+    )
+    return len(trends)
+
+def start_refresh(interval: float = REFRESH_INTERVAL) -> Optional[threading.Event]:
+    """Refresh pending months every `interval` seconds in a daemon thread; set the returned event to stop"""
+    if interval <= 0:
+        return None
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            try:
+                with engine.begin() as connection:
+                    refresh(connection)
+            except Exception as e:
+                print(f"Market trend refresh failed: {e}")
+
+    threading.Thread(target=run, name="market-trends", daemon=True).start()
+    return stop
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute the monthly market trends")
+    parser.add_argument("--full", action="store_true", help="Rebuild every month, not just the pending ones")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with engine.begin() as connection:
+        MarketTrend.__table__.create(connection, checkfirst=True)
+        PendingTrendMonth.__table__.create(connection, checkfirst=True)
+        written = refresh(connection, full=args.full)
+    print(f"{written} market trend rows written in {time.perf_counter() - start:.1f}s")